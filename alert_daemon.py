@@ -0,0 +1,309 @@
+import heapq
+import itertools
+import json
+import os
+import threading
+import time
+import urllib.request
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+
+import pandas as pd
+
+from analysis import breakdown_levels, breakout_levels
+from core import cached_analyze_frame, cached_key_levels, cached_load_market, invalidate_market
+from live_feed import cached_quote, is_new_bar
+from market_data import MTF_BY_TF, REGULAR_OPEN, market_session, next_bar_time, next_session_open
+
+# --- Alert Daemon: เฝ้า Watchlist เบื้องหลัง คำนวณ God Mode ใหม่เฉพาะหุ้นที่มีแท่งใหม่ แล้วส่งแจ้งเตือน ---
+# คิวลำดับความสำคัญเรียงตามเวลาที่แท่งถัดไปควรเกิด: หุ้นที่ยังไม่ถึงเวลาไม่ถูกแตะเลย (ไม่ยิง Quote/ไม่คำนวณ)
+# ถึงเวลาแล้วดู Quote (ผ่านแคชกลาง) ก่อน ถ้ายังไม่ขึ้นแท่งใหม่ก็เลื่อนคิวไป poll_every วินาที
+# python -m cli watch AAPL MSFT NVDA --tf 1d --every 60 --alerts alerts.jsonl
+
+ALERTS_PATH = os.environ.get("ALERTS_PATH", os.path.join(os.path.dirname(os.path.abspath(__file__)), ".alerts.jsonl"))
+
+POLL_EVERY = 60.0          # วินาที: ถึงเวลาแท่งใหม่แล้วแต่ยังไม่มา -> ดู Quote ซ้ำทุกเท่านี้
+NO_BAR_BACKOFF_MAX = 1800  # ดึงแล้วแท่งยังไม่เปลี่ยน (ตลาดปิด/วันหยุด) -> ถอยเวลาเป็นเท่าตัว ไม่เกินเท่านี้
+MAX_WORKERS = 4            # คำนวณพร้อมกันได้กี่ตัว
+MAX_SYMBOLS = 500          # จำกัดขนาด Watchlist (สถานะต่อหุ้นเล็ก แต่กันใส่ผิดเป็นหลักหมื่น)
+RECENT_ALERTS = 200        # แจ้งเตือนล่าสุดที่เก็บไว้ในหน่วยความจำ (ที่เหลืออยู่ใน Sink)
+
+ALERT_DEMAND_ZONE = "demand_zone"
+ALERT_BREAKDOWN = "breakdown"
+ALERT_BREAKOUT = "breakout"
+ALERT_STATUS = "status_change"
+
+
+# --- Snapshot + Diff: สถานะย่อของหุ้น 1 ตัว ณ แท่งล่าสุด (ไม่เก็บ DataFrame ไว้ระหว่างรอบ) ---
+
+def evaluate_symbol(symbol, interval="1d", mtf_interval=None, cache=None):
+    """ผล God Mode + Breakdown/Breakout ของแท่งล่าสุด (ทางเดียวกับหน้าเว็บ ผ่านแคชกลาง) คืนค่า dict เล็กๆ หรือ None"""
+    df, info, df_mtf, df_stats_day, df_stats_week = cached_load_market(symbol, interval, mtf_interval, cache=cache)
+    if df is None or df.empty or len(df) <= 20: return None
+    ctx = cached_analyze_frame(symbol, interval, df, df_mtf, price=info.get('regularMarketPrice'), cache=cache)
+    if ctx is None: return None
+    levels = cached_key_levels(symbol, interval, ctx, df_stats_day, df_stats_week, cache=cache)
+    price = float(ctx['price']); r = ctx['ai_report']
+    breakdown = breakdown_levels(levels, price)
+    return {
+        "symbol": symbol, "interval": interval, "bar_ts": df.index[-1], "price": price,
+        "status_color": r['status_color'], "strategy": r['strategy'], "score": int(r['score']),
+        "in_demand_zone": bool(r['in_demand_zone']),
+        # เหมือนหน้าเว็บ: มีแนวรับแตกแล้วไม่แสดง Breakout
+        "breakdown": breakdown, "breakout": [] if breakdown else breakout_levels(levels, price),
+    }
+
+
+def _level_name(label):
+    """'EMA 50 (123.45)' -> 'EMA 50' (ค่าของเส้นขยับทุกแท่ง เทียบกันด้วยชื่อ)"""
+    return label.split(" (")[0].split(" [")[0]
+
+
+def diff_alerts(prev, snap):
+    """แจ้งเตือนจากการเปลี่ยนแปลงระหว่าง Snapshot ก่อนหน้ากับปัจจุบัน (prev=None = รอบแรก ไม่แจ้ง)"""
+    if prev is None or snap is None: return []
+    base = {"symbol": snap['symbol'], "interval": snap['interval'], "bar_ts": snap['bar_ts'], "price": snap['price'],
+            "status_color": snap['status_color'], "strategy": snap['strategy'], "score": snap['score']}
+    alerts = []
+    if snap['in_demand_zone'] and not prev['in_demand_zone']:
+        alerts.append({**base, "kind": ALERT_DEMAND_ZONE, "message": f"🟢 {snap['symbol']} เข้า Demand Zone ที่ {snap['price']:.2f}"})
+    for kind, key, icon, text in ((ALERT_BREAKDOWN, 'breakdown', "🚨", "หลุดแนวรับ"), (ALERT_BREAKOUT, 'breakout', "🚀", "เบรคแนวต้าน")):
+        seen = {_level_name(x) for x in prev[key]}
+        new = [x for x in snap[key] if _level_name(x) not in seen]
+        if new: alerts.append({**base, "kind": kind, "levels": new, "message": f"{icon} {snap['symbol']} {text}: {', '.join(new)}"})
+    if snap['status_color'] != prev['status_color']:
+        alerts.append({**base, "kind": ALERT_STATUS, "prev_status": prev['status_color'],
+                       "message": f"🚦 {snap['symbol']} สถานะ {prev['status_color']} -> {snap['status_color']} ({snap['strategy']})"})
+    return alerts
+
+
+# --- Sinks: ปลายทางของแจ้งเตือน ---
+
+def _jsonable(alert):
+    return {k: v.isoformat() if isinstance(v, pd.Timestamp) else v for k, v in alert.items()}
+
+
+class FileSink:
+    """ต่อท้ายไฟล์ JSON Lines (1 แจ้งเตือนต่อบรรทัด)"""
+
+    def __init__(self, path=ALERTS_PATH):
+        self.path = path
+        self._lock = threading.Lock()
+
+    def emit(self, alert):
+        with self._lock, open(self.path, "a", encoding="utf-8") as f:
+            f.write(json.dumps(_jsonable(alert), ensure_ascii=False) + "\n")
+
+
+class WebhookSink:
+    """POST JSON ไปที่ URL (Slack/Discord/LINE Notify Proxy หรือ Server ทดสอบในเครื่อง)"""
+
+    def __init__(self, url, timeout=5.0):
+        self.url = url
+        self.timeout = timeout
+
+    def emit(self, alert):
+        data = json.dumps(_jsonable(alert), ensure_ascii=False).encode("utf-8")
+        req = urllib.request.Request(self.url, data=data, headers={"Content-Type": "application/json"}, method="POST")
+        with urllib.request.urlopen(req, timeout=self.timeout) as resp: resp.read()
+
+
+class ConsoleSink:
+    """พิมพ์ข้อความแจ้งเตือนออกจอ (ใช้กับ CLI)"""
+
+    def emit(self, alert):
+        print(f"[{alert['ts']:%Y-%m-%d %H:%M:%S}] {alert['message']}", flush=True)
+
+
+class MemorySink:
+    """เก็บในหน่วยความจำแบบจำกัดจำนวน (ทดสอบแบบ Offline)"""
+
+    def __init__(self, maxlen=RECENT_ALERTS):
+        self.alerts = deque(maxlen=maxlen)
+
+    def emit(self, alert):
+        self.alerts.append(alert)
+
+
+# --- Daemon ---
+
+def _epoch(ts):
+    ts = pd.Timestamp(ts)
+    return (ts if ts.tzinfo else ts.tz_localize("UTC")).timestamp()
+
+
+class AlertDaemon:
+    """
+    Watchlist + คิวตามเวลาแท่งถัดไป (heap ของ (due, seq, symbol)) + Thread Pool จำกัดจำนวน
+    - ถึงเวลา: ดู Quote -> ถ้าขึ้นแท่งใหม่ invalidate_market แล้วคำนวณใหม่ (evaluate_symbol) เทียบกับ Snapshot เดิม
+    - สถานะต่อหุ้น = Snapshot ล่าสุด 1 ก้อน (ไม่ถือ DataFrame) -> หน่วยความจำโตตามจำนวนหุ้นเท่านั้น
+    - Sink พังไม่ทำให้ Daemon หยุด (นับไว้ใน sink_errors)
+    """
+
+    def __init__(self, symbols=(), interval="1d", mtf_interval=None, sinks=None, poll_every=POLL_EVERY,
+                 max_workers=MAX_WORKERS, max_symbols=MAX_SYMBOLS, quote_source=None, cache=None, clock=time.time):
+        self.interval = interval
+        self.mtf_interval = mtf_interval or MTF_BY_TF.get(interval, "1wk")
+        self.sinks = list(sinks) if sinks is not None else [FileSink()]
+        self.poll_every = poll_every
+        self.max_workers = max_workers
+        self.max_symbols = max_symbols
+        self.quote_source = quote_source
+        self.cache = cache
+        self.clock = clock
+        self.recent = deque(maxlen=RECENT_ALERTS)
+        self.evaluations = 0
+        self.quote_checks = 0
+        self.sink_errors = 0
+        self.last_error = None
+        self._state = {}             # symbol -> {"snap": dict|None, "misses": int, "gen": int}
+        self._heap = []
+        self._seq = itertools.count()
+        self._in_flight = set()
+        self._cond = threading.Condition()
+        self._stopping = False
+        self._thread = None
+        self._pool = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="alert")
+        for s in symbols: self.add(s)
+
+    # --- Watchlist ---
+    def add(self, symbol, due=None):
+        symbol = symbol.upper().strip()
+        with self._cond:
+            if symbol in self._state: return False
+            if len(self._state) >= self.max_symbols: raise ValueError(f"Watchlist เต็ม ({self.max_symbols} ตัว)")
+            self._state[symbol] = {"snap": None, "misses": 0}
+            self._push(symbol, self.clock() if due is None else due)
+            self._cond.notify()
+        return True
+
+    def remove(self, symbol):
+        """เอาออกจาก Watchlist (รายการในคิวที่ค้างอยู่ gen ไม่ตรงแล้ว -> ถูกทิ้งตอนถึงเวลา)"""
+        with self._cond: return self._state.pop(symbol.upper().strip(), None) is not None
+
+    @property
+    def symbols(self):
+        with self._cond: return list(self._state)
+
+    def snapshot(self, symbol):
+        with self._cond:
+            state = self._state.get(symbol.upper())
+            return dict(state["snap"]) if state and state["snap"] else None
+
+    def next_due(self):
+        with self._cond: return self._heap[0][0] if self._heap else None
+
+    # --- Scheduling ---
+    def step(self, now=None):
+        """ส่งงานของหุ้นที่ถึงเวลา (งานค้างไม่เกิน max_workers) คืนค่าจำนวนงานที่ส่ง"""
+        now = self.clock() if now is None else now
+        submitted = 0
+        with self._cond:
+            while self._heap and self._heap[0][0] <= now and len(self._in_flight) < self.max_workers:
+                _, gen, symbol = heapq.heappop(self._heap)
+                state = self._state.get(symbol)
+                # รายการเก่า (ถูก remove/add ใหม่ หรือมีรายการใหม่แทนแล้ว) -> ทิ้ง / กำลังเช็คอยู่ -> _schedule จะลงคิวให้เอง
+                if state is None or state["gen"] != gen or symbol in self._in_flight: continue
+                self._in_flight.add(symbol)
+                self._pool.submit(self._check, symbol)
+                submitted += 1
+        return submitted
+
+    def _push(self, symbol, due):
+        """ลงคิว (ถือ _cond อยู่) 1 หุ้นมีรายการที่ใช้ได้รายการเดียว = gen ล่าสุดใน _state"""
+        gen = self._state[symbol]["gen"] = next(self._seq)
+        heapq.heappush(self._heap, (due, gen, symbol))
+
+    def _schedule(self, symbol, due):
+        with self._cond:
+            self._in_flight.discard(symbol)
+            if symbol in self._state: self._push(symbol, due)
+            self._cond.notify_all()
+
+    def _check(self, symbol):
+        now = self.clock()
+        due = now + self.poll_every
+        try:
+            with self._cond:
+                state = self._state.get(symbol)
+                prev = state["snap"] if state else None
+            if state is None: return
+            if prev is not None:
+                with self._cond: self.quote_checks += 1
+                quote = cached_quote(symbol, source=self.quote_source, cache=self.cache)
+                if quote is None: return   # แหล่ง Quote ไม่ตอบ -> ลองใหม่ใน poll_every วินาที
+                if not is_new_bar(quote, prev['bar_ts'], self.interval):
+                    # ยังไม่ขึ้นแท่งใหม่ -> ดูใหม่ poll_every วินาที / Quote ไม่รู้แท่ง (yfinance) + นอกเวลาตลาดปกติ:
+                    # แท่งใหม่เกิดไม่ได้จนกว่าตลาดเปิด -> หลับถึงเวลาเปิด ไม่ยิง Quote ทั้งคืน/เสาร์-อาทิตย์
+                    wall = pd.Timestamp(now, unit="s", tz="UTC")
+                    if quote.get("bar_ts") is None and market_session(wall) != "REGULAR":
+                        due = max(due, _epoch(next_session_open(wall, at=REGULAR_OPEN)))
+                    return
+                invalidate_market(symbol, self.interval, self.mtf_interval, cache=self.cache)
+            snap = evaluate_symbol(symbol, self.interval, self.mtf_interval, cache=self.cache)
+            with self._cond:
+                self.evaluations += 1
+                if snap is None or symbol not in self._state: return
+                if prev is not None and snap['bar_ts'] == prev['bar_ts']:
+                    # Quote บอกว่าถึงเวลาแล้ว แต่แหล่งข้อมูลยังไม่มีแท่งใหม่ -> ถอยเวลาเป็นเท่าตัว
+                    state["misses"] += 1
+                    due = now + min(NO_BAR_BACKOFF_MAX, self.poll_every * 2 ** state["misses"])
+                else:
+                    state["misses"] = 0
+                    due = max(due, _epoch(next_bar_time(snap['bar_ts'], self.interval)))
+                state["snap"] = snap
+            for alert in diff_alerts(prev, snap): self._emit(alert)
+        except Exception as e:
+            self.last_error = f"{symbol}: {e!r}"
+        finally:
+            self._schedule(symbol, due)
+
+    def _emit(self, alert):
+        alert = {"ts": pd.Timestamp.now(tz="UTC"), **alert}
+        self.recent.append(alert)
+        for sink in self.sinks:
+            try: sink.emit(alert)
+            except Exception as e:
+                with self._cond: self.sink_errors += 1; self.last_error = f"sink: {e!r}"
+
+    # --- Run Loop ---
+    def run(self, max_cycles=None):
+        """วนจนกว่าจะ stop() (หรือครบ max_cycles รอบ) หลับจนถึงคิวถัดไป/มีงานเสร็จ"""
+        cycles = 0
+        while max_cycles is None or cycles < max_cycles:
+            self.step()
+            cycles += 1
+            with self._cond:
+                if self._stopping: break
+                wait = self.poll_every
+                if self._heap and len(self._in_flight) < self.max_workers: wait = min(wait, max(0.0, self._heap[0][0] - self.clock()))
+                self._cond.wait(wait)
+                if self._stopping: break
+
+    def start(self):
+        self._thread = threading.Thread(target=self.run, name="alert-daemon", daemon=True)
+        self._thread.start()
+        return self
+
+    def wait_idle(self, timeout=None):
+        """รอจนไม่มีงานค้าง (ใช้ตอนทดสอบ)"""
+        deadline = None if timeout is None else time.monotonic() + timeout
+        with self._cond:
+            while self._in_flight:
+                remaining = None if deadline is None else deadline - time.monotonic()
+                if remaining is not None and remaining <= 0: return False
+                self._cond.wait(remaining if remaining is not None else 0.5)
+        return True
+
+    def stop(self, timeout=5.0):
+        with self._cond:
+            self._stopping = True
+            self._cond.notify_all()
+        if self._thread is not None: self._thread.join(timeout)
+        self._pool.shutdown(wait=True)
+
+    def stats(self):
+        with self._cond:
+            return {"symbols": len(self._state), "queued": len(self._heap), "in_flight": len(self._in_flight),
+                    "evaluations": self.evaluations, "quote_checks": self.quote_checks,
+                    "alerts": len(self.recent), "sink_errors": self.sink_errors, "last_error": self.last_error}
@@ -0,0 +1,892 @@
+import numpy as np
+import pandas as pd
+
+from indicators import ADX_COL, BBL_COL, BBU_COL, MACD_COL, MACDS_COL, compute_indicator_frame, ema
+from market_data import bar_end_times
+
+# --- Analysis Core: ฟังก์ชันวิเคราะห์ล้วนๆ (ไม่ยุ่งกับ Streamlit ใช้ได้ทั้งหน้าเว็บ, Scanner และ Worker Process) ---
+
+# --- Candlestick Reader (4-Bar Logic) ---
+# ติดป้ายทุกแท่งในครั้งเดียวด้วย Array ที่ Shift แล้ว + Boolean Mask (ลำดับความสำคัญเดิม: 3-4 แท่ง > 2 แท่ง > แท่งเดียว)
+
+BULL_COLOR = "🟢 เขียว (Buying)"
+BEAR_COLOR = "🔴 แดง (Selling)"
+
+CANDLE_INSUFFICIENT = -1
+CANDLE_NORMAL = 0
+CANDLE_THREE_BLACK_CROWS = 1
+CANDLE_THREE_WHITE_SOLDIERS = 2
+CANDLE_MORNING_STAR = 3
+CANDLE_EVENING_STAR = 4
+CANDLE_BEARISH_ENGULFING = 5
+CANDLE_BULLISH_ENGULFING = 6
+CANDLE_HAMMER = 7
+CANDLE_SHOOTING_STAR = 8
+CANDLE_BIG_BULLISH = 9
+CANDLE_BIG_BEARISH = 10
+CANDLE_DOJI = 11
+
+# code -> (ชื่อ Pattern, รายละเอียด, สีคงที่ของ Pattern หรือ None = ตามสีแท่ง)
+CANDLE_PATTERNS = {
+    CANDLE_INSUFFICIENT: ("Normal Candle", "ข้อมูลไม่เพียงพอ", "gray"),
+    CANDLE_NORMAL: ("Normal Candle (ปกติ)", "แรงซื้อขายสมดุล", None),
+    CANDLE_THREE_BLACK_CROWS: ("🦅 Three Black Crows (อีกา 3 ตัว)", "แรงขายทุบต่อเนื่อง 3 วัน (ระวังลงลึก)", BEAR_COLOR),
+    CANDLE_THREE_WHITE_SOLDIERS: ("💂 Three White Soldiers (3 ทหารเสือ)", "แรงซื้อดันต่อเนื่อง 3 วัน (แข็งแกร่ง)", BULL_COLOR),
+    CANDLE_MORNING_STAR: ("🌅 Morning Star (รุ่งอรุณ)", "กลับตัวขึ้นสวยงาม (Confirm Reversal)", BULL_COLOR),
+    CANDLE_EVENING_STAR: ("🌆 Evening Star (พลบค่ำ)", "กลับตัวลงชัดเจน (Confirm Reversal)", BEAR_COLOR),
+    CANDLE_BEARISH_ENGULFING: ("🐻 Bearish Engulfing (กลืนกินขาลง)", "แท่งแดงกลบแท่งเขียวเมื่อวาน", BEAR_COLOR),
+    CANDLE_BULLISH_ENGULFING: ("🐂 Bullish Engulfing (กลืนกินขาขึ้น)", "แท่งเขียวกลบแท่งแดงเมื่อวาน", BULL_COLOR),
+    CANDLE_HAMMER: ("🔨 Hammer/Pinbar (ค้อน)", "ปฏิเสธราคาต่ำ (แรงซื้อสวน)", None),
+    CANDLE_SHOOTING_STAR: ("☄️ Shooting Star (ดาวตก)", "ปฏิเสธราคาสูง (แรงขายตบ)", None),
+    CANDLE_BIG_BULLISH: ("Big Bullish (แท่งเขียวตัน)", "แรงซื้อ/ขาย คุมตลาดเบ็ดเสร็จ", None),
+    CANDLE_BIG_BEARISH: ("Big Bearish (แท่งแดงตัน)", "แรงซื้อ/ขาย คุมตลาดเบ็ดเสร็จ", None),
+    CANDLE_DOJI: ("Doji (โดจิ)", "ตลาดลังเล (Indecision)", None),
+}
+
+def classify_candles(df):
+    """
+    อ่านแท่งเทียนทุกแท่งของ df พร้อมกัน (แต่ละแท่งใช้ตัวเองกับ 3 แท่งก่อนหน้า)
+    คืนค่า DataFrame: Candle_Code (รหัสใน CANDLE_PATTERNS), Candle_Color, Candle_Big
+    """
+    o = df['Open'].to_numpy(dtype="float64"); h = df['High'].to_numpy(dtype="float64")
+    l = df['Low'].to_numpy(dtype="float64"); c = df['Close'].to_numpy(dtype="float64")
+
+    def prev(x, k):
+        out = np.full(len(x), np.nan); out[k:] = x[:len(x) - k]
+        return out
+
+    o2, c2, h2, l2 = prev(o, 2), prev(c, 2), prev(h, 2), prev(l, 2)  # 2 วันก่อน
+    o3, c3 = prev(o, 1), prev(c, 1)                                    # เมื่อวาน (Prev)
+
+    body = np.abs(c - o); range_len = h - l
+    is_bull = c >= o; is_prev_bull = c3 >= o3
+    c2_body = np.abs(c2 - o2); c2_range = h2 - l2
+    c3_small = np.abs(c3 - o3) < c2_body * 0.4
+    midpoint = (o2 + c2) / 2
+    wick_up = h - np.maximum(c, o); wick_low = np.minimum(c, o) - l
+
+    # --- 🧠 LEVEL 1: รูปแบบกลุ่ม 3-4 แท่ง ---
+    crows = (c2 < o2) & (c3 < o3) & (c < o) & (c < c3) & (c3 < c2)
+    soldiers = (c2 > o2) & (c3 > o3) & (c > o) & (c > c3) & (c3 > c2)
+    morning = (c2 < o2) & (c2_body > c2_range * 0.5) & c3_small & (c > o) & (c > midpoint)
+    evening = (c2 > o2) & (c2_body > c2_range * 0.5) & c3_small & (c < o) & (c < midpoint)
+    # --- 🧠 LEVEL 2: รูปแบบ 2 แท่ง ---
+    bear_engulf = is_prev_bull & ~is_bull & (o >= c3) & (c <= o3)
+    bull_engulf = ~is_prev_bull & is_bull & (o <= c3) & (c >= o3)
+    # --- 🧠 LEVEL 3: รูปแบบแท่งเดียว ---
+    hammer = (wick_low > body * 2) & (wick_up < body)
+    shooting = (wick_up > body * 2) & (wick_low < body)
+    big = body > range_len * 0.6
+    doji = body < range_len * 0.1
+
+    code = np.select(
+        [crows, soldiers, morning, evening, bear_engulf, bull_engulf, hammer, shooting, big & is_bull, big, doji],
+        [CANDLE_THREE_BLACK_CROWS, CANDLE_THREE_WHITE_SOLDIERS, CANDLE_MORNING_STAR, CANDLE_EVENING_STAR,
+         CANDLE_BEARISH_ENGULFING, CANDLE_BULLISH_ENGULFING, CANDLE_HAMMER, CANDLE_SHOOTING_STAR,
+         CANDLE_BIG_BULLISH, CANDLE_BIG_BEARISH, CANDLE_DOJI],
+        default=CANDLE_NORMAL).astype("int8")
+    code[:3] = CANDLE_INSUFFICIENT
+
+    color = np.where(is_bull, BULL_COLOR, BEAR_COLOR).astype(object)
+    for k, (_, _, fixed) in CANDLE_PATTERNS.items():
+        if fixed is not None: color[code == k] = fixed
+    is_big = (code >= CANDLE_THREE_BLACK_CROWS) & (code <= CANDLE_BULLISH_ENGULFING) | (code == CANDLE_BIG_BULLISH) | (code == CANDLE_BIG_BEARISH)
+    return pd.DataFrame({'Candle_Code': code, 'Candle_Color': color, 'Candle_Big': is_big}, index=df.index)
+
+def candle_info(code, color, is_big):
+    """แปลงผลของ classify_candles 1 แถวเป็น (pattern_name, color, detail, is_big) แบบเดิม"""
+    name, detail, _ = CANDLE_PATTERNS[int(code)]
+    return name, color, detail, bool(is_big)
+
+def analyze_candlestick(df_window):
+    """
+    ฟังก์ชันอ่านแท่งเทียน Pro Max (4-Bar Logic)
+    รับค่า: DataFrame ย้อนหลัง 4 แท่ง (Index 0=ไกลสุด, 3=ล่าสุด)
+    """
+    if len(df_window) < 4: 
+        return "Normal Candle", "gray", "ข้อมูลไม่เพียงพอ", False
+    last = classify_candles(df_window.iloc[-4:]).iloc[-1]
+    return candle_info(last['Candle_Code'], last['Candle_Color'], last['Candle_Big'])
+
+# --- SMC: Find Zones ---
+# ตรวจว่าโซนยังไม่ถูกทำลายด้วย Suffix Min/Max ของราคาปิด (ย้อนจากท้าย) แทนการ Slice ข้อมูลอนาคตทีละจุด -> O(N)
+# แต่ละโซนมี 'index' (ตำแหน่งแท่ง Swing) และ 'timestamp' (เวลาที่เกิดโซน) เพิ่มจาก bottom/top
+
+def _swing_zones(df, atr_multiplier, is_demand):
+    zones = []
+    if len(df) < 20: return zones
+    if is_demand:
+        s = df['Low']
+        is_swing = (s < s.shift(1)) & (s < s.shift(2)) & (s < s.shift(-1)) & (s < s.shift(-2))
+    else:
+        s = df['High']
+        is_swing = (s > s.shift(1)) & (s > s.shift(2)) & (s > s.shift(-1)) & (s > s.shift(-2))
+    n = len(df)
+    pos = np.flatnonzero(is_swing.to_numpy())
+    pos = pos[pos < n - 2]
+    if len(pos) == 0: return zones
+
+    close = df['Close'].to_numpy(dtype="float64")
+    current_price = close[-1]
+    swing_val = s.to_numpy(dtype="float64")[pos]
+    atr_val = df['ATR'].to_numpy(dtype="float64")[pos] if 'ATR' in df.columns else swing_val * 0.02
+    atr_val = np.where(np.isnan(atr_val), swing_val * 0.02, atr_val)
+
+    # Suffix Min/Max ของ Close (NaN ไม่นับ) -> future_extreme[i] = ค่าต่ำ/สูงสุดของแท่งหลังแท่ง i
+    if is_demand:
+        suffix = np.minimum.accumulate(np.where(np.isnan(close), np.inf, close)[::-1])[::-1]
+        zone_bottom = swing_val; zone_top = swing_val + (atr_val * atr_multiplier)
+        too_far = (current_price - zone_top) / current_price > 0.20
+        broken = suffix[pos + 1] < zone_bottom
+    else:
+        suffix = np.maximum.accumulate(np.where(np.isnan(close), -np.inf, close)[::-1])[::-1]
+        zone_top = swing_val; zone_bottom = swing_val - (atr_val * atr_multiplier)
+        too_far = (zone_bottom - current_price) / current_price > 0.20
+        broken = suffix[pos + 1] > zone_top
+
+    for k in np.flatnonzero(~too_far & ~broken):
+        zones.append({'bottom': zone_bottom[k], 'top': zone_top[k], 'index': int(pos[k]), 'timestamp': df.index[pos[k]]})
+    return zones
+
+def find_demand_zones(df, atr_multiplier=0.25):
+    return _swing_zones(df, atr_multiplier, is_demand=True)
+
+def find_supply_zones(df, atr_multiplier=0.25):
+    return _swing_zones(df, atr_multiplier, is_demand=False)
+
+def _first_close_below(close, start, thr):
+    """
+    ตำแหน่งแรก t >= start ที่ close[t] < thr (ไม่มี = len(close)) ของทุก Query พร้อมกัน
+    ใช้ Sparse Table ของ Min แล้วกระโดดแบบ Binary Lifting -> O((N + Q) log N)
+    """
+    n = len(close)
+    c = np.where(np.isnan(close), np.inf, close)
+    table = [c]
+    k = 1
+    while (1 << k) <= n:
+        prev = table[-1]; half = 1 << (k - 1)
+        table.append(np.minimum(prev[:n - (1 << k) + 1], prev[half:half + n - (1 << k) + 1]))
+        k += 1
+    pos = np.asarray(start, dtype=np.int64).copy()
+    for k in range(len(table) - 1, -1, -1):
+        span = 1 << k
+        ok = pos + span <= n
+        idx = np.where(ok, pos, 0)
+        jump = ok & (table[k][np.minimum(idx, len(table[k]) - 1)] >= thr)
+        pos = np.where(jump, pos + span, pos)
+    return pos
+
+def demand_swings(df):
+    """
+    Swing Low ทั้งหมดของ df (ไม่ขึ้นกับความหนาโซน): ตำแหน่ง, ราคา Low, ATR ณ Swing และแท่งแรกที่ปิดหลุด
+    คำนวณครั้งเดียวแล้วสร้าง Timeline ได้หลาย atr_multiplier/zone_buffer (optimizer ใช้ซ้ำ)
+    """
+    low = df['Low'].to_numpy(dtype="float64"); close = df['Close'].to_numpy(dtype="float64")
+    s = df['Low']
+    is_swing = (s < s.shift(1)) & (s < s.shift(2)) & (s < s.shift(-1)) & (s < s.shift(-2))
+    pos = np.flatnonzero(is_swing.to_numpy())
+    bottoms = low[pos]
+    atr_val = df['ATR'].to_numpy(dtype="float64")[pos] if 'ATR' in df.columns else bottoms * 0.02
+    atr_val = np.where(np.isnan(atr_val), bottoms * 0.02, atr_val)
+    return pos, bottoms, atr_val, _first_close_below(close, pos + 1, bottoms)
+
+def zone_hits(low, high, close, pos, bottoms, tops, ends, zone_buffer=0.015):
+    """แต่ละแท่งแตะโซนไหน (โซนแรกที่แตะได้ชนะ เหมือน break ในลูปของ ai_hybrid_analysis) คืนค่า (in_zone, zone_bottom)"""
+    n = len(close)
+    in_zone = np.zeros(n, dtype=bool); zone_bottom = np.full(n, np.nan)
+    with np.errstate(invalid="ignore"):
+        # ไล่จากโซนเก่าไปใหม่
+        for i, bottom, top, end in zip(pos, bottoms, tops, ends):
+            seg = slice(i + 2, end)
+            lo = low[seg]; hi = high[seg]; px = close[seg]
+            hit = ~in_zone[seg] & ~((px - top) / px > 0.20) & (lo <= top * (1 + zone_buffer)) & (hi >= bottom)
+            if hit.any():
+                idx = np.flatnonzero(hit) + i + 2
+                in_zone[idx] = True; zone_bottom[idx] = bottom
+    return in_zone, zone_bottom
+
+def demand_zone_timeline(df, demand_zones=None, atr_multiplier=0.25, zone_buffer=0.015):
+    """
+    Demand Zone ของทุกแท่งแบบไม่มองอนาคต: แท่ง T เห็นเฉพาะโซนที่ find_demand_zones(df.iloc[:T+1]) จะเจอ
+    (Swing ยืนยันแล้ว, ยังไม่ถูกปิดหลุด, ไม่ไกลเกิน 20%) แล้วเลือกโซนแรกที่ราคาแท่งนั้นเข้ามาแตะ (Buffer 1.5%)
+    ถ้าส่ง demand_zones มา (เช่นผลของ find_demand_zones) จะใช้ชุดนั้นแทน (เริ่มมีผลหลัง Swing ยืนยัน)
+    คืนค่า (in_zone: bool[N], zone_bottom: float[N])
+    """
+    n = len(df)
+    if n < 20: return np.zeros(n, dtype=bool), np.full(n, np.nan)
+    low = df['Low'].to_numpy(dtype="float64"); high = df['High'].to_numpy(dtype="float64")
+    close = df['Close'].to_numpy(dtype="float64")
+
+    if demand_zones is None:
+        pos, bottoms, atr_val, ends = demand_swings(df)
+        tops = bottoms + atr_val * atr_multiplier
+    else:
+        pos = np.array([z['index'] for z in demand_zones], dtype=np.int64)
+        bottoms = np.array([z['bottom'] for z in demand_zones], dtype="float64")
+        tops = np.array([z['top'] for z in demand_zones], dtype="float64")
+        ends = np.full(len(pos), n, dtype=np.int64)
+    return zone_hits(low, high, close, pos, bottoms, tops, ends, zone_buffer)
+
+# --- Volume Reader ---
+
+def analyze_volume(row, vol_ma):
+    vol = row['Volume']
+    if np.isnan(vol_ma) or vol_ma == 0: return "☁️ ปกติ", "gray"
+    pct = (vol / vol_ma) * 100
+    if pct >= 250: return f"💣 สูงมาก/ระเบิด ({pct:.0f}%)", "#7f1d1d"
+    elif pct >= 120: return f"🔥 สูง/คึกคัก ({pct:.0f}%)", "#16a34a"
+    elif pct <= 70: return f"🌵 ต่ำ/เบาบาง ({pct:.0f}%)", "#f59e0b"
+    else: return f"☁️ ปกติ ({pct:.0f}%)", "gray"
+
+# --- 7. AI Decision Engine (THE UPGRADED BRAIN - GOD MODE) ---
+
+def ai_hybrid_analysis(price, ema20, ema50, ema200, rsi, macd_val, macd_sig, adx, bb_up, bb_low, 
+                       vol_status, mtf_trend, atr_val, mtf_ema200_val,
+                       open_price, high, low, close, obv_val, obv_avg,
+                       obv_slope, prev_open, prev_close, vol_now, vol_avg, demand_zones,
+                       is_squeeze, df_candles): 
+
+    def safe(x): return float(x) if not np.isnan(float(x)) else np.nan
+    price = safe(price); ema20 = safe(ema20); ema50 = safe(ema50); ema200 = safe(ema200)
+    atr_val = safe(atr_val); obv_slope = safe(obv_slope); vol_now = safe(vol_now); vol_avg = safe(vol_avg)
+
+    # 1. 🔬 Deep Vision: อ่านแท่งเทียน 4 แท่งแบบละเอียด
+    candle_pattern, candle_color, candle_detail, is_big_candle = analyze_candlestick(df_candles)
+    
+    is_reversal_up = any(x in candle_pattern for x in ["Hammer", "Bullish Engulfing", "Morning Star", "Three White Soldiers"])
+    is_reversal_down = any(x in candle_pattern for x in ["Shooting Star", "Bearish Engulfing", "Evening Star", "Three Black Crows"])
+    
+    is_shooting_star = "Shooting Star" in candle_pattern
+
+    # Volume Logic (Smart Check)
+    is_vol_dry = vol_now < (vol_avg * 0.8) 
+    is_vol_climax = vol_now > (vol_avg * 2.0) 
+    vol_txt, vol_col = analyze_volume({'Volume': vol_now}, vol_avg)
+
+    # 2. 🏗️ Zone Checking (Buffer 1.5%)
+    in_demand_zone = False; active_zone = None; confluence_msg = ""
+    if demand_zones:
+        for zone in demand_zones:
+            if (low <= zone['top'] * 1.015) and (high >= zone['bottom']):
+                in_demand_zone = True; active_zone = zone; break
+    
+    is_confluence = False
+    if in_demand_zone:
+        if not np.isnan(ema200) and abs(active_zone['bottom'] - ema200) / price < 0.02: is_confluence = True; confluence_msg = "Zone + EMA 200"
+        elif not np.isnan(ema50) and abs(active_zone['bottom'] - ema50) / price < 0.02: is_confluence = True; confluence_msg = "Zone + EMA 50"
+
+    # 3. 🌊 Regime Filter (ADX & Trend)
+    is_strong_trend = adx > 25 if not np.isnan(adx) else False
+    is_major_uptrend = price > ema200 if not np.isnan(ema200) else True
+
+    # --- 🧠 CONTEXTUAL SCORING SYSTEM (God Mode) ---
+    score = 0
+    bullish = []
+    bearish = []
+    ctx = ""
+
+    # A. 🏛️ Structural Score (โครงสร้างพื้นฐาน)
+    if not np.isnan(ema200):
+        if price > ema200: score += 3; bullish.append("Structure: ยืนเหนือ EMA 200 (ขาขึ้นระยะยาว)")
+        else: score -= 3; bearish.append("Structure: หลุด EMA 200 (ขาลงระยะยาว)")
+
+    if not np.isnan(ema50):
+        if price > ema50: score += 2; bullish.append("Structure: ยืนเหนือ EMA 50 (แกร่งระยะกลาง)")
+        else: score -= 1; bearish.append("Structure: หลุด EMA 50 (เสียทรงระยะกลาง)")
+
+    # B. 🕯️ Price Action Score (ตัดสินใจด้วย 4 แท่ง + บริบท)
+    # --- กลุ่มสัญญาณลบ (Bearish) ---
+    if "Three Black Crows" in candle_pattern:
+        score -= 3 # โดนหนัก
+        bearish.append("🦅 Three Black Crows: แรงขายทุบ 3 วันติด (อันตราย)")
+        ctx = "🩸 Panic Dump: หนีตาย (เจ้ามือทิ้งของ)" # Veto
+
+    elif "Evening Star" in candle_pattern:
+        score -= 2
+        bearish.append("🌆 Evening Star: กลับตัวลงสมบูรณ์แบบ")
+        if score < 2: ctx = "📉 Reversal: สัญญาณกลับตัวลงชัดเจน"
+
+    elif "Bearish Engulfing" in candle_pattern:
+        # Contextual Check: วอลุ่มและการย่อตัว
+        if is_vol_climax: 
+            score -= 3 # วอลุ่มพีค = เจ้าทิ้ง
+            bearish.append("🐻 Bearish Engulfing + Vol Peak (เจ้ามือทิ้งของ)")
+            ctx = "🩸 Panic Sell: แรงขายมหาศาล"
+        elif is_major_uptrend and is_vol_dry:
+            score += 1 # พลิกวิกฤตเป็นโอกาส
+            bullish.append("🐂 Bullish Pullback: แท่งแดงวอลุ่มแห้ง (ย่อเพื่อไปต่อ)")
+        else:
+            score -= 2 # ปกติ
+            bearish.append("⚠️ Bearish Engulfing: แรงขายชนะแรงซื้อ")
+
+    elif is_shooting_star:
+        if price > bb_up: # ชน Bollinger Band บน
+            score -= 2
+            bearish.append("☄️ Shooting Star: โดนตบที่แนวต้าน BB (Overbought)")
+        else:
+            score -= 1
+            bearish.append("☄️ Shooting Star: มีแรงขายกดดันข้างบน")
+
+    # --- กลุ่มสัญญาณบวก (Bullish) ---
+    if "Three White Soldiers" in candle_pattern:
+        score += 3
+        bullish.append("💂 Three White Soldiers: แรงซื้อ 3 วันติด (แข็งแกร่งมาก)")
+
+    elif "Morning Star" in candle_pattern:
+        if in_demand_zone:
+            score += 3 # คูณพิเศษ
+            bullish.append("🌅 Morning Star (in Zone): จุดกลับตัวต้นน้ำสวยงาม")
+        else:
+            score += 2
+            bullish.append("🌅 Morning Star: กลับตัวขึ้นสมบูรณ์")
+
+    elif "Bullish Engulfing" in candle_pattern:
+        # Contextual Check: วอลุ่มและตำแหน่ง
+        if rsi > 70: # ซื้อยอดดอย
+            score -= 1
+            bearish.append("⚠️ Bullish Trap: เขียวที่ยอดดอย (RSI Overbought)")
+        elif is_vol_climax:
+            score += 3
+            bullish.append("🚀 Power Buy: แท่งเขียวกลืนกิน + วอลุ่มระเบิด")
+        else:
+            score += 2
+            bullish.append("🐂 Bullish Engulfing: แรงซื้อชนะแรงขาย")
+
+    # C. 📊 Volume & Flow Analysis (Smart OBV)
+    obv_strength_pct = 0
+    if vol_avg > 0 and not np.isnan(obv_slope):
+        obv_strength_pct = (obv_slope / vol_avg) * 100
+    
+    obv_insight = f"Flow ปกติ ({obv_strength_pct:.1f}%)"
+
+    if obv_strength_pct > 5: # เงินเข้า
+        if obv_strength_pct > 60: obv_insight = f"🚀 กวาดซื้อ ({obv_strength_pct:.1f}%)"
+        else: obv_insight = f"💎 เก็บของ ({obv_strength_pct:.1f}%)"
+        
+        # Bullish Divergence Check
+        if price < ema20: # ราคาลงแต่เงินเข้า
+            score += 2
+            bullish.append(f"Bullish Divergence: ราคาลงแต่เงินเข้า ({obv_strength_pct:.1f}%)")
+            obv_insight = "Bullish Div (เก็บของ)"
+        else:
+            score += 1
+            bullish.append(f"Fund Flow: เงินไหลเข้าต่อเนื่อง")
+
+    elif obv_strength_pct < -5: # เงินออก
+        if obv_strength_pct < -60: obv_insight = f"🩸 ทิ้งของ ({obv_strength_pct:.1f}%)"
+        else: obv_insight = f"💧 รินขาย ({obv_strength_pct:.1f}%)"
+
+        # Bearish Divergence Check
+        if price > ema20: # ราคาขึ้นแต่เงินออก
+            score -= 2
+            bearish.append(f"Bearish Divergence: ราคาขึ้นแต่เงินออก ({obv_strength_pct:.1f}%)")
+            obv_insight = "Bearish Div (รินขาย)"
+        else:
+            score -= 1
+            bearish.append(f"Fund Flow: เงินไหลออกต่อเนื่อง")
+
+    # D. ⚡ Momentum & Indicators (RSI/MACD)
+    if not np.isnan(macd_val) and macd_val > macd_sig: score += 1; bullish.append("MACD ตัดขึ้น")
+    elif not np.isnan(macd_val): score -= 1
+
+    # RSI Context
+    if not np.isnan(rsi):
+        if is_strong_trend and is_major_uptrend:
+            if rsi > 75 and not is_vol_climax: score += 1; bullish.append(f"RSI {rsi:.0f}: Super Bullish Trend") # Run trend
+            elif rsi < 45: score += 2; bullish.append(f"RSI {rsi:.0f}: Dip Opportunity (ย่อซื้อ)")
+        else: # Sideway
+            if rsi > 65: score -= 2; bearish.append(f"RSI {rsi:.0f}: Overbought (ระวังต้าน)")
+            elif rsi < 30: score += 2; bullish.append(f"RSI {rsi:.0f}: Oversold (รอเด้ง)")
+
+    # E. 🛡️ Special Context (Veto Rules)
+    if in_demand_zone:
+        score += 3; bullish.append("🟢 In Demand Zone (ต้นทุนดี)")
+        if is_confluence: score += 1; bullish.append(f"⭐ {confluence_msg}")
+        if not ctx: ctx = "💎 Sniper Mode (เข้าโซนสวย)"
+
+    # Final Context Generation
+    if ctx == "":
+        if score >= 5: ctx = "🚀 Bullish Breakout: โมเมนตัมกระทิงดุ"
+        elif score >= 2: ctx = "📈 Uptrend Structure: ย่อตัวเพื่อขึ้นต่อ"
+        elif score <= -4: ctx = "🩸 Bearish Crash: แรงขายรุนแรง (ห้ามรับ)"
+        elif score <= -1: ctx = "📉 Downtrend Pressure: เด้งเพื่อลง"
+        else: ctx = "⚖️ Sideway/Neutral: รอเลือกทาง"
+
+    # --- FINAL STATUS ASSIGNMENT ---
+    if score >= 6:
+        color = "green"; title = "🚀 Sniper Entry: จุดซื้อคมกริบ"; strat = "Aggressive Buy"
+        adv = f"โมเมนตัมแรงจัด Pattern สวย ถือรันเทรนด์ SL: {low-(atr_val*1.0):.2f}"
+    elif score >= 4:
+        if "Pullback" in ctx or "Dip" in str(bullish):
+            color = "green"; title = "🐂 Bullish Pullback: ย่อเพื่อไปต่อ"; strat = "Buy on Dip"
+            adv = "ราคาย่อตัวในขาขึ้น วอลุ่มแห้ง/RSI ต่ำ เป็นจังหวะเก็บของที่ดีที่สุด"
+        else:
+            color = "green"; title = "🐂 Strong Buy: ขาขึ้นแข็งแกร่ง"; strat = "Accumulate"
+            adv = "เทรนด์หลักเป็นขาขึ้น ย่อตัวน่าสนใจ"
+    elif score >= 1:
+        if "Sideway Up" in ctx:
+            color = "yellow"; title = "⚖️ Sideway Up: สะสมพลัง"; strat = "Accumulate"
+            adv = "ราคาออกข้างแต่เงินไหลเข้า ดักเก็บที่แนวรับ ลุ้นเบรค"
+        else:
+            color = "yellow"; title = "⚖️ Neutral: รอความชัดเจน"; strat = "Wait & Watch"
+            adv = "ปัจจัยขัดแย้งกัน (เช่น เทรนด์ดีแต่เจอแท่งเทียนกลับตัว) นั่งทับมือไปก่อน"
+    elif score <= -4:
+        if "Panic" in ctx:
+            color = "red"; title = "💀 Panic Sell: หนีตาย"; strat = "Exit Immediately"
+            adv = "วงแตก! แรงขายระดับวิกฤต (3 Crows / Vol Peak) ห้ามรับเด็ดขาด"
+        else:
+            color = "red"; title = "🩸 Falling Knife: มีดหล่น"; strat = "Avoid / Cut Loss"
+            adv = "ราคาดิ่งแรง หลุดแนวรับสำคัญ รอให้หยุดลงและสร้างฐานก่อน"
+    else: # Score 0 to -3
+        color = "orange"; title = "🐻 Bearish Pressure: แรงกดดันสูง"; strat = "Reduce Port"
+        adv = "แรงขายมากกว่าแรงซื้อ ระวังหลุดแนวรับ ไม่ควรรีบรับจนกว่าจะเห็นสัญญาณกลับตัว"
+
+    if in_demand_zone: sl = active_zone['bottom'] - (atr_val*0.5)
+    else: sl = price - (2*atr_val) if not np.isnan(atr_val) else price*0.95
+    tp = price + (3*atr_val) if not np.isnan(atr_val) else price*1.05
+
+    return {
+        "status_color": color, "banner_title": title, "strategy": strat, "context": ctx,
+        "bullish_factors": bullish, "bearish_factors": bearish, "sl": sl, "tp": tp, "holder_advice": adv,
+        "candle_pattern": candle_pattern, "candle_color": candle_color, "candle_detail": candle_detail,
+        "vol_quality_msg": vol_txt, "vol_quality_color": vol_col,
+        "in_demand_zone": in_demand_zone, "confluence_msg": confluence_msg,
+        "is_squeeze": is_squeeze, "obv_insight": obv_insight, "score": score
+    }
+
+# --- 7.1 AI Decision Engine แบบ Time Series (ให้คะแนนทุกแท่งในรอบเดียว) ---
+
+# ค่าคงที่ของกฎให้คะแนน (ค่าเดียวกับ ai_hybrid_analysis) -> optimizer.py ปรับจูนผ่าน params ของ ai_hybrid_analysis_batch
+SCORING_DEFAULTS = {
+    "ema200_weight": 3,       # ยืนเหนือ/หลุด EMA 200: +/- เท่านี้
+    "rsi_overbought": 65,     # Sideway: RSI เกินนี้ = Overbought (-2)
+    "rsi_trap": 70,           # Bullish Engulfing ที่ RSI เกินนี้ = Bullish Trap (-1)
+    "rsi_super": 75,          # เทรนด์แรง: RSI เกินนี้ (วอลุ่มไม่พีค) = Super Bullish (+1)
+    "atr_multiplier": 0.25,   # ความหนา Demand Zone = ATR x เท่านี้
+    "zone_buffer": 0.015,     # แตะโซนเมื่อ Low <= top x (1 + buffer)
+    "sl_atr": 2.0,            # SL นอกโซน = ราคา - ATR x เท่านี้
+    "tp_atr": 3.0,            # TP = ราคา + ATR x เท่านี้
+}
+
+# คอลัมน์ที่แกนคะแนนใช้ (ผลของ compute_indicators)
+SCORING_COLUMNS = ['Close', 'High', 'Low', 'EMA20', 'EMA50', 'EMA200', 'RSI', 'ATR', ADX_COL,
+                   MACD_COL, MACDS_COL, BBU_COL, 'OBV_Slope', 'Volume', 'Vol_SMA20']
+
+def scoring_arrays(df):
+    """{คอลัมน์: float64 Array} ของ SCORING_COLUMNS (คอลัมน์ที่ไม่มี = NaN)"""
+    n = len(df)
+    return {name: df[name].to_numpy(dtype="float64") if name in df.columns else np.full(n, np.nan) for name in SCORING_COLUMNS}
+
+def score_bars(a, code, in_zone, zone_bottom, params=None, price=None):
+    """
+    แกนคะแนนของ ai_hybrid_analysis_batch บน Array ล้วน (a = scoring_arrays, code = รหัสแท่งเทียน)
+    ไม่สร้าง DataFrame -> optimizer เรียกซ้ำได้หลายพันชุดพารามิเตอร์
+    คืนค่า dict: score, panic, rsi_dip, sl, tp, px
+    """
+    p = SCORING_DEFAULTS if params is None else {**SCORING_DEFAULTS, **params}
+    n = len(code)
+    close = a['Close']
+    px = close.copy()
+    if price is not None and n > 0: px[-1] = float(price)
+    ema20 = a['EMA20']; ema50 = a['EMA50']; ema200 = a['EMA200']
+    rsi = a['RSI']; atr = a['ATR']; adx = a[ADX_COL]
+    macd_val = a[MACD_COL]; macd_sig = a[MACDS_COL]; bb_up = a[BBU_COL]
+    obv_slope = a['OBV_Slope']; vol_now = a['Volume']; vol_avg = a['Vol_SMA20']
+
+    with np.errstate(invalid="ignore", divide="ignore"):
+        is_vol_dry = vol_now < (vol_avg * 0.8)
+        is_vol_climax = vol_now > (vol_avg * 2.0)
+
+        conf200 = ~np.isnan(ema200) & (np.abs(zone_bottom - ema200) / px < 0.02)
+        conf50 = ~np.isnan(ema50) & (np.abs(zone_bottom - ema50) / px < 0.02)
+        is_confluence = in_zone & (conf200 | conf50)
+
+        is_strong_trend = ~np.isnan(adx) & (adx > 25)
+        is_major_uptrend = np.where(np.isnan(ema200), True, px > ema200)
+
+        # A. 🏛️ Structural Score
+        w200 = p['ema200_weight']
+        score = np.zeros(n, dtype=np.int64)
+        score += np.where(np.isnan(ema200), 0, np.where(px > ema200, w200, -w200))
+        score += np.where(np.isnan(ema50), 0, np.where(px > ema50, 2, -1))
+
+        # B. 🕯️ Price Action Score (รหัสแท่งเทียนไม่ซ้อนกัน กลุ่มลบ/บวกจึงเกิดได้ทีละอย่าง)
+        panic = np.zeros(n, dtype=bool)
+        crows = code == CANDLE_THREE_BLACK_CROWS
+        score -= 3 * crows; panic |= crows
+        score -= 2 * (code == CANDLE_EVENING_STAR)
+        bear_eng = code == CANDLE_BEARISH_ENGULFING
+        score += np.where(bear_eng, np.where(is_vol_climax, -3, np.where(is_major_uptrend & is_vol_dry, 1, -2)), 0)
+        panic |= bear_eng & is_vol_climax
+        shooting = code == CANDLE_SHOOTING_STAR
+        score += np.where(shooting, np.where(px > bb_up, -2, -1), 0)
+
+        score += 3 * (code == CANDLE_THREE_WHITE_SOLDIERS)
+        score += np.where(code == CANDLE_MORNING_STAR, np.where(in_zone, 3, 2), 0)
+        bull_eng = code == CANDLE_BULLISH_ENGULFING
+        score += np.where(bull_eng, np.where(rsi > p['rsi_trap'], -1, np.where(is_vol_climax, 3, 2)), 0)
+
+        # C. 📊 Volume & Flow (Smart OBV)
+        obv_pct = np.where((vol_avg > 0) & ~np.isnan(obv_slope), obv_slope / vol_avg * 100, 0.0)
+        score += np.where(obv_pct > 5, np.where(px < ema20, 2, 1), np.where(obv_pct < -5, np.where(px > ema20, -2, -1), 0))
+
+        # D. ⚡ Momentum (MACD/RSI)
+        score += np.where(np.isnan(macd_val), 0, np.where(macd_val > macd_sig, 1, -1))
+        has_rsi = ~np.isnan(rsi)
+        trend_mode = is_strong_trend & is_major_uptrend
+        super_bull = (rsi > p['rsi_super']) & ~is_vol_climax
+        rsi_dip = has_rsi & trend_mode & ~super_bull & (rsi < 45)
+        score += np.where(has_rsi & trend_mode, np.where(super_bull, 1, np.where(rsi < 45, 2, 0)), 0)
+        score += np.where(has_rsi & ~trend_mode, np.where(rsi > p['rsi_overbought'], -2, np.where(rsi < 30, 2, 0)), 0)
+
+        # E. 🛡️ Special Context
+        score += 3 * in_zone + is_confluence
+
+        sl = np.where(in_zone, zone_bottom - (atr * 0.5), np.where(np.isnan(atr), px * 0.95, px - (p['sl_atr'] * atr)))
+        tp = np.where(np.isnan(atr), px * 1.05, px + (p['tp_atr'] * atr))
+    return {"score": score, "panic": panic, "rsi_dip": rsi_dip, "sl": sl, "tp": tp, "px": px}
+
+def ai_hybrid_analysis_batch(df, demand_zones=None, mtf_trend=None, price=None, params=None):
+    """
+    กฎชุดเดียวกับ ai_hybrid_analysis แต่คำนวณทุกแท่งของ df (ที่ผ่าน compute_indicators แล้ว) ด้วย Array
+    - ราคาของแต่ละแท่ง = Close (ส่ง price มาเพื่อใช้แทนราคาของแท่งล่าสุด เหมือนหน้าวิเคราะห์ที่ใช้ราคา Real-time)
+    - demand_zones=None: ใช้ demand_zone_timeline (แต่ละแท่งเห็นเฉพาะโซน ณ เวลานั้น)
+    - mtf_trend: ไม่ได้ใช้ให้คะแนน (เหมือนฟังก์ชันเดิม) แนบไว้เป็นคอลัมน์ให้ผู้ใช้ต่อ
+      (ส่ง mtf_alignment(...)['mtf_trend'] ได้ -> แต่ละแท่งได้เทรนด์ TF ใหญ่ ณ เวลานั้น)
+    - params: ทับค่าใน SCORING_DEFAULTS (เช่นชุดที่ optimizer หาได้)
+    คืนค่า DataFrame: score, status_color, strategy, sl, tp, in_demand_zone, candle_code
+    แถวสุดท้ายตรงกับ ai_hybrid_analysis ของแท่งล่าสุด (เมื่อใช้ค่าเริ่มต้น)
+    """
+    p = SCORING_DEFAULTS if params is None else {**SCORING_DEFAULTS, **params}
+    code = classify_candles(df)['Candle_Code'].to_numpy()
+    in_zone, zone_bottom = demand_zone_timeline(df, demand_zones, p['atr_multiplier'], p['zone_buffer'])
+    r = score_bars(scoring_arrays(df), code, in_zone, zone_bottom, p, price)
+    score = r['score']
+
+    # --- FINAL STATUS ASSIGNMENT ---
+    status_color = np.select([score >= 4, score >= 1, score <= -4], ["green", "yellow", "red"], default="orange")
+    strategy = np.select(
+        [score >= 6, (score >= 4) & r['rsi_dip'], score >= 4, score >= 1, (score <= -4) & r['panic'], score <= -4],
+        ["Aggressive Buy", "Buy on Dip", "Accumulate", "Wait & Watch", "Exit Immediately", "Avoid / Cut Loss"],
+        default="Reduce Port")
+
+    out = pd.DataFrame({
+        'score': score, 'status_color': status_color, 'strategy': strategy, 'sl': r['sl'], 'tp': r['tp'],
+        'in_demand_zone': in_zone, 'candle_code': code,
+    }, index=df.index)
+    if mtf_trend is not None: out['mtf_trend'] = mtf_trend
+    return out
+
+# --- 8. Indicator & Report Pipeline (ชุดเดียวกับหน้าวิเคราะห์หลัก) ---
+
+def compute_indicators(df):
+    """คำนวณ Indicator ทั้งชุด (indicators.compute_indicator_frame) คืนค่า (df, bbl_col_name, bbu_col_name, is_squeeze)"""
+    # เฟรม Compact (float32) -> คำนวณ/เปรียบเทียบทุกอย่างเป็น float64 เหมือนเดิม
+    low_precision = {c: "float64" for c, t in df.dtypes.items() if t == np.float32}
+    if low_precision: df = df.astype(low_precision)
+    df = compute_indicator_frame(df)
+    bbl_col_name, bbu_col_name = BBL_COL, BBU_COL
+    is_squeeze = df['BB_Width'].iloc[-1] <= (df['BB_Width_Min20'].iloc[-1] * 1.1) 
+    return df, bbl_col_name, bbu_col_name, is_squeeze
+
+def mtf_context(df_mtf):
+    """เทรนด์ TF ใหญ่จาก EMA 200 ของแท่งล่าสุด คืนค่า (mtf_trend, mtf_ema200_val)"""
+    mtf_trend = "Sideway"; mtf_ema200_val = 0
+    if df_mtf is not None and not df_mtf.empty:
+        if 'EMA200' not in df_mtf.columns: df_mtf['EMA200'] = ema(df_mtf['Close'], 200)
+        if len(df_mtf) > 200 and not pd.isna(df_mtf['EMA200'].iloc[-1]):
+            mtf_ema200_val = df_mtf['EMA200'].iloc[-1]
+            if df_mtf['Close'].iloc[-1] > mtf_ema200_val: mtf_trend = "Bullish"
+            else: mtf_trend = "Bearish"
+    return mtf_trend, mtf_ema200_val
+
+# --- 8.1 MTF Alignment: บริบท TF ใหญ่ที่ "ปิดแล้ว" ของทุกแท่ง (As-of Join เรียงเวลา ไม่มี Lookahead) ---
+
+MTF_ALIGN_COLS = ["mtf_close", "mtf_ema200", "mtf_trend", "week_ema50", "week_ema200", "week_high", "week_low"]
+
+def _as_of_join(index, frame, interval, columns):
+    """
+    ค่าของแท่งล่าสุดใน frame ที่ปิดแล้ว ณ เวลาเริ่มของแต่ละแท่งใน index (merge_asof ทิศ backward)
+    columns = {ชื่อคอลัมน์ผลลัพธ์: Array ยาวเท่า frame}
+    """
+    if frame is None or frame.empty or len(index) == 0:
+        return pd.DataFrame({c: np.full(len(index), np.nan) for c in columns}, index=index)
+    ends = bar_end_times(frame.index, interval)
+    if ends.tz is None and index.tz is not None: ends = ends.tz_localize(index.tz)
+    elif ends.tz is not None: ends = ends.tz_convert(index.tz) if index.tz is not None else ends.tz_convert(None)
+    right = pd.DataFrame(columns).assign(_at=ends.as_unit("ns"))
+    left = pd.DataFrame({"_at": index.as_unit("ns")})
+    out = pd.merge_asof(left, right, on="_at", direction="backward", allow_exact_matches=True)
+    return out.drop(columns="_at").set_axis(index)
+
+def mtf_alignment(df, df_mtf=None, mtf_interval="1wk", df_week=None):
+    """
+    แนบบริบท TF ใหญ่ให้ทุกแท่งของ df ครั้งเดียวด้วย As-of Join (O(n+m)) แทนการค้นย้อนทีละแท่ง
+    - แท่งที่เริ่มเวลา t เห็นเฉพาะแท่ง TF ใหญ่ที่ปิดไปแล้ว (เวลาปิด <= t) -> Backtest/คะแนนย้อนหลังไม่แอบเห็นอนาคต
+    - mtf_trend: กฎเดียวกับ mtf_context (มีเกิน 200 แท่ง + Close เทียบ EMA 200) แต่ของแท่งที่ปิดแล้ว ณ เวลานั้น
+    - df_week: EMA 50/200 รายสัปดาห์ + High/Low ของสัปดาห์ที่ปิดล่าสุด
+    คืนค่า DataFrame (index เดียวกับ df) คอลัมน์ตาม MTF_ALIGN_COLS
+    """
+    index = df.index
+    mtf_cols = {}
+    if df_mtf is not None and not df_mtf.empty:
+        close = df_mtf['Close'].to_numpy(dtype="float64")
+        mtf_ema = df_mtf['EMA200'] if 'EMA200' in df_mtf.columns else ema(df_mtf['Close'], 200)
+        mtf_ema = np.full(len(close), np.nan) if mtf_ema is None else np.asarray(mtf_ema, dtype="float64")
+        valid = (np.arange(len(close)) >= 200) & ~np.isnan(mtf_ema)
+        mtf_cols = {"mtf_close": close, "mtf_ema200": np.where(valid, mtf_ema, np.nan),
+                    "mtf_trend": np.where(valid, np.where(close > mtf_ema, "Bullish", "Bearish"), "Sideway")}
+    out = _as_of_join(index, df_mtf, mtf_interval, mtf_cols or dict.fromkeys(MTF_ALIGN_COLS[:3]))
+    out['mtf_trend'] = out['mtf_trend'].where(out['mtf_trend'].notna(), "Sideway").astype(str)
+
+    week_cols = dict.fromkeys(MTF_ALIGN_COLS[3:])
+    if df_week is not None and not df_week.empty:
+        week_close = df_week['Close'].astype("float64")
+        ema_or_nan = lambda n: np.full(len(df_week), np.nan) if len(df_week) < n else ema(week_close, n).to_numpy()
+        week_cols = {"week_ema50": ema_or_nan(50), "week_ema200": ema_or_nan(200),
+                     "week_high": df_week['High'].to_numpy(dtype="float64"), "week_low": df_week['Low'].to_numpy(dtype="float64")}
+    week = _as_of_join(index, df_week, "1wk", week_cols)
+    return pd.concat([out, week], axis=1)[MTF_ALIGN_COLS]
+
+def analyze_frame(df, df_mtf=None, price=None):
+    """
+    Indicator -> Zones -> God Mode Brain สำหรับแท่งล่าสุดของ df
+    คืนค่า dict ของทุกค่าที่หน้าแสดงผลใช้ (รวม ai_report) หรือ None ถ้าข้อมูลไม่พอ (<= 20 แท่ง)
+    """
+    if df is None or df.empty or len(df) <= 20: return None
+    df, bbl_col_name, bbu_col_name, is_squeeze = compute_indicators(df)
+
+    demand_zones = find_demand_zones(df, atr_multiplier=0.25)
+    supply_zones = find_supply_zones(df, atr_multiplier=0.25)
+    
+    last = df.iloc[-1]
+    price = price if price else last['Close']
+    ema20 = last['EMA20'] if 'EMA20' in last else np.nan
+    ema50 = last['EMA50'] if 'EMA50' in last else np.nan
+    ema200 = last['EMA200'] if 'EMA200' in last else np.nan
+
+    rsi = last['RSI'] if 'RSI' in last else np.nan
+    atr = last['ATR'] if 'ATR' in last else np.nan
+    vol_now = last['Volume']
+    open_p = last['Open']; high_p = last['High']; low_p = last['Low']; close_p = last['Close']
+    
+    try: macd_val, macd_signal = last['MACD_12_26_9'], last['MACDs_12_26_9']
+    except: macd_val, macd_signal = np.nan, np.nan
+    try: adx_val = last['ADX_14']
+    except: adx_val = np.nan
+    
+    if bbu_col_name and bbl_col_name: bb_upper, bb_lower = last[bbu_col_name], last[bbl_col_name]
+    else: bb_upper, bb_lower = price * 1.05, price * 0.95
+    
+    vol_status, vol_color = analyze_volume(last, last['Vol_SMA20'])
+    
+    try: obv_val = last['OBV']; obv_avg = last['OBV_SMA20']
+    except: obv_val = np.nan; obv_avg = np.nan
+    
+    obv_slope_val = last.get('OBV_Slope', np.nan)
+    
+    mtf_trend, mtf_ema200_val = mtf_context(df_mtf)
+    
+    try: prev_open = df['Open'].iloc[-2]; prev_close = df['Close'].iloc[-2]; vol_avg = last['Vol_SMA20']
+    except: prev_open = 0; prev_close = 0; vol_avg = 1
+
+    # 🔑 ตัดข้อมูล 4 แท่ง
+    df_candles_4 = df.iloc[-4:] 
+
+    # 🧠 CALL GOD MODE BRAIN
+    ai_report = ai_hybrid_analysis(price, ema20, ema50, ema200, rsi, macd_val, macd_signal, adx_val, bb_upper, bb_lower, 
+                                   vol_status, mtf_trend, atr, mtf_ema200_val,
+                                   open_p, high_p, low_p, close_p, obv_val, obv_avg,
+                                   obv_slope_val, 
+                                   prev_open, prev_close, vol_now, vol_avg, demand_zones, 
+                                   is_squeeze,
+                                   df_candles_4)
+
+    return {
+        "df": df, "ai_report": ai_report, "price": price,
+        "ema20": ema20, "ema50": ema50, "ema200": ema200, "rsi": rsi, "atr": atr,
+        "macd_val": macd_val, "macd_signal": macd_signal, "adx_val": adx_val,
+        "bb_upper": bb_upper, "bb_lower": bb_lower, "vol_now": vol_now, "vol_status": vol_status,
+        "demand_zones": demand_zones, "supply_zones": supply_zones, "is_squeeze": is_squeeze,
+        "mtf_trend": mtf_trend, "mtf_ema200_val": mtf_ema200_val,
+    }
+
+# --- 9. Key Levels: ระดับราคาทุก TF ของแท่งล่าสุด + รวมแนวรับ/แนวต้านที่ใกล้กัน (Confluence) + คัดที่จะแสดง ---
+
+def _last_ema(df, length):
+    if df is None or df.empty: return np.nan
+    try: return float(ema(df['Close'], length).iloc[-1])
+    except Exception: return np.nan
+
+def key_levels(ctx, df_stats_day=None, df_stats_week=None):
+    """
+    ระดับราคาทั้งชุดของแท่งล่าสุด: EMA 20/50/200 + BB ของ TF หลัก (จาก ctx ของ analyze_frame),
+    EMA 50/200 รายวัน/รายสัปดาห์, High 60 วัน และ Demand/Supply Zone
+    ไม่ขึ้นกับราคาปัจจุบัน -> คำนวณครั้งเดียวต่อแท่ง (core.cached_key_levels) แล้วใช้ร่วมทั้ง Alert/Health Check/ตารางแนวรับ-ต้าน
+    """
+    num = lambda v: float(v) if v is not None and not pd.isna(v) else np.nan
+    high_60d = np.nan
+    if df_stats_day is not None and not df_stats_day.empty:
+        high_60d = num(df_stats_day['High'].tail(60).max())
+    return {
+        "ema20": num(ctx['ema20']), "ema50": num(ctx['ema50']), "ema200": num(ctx['ema200']),
+        "bb_upper": num(ctx['bb_upper']), "bb_lower": num(ctx['bb_lower']),
+        "day_ema50": _last_ema(df_stats_day, 50), "day_ema200": _last_ema(df_stats_day, 200),
+        "week_ema50": _last_ema(df_stats_week, 50), "week_ema200": _last_ema(df_stats_week, 200),
+        "high_60d": high_60d,
+        "demand_zones": list(ctx['demand_zones'] or []), "supply_zones": list(ctx['supply_zones'] or []),
+        # โซนจาก TF รายวัน/รายสัปดาห์ (ทุกโซนในอดีตที่ยังไม่ถูกทำลาย) -> เป็นแนวให้ cluster_levels รวมข้าม TF
+        **{f"{tf}_{kind}_zones": _swing_zones(frame, 0.25, is_demand=(kind == "demand")) if frame is not None else []
+           for tf, frame in (("day", df_stats_day), ("week", df_stats_week)) for kind in ("demand", "supply")},
+    }
+
+def _valid(v): return v is not None and not np.isnan(v)
+
+def breakdown_levels(levels, price):
+    """แนวรับที่ราคาหลุดลงมาแล้ว (EMA 50/200 ของ TF หลัก + Demand Zone บนสุดที่หลุด)"""
+    out = []
+    for key, name in (("ema50", "EMA 50"), ("ema200", "EMA 200")):
+        v = levels[key]
+        if _valid(v) and price < v: out.append(f"{name} ({v:.2f})")
+    for z in sorted(levels['demand_zones'], key=lambda x: x['top'], reverse=True):
+        if price < z['bottom']: out.append(f"Demand Zone [{z['bottom']:.2f}-{z['top']:.2f}]"); break
+    return out
+
+def breakout_levels(levels, price):
+    """แนวต้านที่ราคาเพิ่งทะลุขึ้นมา (อยู่เหนือ EMA 50/200 ไม่เกิน 5%)"""
+    out = []
+    for key, name in (("ema50", "EMA 50"), ("ema200", "EMA 200")):
+        v = levels[key]
+        if _valid(v) and price > v and (price - v) / v < 0.05: out.append(f"{name} ({v:.2f})")
+    return out
+
+def next_support(levels, price):
+    """แนวรับถัดไปใต้ราคา (ตัวที่สูงที่สุด) คืนค่า (val, label) หรือ (0, "") ถ้าไม่มี"""
+    cands = [{'val': levels[k], 'label': name} for k, name in (("ema50", "EMA 50"), ("ema200", "EMA 200"))
+             if _valid(levels[k]) and levels[k] < price]
+    cands += [{'val': z['top'], 'label': f"Zone {z['top']:.2f}"} for z in levels['demand_zones'] if z['top'] < price]
+    if _valid(levels['week_ema200']) and levels['week_ema200'] < price: cands.append({'val': levels['week_ema200'], 'label': "EMA 200 Week"})
+    if not cands: return 0, ""
+    best = max(cands, key=lambda x: x['val'])
+    return best['val'], best['label']
+
+def next_resistance(levels, price):
+    """แนวต้านถัดไปเหนือราคา (ตัวที่ต่ำที่สุด) คืนค่า (val, label) หรือ (0, "") ถ้าไม่มี"""
+    cands = [{'val': levels[k], 'label': name} for k, name in (("ema50", "EMA 50"), ("ema200", "EMA 200"), ("bb_upper", "BB Upper"))
+             if _valid(levels[k]) and levels[k] > price]
+    cands += [{'val': z['bottom'], 'label': "Supply Zone"} for z in levels['supply_zones'] if z['bottom'] > price]
+    if not cands: return 0, ""
+    best = min(cands, key=lambda x: x['val'])
+    return best['val'], best['label']
+
+# น้ำหนักของแต่ละแหล่ง (รวมในกลุ่มเป็น weight ของ Cluster): TF ใหญ่/EMA 200 คนดูเยอะ แนวแข็งกว่า
+LEVEL_WEIGHTS = {"ema20": 1.0, "ema50": 1.0, "ema200": 2.0, "bb_lower": 0.5, "bb_upper": 0.5,
+                 "day_ema50": 1.5, "day_ema200": 2.5, "week_ema50": 2.0, "week_ema200": 3.0, "high_60d": 1.5,
+                 "zone": 1.0, "day_zone": 1.5, "week_zone": 2.0}
+
+def _tf_zone_candidates(levels, tf_code, kind, name, keep):
+    """โซนของ TF Day/Week (ข้าม TF ที่ซ้ำกับ TF หลัก) เฉพาะฝั่งที่ถูกต้องของราคา"""
+    out = []
+    for tf, code, tf_name in (("day", "1d", "TF Day"), ("week", "1wk", "TF Week")):
+        if tf_code == code: continue
+        for z in levels.get(f"{tf}_{kind}_zones", []):
+            if keep(z):
+                val = z['bottom'] if kind == "demand" else z['top']
+                out.append({'val': val, 'label': f"{name} {tf_name} [{z['bottom']:.2f}-{z['top']:.2f}]", 'weight': LEVEL_WEIGHTS[f"{tf}_zone"]})
+    return out
+
+def support_candidates(levels, price, tf_code, tf_label):
+    """แนวรับทั้งหมดใต้ราคาสำหรับตาราง Supports (TF ที่ซ้ำกับ TF หลักไม่ใส่ซ้ำ) แต่ละแนวมี weight ตาม LEVEL_WEIGHTS"""
+    spec = [("ema20", f"EMA 20 ({tf_label} - ระยะสั้น)"), ("ema50", f"EMA 50 ({tf_label})"),
+            ("ema200", f"EMA 200 ({tf_label} - Trend Support)"), ("bb_lower", f"BB Lower ({tf_label} - แนวรับผันผวน)")]
+    if tf_code != "1d": spec += [("day_ema50", "EMA 50 (TF Day - รับระยะกลาง)"), ("day_ema200", "🛡️ EMA 200 (TF Day - รับใหญ่รายวัน)")]
+    if tf_code != "1wk": spec += [("week_ema50", "EMA 50 (TF Week - รับระยะยาว)"), ("week_ema200", "🛡️ EMA 200 (TF Week - รับระดับกองทุน)")]
+    cands = [{'val': levels[k], 'label': label, 'weight': LEVEL_WEIGHTS[k]} for k, label in spec if _valid(levels[k]) and levels[k] < price]
+    cands += [{'val': z['bottom'], 'label': f"Demand Zone [{z['bottom']:.2f}-{z['top']:.2f}]", 'weight': LEVEL_WEIGHTS["zone"]} for z in levels['demand_zones']]
+    cands += _tf_zone_candidates(levels, tf_code, "demand", "Demand Zone", lambda z: z['bottom'] < price)
+    return cands
+
+def resistance_candidates(levels, price, tf_code, tf_label):
+    """แนวต้านทั้งหมดเหนือราคาสำหรับตาราง Resistances (weight ตาม LEVEL_WEIGHTS)"""
+    spec = [("ema20", f"EMA 20 ({tf_label} - ต้านสั้น)"), ("ema50", f"EMA 50 ({tf_label})"),
+            ("ema200", f"EMA 200 ({tf_label} - ต้านใหญ่)"), ("bb_upper", f"BB Upper ({tf_label} - เพดาน)")]
+    if tf_code != "1d": spec += [("day_ema50", "EMA 50 (TF Day)")]
+    spec += [("high_60d", "🏔️ High 60d (ดอย 3 เดือน)")]
+    if tf_code != "1wk": spec += [("week_ema50", "EMA 50 (TF Week - ต้านระยะยาว)"), ("week_ema200", "🛡️ EMA 200 (TF Week - ต้านระดับกองทุน)")]
+    cands = [{'val': levels[k], 'label': label, 'weight': LEVEL_WEIGHTS[k]} for k, label in spec if _valid(levels[k]) and levels[k] > price]
+    cands += [{'val': z['top'], 'label': f"Supply Zone [{z['bottom']:.2f}-{z['top']:.2f}]", 'weight': LEVEL_WEIGHTS["zone"]} for z in levels['supply_zones']]
+    cands += _tf_zone_candidates(levels, tf_code, "supply", "Supply Zone", lambda z: z['top'] > price)
+    return cands
+
+
+LEVEL_TOLERANCE = 0.01     # แนวที่ห่างจากแนวหัวกลุ่ม < 1% รวมเป็นกลุ่มเดียว
+CONFLUENCE_LABELS = 3      # จำนวนชื่อแนวที่แสดงใน Label ของกลุ่ม (ที่เหลือแสดงเป็น +N)
+VIP_WEIGHT = 2.0           # กลุ่มที่น้ำหนักรวมถึงเท่านี้ แสดงเสมอแม้ชิดกับแนวก่อนหน้า
+
+def cluster_levels(candidates, is_support, tol=LEVEL_TOLERANCE):
+    """
+    จัดกลุ่มแนว 1 มิติแบบ Sort-and-Sweep: เรียงจากใกล้ราคาไปไกล แนวแรกที่ยังไม่มีกลุ่มเป็นหัวกลุ่ม
+    ทุกแนวที่ห่างจากหัวกลุ่ม < tol (สัดส่วนของหัวกลุ่ม) รวมเข้ากลุ่มเดียวกันได้ไม่จำกัดจำนวน
+    ขอบกลุ่มหาด้วย searchsorted -> O(N log N) รับแนวได้เป็นพันๆ จากทุก TF/ทุกโซนในอดีต
+    candidate: {'val', 'label', 'weight' (ไม่ใส่ = 1)}
+    คืนค่า list ของกลุ่มเรียงจากใกล้ราคาไปไกล: {'val' (หัวกลุ่ม), 'label', 'low', 'high', 'count', 'weight', 'labels'}
+    """
+    cands = [c for c in candidates if c['val'] is not None and not np.isnan(c['val'])]
+    if not cands: return []
+    vals = np.array([c['val'] for c in cands], dtype="float64")
+    weights = np.array([c.get('weight', 1.0) for c in cands], dtype="float64")
+    # key เรียงจากน้อยไปมาก = จากใกล้ราคาไปไกล (แนวรับ: ราคาสูงก่อน) / Stable Sort คงลำดับของแนวที่ราคาเท่ากัน
+    key = -vals if is_support else vals
+    order = np.argsort(key, kind="stable")
+    key = key[order]; vals = vals[order]; weights = weights[order]
+
+    starts = []
+    i, n = 0, len(key)
+    while i < n:
+        starts.append(i)
+        i = max(i + 1, int(np.searchsorted(key, key[i] + tol * abs(vals[i]), side="left")))
+    starts = np.array(starts)
+    counts = np.diff(np.append(starts, n))
+    lows = np.minimum.reduceat(vals, starts); highs = np.maximum.reduceat(vals, starts)
+    wsum = np.add.reduceat(weights, starts)
+
+    clusters = []
+    for start, count, low, high, weight in zip(starts, counts, lows, highs, wsum):
+        labels = [cands[k]['label'] for k in order[start:start + count]]
+        if count == 1: label = labels[0]
+        else:
+            more = f" +{count - CONFLUENCE_LABELS}" if count > CONFLUENCE_LABELS else ""
+            label = f"⭐ Confluence Zone ({' + '.join(labels[:CONFLUENCE_LABELS])}{more})"
+        clusters.append({'val': float(vals[start]), 'label': label, 'low': float(low), 'high': float(high),
+                         'count': int(count), 'weight': float(weight), 'labels': labels})
+    return clusters
+
+def merge_levels(candidates, is_support):
+    """รวมแนวรับ/แนวต้านที่ใกล้กัน < 1% เป็น Confluence Zone (cluster_levels) เรียงจากใกล้ราคาไปไกล"""
+    return cluster_levels(candidates, is_support)
+
+def select_levels(merged, price, min_dist, is_support, limit=None):
+    """
+    คัดแนวที่จะแสดง: ตัดแนวที่ไกลเกิน 30% (ยกเว้น EMA 200 Week)
+    แนวที่ชิดกันเกิน min_dist เก็บกลุ่มที่น้ำหนักมากกว่า (กลุ่มหนัก >= VIP_WEIGHT / แนวสำคัญ แสดงเสมอ)
+    limit: เหลือไม่เกินเท่านี้ = แนวใกล้ราคาที่สุด 1 แนว + ที่เหลือเลือกตามน้ำหนัก แล้วเรียงจากใกล้ไปไกลเหมือนเดิม
+    """
+    final_show = []
+    for item in merged:
+        dist_pct = (price - item['val']) / price if is_support else (item['val'] - price) / price
+        if dist_pct > 0.30 and "EMA 200 (TF Week" not in item['label']: continue
+        is_vip = ("EMA 200" in item['label'] or "EMA 50 (TF Week" in item['label'] or "52-Week" in item['label'] or "Confluence" in item['label']
+                  or item.get('weight', 1.0) >= VIP_WEIGHT)
+        if not final_show or is_vip or abs(item['val'] - final_show[-1]['val']) >= min_dist:
+            final_show.append(item)
+        elif item.get('weight', 1.0) > final_show[-1].get('weight', 1.0) and len(final_show) > 1:
+            final_show[-1] = item   # ชิดกัน: แทนด้วยกลุ่มที่หนักกว่า (แนวแรกใกล้ราคาที่สุดคงไว้)
+    if limit is not None and len(final_show) > limit:
+        rest = sorted(range(1, len(final_show)), key=lambda i: (-final_show[i].get('weight', 1.0), i))[:limit - 1]
+        final_show = [final_show[i] for i in [0] + sorted(rest)]
+    return final_show
+
+def level_strength(item):
+    """ข้อความน้ำหนักของกลุ่มแนว (ต่อท้าย Label ในตาราง) เช่น '💪 4.5 · 3 แหล่ง'"""
+    count = item.get('count', 1); weight = item.get('weight', 1.0)
+    return f"💪 {weight:g}" + (f" · {count} แหล่ง" if count > 1 else "")
@@ -1,14 +1,27 @@
+import os
+import startup
+startup.begin()  # จับเวลา Import ของแอป (ดูได้ที่ ?debug=1 หรือ STARTUP_PROFILE=1)
+
 import streamlit as st
-import yfinance as yf
 import pandas as pd
-import pandas_ta as ta
 import numpy as np
+import tempfile
 import time
 from datetime import datetime, timedelta
 
-# --- Import สำหรับ Google Sheets ---
-import gspread
-from oauth2client.service_account import ServiceAccountCredentials
+from core import cached_analyze_frame, cached_key_levels, cached_load_market, invalidate_market, session_memory
+from live_feed import LIVE_REFRESH_CHOICES, cached_quote, is_new_bar, overlay_quote
+from shared_cache import get_shared_cache
+from analysis import (breakdown_levels, breakout_levels, level_strength, merge_levels, next_resistance, next_support,
+                      resistance_candidates, select_levels, support_candidates)
+
+# --- Google Sheets (gspread/oauth2client โหลดจริงตอนส่งครั้งแรกใน sheets_writer) ---
+from sheets_writer import get_writer, log_row
+from history_store import HISTORY_WINDOWS, entry_from_report, get_history_store
+
+startup.end()
+if os.environ.get("STARTUP_PROFILE") == "1" and 'startup_printed' not in st.session_state:
+    st.session_state['startup_printed'] = True; startup.print_report()
 
 # --- 1. ตั้งค่าหน้าเว็บ (The Master Version) ---
 st.set_page_config(page_title="AI Stock Master (God Mode)", page_icon="💎", layout="wide")
@@ -96,87 +109,13 @@ with col_form:
         
         st.markdown("---")
         submit_btn = st.form_submit_button("🚀 วิเคราะห์ทันที")
+    # Live Watch อยู่นอก Form: เปิด/ปิดได้ทันทีโดยไม่ต้องกดวิเคราะห์ใหม่
+    lw1, lw2 = st.columns([1, 1])
+    with lw1: st.toggle("🔴 Live Watch (อัปเดตราคาอัตโนมัติ)", key="live_mode")
+    with lw2: st.select_slider("อัปเดตทุก (วินาที)", options=LIVE_REFRESH_CHOICES, value=10, key="live_every", disabled=not st.session_state.get('live_mode'))
 
 # --- 4. Helper Functions (Visuals & Data) ---
 
-def analyze_candlestick(df_window):
-    """
-    ฟังก์ชันอ่านแท่งเทียน Pro Max (4-Bar Logic)
-    รับค่า: DataFrame ย้อนหลัง 4 แท่ง (Index 0=ไกลสุด, 3=ล่าสุด)
-    """
-    if len(df_window) < 4: 
-        return "Normal Candle", "gray", "ข้อมูลไม่เพียงพอ", False
-
-    c1 = df_window.iloc[0] # 3 วันก่อน
-    c2 = df_window.iloc[1] # 2 วันก่อน
-    c3 = df_window.iloc[2] # เมื่อวาน (Prev)
-    c4 = df_window.iloc[3] # วันนี้ (Current)
-
-    open_p = c4['Open']; close_p = c4['Close']
-    high_p = c4['High']; low_p = c4['Low']
-    body = abs(close_p - open_p)
-    range_len = high_p - low_p
-    is_bull = close_p >= open_p
-    color = "🟢 เขียว (Buying)" if is_bull else "🔴 แดง (Selling)"
-
-    prev_open = c3['Open']; prev_close = c3['Close']
-    is_prev_bull = prev_close >= prev_open
-
-    pattern_name = "Normal Candle (ปกติ)"
-    detail = "แรงซื้อขายสมดุล"
-    is_big = False
-
-    # --- 🧠 LEVEL 1: รูปแบบกลุ่ม 3-4 แท่ง ---
-    if (c2['Close'] < c2['Open']) and (c3['Close'] < c3['Open']) and (c4['Close'] < c4['Open']):
-        if (c4['Close'] < c3['Close']) and (c3['Close'] < c2['Close']):
-            return "🦅 Three Black Crows (อีกา 3 ตัว)", "🔴 แดง (Selling)", "แรงขายทุบต่อเนื่อง 3 วัน (ระวังลงลึก)", True
-
-    if (c2['Close'] > c2['Open']) and (c3['Close'] > c3['Open']) and (c4['Close'] > c4['Open']):
-        if (c4['Close'] > c3['Close']) and (c3['Close'] > c2['Close']):
-            return "💂 Three White Soldiers (3 ทหารเสือ)", "🟢 เขียว (Buying)", "แรงซื้อดันต่อเนื่อง 3 วัน (แข็งแกร่ง)", True
-
-    c2_body = abs(c2['Close'] - c2['Open']); c2_range = c2['High'] - c2['Low']
-    if (c2['Close'] < c2['Open']) and (c2_body > c2_range * 0.5): 
-        if abs(c3['Close'] - c3['Open']) < c2_body * 0.4: 
-            midpoint = (c2['Open'] + c2['Close']) / 2
-            if (c4['Close'] > c4['Open']) and (c4['Close'] > midpoint): 
-                return "🌅 Morning Star (รุ่งอรุณ)", "🟢 เขียว (Buying)", "กลับตัวขึ้นสวยงาม (Confirm Reversal)", True
-
-    if (c2['Close'] > c2['Open']) and (c2_body > c2_range * 0.5): 
-        if abs(c3['Close'] - c3['Open']) < c2_body * 0.4: 
-            midpoint = (c2['Open'] + c2['Close']) / 2
-            if (c4['Close'] < c4['Open']) and (c4['Close'] < midpoint): 
-                return "🌆 Evening Star (พลบค่ำ)", "🔴 แดง (Selling)", "กลับตัวลงชัดเจน (Confirm Reversal)", True
-
-    # --- 🧠 LEVEL 2: รูปแบบ 2 แท่ง ---
-    if is_prev_bull and not is_bull: 
-        if (open_p >= prev_close) and (close_p <= prev_open):
-            return "🐻 Bearish Engulfing (กลืนกินขาลง)", "🔴 แดง (Selling)", "แท่งแดงกลบแท่งเขียวเมื่อวาน", True
-
-    if not is_prev_bull and is_bull: 
-        if (open_p <= prev_close) and (close_p >= prev_open):
-            return "🐂 Bullish Engulfing (กลืนกินขาขึ้น)", "🟢 เขียว (Buying)", "แท่งเขียวกลบแท่งแดงเมื่อวาน", True
-
-    # --- 🧠 LEVEL 3: รูปแบบแท่งเดียว ---
-    wick_up = high_p - max(close_p, open_p)
-    wick_low = min(close_p, open_p) - low_p
-    
-    if wick_low > (body * 2) and wick_up < body:
-        pattern_name = "🔨 Hammer/Pinbar (ค้อน)"
-        detail = "ปฏิเสธราคาต่ำ (แรงซื้อสวน)"
-    elif wick_up > (body * 2) and wick_low < body:
-        pattern_name = "☄️ Shooting Star (ดาวตก)"
-        detail = "ปฏิเสธราคาสูง (แรงขายตบ)"
-    elif body > (range_len * 0.6): 
-        is_big = True
-        pattern_name = "Big Bullish (แท่งเขียวตัน)" if is_bull else "Big Bearish (แท่งแดงตัน)"
-        detail = "แรงซื้อ/ขาย คุมตลาดเบ็ดเสร็จ"
-    elif body < (range_len * 0.1):
-        pattern_name = "Doji (โดจิ)"
-        detail = "ตลาดลังเล (Indecision)"
-        
-    return pattern_name, color, detail, is_big
-
 def arrow_html(change):
     if change is None: return ""
     return "<span style='color:#16a34a;font-weight:600'>▲</span>" if change > 0 else "<span style='color:#dc2626;font-weight:600'>▼</span>"
@@ -222,337 +161,135 @@ def get_adx_interpretation(adx, is_uptrend):
     if adx >= 25: return f"Strong {trend_str} (แข็งแกร่ง)"
     return "Weak/Sideway (ตลาดไร้ทิศทาง)"
 
-# --- Google Sheets Function ---
+# --- Google Sheets Function (เข้าคิวแล้วกลับทันที Background Thread ส่งเป็นก้อนให้) ---
 def save_to_gsheet(data_dict):
     try:
-        scope = ['https://spreadsheets.google.com/feeds', 'https://www.googleapis.com/auth/drive']
         if "gcp_service_account" in st.secrets:
-            creds_dict = dict(st.secrets["gcp_service_account"])
-            creds = ServiceAccountCredentials.from_json_keyfile_dict(creds_dict, scope)
-            client = gspread.authorize(creds)
-            sheet = client.open("Stock_Analysis_Log").sheet1
-            
-            row = [
-                datetime.now().strftime("%Y-%m-%d"), 
-                data_dict.get("เวลา", ""),           
-                data_dict.get("หุ้น", ""),           
-                data_dict.get("TF", ""),             
-                data_dict.get("ราคา", ""),           
-                data_dict.get("Change%", ""),        
-                data_dict.get("สถานะ", ""),          
-                data_dict.get("Action", ""),         
-                data_dict.get("SL", ""),             
-                data_dict.get("TP", "")              
-            ]
-            sheet.append_row(row)
+            get_writer(st.secrets["gcp_service_account"]).submit(log_row(data_dict))
             return True
         return False
     except Exception as e:
         return False
 
-# --- SMC: Find Zones ---
-def find_demand_zones(df, atr_multiplier=0.25):
-    zones = []
-    if len(df) < 20: return zones
-    lows = df['Low']
-    is_swing_low = (lows < lows.shift(1)) & (lows < lows.shift(2)) & (lows < lows.shift(-1)) & (lows < lows.shift(-2))
-    swing_indices = is_swing_low[is_swing_low].index
-    current_price = df['Close'].iloc[-1]
-    for date in swing_indices:
-        if date == df.index[-1] or date == df.index[-2]: continue
-        swing_low_val = df.loc[date, 'Low']
-        atr_val = df.loc[date, 'ATR'] if 'ATR' in df.columns else (swing_low_val * 0.02)
-        if np.isnan(atr_val): atr_val = swing_low_val * 0.02
-        zone_bottom = swing_low_val
-        zone_top = swing_low_val + (atr_val * atr_multiplier)
-        if (current_price - zone_top) / current_price > 0.20: continue
-        future_data = df.loc[date:][1:]
-        if future_data.empty: continue
-        if not (future_data['Close'] < zone_bottom).any():
-            zones.append({'bottom': zone_bottom, 'top': zone_top})
-    return zones
-
-def find_supply_zones(df, atr_multiplier=0.25):
-    zones = []
-    if len(df) < 20: return zones
-    highs = df['High']
-    is_swing_high = (highs > highs.shift(1)) & (highs > highs.shift(2)) & (highs > highs.shift(-1)) & (highs > highs.shift(-2))
-    swing_indices = is_swing_high[is_swing_high].index
-    current_price = df['Close'].iloc[-1]
-    for date in swing_indices:
-        if date == df.index[-1] or date == df.index[-2]: continue
-        swing_high_val = df.loc[date, 'High']
-        atr_val = df.loc[date, 'ATR'] if 'ATR' in df.columns else (swing_high_val * 0.02)
-        if np.isnan(atr_val): atr_val = swing_high_val * 0.02
-        zone_top = swing_high_val
-        zone_bottom = swing_high_val - (atr_val * atr_multiplier)
-        if (zone_bottom - current_price) / current_price > 0.20: continue
-        future_data = df.loc[date:][1:]
-        if future_data.empty: continue
-        if not (future_data['Close'] > zone_top).any():
-            zones.append({'bottom': zone_bottom, 'top': zone_top})
-    return zones
+def render_price_header(info):
+    """ราคา + เปลี่ยนแปลง + OHLC/Pre/Post + P/E/EPS (ใช้ทั้งตอนโหลดหน้าและตอน Live Watch อัปเดตราคา)"""
+    m_state = (info.get('marketState') or '').upper()
+    reg_price, reg_chg = info.get('regularMarketPrice'), info.get('regularMarketChange')
+    if reg_price and reg_chg: prev_c = reg_price - reg_chg; reg_pct = (reg_chg / prev_c) * 100 if prev_c != 0 else 0.0
+    else: reg_pct = 0.0
+    color_text = "#16a34a" if reg_chg and reg_chg > 0 else "#dc2626"; bg_color = "#e8f5ec" if reg_chg and reg_chg > 0 else "#fee2e2"
+
+    # Price Display (ขนาดใหญ่ 40px)
+    st.markdown(f"""<div style="margin-bottom:5px; display: flex; align-items: center; gap: 15px; flex-wrap: wrap;"><div style="font-size:40px; font-weight:600; line-height: 1;">{reg_price:,.2f} <span style="font-size: 20px; color: #6b7280; font-weight: 400;">USD</span></div><div style="display:inline-flex; align-items:center; gap:6px; background:{bg_color}; color:{color_text}; padding:4px 12px; border-radius:999px; font-size:18px; font-weight:500;">{arrow_html(reg_chg)} {reg_chg:+.2f} ({reg_pct:.2f}%)</div></div>""", unsafe_allow_html=True)
+
+    # P/E & EPS HTML (เตรียมไว้ใส่ด้านล่าง)
+    pe = info.get('trailingPE')
+    eps = info.get('trailingEps')
+    pe_str = f"{pe:.2f}" if pe and pe > 0 else "N/A"
+    eps_str = f"{eps:.2f}" if eps else "N/A"
+    pe_eps_html = f"""
+    <div style="display: flex; gap: 12px; margin-bottom: 10px; margin-top: 8px;">
+        <div class="metric-box">📊 P/E: <b>{pe_str}</b></div>
+        <div class="metric-box">💰 EPS: <b>{eps_str}</b></div>
+    </div>
+    """
+
+    def make_pill(change, percent): color = "#16a34a" if change >= 0 else "#dc2626"; bg = "#e8f5ec" if change >= 0 else "#fee2e2"; arrow = "▲" if change >= 0 else "▼"; return f'<span style="background:{bg}; color:{color}; padding: 2px 8px; border-radius: 10px; font-size: 12px; font-weight: 600; margin-left: 8px;">{arrow} {change:+.2f} ({percent:.2f}%)</span>'
+
+    ohlc_html = ""; 
+    if m_state != "REGULAR": 
+        d_open = info.get('regularMarketOpen'); d_high = info.get('dayHigh'); d_low = info.get('dayLow'); d_close = info.get('regularMarketPrice')
+        if d_open: day_chg = info.get('regularMarketChange', 0); val_color = "#16a34a" if day_chg >= 0 else "#dc2626"; ohlc_html = f"""<div style="font-size: 12px; font-weight: 600; margin-bottom: 5px; font-family: 'Source Sans Pro', sans-serif; white-space: nowrap; overflow-x: auto;"><span style="margin-right: 5px; opacity: 0.7;">O</span><span style="color: {val_color}; margin-right: 12px;">{d_open:.2f}</span><span style="margin-right: 5px; opacity: 0.7;">H</span><span style="color: {val_color}; margin-right: 12px;">{d_high:.2f}</span><span style="margin-right: 5px; opacity: 0.7;">L</span><span style="color: {val_color}; margin-right: 12px;">{d_low:.2f}</span><span style="margin-right: 5px; opacity: 0.7;">C</span><span style="color: {val_color};">{d_close:.2f}</span></div>"""
+
+    pre_post_html = ""
+    if info.get('preMarketPrice') and info.get('preMarketChange'): p = info.get('preMarketPrice'); c = info.get('preMarketChange'); prev_p = p - c; pct = (c / prev_p) * 100 if prev_p != 0 else 0; pre_post_html += f'<div style="margin-bottom: 6px; font-size: 12px;">☀️ Pre: <b>{p:.2f}</b> {make_pill(c, pct)}</div>'
+    if info.get('postMarketPrice') and info.get('postMarketChange'): p = info.get('postMarketPrice'); c = info.get('postMarketChange'); prev_p = p - c; pct = (c / prev_p) * 100 if prev_p != 0 else 0; pre_post_html += f'<div style="margin-bottom: 6px; font-size: 12px;">🌙 Post: <b>{p:.2f}</b> {make_pill(c, pct)}</div>'
+
+    # 🔥 รวม HTML: เอา P/E & EPS มาต่อท้ายสุด
+    combined_html = f'<div style="margin-top: -5px; margin-bottom: 15px;">{ohlc_html}{pre_post_html}{pe_eps_html}</div>'
+    st.markdown(combined_html, unsafe_allow_html=True)
+
+
+# --- 4.1 Live Watch: Rerun เฉพาะส่วนราคา/X-Ray ตามรอบเวลา (st.fragment) แทนการ Rerun ทั้งสคริปต์ ---
+def live_fragment(fn):
+    """ครอบ fn เป็น Fragment ที่รันซ้ำเองทุก live_every วินาทีเมื่อเปิด Live Watch (ปิดอยู่ = วาดครั้งเดียวตามปกติ)"""
+    every = st.session_state.get('live_every', 10) if st.session_state.get('live_mode') else None
+    return st.fragment(run_every=every)(fn)
+
+def live_quote(symbol):
+    if not st.session_state.get('live_mode'): return None
+    try: return cached_quote(symbol)
+    except Exception: return None
+
+def price_header_panel(symbol, interval, mtf_interval, info, last_bar_ts):
+    quote = live_quote(symbol)
+    if quote is not None:
+        # แท่งใหม่เริ่มแล้ว -> ล้างตัวชี้แคช + Rerun ทั้งหน้า 1 ครั้งต่อแท่ง (Analysis หนักคำนวณใหม่เฉพาะตอนนี้)
+        if is_new_bar(quote, last_bar_ts, interval) and st.session_state.get('live_bar_trigger') != str(last_bar_ts):
+            st.session_state['live_bar_trigger'] = str(last_bar_ts)
+            invalidate_market(symbol, interval, mtf_interval)
+            st.rerun(scope="app")
+        info = overlay_quote(info, quote)
+    render_price_header(info)
+    if quote is not None: st.caption(f"📡 Live · อัปเดต {datetime.now().strftime('%H:%M:%S')} (ทุก {st.session_state.get('live_every', 10)} วินาที)")
+
+def xray_panel(symbol, ai_report, levels):
+    """กล่อง Price Action X-Ray (ผลของแท่งล่าสุด + ราคาสดเทียบโซน/แนวรับ-ต้าน เมื่อเปิด Live Watch)"""
+    sq_col = "#f97316" if ai_report['is_squeeze'] else "#0369a1"
+    sq_txt = "⚠️ Squeeze (อัดอั้นรอระเบิด)" if ai_report['is_squeeze'] else "Normal (ปกติ)"
+    vol_q_col = ai_report['vol_quality_color']
+    vol_txt = ai_report['vol_quality_msg']
+    obv_col = "#22c55e" if "Bullish" in ai_report['obv_insight'] or "ซื้อ" in ai_report['obv_insight'] else ("#ef4444" if "Bearish" in ai_report['obv_insight'] or "ขาย" in ai_report['obv_insight'] else "#6b7280")
+    dz_status = "✅ อยู่ในโซน (In Zone)" if ai_report['in_demand_zone'] else "❌ นอกโซน (รอราคา)"
+
+    # Live Watch: เทียบราคาสดกับโซน/แนวรับ-ต้านของแท่งล่าสุด (ไม่คำนวณ Indicator ใหม่)
+    live_html = ""
+    quote = live_quote(symbol)
+    if quote is not None:
+        px = quote['price']
+        in_zone = any(px >= z['bottom'] and px <= z['top'] * 1.015 for z in levels['demand_zones'])
+        sup_val, sup_desc = next_support(levels, px); res_val, res_desc = next_resistance(levels, px)
+        sup_txt = f"{sup_val:.2f} ({sup_desc}, -{(px - sup_val) / px * 100:.2f}%)" if sup_val else "N/A"
+        res_txt = f"{res_val:.2f} ({res_desc}, +{(res_val - px) / px * 100:.2f}%)" if res_val else "N/A"
+        live_html = f"""
+        <hr style='margin: 8px 0; opacity: 0.3;'>
+        <div class='xray-item'><span>📡 ราคาสด:</span> <span style='font-weight:bold;'>{px:,.2f} {'✅ ในโซน' if in_zone else ''}</span></div>
+        <div class='xray-item'><span>⬇️ แนวรับถัดไป:</span> <span>{sup_txt}</span></div>
+        <div class='xray-item'><span>⬆️ แนวต้านถัดไป:</span> <span>{res_txt}</span></div>"""
+
+    st.markdown(f"""
+    <div class='xray-box'>
+        <div class='xray-title'>🕯️ God Mode Insight</div>
+        <div class='xray-item'><span>ทรงกราฟ (4 Bars):</span> <span style='font-weight:bold;'>{ai_report['candle_pattern']}</span></div>
+        <div class='xray-item'><span>สถานะ:</span> <span>{ai_report['candle_color']}</span></div>
+        <div class='xray-item'><span>รายละเอียด:</span> <span style='font-style:italic;'>{ai_report['candle_detail']}</span></div>
+        <hr style='margin: 8px 0; opacity: 0.3;'>
+        <div class='xray-item'><span>🔥 ความผันผวน (BB):</span> <span style='color:{sq_col}; font-weight:bold;'>{sq_txt}</span></div>
+        <div class='xray-item'><span>📊 คุณภาพ Volume:</span> <span style='color:{vol_q_col}; font-weight:bold;'>{vol_txt}</span></div>
+        <div class='xray-item'><span>🌊 รายใหญ่ (Smart OBV):</span> <span style='color:{obv_col}; font-weight:bold;'>{ai_report['obv_insight']}</span></div>
+        <div class='xray-item'><span>🎯 Demand Zone:</span> <span style='font-weight:bold;'>{dz_status}</span></div>{live_html}
+    </div>
+    """, unsafe_allow_html=True)
+
 
 # --- 5. Data Fetching ---
-@st.cache_data(ttl=60, show_spinner=False)
+# แคชกลาง (SQLite) ใช้ร่วมกันทุก Process/Replica ในเครื่อง แทน st.cache_data ที่แยกกันคนละ Process
 def get_data_hybrid(symbol, interval, mtf_interval):
-    try:
-        ticker = yf.Ticker(symbol)
-        period_val = "10y" if interval == "1wk" else "5y" if interval == "1d" else "730d"
-        df = ticker.history(period=period_val, interval=interval)
-        df_mtf = ticker.history(period="10y", interval=mtf_interval)
-        if not df_mtf.empty: df_mtf['EMA200'] = ta.ema(df_mtf['Close'], length=200)
-        
-        try: raw_info = ticker.info 
-        except: raw_info = {} 
-
-        df_daily = ticker.history(period="5d", interval="1d")
-        if not df_daily.empty:
-            price = df_daily['Close'].iloc[-1]
-            chg = price - df_daily['Close'].iloc[-2] if len(df_daily) >=2 else 0
-            pct = (chg / df_daily['Close'].iloc[-2]) if len(df_daily) >=2 else 0
-            d_h, d_l, d_o = df_daily['High'].iloc[-1], df_daily['Low'].iloc[-1], df_daily['Open'].iloc[-1]
-        else:
-            price = df['Close'].iloc[-1]; chg = 0; pct = 0; d_h=0; d_l=0; d_o=0
-
-        # --- UPDATE: เพิ่มการดึงค่า P/E และ EPS ตรงนี้ (เหมือนเดิม) ---
-        info_dict = {
-            'longName': raw_info.get('longName', symbol), 
-            'marketState': raw_info.get('marketState', 'REGULAR'), 
-            'regularMarketPrice': price, 'regularMarketChange': chg,
-            'regularMarketChangePercent': pct, 'dayHigh': d_h, 'dayLow': d_l, 'regularMarketOpen': d_o,
-            'preMarketPrice': raw_info.get('preMarketPrice'), 'preMarketChange': raw_info.get('preMarketChange'),
-            'postMarketPrice': raw_info.get('postMarketPrice'), 'postMarketChange': raw_info.get('postMarketChange'),
-            'trailingPE': raw_info.get('trailingPE'),
-            'trailingEps': raw_info.get('trailingEps')
-        }
-        return df, info_dict, df_mtf
-    except: return None, None, None
-
-def analyze_volume(row, vol_ma):
-    vol = row['Volume']
-    if np.isnan(vol_ma) or vol_ma == 0: return "☁️ ปกติ", "gray"
-    pct = (vol / vol_ma) * 100
-    if pct >= 250: return f"💣 สูงมาก/ระเบิด ({pct:.0f}%)", "#7f1d1d"
-    elif pct >= 120: return f"🔥 สูง/คึกคัก ({pct:.0f}%)", "#16a34a"
-    elif pct <= 70: return f"🌵 ต่ำ/เบาบาง ({pct:.0f}%)", "#f59e0b"
-    else: return f"☁️ ปกติ ({pct:.0f}%)", "gray"
-
-# --- 7. AI Decision Engine (THE UPGRADED BRAIN - GOD MODE) ---
-
-def ai_hybrid_analysis(price, ema20, ema50, ema200, rsi, macd_val, macd_sig, adx, bb_up, bb_low, 
-                       vol_status, mtf_trend, atr_val, mtf_ema200_val,
-                       open_price, high, low, close, obv_val, obv_avg,
-                       obv_slope, prev_open, prev_close, vol_now, vol_avg, demand_zones,
-                       is_squeeze, df_candles): 
-
-    def safe(x): return float(x) if not np.isnan(float(x)) else np.nan
-    price = safe(price); ema20 = safe(ema20); ema50 = safe(ema50); ema200 = safe(ema200)
-    atr_val = safe(atr_val); obv_slope = safe(obv_slope); vol_now = safe(vol_now); vol_avg = safe(vol_avg)
-
-    # 1. 🔬 Deep Vision: อ่านแท่งเทียน 4 แท่งแบบละเอียด
-    candle_pattern, candle_color, candle_detail, is_big_candle = analyze_candlestick(df_candles)
-    
-    is_reversal_up = any(x in candle_pattern for x in ["Hammer", "Bullish Engulfing", "Morning Star", "Three White Soldiers"])
-    is_reversal_down = any(x in candle_pattern for x in ["Shooting Star", "Bearish Engulfing", "Evening Star", "Three Black Crows"])
-    
-    is_shooting_star = "Shooting Star" in candle_pattern
-
-    # Volume Logic (Smart Check)
-    is_vol_dry = vol_now < (vol_avg * 0.8) 
-    is_vol_climax = vol_now > (vol_avg * 2.0) 
-    vol_txt, vol_col = analyze_volume({'Volume': vol_now}, vol_avg)
-
-    # 2. 🏗️ Zone Checking (Buffer 1.5%)
-    in_demand_zone = False; active_zone = None; confluence_msg = ""
-    if demand_zones:
-        for zone in demand_zones:
-            if (low <= zone['top'] * 1.015) and (high >= zone['bottom']):
-                in_demand_zone = True; active_zone = zone; break
-    
-    is_confluence = False
-    if in_demand_zone:
-        if not np.isnan(ema200) and abs(active_zone['bottom'] - ema200) / price < 0.02: is_confluence = True; confluence_msg = "Zone + EMA 200"
-        elif not np.isnan(ema50) and abs(active_zone['bottom'] - ema50) / price < 0.02: is_confluence = True; confluence_msg = "Zone + EMA 50"
-
-    # 3. 🌊 Regime Filter (ADX & Trend)
-    is_strong_trend = adx > 25 if not np.isnan(adx) else False
-    is_major_uptrend = price > ema200 if not np.isnan(ema200) else True
-
-    # --- 🧠 CONTEXTUAL SCORING SYSTEM (God Mode) ---
-    score = 0
-    bullish = []
-    bearish = []
-    ctx = ""
-
-    # A. 🏛️ Structural Score (โครงสร้างพื้นฐาน)
-    if not np.isnan(ema200):
-        if price > ema200: score += 3; bullish.append("Structure: ยืนเหนือ EMA 200 (ขาขึ้นระยะยาว)")
-        else: score -= 3; bearish.append("Structure: หลุด EMA 200 (ขาลงระยะยาว)")
-
-    if not np.isnan(ema50):
-        if price > ema50: score += 2; bullish.append("Structure: ยืนเหนือ EMA 50 (แกร่งระยะกลาง)")
-        else: score -= 1; bearish.append("Structure: หลุด EMA 50 (เสียทรงระยะกลาง)")
-
-    # B. 🕯️ Price Action Score (ตัดสินใจด้วย 4 แท่ง + บริบท)
-    # --- กลุ่มสัญญาณลบ (Bearish) ---
-    if "Three Black Crows" in candle_pattern:
-        score -= 3 # โดนหนัก
-        bearish.append("🦅 Three Black Crows: แรงขายทุบ 3 วันติด (อันตราย)")
-        ctx = "🩸 Panic Dump: หนีตาย (เจ้ามือทิ้งของ)" # Veto
-
-    elif "Evening Star" in candle_pattern:
-        score -= 2
-        bearish.append("🌆 Evening Star: กลับตัวลงสมบูรณ์แบบ")
-        if score < 2: ctx = "📉 Reversal: สัญญาณกลับตัวลงชัดเจน"
-
-    elif "Bearish Engulfing" in candle_pattern:
-        # Contextual Check: วอลุ่มและการย่อตัว
-        if is_vol_climax: 
-            score -= 3 # วอลุ่มพีค = เจ้าทิ้ง
-            bearish.append("🐻 Bearish Engulfing + Vol Peak (เจ้ามือทิ้งของ)")
-            ctx = "🩸 Panic Sell: แรงขายมหาศาล"
-        elif is_major_uptrend and is_vol_dry:
-            score += 1 # พลิกวิกฤตเป็นโอกาส
-            bullish.append("🐂 Bullish Pullback: แท่งแดงวอลุ่มแห้ง (ย่อเพื่อไปต่อ)")
-        else:
-            score -= 2 # ปกติ
-            bearish.append("⚠️ Bearish Engulfing: แรงขายชนะแรงซื้อ")
-
-    elif is_shooting_star:
-        if price > bb_up: # ชน Bollinger Band บน
-            score -= 2
-            bearish.append("☄️ Shooting Star: โดนตบที่แนวต้าน BB (Overbought)")
+    try: return cached_load_market(symbol, interval, mtf_interval)
+    except: return None, None, None, pd.DataFrame(), pd.DataFrame()
+
+@st.fragment
+def save_panel(latest_data):
+    """ปุ่มบันทึกลง Sheet เป็น Fragment: กดแล้ว Rerun แค่ปุ่มนี้ ไม่ดึงข้อมูล/วิเคราะห์ใหม่ทั้งหน้า"""
+    save_key = f"save_{latest_data['หุ้น']}_{latest_data['เวลา']}"
+    if st.button(f"💾 บันทึก {latest_data['หุ้น']} ลง Sheet", type="primary", use_container_width=True, key=save_key):
+        success = save_to_gsheet(latest_data)
+        if success:
+            st.toast(f"✅ เข้าคิวบันทึก {latest_data['หุ้น']} เรียบร้อย!", icon="☁️")
+            st.success(f"บันทึกข้อมูล {latest_data['หุ้น']} แล้ว (ระบบจะส่งเข้า Sheet เบื้องหลังภายในไม่กี่วินาที)")
         else:
-            score -= 1
-            bearish.append("☄️ Shooting Star: มีแรงขายกดดันข้างบน")
-
-    # --- กลุ่มสัญญาณบวก (Bullish) ---
-    if "Three White Soldiers" in candle_pattern:
-        score += 3
-        bullish.append("💂 Three White Soldiers: แรงซื้อ 3 วันติด (แข็งแกร่งมาก)")
-
-    elif "Morning Star" in candle_pattern:
-        if in_demand_zone:
-            score += 3 # คูณพิเศษ
-            bullish.append("🌅 Morning Star (in Zone): จุดกลับตัวต้นน้ำสวยงาม")
-        else:
-            score += 2
-            bullish.append("🌅 Morning Star: กลับตัวขึ้นสมบูรณ์")
-
-    elif "Bullish Engulfing" in candle_pattern:
-        # Contextual Check: วอลุ่มและตำแหน่ง
-        if rsi > 70: # ซื้อยอดดอย
-            score -= 1
-            bearish.append("⚠️ Bullish Trap: เขียวที่ยอดดอย (RSI Overbought)")
-        elif is_vol_climax:
-            score += 3
-            bullish.append("🚀 Power Buy: แท่งเขียวกลืนกิน + วอลุ่มระเบิด")
-        else:
-            score += 2
-            bullish.append("🐂 Bullish Engulfing: แรงซื้อชนะแรงขาย")
+            st.error("บันทึกไม่สำเร็จ โปรดตรวจสอบการตั้งค่า gcp_service_account ใน Secrets")
 
-    # C. 📊 Volume & Flow Analysis (Smart OBV)
-    obv_strength_pct = 0
-    if vol_avg > 0 and not np.isnan(obv_slope):
-        obv_strength_pct = (obv_slope / vol_avg) * 100
-    
-    obv_insight = f"Flow ปกติ ({obv_strength_pct:.1f}%)"
-
-    if obv_strength_pct > 5: # เงินเข้า
-        if obv_strength_pct > 60: obv_insight = f"🚀 กวาดซื้อ ({obv_strength_pct:.1f}%)"
-        else: obv_insight = f"💎 เก็บของ ({obv_strength_pct:.1f}%)"
-        
-        # Bullish Divergence Check
-        if price < ema20: # ราคาลงแต่เงินเข้า
-            score += 2
-            bullish.append(f"Bullish Divergence: ราคาลงแต่เงินเข้า ({obv_strength_pct:.1f}%)")
-            obv_insight = "Bullish Div (เก็บของ)"
-        else:
-            score += 1
-            bullish.append(f"Fund Flow: เงินไหลเข้าต่อเนื่อง")
-
-    elif obv_strength_pct < -5: # เงินออก
-        if obv_strength_pct < -60: obv_insight = f"🩸 ทิ้งของ ({obv_strength_pct:.1f}%)"
-        else: obv_insight = f"💧 รินขาย ({obv_strength_pct:.1f}%)"
-
-        # Bearish Divergence Check
-        if price > ema20: # ราคาขึ้นแต่เงินออก
-            score -= 2
-            bearish.append(f"Bearish Divergence: ราคาขึ้นแต่เงินออก ({obv_strength_pct:.1f}%)")
-            obv_insight = "Bearish Div (รินขาย)"
-        else:
-            score -= 1
-            bearish.append(f"Fund Flow: เงินไหลออกต่อเนื่อง")
-
-    # D. ⚡ Momentum & Indicators (RSI/MACD)
-    if not np.isnan(macd_val) and macd_val > macd_sig: score += 1; bullish.append("MACD ตัดขึ้น")
-    elif not np.isnan(macd_val): score -= 1
-
-    # RSI Context
-    if not np.isnan(rsi):
-        if is_strong_trend and is_major_uptrend:
-            if rsi > 75 and not is_vol_climax: score += 1; bullish.append(f"RSI {rsi:.0f}: Super Bullish Trend") # Run trend
-            elif rsi < 45: score += 2; bullish.append(f"RSI {rsi:.0f}: Dip Opportunity (ย่อซื้อ)")
-        else: # Sideway
-            if rsi > 65: score -= 2; bearish.append(f"RSI {rsi:.0f}: Overbought (ระวังต้าน)")
-            elif rsi < 30: score += 2; bullish.append(f"RSI {rsi:.0f}: Oversold (รอเด้ง)")
-
-    # E. 🛡️ Special Context (Veto Rules)
-    if in_demand_zone:
-        score += 3; bullish.append("🟢 In Demand Zone (ต้นทุนดี)")
-        if is_confluence: score += 1; bullish.append(f"⭐ {confluence_msg}")
-        if not ctx: ctx = "💎 Sniper Mode (เข้าโซนสวย)"
-
-    # Final Context Generation
-    if ctx == "":
-        if score >= 5: ctx = "🚀 Bullish Breakout: โมเมนตัมกระทิงดุ"
-        elif score >= 2: ctx = "📈 Uptrend Structure: ย่อตัวเพื่อขึ้นต่อ"
-        elif score <= -4: ctx = "🩸 Bearish Crash: แรงขายรุนแรง (ห้ามรับ)"
-        elif score <= -1: ctx = "📉 Downtrend Pressure: เด้งเพื่อลง"
-        else: ctx = "⚖️ Sideway/Neutral: รอเลือกทาง"
-
-    # --- FINAL STATUS ASSIGNMENT ---
-    if score >= 6:
-        color = "green"; title = "🚀 Sniper Entry: จุดซื้อคมกริบ"; strat = "Aggressive Buy"
-        adv = f"โมเมนตัมแรงจัด Pattern สวย ถือรันเทรนด์ SL: {low-(atr_val*1.0):.2f}"
-    elif score >= 4:
-        if "Pullback" in ctx or "Dip" in str(bullish):
-            color = "green"; title = "🐂 Bullish Pullback: ย่อเพื่อไปต่อ"; strat = "Buy on Dip"
-            adv = "ราคาย่อตัวในขาขึ้น วอลุ่มแห้ง/RSI ต่ำ เป็นจังหวะเก็บของที่ดีที่สุด"
-        else:
-            color = "green"; title = "🐂 Strong Buy: ขาขึ้นแข็งแกร่ง"; strat = "Accumulate"
-            adv = "เทรนด์หลักเป็นขาขึ้น ย่อตัวน่าสนใจ"
-    elif score >= 1:
-        if "Sideway Up" in ctx:
-            color = "yellow"; title = "⚖️ Sideway Up: สะสมพลัง"; strat = "Accumulate"
-            adv = "ราคาออกข้างแต่เงินไหลเข้า ดักเก็บที่แนวรับ ลุ้นเบรค"
-        else:
-            color = "yellow"; title = "⚖️ Neutral: รอความชัดเจน"; strat = "Wait & Watch"
-            adv = "ปัจจัยขัดแย้งกัน (เช่น เทรนด์ดีแต่เจอแท่งเทียนกลับตัว) นั่งทับมือไปก่อน"
-    elif score <= -4:
-        if "Panic" in ctx:
-            color = "red"; title = "💀 Panic Sell: หนีตาย"; strat = "Exit Immediately"
-            adv = "วงแตก! แรงขายระดับวิกฤต (3 Crows / Vol Peak) ห้ามรับเด็ดขาด"
-        else:
-            color = "red"; title = "🩸 Falling Knife: มีดหล่น"; strat = "Avoid / Cut Loss"
-            adv = "ราคาดิ่งแรง หลุดแนวรับสำคัญ รอให้หยุดลงและสร้างฐานก่อน"
-    else: # Score 0 to -3
-        color = "orange"; title = "🐻 Bearish Pressure: แรงกดดันสูง"; strat = "Reduce Port"
-        adv = "แรงขายมากกว่าแรงซื้อ ระวังหลุดแนวรับ ไม่ควรรีบรับจนกว่าจะเห็นสัญญาณกลับตัว"
-
-    if in_demand_zone: sl = active_zone['bottom'] - (atr_val*0.5)
-    else: sl = price - (2*atr_val) if not np.isnan(atr_val) else price*0.95
-    tp = price + (3*atr_val) if not np.isnan(atr_val) else price*1.05
-
-    return {
-        "status_color": color, "banner_title": title, "strategy": strat, "context": ctx,
-        "bullish_factors": bullish, "bearish_factors": bearish, "sl": sl, "tp": tp, "holder_advice": adv,
-        "candle_pattern": candle_pattern, "candle_color": candle_color, "candle_detail": candle_detail,
-        "vol_quality_msg": vol_txt, "vol_quality_color": vol_col,
-        "in_demand_zone": in_demand_zone, "confluence_msg": confluence_msg,
-        "is_squeeze": is_squeeze, "obv_insight": obv_insight
-    }
 # --- 8. Main Execution & Display (ส่วนแสดงผลหลัก) ---
 
 # 1. อัปเดต State เมื่อกดปุ่มค้นหา
@@ -593,112 +330,31 @@ if st.session_state['search_triggered']:
     """, unsafe_allow_html=True)
     
     with st.spinner(f"AI God Mode กำลังเจาะลึก {symbol_input} (Analyzing 4-Bar Pattern & Context)..."):
-        # 1. Main Data
-        df, info, df_mtf = get_data_hybrid(symbol_input, tf_code, mtf_code)
-        
-        # 2. Safety Net Data
-        try:
-            ticker_stats = yf.Ticker(symbol_input)
-            df_stats_day = ticker_stats.history(period="2y", interval="1d")
-            df_stats_week = ticker_stats.history(period="5y", interval="1wk")
-        except:
-            df_stats_day = pd.DataFrame(); df_stats_week = pd.DataFrame()
-
-    if df is not None and not df.empty and len(df) > 20: 
-        # --- Indicator Calculation ---
-        df['EMA20'] = ta.ema(df['Close'], length=20)
-        df['EMA50'] = ta.ema(df['Close'], length=50)
-        
-        ema200_series = ta.ema(df['Close'], length=200)
-        df['EMA200'] = ema200_series if ema200_series is not None else np.nan
+        # 1. Main Data + 2. Safety Net Data (แยกจากชุดดาวน์โหลดเดียวกัน ไม่ต้องดึงซ้ำ)
+        df, info, df_mtf, df_stats_day, df_stats_week = get_data_hybrid(symbol_input, tf_code, mtf_code)
 
-        df['RSI'] = ta.rsi(df['Close'], length=14)
-        df['ATR'] = ta.atr(df['High'], df['Low'], df['Close'], length=14)
-        
-        macd = ta.macd(df['Close'])
-        if macd is not None: df = pd.concat([df, macd], axis=1)
-        
-        bbands = ta.bbands(df['Close'], length=20, std=2)
-        if bbands is not None and len(bbands.columns) >= 3:
-            bbl_col_name, bbu_col_name = bbands.columns[0], bbands.columns[2]
-            df = pd.concat([df, bbands], axis=1)
-        else: bbl_col_name, bbu_col_name = None, None
-        
-        adx = ta.adx(df['High'], df['Low'], df['Close'], length=14)
-        if adx is not None: df = pd.concat([df, adx], axis=1)
-        
-        df['Vol_SMA20'] = ta.sma(df['Volume'], length=20)
-        
-        df['OBV'] = ta.obv(df['Close'], df['Volume'])
-        df['OBV_SMA20'] = ta.sma(df['OBV'], length=20)
-        df['OBV_Slope'] = ta.slope(df['OBV'], length=5) 
-        
-        df['Rolling_Min'] = df['Low'].rolling(window=20).min()
-        df['Rolling_Max'] = df['High'].rolling(window=20).max()
-        
-        if bbu_col_name and bbl_col_name and 'EMA20' in df.columns:
-            df['BB_Width'] = (df[bbu_col_name] - df[bbl_col_name]) / df['EMA20'] * 100
-            df['BB_Width_Min20'] = df['BB_Width'].rolling(window=20).min()
-            is_squeeze = df['BB_Width'].iloc[-1] <= (df['BB_Width_Min20'].iloc[-1] * 1.1) 
-        else:
-            is_squeeze = False
+    if info and info.get('fetchErrors'):
+        failed = ", ".join(f"{k} ({v})" for k, v in info['fetchErrors'].items())
+        st.caption(f"⚠️ ดึงข้อมูลบางส่วนไม่สำเร็จ: {failed} — แสดงผลเท่าที่มี")
 
-        demand_zones = find_demand_zones(df, atr_multiplier=0.25)
-        supply_zones = find_supply_zones(df, atr_multiplier=0.25)
-        
-        last = df.iloc[-1]
-        price = info.get('regularMarketPrice') if info.get('regularMarketPrice') else last['Close']
-        ema20 = last['EMA20'] if 'EMA20' in last else np.nan
-        ema50 = last['EMA50'] if 'EMA50' in last else np.nan
-        ema200 = last['EMA200'] if 'EMA200' in last else np.nan
+    analysis_ctx = None
+    if df is not None and not df.empty and len(df) > 20:
+        analysis_ctx = cached_analyze_frame(symbol_input, tf_code, df, df_mtf, price=info.get('regularMarketPrice'))
+
+    if analysis_ctx is not None: 
+        # --- Indicator Calculation + Zones + God Mode Brain (analysis.analyze_frame) ---
+        df = analysis_ctx['df']; ai_report = analysis_ctx['ai_report']; price = analysis_ctx['price']
+        ema20 = analysis_ctx['ema20']; ema50 = analysis_ctx['ema50']; ema200 = analysis_ctx['ema200']
         
         if tf_code == "1wk":
             if ema200 is None or (isinstance(ema200, float) and np.isnan(ema200)):
                 st.error(f"⚠️ **ข้อมูลไม่เพียงพอสำหรับ TF Week** (ต้องการ 200 สัปดาห์)")
                 st.stop() 
 
-        rsi = last['RSI'] if 'RSI' in last else np.nan
-        atr = last['ATR'] if 'ATR' in last else np.nan
-        vol_now = last['Volume']
-        open_p = last['Open']; high_p = last['High']; low_p = last['Low']; close_p = last['Close']
-        
-        try: macd_val, macd_signal = last['MACD_12_26_9'], last['MACDs_12_26_9']
-        except: macd_val, macd_signal = np.nan, np.nan
-        try: adx_val = last['ADX_14']
-        except: adx_val = np.nan
-        
-        if bbu_col_name and bbl_col_name: bb_upper, bb_lower = last[bbu_col_name], last[bbl_col_name]
-        else: bb_upper, bb_lower = price * 1.05, price * 0.95
-        
-        vol_status, vol_color = analyze_volume(last, last['Vol_SMA20'])
-        
-        try: obv_val = last['OBV']; obv_avg = last['OBV_SMA20']
-        except: obv_val = np.nan; obv_avg = np.nan
-        
-        obv_slope_val = last.get('OBV_Slope', np.nan)
-        
-        mtf_trend = "Sideway"; mtf_ema200_val = 0
-        if df_mtf is not None and not df_mtf.empty:
-            if 'EMA200' not in df_mtf.columns: df_mtf['EMA200'] = ta.ema(df_mtf['Close'], length=200)
-            if len(df_mtf) > 200 and not pd.isna(df_mtf['EMA200'].iloc[-1]):
-                mtf_ema200_val = df_mtf['EMA200'].iloc[-1]
-                if df_mtf['Close'].iloc[-1] > mtf_ema200_val: mtf_trend = "Bullish"
-                else: mtf_trend = "Bearish"
-        
-        try: prev_open = df['Open'].iloc[-2]; prev_close = df['Close'].iloc[-2]; vol_avg = last['Vol_SMA20']
-        except: prev_open = 0; prev_close = 0; vol_avg = 1
-
-        # 🔑 ตัดข้อมูล 4 แท่ง
-        df_candles_4 = df.iloc[-4:] 
-
-        # 🧠 CALL GOD MODE BRAIN
-        ai_report = ai_hybrid_analysis(price, ema20, ema50, ema200, rsi, macd_val, macd_signal, adx_val, bb_upper, bb_lower, 
-                                       vol_status, mtf_trend, atr, mtf_ema200_val,
-                                       open_p, high_p, low_p, close_p, obv_val, obv_avg,
-                                       obv_slope_val, 
-                                       prev_open, prev_close, vol_now, vol_avg, demand_zones, 
-                                       is_squeeze,
-                                       df_candles_4)
+        rsi = analysis_ctx['rsi']; atr = analysis_ctx['atr']; vol_now = analysis_ctx['vol_now']
+        macd_val = analysis_ctx['macd_val']; macd_signal = analysis_ctx['macd_signal']; adx_val = analysis_ctx['adx_val']
+        bb_upper = analysis_ctx['bb_upper']; bb_lower = analysis_ctx['bb_lower']; vol_status = analysis_ctx['vol_status']
+        demand_zones = analysis_ctx['demand_zones']; supply_zones = analysis_ctx['supply_zones']
 
         # --- LOG MANAGEMENT ---
         current_time = datetime.now().strftime("%H:%M:%S")
@@ -737,6 +393,9 @@ if st.session_state['search_triggered']:
         if submit_btn: 
             st.session_state['history_log'].insert(0, log_entry)
             if len(st.session_state['history_log']) > 10: st.session_state['history_log'] = st.session_state['history_log'][:10]
+            # เก็บถาวรลงคลังประวัติ (SQLite) ทุกครั้งที่กดวิเคราะห์
+            try: get_history_store().record(entry_from_report(analysis_ctx, symbol_input, tf_code, change_pct=(pct_change or 0) * 100, status_label=th_score, action_label=th_action))
+            except Exception: pass
 
         # --- DISPLAY UI ---
         logo_url = f"https://financialmodelingprep.com/image-stock/{symbol_input}.png"
@@ -744,44 +403,10 @@ if st.session_state['search_triggered']:
         icon_html = f"""<img src="{logo_url}" onerror="this.onerror=null; this.src='{fallback_url}';" style="height: 50px; width: 50px; border-radius: 50%; vertical-align: middle; margin-right: 10px; object-fit: contain; background-color: white; border: 1px solid #e0e0e0; padding: 2px;">"""
         st.markdown(f"<h2 style='text-align: center; margin-top: -15px; margin-bottom: 25px;'>{icon_html} {info['longName']} ({symbol_input})</h2>", unsafe_allow_html=True)
 
-        m_state = info.get('marketState', '').upper()
-
         c1, c2 = st.columns(2)
         with c1:
-            reg_price, reg_chg = info.get('regularMarketPrice'), info.get('regularMarketChange')
-            if reg_price and reg_chg: prev_c = reg_price - reg_chg; reg_pct = (reg_chg / prev_c) * 100 if prev_c != 0 else 0.0
-            else: reg_pct = 0.0
-            color_text = "#16a34a" if reg_chg and reg_chg > 0 else "#dc2626"; bg_color = "#e8f5ec" if reg_chg and reg_chg > 0 else "#fee2e2"
-            
-            # Price Display (ขนาดใหญ่ 40px)
-            st.markdown(f"""<div style="margin-bottom:5px; display: flex; align-items: center; gap: 15px; flex-wrap: wrap;"><div style="font-size:40px; font-weight:600; line-height: 1;">{reg_price:,.2f} <span style="font-size: 20px; color: #6b7280; font-weight: 400;">USD</span></div><div style="display:inline-flex; align-items:center; gap:6px; background:{bg_color}; color:{color_text}; padding:4px 12px; border-radius:999px; font-size:18px; font-weight:500;">{arrow_html(reg_chg)} {reg_chg:+.2f} ({reg_pct:.2f}%)</div></div>""", unsafe_allow_html=True)
-            
-            # P/E & EPS HTML (เตรียมไว้ใส่ด้านล่าง)
-            pe = info.get('trailingPE')
-            eps = info.get('trailingEps')
-            pe_str = f"{pe:.2f}" if pe and pe > 0 else "N/A"
-            eps_str = f"{eps:.2f}" if eps else "N/A"
-            pe_eps_html = f"""
-            <div style="display: flex; gap: 12px; margin-bottom: 10px; margin-top: 8px;">
-                <div class="metric-box">📊 P/E: <b>{pe_str}</b></div>
-                <div class="metric-box">💰 EPS: <b>{eps_str}</b></div>
-            </div>
-            """
-
-            def make_pill(change, percent): color = "#16a34a" if change >= 0 else "#dc2626"; bg = "#e8f5ec" if change >= 0 else "#fee2e2"; arrow = "▲" if change >= 0 else "▼"; return f'<span style="background:{bg}; color:{color}; padding: 2px 8px; border-radius: 10px; font-size: 12px; font-weight: 600; margin-left: 8px;">{arrow} {change:+.2f} ({percent:.2f}%)</span>'
-            
-            ohlc_html = ""; 
-            if m_state != "REGULAR": 
-                d_open = info.get('regularMarketOpen'); d_high = info.get('dayHigh'); d_low = info.get('dayLow'); d_close = info.get('regularMarketPrice')
-                if d_open: day_chg = info.get('regularMarketChange', 0); val_color = "#16a34a" if day_chg >= 0 else "#dc2626"; ohlc_html = f"""<div style="font-size: 12px; font-weight: 600; margin-bottom: 5px; font-family: 'Source Sans Pro', sans-serif; white-space: nowrap; overflow-x: auto;"><span style="margin-right: 5px; opacity: 0.7;">O</span><span style="color: {val_color}; margin-right: 12px;">{d_open:.2f}</span><span style="margin-right: 5px; opacity: 0.7;">H</span><span style="color: {val_color}; margin-right: 12px;">{d_high:.2f}</span><span style="margin-right: 5px; opacity: 0.7;">L</span><span style="color: {val_color}; margin-right: 12px;">{d_low:.2f}</span><span style="margin-right: 5px; opacity: 0.7;">C</span><span style="color: {val_color};">{d_close:.2f}</span></div>"""
-            
-            pre_post_html = ""
-            if info.get('preMarketPrice') and info.get('preMarketChange'): p = info.get('preMarketPrice'); c = info.get('preMarketChange'); prev_p = p - c; pct = (c / prev_p) * 100 if prev_p != 0 else 0; pre_post_html += f'<div style="margin-bottom: 6px; font-size: 12px;">☀️ Pre: <b>{p:.2f}</b> {make_pill(c, pct)}</div>'
-            if info.get('postMarketPrice') and info.get('postMarketChange'): p = info.get('postMarketPrice'); c = info.get('postMarketChange'); prev_p = p - c; pct = (c / prev_p) * 100 if prev_p != 0 else 0; pre_post_html += f'<div style="margin-bottom: 6px; font-size: 12px;">🌙 Post: <b>{p:.2f}</b> {make_pill(c, pct)}</div>'
-            
-            # 🔥 รวม HTML: เอา P/E & EPS มาต่อท้ายสุด
-            combined_html = f'<div style="margin-top: -5px; margin-bottom: 15px;">{ohlc_html}{pre_post_html}{pe_eps_html}</div>'
-            st.markdown(combined_html, unsafe_allow_html=True)
+            # Live Watch: Fragment นี้ Rerun เองตามรอบ (เฉพาะส่วนราคา) แท่งใหม่ปิดค่อย Rerun ทั้งหน้า
+            live_fragment(price_header_panel)(symbol_input, tf_code, mtf_code, info, df.index[-1])
 
         if tf_code == "1h": tf_label = "TF Hour"
         elif tf_code == "1wk": tf_label = "TF Week"
@@ -858,61 +483,24 @@ if st.session_state['search_triggered']:
 
             # --- KEY LEVELS & ANALYSIS CENTER (Alert + Forecast) ---
             st.subheader("🚧 Key Levels & Analysis")
+            # ระดับราคาทุก TF คำนวณครั้งเดียวต่อแท่ง (แคชกลาง) ใช้ร่วมทั้ง Alert / Health Check / ตารางแนวรับ-ต้าน
+            levels = cached_key_levels(symbol_input, tf_code, analysis_ctx, df_stats_day, df_stats_week)
 
             # ----------------------------------------------------
             # 1. 🔍 LOGIC: ตรวจสอบการหลุดแนวรับ (Breakdown Check)
             # ----------------------------------------------------
-            breakdown_list = []
-            if not np.isnan(ema50) and price < ema50: breakdown_list.append(f"EMA 50 ({ema50:.2f})")
-            if not np.isnan(ema200) and price < ema200: breakdown_list.append(f"EMA 200 ({ema200:.2f})")
-            if demand_zones:
-                sorted_zones = sorted(demand_zones, key=lambda x: x['top'], reverse=True)
-                for z in sorted_zones:
-                    if price < z['bottom']: 
-                        breakdown_list.append(f"Demand Zone [{z['bottom']:.2f}-{z['top']:.2f}]")
-                        break 
+            breakdown_list = breakdown_levels(levels, price)
 
             # หา Next Support (Magnet)
-            candidates_supp_check = []
-            if not np.isnan(ema50) and ema50 < price: candidates_supp_check.append({'val': ema50, 'label': "EMA 50"})
-            if not np.isnan(ema200) and ema200 < price: candidates_supp_check.append({'val': ema200, 'label': "EMA 200"})
-            if demand_zones:
-                for z in demand_zones:
-                    if z['top'] < price: candidates_supp_check.append({'val': z['top'], 'label': f"Zone {z['top']:.2f}"})
-            if not df_stats_week.empty: 
-                 try: w_ema200 = ta.ema(df_stats_week['Close'], length=200).iloc[-1]
-                 except: w_ema200 = np.nan
-                 if not np.isnan(w_ema200) and w_ema200 < price: candidates_supp_check.append({'val': w_ema200, 'label': "EMA 200 Week"})
-
-            next_support_val = 0
-            next_support_desc = ""
-            if candidates_supp_check:
-                best_supp = max(candidates_supp_check, key=lambda x: x['val']) 
-                next_support_val = best_supp['val']
-                next_support_desc = best_supp['label']
+            next_support_val, next_support_desc = next_support(levels, price)
 
             # ----------------------------------------------------
             # 2. 🚀 LOGIC: ตรวจสอบการเบรคแนวต้าน (Breakout Check)
             # ----------------------------------------------------
-            breakout_list = []
-            if not np.isnan(ema50) and price > ema50 and (price - ema50)/ema50 < 0.05: breakout_list.append(f"EMA 50 ({ema50:.2f})")
-            if not np.isnan(ema200) and price > ema200 and (price - ema200)/ema200 < 0.05: breakout_list.append(f"EMA 200 ({ema200:.2f})")
-            
+            breakout_list = breakout_levels(levels, price)
+
             # หา Next Resistance (Sky Target)
-            candidates_res_check = []
-            if not np.isnan(ema50) and ema50 > price: candidates_res_check.append({'val': ema50, 'label': "EMA 50"})
-            if not np.isnan(ema200) and ema200 > price: candidates_res_check.append({'val': ema200, 'label': "EMA 200"})
-            if not np.isnan(bb_upper) and bb_upper > price: candidates_res_check.append({'val': bb_upper, 'label': "BB Upper"})
-            if supply_zones:
-                for z in supply_zones:
-                    if z['bottom'] > price: candidates_res_check.append({'val': z['bottom'], 'label': f"Supply Zone"})
-
-            next_res_val = 0
-            next_res_desc = ""
-            if candidates_res_check:
-                best_res = min(candidates_res_check, key=lambda x: x['val']) 
-                next_res_val = best_res['val']
-                next_res_desc = best_res['label']
+            next_res_val, next_res_desc = next_resistance(levels, price)
 
             # ----------------------------------------------------
             # 3. 🚦 DISPLAY ALERTS (แสดงผลแจ้งเตือน)
@@ -1030,149 +618,31 @@ if st.session_state['search_triggered']:
 
 
             # --- SUPPORTS ---
-            candidates_supp = []
-            if not np.isnan(ema20) and ema20 < price: candidates_supp.append({'val': ema20, 'label': f"EMA 20 ({tf_label} - ระยะสั้น)"})
-            if not np.isnan(ema50) and ema50 < price: candidates_supp.append({'val': ema50, 'label': f"EMA 50 ({tf_label})"})
-            if not np.isnan(ema200) and ema200 < price: candidates_supp.append({'val': ema200, 'label': f"EMA 200 ({tf_label} - Trend Support)"})
-            if not np.isnan(bb_lower) and bb_lower < price: candidates_supp.append({'val': bb_lower, 'label': f"BB Lower ({tf_label} - แนวรับผันผวน)"})
-
-            if not df_stats_day.empty:
-                try: d_ema50 = ta.ema(df_stats_day['Close'], length=50).iloc[-1]
-                except: d_ema50 = np.nan
-                try: d_ema200 = ta.ema(df_stats_day['Close'], length=200).iloc[-1]
-                except: d_ema200 = np.nan
-                if tf_code != "1d": 
-                    if not np.isnan(d_ema50) and d_ema50 < price: candidates_supp.append({'val': d_ema50, 'label': "EMA 50 (TF Day - รับระยะกลาง)"})
-                    if not np.isnan(d_ema200) and d_ema200 < price: candidates_supp.append({'val': d_ema200, 'label': "🛡️ EMA 200 (TF Day - รับใหญ่รายวัน)"})
-            
-            if not df_stats_week.empty:
-                try: w_ema50 = ta.ema(df_stats_week['Close'], length=50).iloc[-1]
-                except: w_ema50 = np.nan
-                try: w_ema200 = ta.ema(df_stats_week['Close'], length=200).iloc[-1]
-                except: w_ema200 = np.nan
-                if tf_code != "1wk":
-                    if not np.isnan(w_ema50) and w_ema50 < price: candidates_supp.append({'val': w_ema50, 'label': "EMA 50 (TF Week - รับระยะยาว)"})
-                    if not np.isnan(w_ema200) and w_ema200 < price: candidates_supp.append({'val': w_ema200, 'label': "🛡️ EMA 200 (TF Week - รับระดับกองทุน)"})
-
-            if demand_zones:
-                for z in demand_zones: candidates_supp.append({'val': z['bottom'], 'label': f"Demand Zone [{z['bottom']:.2f}-{z['top']:.2f}]"})
-
-            candidates_supp.sort(key=lambda x: x['val'], reverse=True)
-            merged_supp = []
-            skip_next = False
-            for i in range(len(candidates_supp)):
-                if skip_next: skip_next = False; continue
-                current = candidates_supp[i]
-                if i < len(candidates_supp) - 1:
-                    next_item = candidates_supp[i+1]
-                    if (current['val'] - next_item['val']) / current['val'] < 0.01: 
-                        new_label = f"⭐ Confluence Zone ({current['label']} + {next_item['label']})"
-                        merged_supp.append({'val': current['val'], 'label': new_label})
-                        skip_next = True
-                        continue
-                merged_supp.append(current)
-
-            final_show_supp = []
-            for item in merged_supp:
-                if (price - item['val']) / price > 0.30 and "EMA 200 (TF Week" not in item['label']: continue
-                is_vip = "EMA 200" in item['label'] or "EMA 50 (TF Week" in item['label'] or "52-Week" in item['label'] or "Confluence" in item['label']
-                if not final_show_supp: final_show_supp.append(item)
-                else:
-                    last_item = final_show_supp[-1]
-                    dist = abs(last_item['val'] - item['val'])
-                    if is_vip or dist >= min_dist:
-                         final_show_supp.append(item)
+            candidates_supp = support_candidates(levels, price, tf_code, tf_label)
+
+            final_show_supp = select_levels(merge_levels(candidates_supp, is_support=True), price, min_dist, is_support=True, limit=4)
 
             st.markdown("#### 🟢 แนวรับ (Supports)"); 
             if final_show_supp: 
-                for item in final_show_supp[:4]: st.write(f"- **{item['val']:.2f} :** {item['label']}")
+                for item in final_show_supp: st.write(f"- **{item['val']:.2f} :** {item['label']} `{level_strength(item)}`")
             else: st.error("🚨 ราคาหลุดทุกแนวรับสำคัญ! (All Time Low?)")
 
             # --- RESISTANCES ---
-            candidates_res = []
-            if not np.isnan(ema20) and ema20 > price: candidates_res.append({'val': ema20, 'label': f"EMA 20 ({tf_label} - ต้านสั้น)"})
-            if not np.isnan(ema50) and ema50 > price: candidates_res.append({'val': ema50, 'label': f"EMA 50 ({tf_label})"})
-            if not np.isnan(ema200) and ema200 > price: candidates_res.append({'val': ema200, 'label': f"EMA 200 ({tf_label} - ต้านใหญ่)"})
-            if not np.isnan(bb_upper) and bb_upper > price: candidates_res.append({'val': bb_upper, 'label': f"BB Upper ({tf_label} - เพดาน)"})
-            
-            if not df_stats_day.empty:
-                try: d_ema50 = ta.ema(df_stats_day['Close'], length=50).iloc[-1]
-                except: d_ema50 = np.nan
-                if tf_code != "1d":
-                    if not np.isnan(d_ema50) and d_ema50 > price: candidates_res.append({'val': d_ema50, 'label': "EMA 50 (TF Day)"})
-                try: high_60d = df_stats_day['High'].tail(60).max()
-                except: high_60d = np.nan
-                if not np.isnan(high_60d) and high_60d > price: candidates_res.append({'val': high_60d, 'label': "🏔️ High 60d (ดอย 3 เดือน)"})
-
-            if not df_stats_week.empty:
-                try: w_ema50 = ta.ema(df_stats_week['Close'], length=50).iloc[-1]
-                except: w_ema50 = np.nan
-                try: w_ema200 = ta.ema(df_stats_week['Close'], length=200).iloc[-1]
-                except: w_ema200 = np.nan
-                if tf_code != "1wk":
-                    if not np.isnan(w_ema50) and w_ema50 > price: candidates_res.append({'val': w_ema50, 'label': "EMA 50 (TF Week - ต้านระยะยาว)"})
-                    if not np.isnan(w_ema200) and w_ema200 > price: candidates_res.append({'val': w_ema200, 'label': "🛡️ EMA 200 (TF Week - ต้านระดับกองทุน)"})
-                
-            if supply_zones:
-                for z in supply_zones: candidates_res.append({'val': z['top'], 'label': f"Supply Zone [{z['bottom']:.2f}-{z['top']:.2f}]"})
-
-            candidates_res.sort(key=lambda x: x['val'])
-
-            merged_res = []
-            skip_next = False
-            for i in range(len(candidates_res)):
-                if skip_next: skip_next = False; continue
-                current = candidates_res[i]
-                if i < len(candidates_res) - 1:
-                    next_item = candidates_res[i+1]
-                    if (next_item['val'] - current['val']) / current['val'] < 0.01:
-                        new_label = f"⭐ Confluence Zone ({current['label']} + {next_item['label']})"
-                        merged_res.append({'val': current['val'], 'label': new_label})
-                        skip_next = True
-                        continue
-                merged_res.append(current)
-
-            final_show_res = []
-            for item in merged_res:
-                if (item['val'] - price) / price > 0.30 and "EMA 200 (TF Week" not in item['label']: continue
-                is_vip = "EMA 200" in item['label'] or "EMA 50 (TF Week" in item['label'] or "Confluence" in item['label']
-                if not final_show_res: final_show_res.append(item)
-                else:
-                    last_item = final_show_res[-1]
-                    dist = abs(item['val'] - last_item['val'])
-                    if is_vip or dist >= min_dist:
-                        final_show_res.append(item)
+            candidates_res = resistance_candidates(levels, price, tf_code, tf_label)
+
+            final_show_res = select_levels(merge_levels(candidates_res, is_support=False), price, min_dist, is_support=False, limit=4)
 
             st.markdown("#### 🔴 แนวต้าน (Resistances)"); 
             if final_show_res: 
-                for item in final_show_res[:4]: st.write(f"- **{item['val']:.2f} :** {item['label']}")
+                for item in final_show_res: st.write(f"- **{item['val']:.2f} :** {item['label']} `{level_strength(item)}`")
             else: st.write("- N/A (Blue Sky)")
 
 
         with c_ai:
             st.subheader("🔬 Price Action X-Ray")
             
-            sq_col = "#f97316" if ai_report['is_squeeze'] else "#0369a1"
-            sq_txt = "⚠️ Squeeze (อัดอั้นรอระเบิด)" if ai_report['is_squeeze'] else "Normal (ปกติ)"
-            vol_q_col = ai_report['vol_quality_color']
-            vol_txt = ai_report['vol_quality_msg']
-            obv_col = "#22c55e" if "Bullish" in ai_report['obv_insight'] or "ซื้อ" in ai_report['obv_insight'] else ("#ef4444" if "Bearish" in ai_report['obv_insight'] or "ขาย" in ai_report['obv_insight'] else "#6b7280")
-            dz_status = "✅ อยู่ในโซน (In Zone)" if ai_report['in_demand_zone'] else "❌ นอกโซน (รอราคา)"
-            
-            st.markdown(f"""
-            <div class='xray-box'>
-                <div class='xray-title'>🕯️ God Mode Insight</div>
-                <div class='xray-item'><span>ทรงกราฟ (4 Bars):</span> <span style='font-weight:bold;'>{ai_report['candle_pattern']}</span></div>
-                <div class='xray-item'><span>สถานะ:</span> <span>{ai_report['candle_color']}</span></div>
-                <div class='xray-item'><span>รายละเอียด:</span> <span style='font-style:italic;'>{ai_report['candle_detail']}</span></div>
-                <hr style='margin: 8px 0; opacity: 0.3;'>
-                <div class='xray-item'><span>🔥 ความผันผวน (BB):</span> <span style='color:{sq_col}; font-weight:bold;'>{sq_txt}</span></div>
-                <div class='xray-item'><span>📊 คุณภาพ Volume:</span> <span style='color:{vol_q_col}; font-weight:bold;'>{vol_txt}</span></div>
-                <div class='xray-item'><span>🌊 รายใหญ่ (Smart OBV):</span> <span style='color:{obv_col}; font-weight:bold;'>{ai_report['obv_insight']}</span></div>
-                <div class='xray-item'><span>🎯 Demand Zone:</span> <span style='font-weight:bold;'>{dz_status}</span></div>
-            </div>
-            """, unsafe_allow_html=True)
-            
+            live_fragment(xray_panel)(symbol_input, ai_report, levels)
+
             # --- AI Strategy & Execution Plan (Fixed Variable Method) ---
             
             color_map = {
@@ -1266,18 +736,7 @@ if st.session_state['search_triggered']:
         
         with col_btn:
             if st.session_state['history_log']:
-                latest_data = st.session_state['history_log'][0]
-                save_key = f"save_{latest_data['หุ้น']}_{latest_data['เวลา']}"
-                
-                if st.button(f"💾 บันทึก {latest_data['หุ้น']} ลง Sheet", type="primary", use_container_width=True, key=save_key):
-                    with st.spinner("กำลังส่งข้อมูลไป Google Sheet..."):
-                        success = save_to_gsheet(latest_data)
-                        
-                    if success:
-                        st.toast(f"✅ บันทึก {latest_data['หุ้น']} เรียบร้อย!", icon="☁️")
-                        st.success(f"บันทึกข้อมูล {latest_data['หุ้น']} สำเร็จแล้ว")
-                    else:
-                        st.error("บันทึกไม่สำเร็จ โปรดตรวจสอบชื่อ Sheet หรือการแชร์สิทธิ์")
+                save_panel(st.session_state['history_log'][0])
         
         st.divider()
         c_head, c_reset = st.columns([3, 1]) 
@@ -1285,29 +744,82 @@ if st.session_state['search_triggered']:
         with c_head:
             st.subheader("📜 History Log (บันทึกการวิเคราะห์)")
         
-        with c_reset:
-            pass
+        history = get_history_store()
+        hist_symbols = ["ทั้งหมด"] + history.symbols()
+        f1, f2, f3, f4 = st.columns([2, 1, 1, 1])
+        with f1: hist_symbol = st.selectbox("หุ้น", hist_symbols, index=hist_symbols.index(symbol_input) if symbol_input in hist_symbols else 0, key="hist_symbol")
+        with f2: hist_tf = st.selectbox("TF", ["ทั้งหมด", "1h", "1d", "1wk"], key="hist_tf")
+        with f3: hist_status = st.selectbox("สถานะ", ["ทั้งหมด", "green", "yellow", "orange", "red"], key="hist_status")
+        with f4: hist_days = st.selectbox("ช่วงเวลา", list(HISTORY_WINDOWS), index=1, key="hist_window")
+        # ค่าเริ่มต้น 30 วัน: สรุปสัญญาณ/การเปลี่ยนสถานะเป็น Aggregate ทั้งช่วง ถ้าไม่จำกัดจะสแกนทั้งตารางทุก Rerun
+        hist_filters = {
+            "symbol": None if hist_symbol == "ทั้งหมด" else hist_symbol,
+            "timeframe": None if hist_tf == "ทั้งหมด" else hist_tf,
+            "status": None if hist_status == "ทั้งหมด" else hist_status,
+            "since": pd.Timestamp.now(tz="UTC") - pd.Timedelta(days=HISTORY_WINDOWS[hist_days]) if HISTORY_WINDOWS[hist_days] else None,
+        }
 
-        if st.session_state['history_log']: 
-            df_hist = pd.DataFrame(st.session_state['history_log'])
-            
-            cols_to_show = ["เวลา", "หุ้น", "TF", "ราคา", "Change%", "สถานะ", "Action", "SL", "TP"]
-            final_cols = [c for c in cols_to_show if c in df_hist.columns]
-            
-            st.dataframe(
-                df_hist[final_cols], 
-                use_container_width=True, 
-                hide_index=True,
-                column_config={
-                    "หุ้น": st.column_config.TextColumn("Symbol", help="ชื่อหุ้น"),
-                    "สถานะ": st.column_config.TextColumn("Status", help="สถานะจาก God Mode"),
-                    "Change%": st.column_config.TextColumn("% Chg"),
-                    "SL": st.column_config.TextColumn("Stop Loss", help="จุดหนี"),
-                    "TP": st.column_config.TextColumn("Take Profit", help="เป้าขาย")
-                }
-            )
+        with c_reset:
+            # สร้างไฟล์เมื่อกดเท่านั้น (export() เขียนทีละก้อนลงไฟล์ชั่วคราว) ไม่ใช่ทุก Rerun
+            export_id = (hist_symbol, hist_tf, hist_status, hist_days)
+            if st.button("📦 เตรียมไฟล์ CSV", use_container_width=True, key="hist_export_btn"):
+                old = st.session_state.pop('hist_export', None)
+                if old and os.path.exists(old['path']): os.remove(old['path'])
+                fd, path = tempfile.mkstemp(prefix="analysis_history_", suffix=".csv"); os.close(fd)
+                n_rows = history.export(path, encoding="utf-8-sig", **hist_filters)
+                st.session_state['hist_export'] = {"path": path, "rows": n_rows, "id": export_id}
+            export = st.session_state.get('hist_export')
+            if export and export['id'] == export_id and os.path.exists(export['path']):
+                with open(export['path'], "rb") as f:
+                    st.download_button(f"⬇️ Export CSV ({export['rows']:,})", f, file_name="analysis_history.csv", mime="text/csv", use_container_width=True)
+
+        tab_log, tab_stats, tab_changes = st.tabs(["📜 รายการ", "📊 สรุปสัญญาณ", "🔄 การเปลี่ยนสถานะ"])
+        with tab_log:
+            page_size = 20
+            total = history.count(**hist_filters)
+            n_pages = max(1, -(-total // page_size))
+            page_no = st.number_input(f"หน้า (ทั้งหมด {n_pages} หน้า / {total} รายการ)", min_value=1, max_value=n_pages, value=1, key="hist_page")
+            df_hist = history.page(page_no - 1, page_size, **hist_filters)
+            if not df_hist.empty:
+                df_hist["เวลา"] = pd.to_datetime(df_hist["ts"], utc=True).dt.tz_convert(None).dt.strftime("%Y-%m-%d %H:%M")
+                df_hist["สถานะ"] = df_hist["status_label"].fillna(df_hist["status_color"])
+                df_hist["Action"] = df_hist["action_label"].fillna(df_hist["strategy"])
+                df_hist = df_hist.rename(columns={"symbol": "หุ้น", "timeframe": "TF", "price": "ราคา", "change_pct": "Change%", "sl": "SL", "tp": "TP"})
+
+                cols_to_show = ["เวลา", "หุ้น", "TF", "ราคา", "Change%", "สถานะ", "Action", "SL", "TP"]
+
+                st.dataframe(
+                    df_hist[cols_to_show], 
+                    use_container_width=True, 
+                    hide_index=True,
+                    column_config={
+                        "หุ้น": st.column_config.TextColumn("Symbol", help="ชื่อหุ้น"),
+                        "สถานะ": st.column_config.TextColumn("Status", help="สถานะจาก God Mode"),
+                        "ราคา": st.column_config.NumberColumn("ราคา", format="%.2f"),
+                        "Change%": st.column_config.NumberColumn("% Chg", format="%+.2f%%"),
+                        "SL": st.column_config.NumberColumn("Stop Loss", help="จุดหนี", format="%.2f"),
+                        "TP": st.column_config.NumberColumn("Take Profit", help="เป้าขาย", format="%.2f")
+                    }
+                )
+            else: st.info("ยังไม่มีประวัติการวิเคราะห์")
+        with tab_stats:
+            st.dataframe(history.signal_counts(**hist_filters), use_container_width=True, hide_index=True)
+        with tab_changes:
+            df_chg = history.status_changes(**hist_filters)
+            st.dataframe(df_chg.iloc[::-1].head(200), use_container_width=True, hide_index=True)
 
     else: 
         st.error("ไม่พบข้อมูลหุ้น หรือข้อมูลไม่เพียงพอสำหรับคำนวณ (ต้องมีมากกว่า 20 แท่ง)")
 
 
+
+# --- 🛠️ Debug Panel: Startup Profile (เปิดด้วย ?debug=1) ---
+if st.query_params.get("debug") == "1":
+    with st.expander("🛠️ Startup Profile (Import Time / Memory)", expanded=False):
+        st.code(startup.format_report(top_level_only=not st.checkbox("แสดงโมดูลย่อยทั้งหมด")), language="text")
+    with st.expander("🗄️ Shared Cache", expanded=False):
+        st.json(get_shared_cache().stats())
+    if st.session_state.get('search_triggered') and 'df_stats_week' in globals():
+        with st.expander("🧮 Session Memory (MB)", expanded=False):
+            st.json(session_memory(df=df, df_mtf=df_mtf, df_stats_day=df_stats_day, df_stats_week=df_stats_week))
+            st.caption(f"RSS ทั้ง Process: {startup.rss_mb():.1f} MB")
@@ -0,0 +1,213 @@
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import numpy as np
+import pandas as pd
+from numpy.lib.stride_tricks import sliding_window_view
+
+from analysis import ai_hybrid_analysis_batch, compute_indicators, mtf_alignment
+from market_data import MTF_BY_TF, RAW_PERIOD, derive_frame, period_offset, plan_fetch
+from scanner import BATCH_SIZE, bulk_download
+
+# --- Backtest: ย้อนดูว่าสัญญาณ God Mode + SL/TP ในอดีตไปชนอะไรก่อน ---
+
+# ถือได้นานสุดกี่แท่ง (ยังไม่ชน SL/TP = ปิดที่ราคาปิดของแท่งสุดท้าย)
+MAX_HOLD = 60
+# ข้ามช่วงต้นที่ EMA200 ยังไม่มีค่า (คะแนนโครงสร้างยังไม่ครบ)
+WARMUP_BARS = 200
+# คำนวณ Forward Scan ทีละก้อน กันหน่วยความจำบวม (N x MAX_HOLD)
+CHUNK_SIZE = 20_000
+
+STRATEGY_ORDER = ["Aggressive Buy", "Buy on Dip", "Accumulate", "Wait & Watch",
+                  "Reduce Port", "Avoid / Cut Loss", "Exit Immediately"]
+
+# สัญญาณฝั่งขาย: ไม่ใช่จุดเข้าซื้อ -> ไม่จำลองเป็น Long แต่วัดว่าราคาหลังจากนั้น max_hold แท่งลงจริงไหม (กำไร = ส่วนที่หนีทัน)
+EXIT_STRATEGIES = ("Reduce Port", "Avoid / Cut Loss", "Exit Immediately")
+
+OUTCOME_TP, OUTCOME_SL, OUTCOME_TIMEOUT = "TP", "SL", "Timeout"
+OUTCOME_EXIT = "Exit"   # สัญญาณขาย: ครบ max_hold แท่ง
+OUTCOME_OPEN = "Open"   # ข้อมูลหมดก่อนครบ max_hold และยังไม่ชน SL/TP -> ยังไม่รู้ผล ไม่นับในสถิติ
+
+
+def resolve_trades(open_, high, low, close, entry_idx, sl, tp, max_hold=MAX_HOLD):
+    """
+    หาว่าแต่ละสัญญาณ (เข้าที่ราคาปิดของแท่ง entry_idx) ชน SL หรือ TP ก่อนกันในแท่งถัดๆ ไป
+    - ดูแท่งล่วงหน้าเป็น Window (N x max_hold) แล้วใช้ argmax หาแท่งแรกที่ชน -> ไม่มีลูปต่อแท่ง
+    - แท่งเดียวชนทั้งคู่ ถือว่าโดน SL ก่อน (มองแง่ร้าย)
+    - เปิด Gap ทะลุ SL/TP ใช้ราคาเปิดแทน
+    - ข้อมูลหมดก่อนครบ max_hold แท่งโดยยังไม่ชน = OUTCOME_OPEN (ปิดที่แท่งสุดท้ายชั่วคราว)
+    คืนค่า (exit_idx, exit_price, outcome) ต่อสัญญาณ
+    """
+    n = len(close)
+    entry_idx = np.asarray(entry_idx, dtype=np.int64)
+    sl = np.asarray(sl, dtype="float64"); tp = np.asarray(tp, dtype="float64")
+    m = len(entry_idx)
+    exit_idx = np.minimum(entry_idx + max_hold, n - 1)
+    exit_price = close[exit_idx].astype("float64")
+    outcome = np.where(entry_idx + max_hold > n - 1, OUTCOME_OPEN, OUTCOME_TIMEOUT).astype(object)
+    if m == 0 or n < 2: return exit_idx, exit_price, outcome
+
+    # เติมท้ายด้วย NaN ให้ทุกสัญญาณมี Window ยาวเท่ากัน (NaN เทียบแล้วเป็น False = ไม่ชน)
+    pad = np.full(max_hold, np.nan)
+    win_o = sliding_window_view(np.concatenate([open_[1:], pad]), max_hold)
+    win_h = sliding_window_view(np.concatenate([high[1:], pad]), max_hold)
+    win_l = sliding_window_view(np.concatenate([low[1:], pad]), max_hold)
+
+    with np.errstate(invalid="ignore"):
+        for s in range(0, m, CHUNK_SIZE):
+            part = slice(s, s + CHUNK_SIZE)
+            rows = entry_idx[part]
+            sl_c = sl[part, None]; tp_c = tp[part, None]
+            hit_sl = win_l[rows] <= sl_c
+            hit_tp = win_h[rows] >= tp_c
+            hit = hit_sl | hit_tp
+            any_hit = hit.any(axis=1)
+            first = hit.argmax(axis=1)
+            k = np.flatnonzero(any_hit); off = first[k]
+            is_sl = hit_sl[k, off]
+            bar_open = win_o[rows[k], off]
+            sl_k = sl[part][k]; tp_k = tp[part][k]
+            price = np.where(is_sl, np.where(bar_open < sl_k, bar_open, sl_k),
+                             np.where(bar_open > tp_k, bar_open, tp_k))
+            idx = s + k
+            exit_idx[idx] = rows[k] + 1 + off
+            exit_price[idx] = price
+            outcome[idx] = np.where(is_sl, OUTCOME_SL, OUTCOME_TP)
+    return exit_idx, exit_price, outcome
+
+
+def signal_trades(df, signals, start=None, max_hold=MAX_HOLD, warmup=WARMUP_BARS, only_changes=False):
+    """
+    แปลงตารางสัญญาณรายแท่ง (ผลของ ai_hybrid_analysis_batch) เป็นตารางเทรด 1 แถวต่อสัญญาณ
+    start: เริ่มนับสัญญาณตั้งแต่ Timestamp นี้ (Indicator ยังคำนวณจากข้อมูลก่อนหน้าได้ครบ)
+    only_changes: นับเฉพาะแท่งที่ Strategy เปลี่ยนจากแท่งก่อน (ลดสัญญาณซ้ำซ้อนในเทรนด์เดียวกัน)
+    สัญญาณซื้อ/ถือ (side = 'long') จำลองเข้าที่ราคาปิด + SL/TP / สัญญาณขาย (EXIT_STRATEGIES, side = 'exit')
+    วัดราคาหลัง max_hold แท่ง: return_pct = % ที่ราคาลง (บวก = ขายถูก) / เทรดที่ยังไม่รู้ผลมี outcome = OUTCOME_OPEN
+    """
+    n = len(df)
+    mask = np.zeros(n, dtype=bool); mask[min(warmup, n):n - 1] = True
+    if start is not None: mask &= df.index >= start
+    strategy = signals['strategy'].to_numpy()
+    if only_changes: mask[1:] &= strategy[1:] != strategy[:-1]
+    sl = signals['sl'].to_numpy(dtype="float64"); tp = signals['tp'].to_numpy(dtype="float64")
+    close = df['Close'].to_numpy(dtype="float64")
+    is_exit = np.isin(strategy, EXIT_STRATEGIES)
+    long_idx = np.flatnonzero(mask & ~is_exit & ~np.isnan(sl) & ~np.isnan(tp) & (sl < close) & (tp > close))
+    exit_sig = np.flatnonzero(mask & is_exit)
+
+    exit_idx, exit_price, outcome = resolve_trades(
+        df['Open'].to_numpy(dtype="float64"), df['High'].to_numpy(dtype="float64"),
+        df['Low'].to_numpy(dtype="float64"), close, long_idx, sl[long_idx], tp[long_idx], max_hold=max_hold)
+    sig_exit_idx = np.minimum(exit_sig + max_hold, n - 1)
+    sig_outcome = np.where(exit_sig + max_hold > n - 1, OUTCOME_OPEN, OUTCOME_EXIT).astype(object)
+
+    entry_idx = np.concatenate([long_idx, exit_sig])
+    exit_idx = np.concatenate([exit_idx, sig_exit_idx])
+    exit_price = np.concatenate([exit_price, close[sig_exit_idx]])
+    entry_price = close[entry_idx]
+    side = np.repeat(np.array(["long", "exit"], dtype=object), [len(long_idx), len(exit_sig)])
+    move = (exit_price / entry_price - 1) * 100
+    trades = pd.DataFrame({
+        'entry_time': df.index[entry_idx], 'exit_time': df.index[exit_idx],
+        'strategy': strategy[entry_idx], 'side': side, 'score': signals['score'].to_numpy()[entry_idx],
+        'entry': entry_price, 'sl': np.where(side == "long", sl[entry_idx], np.nan), 'tp': np.where(side == "long", tp[entry_idx], np.nan),
+        'exit': exit_price, 'outcome': np.concatenate([outcome, sig_outcome]),
+        'return_pct': np.where(side == "long", move, -move),
+        'bars_held': exit_idx - entry_idx,
+    })
+    if 'mtf_trend' in signals.columns: trades['mtf_trend'] = signals['mtf_trend'].to_numpy()[entry_idx]
+    order = np.argsort(entry_idx, kind="stable")
+    return trades.iloc[order].reset_index(drop=True)
+
+
+def backtest_frame(df, period=None, max_hold=MAX_HOLD, only_changes=False, df_mtf=None, mtf_interval=None):
+    """
+    Indicator -> สัญญาณทุกแท่ง -> เทรด ของ DataFrame เดียว (period = ช่วงท้ายที่นับสัญญาณ เช่น '5y')
+    df_mtf: ถ้าส่งมา แต่ละเทรดได้ mtf_trend ของ TF ใหญ่ที่ปิดแล้ว ณ แท่งที่เข้า (mtf_alignment)
+    """
+    if df is None or len(df) <= 20: return pd.DataFrame()
+    df, _, _, _ = compute_indicators(df.copy())
+    mtf_trend = mtf_alignment(df, df_mtf, mtf_interval)['mtf_trend'] if df_mtf is not None else None
+    signals = ai_hybrid_analysis_batch(df, mtf_trend=mtf_trend)
+    start = df.index[-1] - period_offset(period) if period else None
+    return signal_trades(df, signals, start=start, max_hold=max_hold, only_changes=only_changes)
+
+
+def backtest_symbol(symbol, raw_frames, interval, period="5y", max_hold=MAX_HOLD, only_changes=False, mtf_interval=None):
+    """
+    งานของ Worker: Backtest หุ้น 1 ตัว คืนค่า (ตารางเทรด, error) เหมือน scan_symbol
+    ตารางมีคอลัมน์ symbol และ mtf_trend ถ้าส่ง mtf_interval / error = "" ถ้าสำเร็จ (ไม่มีเทรด != พัง)
+    """
+    try:
+        df_mtf = derive_frame(raw_frames, mtf_interval) if mtf_interval else None
+        trades = backtest_frame(derive_frame(raw_frames, interval), period, max_hold, only_changes, df_mtf, mtf_interval)
+    except Exception as e:
+        return pd.DataFrame(), str(e) or type(e).__name__
+    if not trades.empty: trades.insert(0, 'symbol', symbol)
+    return trades, ""
+
+
+def backtest_universe(symbols, interval="1d", period="5y", max_workers=None, batch_size=BATCH_SIZE,
+                      max_hold=MAX_HOLD, only_changes=False):
+    """
+    Backtest ทั้งรายชื่อหุ้น: ดาวน์โหลดแบบ Batch แล้วกระจายงานให้ Process Pool (เหมือน scan_watchlist)
+    yield (symbol, trades, error) ทีละตัวทันทีที่เสร็จ (ทุกเทรดมี mtf_trend ณ แท่งที่เข้า / error = "" ถ้าสำเร็จ)
+    """
+    mtf_interval = MTF_BY_TF.get(interval, "1wk")
+    raws = plan_fetch(interval, mtf_interval)
+    ctx = multiprocessing.get_context("spawn")
+    with ProcessPoolExecutor(max_workers=max_workers, mp_context=ctx) as pool:
+        pending = {}
+        for i in range(0, len(symbols), batch_size):
+            batch = symbols[i:i + batch_size]
+            frames_by_raw = {raw: bulk_download(batch, raw, RAW_PERIOD[raw]) for raw in raws}
+            for sym in batch:
+                raw_frames = {raw: frames_by_raw[raw].get(sym) for raw in raws}
+                if any(f is None for f in raw_frames.values()):
+                    yield sym, pd.DataFrame(), "ดาวน์โหลดข้อมูลไม่สำเร็จ"
+                    continue
+                fut = pool.submit(backtest_symbol, sym, raw_frames, interval, period, max_hold, only_changes, mtf_interval)
+                pending[fut] = sym
+            for fut in [f for f in pending if f.done()]:
+                yield (pending.pop(fut), *fut.result())
+        for fut in as_completed(list(pending)):
+            yield (pending.pop(fut), *fut.result())
+
+
+def max_drawdown(returns_pct):
+    """
+    Drawdown สูงสุดของผลตอบแทนสะสม (ลงเงินเท่ากันทุกเทรด เรียงตามเวลาเข้า) หน่วยเป็น %
+    ไม่ทบต้น เพราะสัญญาณในกลุ่มเดียวกันมักถือซ้อนกันหลายเทรด
+    """
+    if len(returns_pct) == 0: return 0.0
+    equity = np.concatenate([[0.0], np.cumsum(np.asarray(returns_pct, dtype="float64"))])
+    return float((equity - np.maximum.accumulate(equity)).min())
+
+
+def summarize_trades(trades):
+    """
+    สรุปผลแยกตาม Strategy: จำนวนเทรด, Hit Rate (ชน TP), Win Rate, Expectancy, เวลาถือ, Max Drawdown
+    นับเฉพาะเทรดที่รู้ผลแล้ว (Open แสดงแค่จำนวน) / สัญญาณขาย: Win % = ราคาลงจริง, ไม่มี TP/SL
+    """
+    cols = ["Strategy", "Side", "Trades", "Open", "TP Hit %", "SL Hit %", "Timeout %", "Win %",
+            "Expectancy %", "Avg Win %", "Avg Loss %", "Avg Bars Held", "Max Drawdown %"]
+    if trades is None or trades.empty: return pd.DataFrame(columns=cols)
+    rows = []
+    for strategy, g_all in trades.sort_values('entry_time').groupby('strategy', sort=False):
+        g = g_all[g_all['outcome'] != OUTCOME_OPEN]
+        is_long = g_all['side'].iloc[0] == "long" if 'side' in g_all.columns else True
+        r = g['return_pct']
+        wins = r[r > 0]; losses = r[r <= 0]
+        share = lambda outcome: (g['outcome'] == outcome).mean() * 100 if is_long and len(g) else np.nan
+        rows.append({
+            "Strategy": strategy, "Side": "long" if is_long else "exit", "Trades": len(g), "Open": len(g_all) - len(g),
+            "TP Hit %": share(OUTCOME_TP), "SL Hit %": share(OUTCOME_SL), "Timeout %": share(OUTCOME_TIMEOUT),
+            "Win %": (r > 0).mean() * 100 if len(g) else np.nan, "Expectancy %": r.mean(),
+            "Avg Win %": wins.mean() if len(wins) else 0.0,
+            "Avg Loss %": losses.mean() if len(losses) else 0.0,
+            "Avg Bars Held": g['bars_held'].mean(),
+            "Max Drawdown %": max_drawdown(r.to_numpy()),
+        })
+    out = pd.DataFrame(rows, columns=cols)
+    rank = {s: i for i, s in enumerate(STRATEGY_ORDER)}
+    return out.sort_values("Strategy", key=lambda s: s.map(rank).fillna(len(rank))).reset_index(drop=True)
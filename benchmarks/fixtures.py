@@ -0,0 +1,177 @@
+import argparse
+import os
+import sys
+
+import numpy as np
+import pandas as pd
+
+# --- Benchmark Fixtures: OHLCV สังเคราะห์ (Deterministic) + ข้อมูลจริงที่บันทึกไว้ ---
+
+FIXTURE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fixtures")
+
+SHAPES = ("1h", "1d", "1wk")
+SIZES = (1_000, 10_000, 100_000)
+
+# จำนวนแท่งสูงสุดที่เก็บใน Fixture ที่ Commit (ไฟล์เล็ก; extend_recorded ขยายเป็นขนาดที่วัดเอง)
+RECORD_BARS = 1_500
+
+# ความผันผวนต่อแท่ง + Volume เฉลี่ยของแต่ละ TF (ให้หน้าตาใกล้หุ้นจริง)
+# revert = แรงดึง Log ราคากลับเข้าหาค่าเฉลี่ย (AR(1)) กันราคาระเบิด/ดิ่งศูนย์เมื่อยาว 100k แท่ง
+SHAPE_PARAMS = {
+    "1h": {"vol": 0.006, "volume": 2e6, "revert": 1 / 2000},
+    "1d": {"vol": 0.02, "volume": 2e7, "revert": 1 / 1000},
+    "1wk": {"vol": 0.045, "volume": 1e8, "revert": 1 / 300},
+}
+
+
+def bar_index(shape, n, end="2025-01-03"):
+    """Timestamp ย้อนจาก end ให้ได้ n แท่ง (1h = ชั่วโมงตลาด US, 1d = วันทำการ, 1wk = วันจันทร์)"""
+    end = pd.Timestamp(end)
+    if shape == "1h":
+        # 7 แท่งต่อวัน (09:30-15:30) เหมือน 1h ของ Yahoo
+        days = pd.bdate_range(end=end.normalize(), periods=n // 7 + 1)
+        hours = pd.to_timedelta([9.5, 10.5, 11.5, 12.5, 13.5, 14.5, 15.5], unit="h")
+        return (days.repeat(7) + np.tile(hours, len(days)))[-n:].tz_localize("America/New_York")
+    if shape == "1wk":
+        return pd.date_range(end=end, periods=n, freq="W-MON")
+    return pd.bdate_range(end=end, periods=n)
+
+
+def synthetic_ohlcv(shape="1d", n=1_000, seed=None):
+    """
+    OHLCV สังเคราะห์แบบ Deterministic (seed เดียวกัน = ข้อมูลเดียวกันทุกเครื่อง)
+    ราคาเดินแบบ Random Walk ที่ค่อยๆ ดึงกลับ + ช่วงผันผวนสลับ (Regime) ให้มีทั้งเทรนด์ Swing และ Squeeze
+    ให้ทุกขั้นตอนได้ทำงานจริง
+    """
+    p = SHAPE_PARAMS[shape]
+    rng = np.random.default_rng(_seed(shape, n) if seed is None else seed)
+    regime = np.repeat(rng.choice([0.5, 1.0, 2.0], size=n // 50 + 1), 50)[:n]
+    ret = rng.normal(0, p["vol"], n) * regime; ret[0] = 0.0
+    # AR(1) ด้วย ewm(adjust=False): x[t] = (1-k) * x[t-1] + ret[t]
+    k = p["revert"]
+    log_px = pd.Series(ret / k).ewm(alpha=k, adjust=False).mean().to_numpy()
+    close = 100 * np.exp(log_px)
+    open_ = np.concatenate([[close[0]], close[:-1]]) * (1 + rng.normal(0, p["vol"] * 0.2, n))
+    span = np.abs(rng.normal(0, p["vol"] * 0.6, (2, n))) * regime
+    high = np.maximum(open_, close) * (1 + span[0])
+    low = np.minimum(open_, close) * (1 - span[1])
+    volume = np.round(p["volume"] * rng.lognormal(0, 0.4, n) * (1 + np.abs(ret) / p["vol"] * 0.3))
+    return pd.DataFrame({"Open": open_, "High": high, "Low": low, "Close": close, "Volume": volume,
+                         "Dividends": 0.0, "Stock Splits": 0.0}, index=bar_index(shape, n))
+
+
+def _seed(shape, n):
+    return SHAPES.index(shape) * 1_000_003 + n
+
+
+def fixture_path(shape, name):
+    return os.path.join(FIXTURE_DIR, shape, f"{name}.parquet")
+
+
+def recorded_fixtures(shape):
+    """รายชื่อ Fixture ที่บันทึกไว้ของ TF นี้ (ไฟล์ .parquet / .csv ใน fixtures/<shape>/)"""
+    folder = os.path.join(FIXTURE_DIR, shape)
+    if not os.path.isdir(folder): return []
+    return sorted(os.path.splitext(f)[0] for f in os.listdir(folder) if f.endswith((".parquet", ".csv")))
+
+
+def load_recorded(shape, name):
+    base = os.path.join(FIXTURE_DIR, shape, name)
+    if os.path.exists(base + ".parquet"): return pd.read_parquet(base + ".parquet")
+    return pd.read_csv(base + ".csv", index_col=0, parse_dates=True)
+
+
+def extend_recorded(df, n, seed=0):
+    """
+    ปรับ Fixture จริงให้ยาว n แท่ง: ยาวพอ = ตัดท้าย n แท่ง, สั้นไป = Block Bootstrap ผลตอบแทนจริง (รักษาลักษณะ Volatility)
+    ราคา OHLC ของแต่ละแท่งใช้สัดส่วนเทียบ Close ของแท่งจริงที่สุ่มมา
+    """
+    df = df.dropna(subset=["Close"])
+    if len(df) >= n: return df.tail(n).copy()
+    rng = np.random.default_rng(seed)
+    close = df["Close"].to_numpy(dtype="float64")
+    ratios = df[["Open", "High", "Low"]].to_numpy(dtype="float64") / close[:, None]
+    log_ret = np.diff(np.log(close))
+    block = 20
+    starts = rng.integers(0, max(len(log_ret) - block, 1), size=n // block + 1)
+    pick = (starts[:, None] + np.arange(block)[None, :]).ravel()[:n] % len(log_ret)
+    new_close = close[0] * np.exp(np.cumsum(log_ret[pick]))
+    src = pick + 1
+    out = pd.DataFrame(ratios[src] * new_close[:, None], columns=["Open", "High", "Low"])
+    out["Close"] = new_close
+    out["Volume"] = df["Volume"].to_numpy()[src]
+    shape = infer_shape(df)
+    out.index = bar_index(shape, n, end=df.index[-1].tz_localize(None) if df.index.tz is not None else df.index[-1])
+    return out
+
+
+def infer_shape(df):
+    step = pd.Series(df.index).diff().median()
+    if step <= pd.Timedelta(hours=2): return "1h"
+    if step <= pd.Timedelta(days=4): return "1d"
+    return "1wk"
+
+
+def record_fixture(symbol, shape, period=None, bars=RECORD_BARS):
+    """
+    บันทึกข้อมูลจริงจาก Yahoo เป็น Fixture (ต้องต่อเน็ตครั้งเดียว หลังจากนั้น Benchmark ทำงาน Offline ได้)
+    bars: เก็บแค่ท้ายสุดเท่านี้แท่ง (None = เก็บทั้งหมด)
+    """
+    import yfinance as yf
+    period = period or {"1h": "730d", "1d": "max", "1wk": "max"}[shape]
+    df = yf.Ticker(symbol).history(period=period, interval=shape)
+    if df.empty: raise ValueError(f"ไม่มีข้อมูล {symbol} ({shape})")
+    return _write_fixture(df.tail(bars) if bars else df, shape, symbol.upper())
+
+
+def sample_fixture(shape, n=RECORD_BARS):
+    """
+    Fixture สำรองแบบ Offline (ชื่อ SAMPLE) หน้าตาเหมือนไฟล์ที่ record_fixture ได้จาก Yahoo:
+    Index มี Timezone, มีปันผลรายไตรมาส (1d) และแตกพาร์ 1 ครั้ง ให้ load_recorded/extend_recorded ได้ทำงานจริง
+    ราคาเป็นข้อมูลสังเคราะห์ ไม่ใช่ราคาตลาด -> มีเน็ตเมื่อไรให้ record_fixture ของจริงเพิ่ม
+    """
+    df = synthetic_ohlcv(shape, n, seed=_seed(shape, n) + 17)
+    if df.index.tz is None: df.index = df.index.tz_localize("America/New_York")
+    if shape == "1d":
+        quarter_ends = df.groupby(df.index.tz_localize(None).to_period("Q")).tail(1).index
+        df.loc[quarter_ends, "Dividends"] = (df.loc[quarter_ends, "Close"] * 0.004).round(2)
+    df.iloc[len(df) // 2, df.columns.get_loc("Stock Splits")] = 2.0
+    return _write_fixture(df, shape, "SAMPLE")
+
+
+def _write_fixture(df, shape, name):
+    path = fixture_path(shape, name)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    df.to_parquet(path)
+    return path
+
+
+def benchmark_cases(shapes=SHAPES, sizes=SIZES, include_recorded=True):
+    """yield (shape, source, n, df) ทุกกรณีที่ต้องวัด: synthetic ทุกขนาด + ทุก Fixture จริงที่มีในเครื่อง"""
+    for shape in shapes:
+        for n in sizes:
+            yield shape, "synthetic", n, synthetic_ohlcv(shape, n)
+            if not include_recorded: continue
+            for name in recorded_fixtures(shape):
+                yield shape, name, n, extend_recorded(load_recorded(shape, name), n, seed=_seed(shape, n))
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="จัดการ Fixture ของ Benchmark")
+    sub = parser.add_subparsers(dest="cmd", required=True)
+    rec = sub.add_parser("record", help="บันทึกข้อมูลจริงจาก Yahoo (ต้องต่อเน็ต)")
+    rec.add_argument("symbols", nargs="+")
+    rec.add_argument("--shapes", default=",".join(SHAPES))
+    rec.add_argument("--bars", type=int, default=RECORD_BARS, help="เก็บท้ายสุดกี่แท่ง (0 = ทั้งหมด)")
+    smp = sub.add_parser("sample", help="สร้าง Fixture SAMPLE แบบ Offline ทุก TF")
+    smp.add_argument("--shapes", default=",".join(SHAPES))
+    args = parser.parse_args(argv)
+
+    for shape in args.shapes.split(","):
+        if args.cmd == "sample": print(sample_fixture(shape)); continue
+        for symbol in args.symbols: print(record_fixture(symbol, shape, bars=args.bars or None))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,184 @@
+import argparse
+import gc
+import json
+import os
+import platform
+import sys
+import time
+import tracemalloc
+
+import numpy as np
+import pandas as pd
+
+from analysis import (
+    ai_hybrid_analysis_batch, analyze_candlestick, analyze_frame, classify_candles, compute_indicators,
+    find_demand_zones, find_supply_zones, merge_levels, select_levels,
+)
+from backtest import signal_trades
+from benchmarks.fixtures import SHAPES, SIZES, benchmark_cases
+
+# --- Benchmark Runner: จับเวลา + หน่วยความจำของทุกขั้นตอนวิเคราะห์ (ไม่ต้องต่อเน็ต) ---
+# python -m benchmarks.run --sizes 1000,10000 --out bench.json --baseline benchmarks/baseline.json
+# วิธีที่ CI สร้าง/เก็บ Baseline และ Fixture: ดู benchmarks/README.md
+
+BASELINE_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "baseline.json")
+
+# ช้าลงเกินกี่เท่าถึงนับเป็น Regression (0.25 = ช้าลง 25%)
+DEFAULT_THRESHOLD = 0.25
+# ต่างกันไม่ถึงเท่านี้ (วินาที) ไม่นับ (กันสัญญาณหลอกจากงานที่เร็วระดับไมโครวินาที)
+MIN_ABS_DELTA = 0.002
+
+
+def _prepare(df):
+    """ข้อมูลตั้งต้นของแต่ละ Stage (คำนวณครั้งเดียว ไม่รวมในเวลาที่วัด)"""
+    ind, _, _, _ = compute_indicators(df.copy())
+    zones = find_demand_zones(ind)
+    price = float(ind['Close'].iloc[-1])
+    candidates = [{'val': z['bottom'], 'label': f"Demand Zone [{z['bottom']:.2f}-{z['top']:.2f}]"} for z in zones]
+    for col in ('EMA20', 'EMA50', 'EMA200'):
+        val = ind[col].iloc[-1]
+        if not np.isnan(val): candidates.append({'val': val, 'label': f"{col} (TF)"})
+    return {"df": df, "ind": ind, "price": price, "candidates": candidates,
+            "signals": ai_hybrid_analysis_batch(ind), "min_dist": float(ind['ATR'].iloc[-1]) * 1.5}
+
+
+# ชื่อ Stage -> ฟังก์ชันที่รับ ctx จาก _prepare
+STAGES = {
+    "indicators": lambda c: compute_indicators(c["df"].copy()),
+    "candles_batch": lambda c: classify_candles(c["df"]),
+    "candle_last": lambda c: analyze_candlestick(c["df"].iloc[-4:]),
+    "zones": lambda c: (find_demand_zones(c["ind"]), find_supply_zones(c["ind"])),
+    "ai_last_bar": lambda c: analyze_frame(c["df"].copy()),
+    "ai_batch": lambda c: ai_hybrid_analysis_batch(c["ind"]),
+    "key_levels": lambda c: select_levels(merge_levels(c["candidates"], is_support=True), c["price"], c["min_dist"], is_support=True),
+    "backtest": lambda c: signal_trades(c["ind"], c["signals"]),
+}
+
+
+def time_stage(fn, ctx, repeat=3, min_time=0.2):
+    """เวลาที่ดีที่สุดจาก repeat รอบ (งานเร็วจะวนซ้ำในแต่ละรอบจนรวมได้อย่างน้อย min_time)"""
+    t0 = time.perf_counter(); fn(ctx); first = time.perf_counter() - t0
+    loops = max(1, int(min_time / max(first, 1e-9)))
+    best = first
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        for _ in range(loops): fn(ctx)
+        best = min(best, (time.perf_counter() - t0) / loops)
+    return best
+
+
+def peak_memory(fn, ctx):
+    """หน่วยความจำสูงสุดที่ Stage จองเพิ่ม (MB) วัดด้วย tracemalloc แยกจากรอบจับเวลา"""
+    gc.collect()
+    tracemalloc.start()
+    try:
+        fn(ctx)
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return peak / 2**20
+
+
+def run_benchmarks(shapes=SHAPES, sizes=SIZES, stages=None, repeat=3, include_recorded=True, log=print):
+    results = {}
+    stages = stages or list(STAGES)
+    for shape, source, n, df in benchmark_cases(shapes, sizes, include_recorded):
+        ctx = _prepare(df)
+        for name in stages:
+            key = f"{shape}/{source}/{n}/{name}"
+            fn = STAGES[name]
+            results[key] = {"time_s": time_stage(fn, ctx, repeat=repeat), "peak_mb": peak_memory(fn, ctx)}
+            if log: log(f"{key:<40} {results[key]['time_s'] * 1000:>10.2f} ms {results[key]['peak_mb']:>9.2f} MB")
+    return {"meta": environment(), "results": results}
+
+
+def merge_reports(reports, pick=min):
+    """
+    รวมผลหลายรอบเป็นรายงานเดียว ทีละ Stage: pick=min ใช้เช็ค (รอบที่เร็วสุด ตัดสัญญาณรบกวน)
+    pick=max ใช้สร้าง Baseline (ช้าสุดที่ยังเป็นปกติของเครื่องนั้น = เพดานของสัญญาณรบกวน)
+    """
+    results = {}
+    for key in reports[0]["results"]:
+        rows = [r["results"][key] for r in reports if key in r["results"]]
+        results[key] = {"time_s": pick(r["time_s"] for r in rows), "peak_mb": max(r["peak_mb"] for r in rows)}
+    return {"meta": dict(reports[0]["meta"], runs=len(reports)), "results": results}
+
+
+def environment():
+    try:
+        import numba
+        numba_version = numba.__version__
+    except ImportError:
+        numba_version = None
+    return {
+        "timestamp": pd.Timestamp.now().isoformat(timespec="seconds"), "python": platform.python_version(),
+        "platform": platform.platform(), "machine": platform.machine(), "cpu_count": os.cpu_count(),
+        "numpy": np.__version__, "pandas": pd.__version__, "numba": numba_version,
+    }
+
+
+def compare(current, baseline, threshold=DEFAULT_THRESHOLD, min_abs=MIN_ABS_DELTA):
+    """เทียบกับ Baseline: คืนรายการ (key, เวลาเดิม, เวลาใหม่, อัตราส่วน) ที่ช้าลงเกิน threshold"""
+    regressions = []
+    base = baseline.get("results", {})
+    for key, cur in current.get("results", {}).items():
+        if key not in base: continue
+        old_t = base[key]["time_s"]; new_t = cur["time_s"]
+        if new_t > old_t * (1 + threshold) and new_t - old_t > min_abs:
+            regressions.append((key, old_t, new_t, new_t / old_t))
+    return regressions
+
+
+# ค่าใน meta ที่ต้องตรงกัน ผลเวลาถึงเทียบกันได้
+COMPARABLE_META = ("machine", "cpu_count", "python", "numpy", "pandas", "numba")
+
+
+def meta_mismatch(current, baseline):
+    """รายการ (ชื่อ, ของ Baseline, ของรอบนี้) ที่ต่างกัน -> Baseline มาจากเครื่อง/ชุด Library อื่น"""
+    cur = current.get("meta", {}); base = baseline.get("meta", {})
+    return [(k, base.get(k), cur.get(k)) for k in COMPARABLE_META if base.get(k) != cur.get(k)]
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark ทุกขั้นตอนวิเคราะห์แบบ Offline")
+    parser.add_argument("--shapes", default=",".join(SHAPES))
+    parser.add_argument("--sizes", default=",".join(str(s) for s in SIZES))
+    parser.add_argument("--stages", default=",".join(STAGES))
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--runs", type=int, default=1, help="วัดทั้งชุดกี่รอบ (Baseline เก็บช้าสุด / เช็คใช้เร็วสุด ของแต่ละ Stage)")
+    parser.add_argument("--no-recorded", action="store_true", help="ไม่ใช้ Fixture จริงใน benchmarks/fixtures/")
+    parser.add_argument("--out", help="บันทึกผลเป็น JSON")
+    parser.add_argument("--baseline", default=BASELINE_PATH)
+    parser.add_argument("--threshold", type=float, default=DEFAULT_THRESHOLD)
+    parser.add_argument("--save-baseline", action="store_true", help="เขียนผลรอบนี้ทับ Baseline")
+    args = parser.parse_args(argv)
+
+    reports = [run_benchmarks(
+        shapes=args.shapes.split(","), sizes=[int(s) for s in args.sizes.split(",")],
+        stages=args.stages.split(","), repeat=args.repeat, include_recorded=not args.no_recorded)
+        for _ in range(max(args.runs, 1))]
+    report = merge_reports(reports, pick=max if args.save_baseline else min)
+
+    if args.out:
+        with open(args.out, "w") as f: json.dump(report, f, indent=2)
+    if args.save_baseline:
+        with open(args.baseline, "w") as f: json.dump(report, f, indent=2)
+        print(f"บันทึก Baseline: {args.baseline}")
+        return 0
+    if not os.path.exists(args.baseline):
+        print("ไม่มี Baseline (ใช้ --save-baseline เพื่อสร้าง)")
+        return 0
+
+    with open(args.baseline) as f: baseline = json.load(f)
+    for key, base_v, cur_v in meta_mismatch(report, baseline):
+        print(f"⚠️ Baseline ต่างเครื่อง/เวอร์ชัน {key}: {base_v} -> {cur_v} (ผลเทียบอาจคลาดเคลื่อน)")
+    regressions = compare(report, baseline, args.threshold)
+    for key, old_t, new_t, ratio in regressions:
+        print(f"🐢 REGRESSION {key}: {old_t * 1000:.2f} ms -> {new_t * 1000:.2f} ms (x{ratio:.2f})")
+    if regressions: return 1
+    print(f"✅ ไม่มี Stage ไหนช้าลงเกิน {args.threshold:.0%}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,153 @@
+import argparse
+import json
+import sys
+
+# --- CLI: ใช้งาน God Mode แบบไม่ต้องเปิด Streamlit ---
+# python -m cli analyze TSLA --tf 1d --json
+# python -m cli scan AAPL,MSFT,NVDA --tf 1d --workers 8
+# python -m cli backtest AAPL MSFT --tf 1d --period 5y
+# python -m cli optimize AAPL MSFT NVDA --tf 1d --search random --samples 500 --folds 4
+# python -m cli watch AAPL MSFT NVDA --tf 1d --every 60 --alerts alerts.jsonl
+
+TIMEFRAMES = ["1h", "1d", "1wk"]
+
+
+def _print_report(ctx):
+    r = ctx['ai_report']; info = ctx['info']
+    print(f"{info.get('longName', ctx['symbol'])} ({ctx['symbol']}) | TF {ctx['interval']} | Price {ctx['price']:.2f}")
+    print(f"{r['banner_title']} | Score {r['score']} | {r['strategy']}")
+    print(f"SL {r['sl']:.2f} | TP {r['tp']:.2f} | Pattern: {r['candle_pattern']} | MTF: {ctx['mtf_trend']}")
+    for f in r['bullish_factors']: print(f"  + {f}")
+    for f in r['bearish_factors']: print(f"  - {f}")
+    print(f"👉 {r['holder_advice']}")
+
+
+def cmd_analyze(args):
+    from core import analyze_symbol, to_jsonable
+    results = {}; code = 0
+    for symbol in args.symbols:
+        try: ctx = analyze_symbol(symbol, args.tf)
+        except Exception as e: ctx = None; err = str(e)
+        else: err = "ข้อมูลไม่พอ (ต้องมีมากกว่า 20 แท่ง)"
+        if ctx is None:
+            code = 1
+            results[symbol.upper()] = {"error": err}
+            if not args.json: print(f"{symbol.upper()}: ❌ {err}", file=sys.stderr)
+            continue
+        results[ctx['symbol']] = to_jsonable(ctx)
+        if not args.json: _print_report(ctx)
+    if args.json:
+        out = next(iter(results.values())) if len(results) == 1 else results
+        print(json.dumps(out, ensure_ascii=False, indent=2))
+    return code
+
+
+def cmd_scan(args):
+    from scanner import parse_watchlist, results_frame, scan_watchlist
+    rows = list(scan_watchlist(parse_watchlist(" ".join(args.symbols)), interval=args.tf, max_workers=args.workers))
+    table = results_frame(rows)
+    if args.json: print(table.to_json(orient="records", force_ascii=False, indent=2))
+    else: print(table.to_string(index=False))
+    return 0
+
+
+def cmd_backtest(args):
+    import pandas as pd
+    from backtest import backtest_universe, summarize_trades
+    from scanner import parse_watchlist
+    frames, errors = [], {}
+    for sym, trades, error in backtest_universe(parse_watchlist(" ".join(args.symbols)), interval=args.tf,
+                                                period=args.period, max_workers=args.workers):
+        if error: errors[sym] = error
+        elif not trades.empty: frames.append(trades)
+    for sym, error in errors.items(): print(f"⚠️ {sym}: {error}", file=sys.stderr)
+    summary = summarize_trades(pd.concat(frames) if frames else None)
+    if args.json: print(summary.to_json(orient="records", force_ascii=False, indent=2))
+    else: print(summary.round(2).to_string(index=False))
+    return 1 if errors and not frames else 0
+
+
+def cmd_optimize(args):
+    from optimizer import optimize_universe
+    from scanner import parse_watchlist
+    ranking, wf = optimize_universe(parse_watchlist(" ".join(args.symbols)), interval=args.tf, search=args.search,
+                                    samples=args.samples, seed=args.seed, n_folds=args.folds, max_workers=args.workers)
+    top = ranking.head(args.top)
+    if args.json:
+        print(json.dumps({"ranking": json.loads(top.to_json(orient="records")),
+                          "walk_forward": json.loads(wf.to_json(orient="records", date_format="iso"))}, ensure_ascii=False, indent=2))
+    else:
+        print(top.round(3).to_string(index=False))
+        if not wf.empty: print("\nWalk-forward (ชุดที่ดีที่สุดของช่วงก่อนหน้า -> ผลช่วงถัดไป)\n" + wf.round(3).to_string(index=False))
+    return 0
+
+
+def cmd_watch(args):
+    from alert_daemon import ALERTS_PATH, AlertDaemon, ConsoleSink, FileSink, WebhookSink
+    from scanner import parse_watchlist
+    args.alerts = args.alerts or ALERTS_PATH
+    sinks = [ConsoleSink(), FileSink(args.alerts)] + ([WebhookSink(args.webhook)] if args.webhook else [])
+    daemon = AlertDaemon(parse_watchlist(" ".join(args.symbols)), interval=args.tf, sinks=sinks,
+                         poll_every=args.every, max_workers=args.workers)
+    print(f"เฝ้า {len(daemon.symbols)} ตัว (TF {args.tf}) -> {args.alerts} | Ctrl+C เพื่อหยุด", file=sys.stderr)
+    try: daemon.run()
+    except KeyboardInterrupt: pass
+    finally: daemon.stop()
+    return 0
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(prog="python -m cli", description="AI Stock Master (God Mode) แบบ Headless")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    p = sub.add_parser("analyze", help="วิเคราะห์หุ้นรายตัว (ผลเดียวกับหน้าเว็บ)")
+    p.add_argument("symbols", nargs="+")
+    p.add_argument("--tf", choices=TIMEFRAMES, default="1d")
+    p.add_argument("--json", action="store_true", help="พิมพ์ Report เป็น JSON")
+    p.set_defaults(func=cmd_analyze)
+
+    p = sub.add_parser("scan", help="สแกน Watchlist แบบขนาน")
+    p.add_argument("symbols", nargs="+")
+    p.add_argument("--tf", choices=TIMEFRAMES, default="1d")
+    p.add_argument("--workers", type=int, default=None)
+    p.add_argument("--json", action="store_true")
+    p.set_defaults(func=cmd_scan)
+
+    p = sub.add_parser("backtest", help="Backtest สัญญาณ SL/TP ย้อนหลัง สรุปแยกตาม Strategy")
+    p.add_argument("symbols", nargs="+")
+    p.add_argument("--tf", choices=TIMEFRAMES, default="1d")
+    p.add_argument("--period", default="5y")
+    p.add_argument("--workers", type=int, default=None)
+    p.add_argument("--json", action="store_true")
+    p.set_defaults(func=cmd_backtest)
+
+    p = sub.add_parser("optimize", help="จูนค่าคงที่ของกฎให้คะแนน (Grid/Random + Walk-forward) จัดอันดับด้วย Expectancy นอกตัวอย่าง")
+    p.add_argument("symbols", nargs="+")
+    p.add_argument("--tf", choices=TIMEFRAMES, default="1d")
+    p.add_argument("--search", choices=["grid", "random"], default="random")
+    p.add_argument("--samples", type=int, default=500, help="จำนวนชุดที่สุ่ม (--search random)")
+    p.add_argument("--seed", type=int, default=None)
+    p.add_argument("--folds", type=int, default=4)
+    p.add_argument("--top", type=int, default=20)
+    p.add_argument("--workers", type=int, default=None)
+    p.add_argument("--json", action="store_true")
+    p.set_defaults(func=cmd_optimize)
+
+    p = sub.add_parser("watch", help="เฝ้า Watchlist เบื้องหลัง แจ้งเตือนเมื่อเข้าโซน/หลุดแนวรับ/เบรคแนวต้าน/สถานะเปลี่ยน")
+    p.add_argument("symbols", nargs="+")
+    p.add_argument("--tf", choices=TIMEFRAMES, default="1d")
+    p.add_argument("--every", type=float, default=60.0, help="วินาที: ดู Quote ซ้ำเมื่อถึงเวลาแท่งใหม่แล้วแต่ยังไม่มา")
+    p.add_argument("--alerts", default=None, help="ไฟล์ JSON Lines ของแจ้งเตือน (ค่าเริ่มต้น ALERTS_PATH)")
+    p.add_argument("--webhook", default=None, help="URL ที่จะ POST แจ้งเตือนเป็น JSON")
+    p.add_argument("--workers", type=int, default=4)
+    p.set_defaults(func=cmd_watch)
+    return parser
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    return args.func(args)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,203 @@
+import math
+from datetime import date, datetime
+
+import numpy as np
+import pandas as pd
+
+from analysis import analyze_frame, key_levels, mtf_alignment
+from indicators import ADX_COL, BBL_COL, BBU_COL, MACD_COL, MACDS_COL, ema
+from market_data import COMPACT_DTYPE, COMPACT_MEMORY, MTF_BY_TF, OHLCV_COLS, bundle_from_raw, cache_ttl, compact_frame, fetch_raw, frames_nbytes
+from providers import get_provider
+from shared_cache import bar_key, get_shared_cache
+
+# --- Headless Core: Fetch -> Indicators -> Zones -> God Mode Brain โดยไม่ต้องใช้ Streamlit ---
+# ใช้ได้ทั้งจากหน้าเว็บ (app.py), CLI (python -m cli), Cron Job และ Worker
+
+
+# ข้อมูลพื้นฐานจาก Yahoo ที่ใช้จริง (ticker.info เต็มมีหลายร้อยคีย์ -> ไม่เก็บลงแคช)
+INFO_KEYS = ("longName", "marketState", "preMarketPrice", "preMarketChange", "postMarketPrice", "postMarketChange",
+             "trailingPE", "trailingEps", "exchangeTimezoneName")
+
+
+def load_market(symbol, interval, mtf_interval=None):
+    """
+    ดึงข้อมูลที่ใช้วิเคราะห์ 1 ครั้ง คืนค่า (df, info, df_mtf, df_stats_day, df_stats_week)
+    info = Quote ราคาล่าสุด (จากแท่งรายวัน) + ข้อมูลพื้นฐานจาก Yahoo
+    """
+    mtf_interval = mtf_interval or MTF_BY_TF.get(interval, "1wk")
+    # Fetch Planner: ดาวน์โหลดดิบแค่ 1-2 ชุด (ผ่านคลังบนดิสก์ + Delta Fetch) แล้วแยก TF อื่นเอง
+    raw_frames, raw_info, errors = fetch_raw(symbol, interval, mtf_interval)
+    return market_from_raw(symbol, interval, mtf_interval, raw_frames, raw_info, errors)
+
+
+def market_from_raw(symbol, interval, mtf_interval, raw_frames, raw_info, errors=None):
+    """ประกอบผลของ load_market จากชุดดิบ (ใช้ทั้งตอนดึงสดและตอนอ่านจากแคช)"""
+    bundle = bundle_from_raw(raw_frames, interval, mtf_interval, raw_info, errors)
+    df = bundle['df']; df_mtf = bundle['df_mtf']; raw_info = bundle['raw_info']
+    if not df_mtf.empty:
+        mtf_ema = ema(df_mtf['Close'].astype("float64"), 200)
+        if mtf_ema is None: mtf_ema = pd.Series(np.nan, index=df_mtf.index)  # แท่งไม่ถึง 200 (เช่น 1mo) -> ไม่มี EMA200
+        df_mtf = df_mtf.assign(EMA200=mtf_ema.astype(COMPACT_DTYPE) if COMPACT_MEMORY else mtf_ema)
+
+    # Quote เป็น float ของ Python (เฟรม Compact เป็น float32 -> ไม่ให้ความละเอียด float32 ไหลไปถึง SL/TP)
+    df_daily = bundle['df_daily']
+    if not df_daily.empty:
+        closes = df_daily['Close'].astype("float64")
+        price = float(closes.iloc[-1])
+        chg = price - float(closes.iloc[-2]) if len(df_daily) >=2 else 0
+        pct = (chg / float(closes.iloc[-2])) if len(df_daily) >=2 else 0
+        d_h, d_l, d_o = (float(df_daily[c].iloc[-1]) for c in ('High', 'Low', 'Open'))
+    else:
+        price = float(df['Close'].iloc[-1]); chg = 0; pct = 0; d_h=0; d_l=0; d_o=0
+
+    info = {
+        'longName': raw_info.get('longName', symbol),
+        'marketState': raw_info.get('marketState', 'REGULAR'),
+        'regularMarketPrice': price, 'regularMarketChange': chg,
+        'regularMarketChangePercent': pct, 'dayHigh': d_h, 'dayLow': d_l, 'regularMarketOpen': d_o,
+        'preMarketPrice': raw_info.get('preMarketPrice'), 'preMarketChange': raw_info.get('preMarketChange'),
+        'postMarketPrice': raw_info.get('postMarketPrice'), 'postMarketChange': raw_info.get('postMarketChange'),
+        'trailingPE': raw_info.get('trailingPE'),
+        'trailingEps': raw_info.get('trailingEps'),
+        'exchangeTimezoneName': raw_info.get('exchangeTimezoneName'),
+        # Request ที่พัง/หมดเวลา (เช่น {'info': 'timeout'}) -> หน้าเว็บแจ้งเตือนแทนการล้มทั้งหน้า
+        'fetchErrors': bundle.get('errors', {}),
+    }
+    return df, info, df_mtf, bundle['df_stats_day'], bundle['df_stats_week']
+
+
+# --- Compact Mode: ขนาดหน่วยความจำของ Session ---
+
+# คอลัมน์ของ ctx['df'] ที่เก็บไว้ในรายงาน (ราคา + Indicator ที่หน้าแสดงผลอ่าน) ที่เหลือทิ้งหลังวิเคราะห์เสร็จ
+REPORT_COLUMNS = OHLCV_COLS + ["EMA20", "EMA50", "EMA200", "RSI", "ATR", MACD_COL, MACDS_COL, ADX_COL, BBL_COL, BBU_COL, "Vol_SMA20"]
+
+
+def compact_report(ctx, source=None):
+    """
+    ย่อ ctx['df'] ของ analyze_frame ให้เหลือ REPORT_COLUMNS เป็น float32 (ค่าสรุปแท่งล่าสุดใน ctx ยังเป็น float64)
+    source = เฟรมที่ส่งเข้า analyze_frame ถ้าเป็น Compact อยู่แล้ว ใช้ OHLCV ร่วมกับมัน (View) แทนการ Copy
+    """
+    if ctx is None or not COMPACT_MEMORY: return ctx
+    df = ctx['df']
+    shared = (source is not None and source.index.equals(df.index) and all(c in source.columns for c in OHLCV_COLS)
+              and (source[OHLCV_COLS].dtypes == COMPACT_DTYPE).all())
+    prices = source[OHLCV_COLS] if shared else df[[c for c in OHLCV_COLS if c in df.columns]].astype(COMPACT_DTYPE)
+    indicators = df[[c for c in REPORT_COLUMNS if c in df.columns and c not in OHLCV_COLS]].astype(COMPACT_DTYPE)
+    ctx['df'] = pd.concat([prices, indicators], axis=1)
+    return ctx
+
+
+def session_memory(**frames):
+    """ขนาด (MB) ของแต่ละเฟรม + รวมแบบนับ Array ที่แชร์กันครั้งเดียว (โชว์ใน Debug Panel)"""
+    frames = {k: v for k, v in frames.items() if isinstance(v, pd.DataFrame)}
+    out = {k: round(frames_nbytes(v) / 2**20, 3) for k, v in frames.items()}
+    out["total (shared counted once)"] = round(frames_nbytes(*frames.values()) / 2**20, 3)
+    out["compact"] = COMPACT_MEMORY
+    return out
+
+
+# --- Shared Cache: ข้อมูลดิบ + รายงาน ใช้ร่วมกันทุก Process (คีย์ด้วยแท่งล่าสุด) ---
+
+def market_ttl(interval, info, df):
+    """อายุของตัวชี้ 'latest' ตาม TF + marketState + เวลาแท่งถัดไป (ดู market_data.cache_ttl)"""
+    last_ts = df.index[-1] if df is not None and not df.empty else None
+    return cache_ttl(interval, (info or {}).get('marketState'), last_ts, tz=(info or {}).get('exchangeTimezoneName'))
+
+
+def market_base(symbol, interval, mtf_interval):
+    """คีย์ฐานของข้อมูลดิบในแคชกลาง (รวมชื่อ Provider -> ข้อมูล Replay/as-of ไม่ปนกับข้อมูลจริง)"""
+    return f"{get_provider().name}:{symbol}:{interval}:{mtf_interval}"
+
+
+def cached_load_market(symbol, interval, mtf_interval=None, ttl=None, cache=None):
+    """
+    load_market ผ่านแคชกลาง: ตัวชี้ 'latest' บอกว่าแท่งล่าสุดคืออะไร
+    อายุตัวชี้ตามสถานะตลาด (market_ttl) หรือ ttl ที่ส่งมา ส่วนข้อมูลเก็บตาม (symbol, interval, แท่งล่าสุด)
+    อยู่จนกว่าจะถูก LRU เบียดออก
+    """
+    cache = cache or get_shared_cache()
+    mtf_interval = mtf_interval or MTF_BY_TF.get(interval, "1wk")
+    base = market_base(symbol, interval, mtf_interval)
+    ref = cache.get(f"latest:{base}")
+    if ref is not None:
+        raw = cache.get(f"market:{base}:{ref}")
+        if raw is not None: return market_from_raw(symbol, interval, mtf_interval, raw['frames'], raw['info'], raw['errors'])
+    raw_frames, raw_info, errors = fetch_raw(symbol, interval, mtf_interval)
+    data = market_from_raw(symbol, interval, mtf_interval, raw_frames, raw_info, errors)
+    # เก็บแค่ชุดดิบ (OHLCV float32 ชุดละ 1 Parquet) -> df/df_stats_day/df_mtf ตัดใหม่ตอนอ่าน ไม่เก็บข้อมูลซ้อนกันซ้ำ
+    raw = {"frames": {k: compact_frame(v) if COMPACT_MEMORY else v for k, v in raw_frames.items()},
+           "info": {k: raw_info.get(k) for k in INFO_KEYS if raw_info.get(k) is not None}, "errors": errors}
+    ref = bar_key(data[0])
+    cache.set(f"market:{base}:{ref}", raw)
+    cache.set(f"latest:{base}", ref, ttl or market_ttl(interval, data[1], data[0]))
+    return data
+
+
+def invalidate_market(symbol, interval, mtf_interval=None, cache=None):
+    """ลบตัวชี้ 'latest' ของหุ้น+TF -> cached_load_market รอบถัดไปดึงแท่งใหม่ (Delta Fetch) ทันที ไม่รอ TTL"""
+    cache = cache or get_shared_cache()
+    mtf_interval = mtf_interval or MTF_BY_TF.get(interval, "1wk")
+    cache.delete(f"latest:{market_base(symbol, interval, mtf_interval)}")
+
+
+def cached_analyze_frame(symbol, interval, df, df_mtf=None, price=None, cache=None):
+    """analyze_frame ผ่านแคชกลาง: หุ้น+TF+แท่งล่าสุด (ทั้ง TF หลักและ MTF)+ราคาเดียวกัน คำนวณครั้งเดียวทั้ง Fleet"""
+    cache = cache or get_shared_cache()
+    key = f"report:{symbol}:{interval}:{bar_key(df)}:{bar_key(df_mtf)}:{price!r}"
+    return cache.get_or_compute(key, lambda: compact_report(analyze_frame(df, df_mtf, price=price), df))
+
+
+def cached_key_levels(symbol, interval, ctx, df_stats_day=None, df_stats_week=None, cache=None):
+    """
+    key_levels ผ่านแคชกลาง 1 ชุดต่อ (หุ้น, TF, แท่งล่าสุด) -> ทุก Widget ที่กด (Rerun) ไม่ต้องคำนวณ EMA รายวัน/รายสัปดาห์ใหม่
+    ctx = ผลของ analyze_frame สำหรับ df ชุดเดียวกัน
+    """
+    cache = cache or get_shared_cache()
+    key = f"levels:{symbol}:{interval}:{bar_key(ctx['df'])}:{bar_key(df_stats_day)}:{bar_key(df_stats_week)}"
+    return cache.get_or_compute(key, lambda: key_levels(ctx, df_stats_day, df_stats_week))
+
+
+def cached_mtf_alignment(symbol, interval, df, df_mtf=None, mtf_interval=None, df_week=None, cache=None):
+    """
+    mtf_alignment ผ่านแคชกลาง 1 ชุดต่อ (หุ้น, TF, แท่งล่าสุดของ df/df_mtf/df_week)
+    ทุกแท่งของ df ได้ EMA 200/เทรนด์ของ TF ใหญ่ + ระดับรายสัปดาห์ที่ปิดแล้ว ณ เวลานั้น (ใช้ทำคะแนนย้อนหลัง/Backtest)
+    """
+    cache = cache or get_shared_cache()
+    mtf_interval = mtf_interval or MTF_BY_TF.get(interval, "1wk")
+    key = f"mtf:{symbol}:{interval}:{mtf_interval}:{bar_key(df)}:{bar_key(df_mtf)}:{bar_key(df_week)}"
+    return cache.get_or_compute(key, lambda: mtf_alignment(df, df_mtf, mtf_interval, df_week))
+
+
+def analyze_symbol(symbol, interval="1d", mtf_interval=None):
+    """
+    วิเคราะห์หุ้น 1 ตัวแบบเดียวกับหน้าเว็บ คืนค่า dict ของ analyze_frame (ai_report, ema, zones, ...)
+    เพิ่ม symbol/interval/mtf_interval/info และ df_mtf/df_stats_day/df_stats_week
+    คืนค่า None ถ้าข้อมูลไม่พอ (ไม่เกิน 20 แท่ง)
+    """
+    symbol = symbol.upper().strip()
+    mtf_interval = mtf_interval or MTF_BY_TF.get(interval, "1wk")
+    df, info, df_mtf, df_stats_day, df_stats_week = load_market(symbol, interval, mtf_interval)
+    if df is None or df.empty or len(df) <= 20: return None
+    ctx = compact_report(analyze_frame(df, df_mtf, price=info.get('regularMarketPrice')), df)
+    if ctx is None: return None
+    ctx.update({
+        "symbol": symbol, "interval": interval, "mtf_interval": mtf_interval, "info": info,
+        "df_mtf": df_mtf, "df_stats_day": df_stats_day, "df_stats_week": df_stats_week,
+        "key_levels": key_levels(ctx, df_stats_day, df_stats_week),
+    })
+    return ctx
+
+
+# คีย์ที่เป็น DataFrame (ไม่ใส่ใน JSON)
+FRAME_KEYS = ("df", "df_mtf", "df_stats_day", "df_stats_week")
+
+
+def to_jsonable(obj):
+    """แปลงผลวิเคราะห์ให้ json.dumps ได้ (numpy -> Python, Timestamp -> ISO, NaN -> None)"""
+    if isinstance(obj, dict):
+        return {k: to_jsonable(v) for k, v in obj.items() if k not in FRAME_KEYS}
+    if isinstance(obj, (list, tuple)): return [to_jsonable(v) for v in obj]
+    if isinstance(obj, (pd.Timestamp, datetime, date)): return obj.isoformat()
+    if isinstance(obj, np.generic): obj = obj.item()
+    if isinstance(obj, float) and (math.isnan(obj) or math.isinf(obj)): return None
+    return obj
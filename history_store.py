@@ -0,0 +1,197 @@
+import os
+import sqlite3
+import threading
+from datetime import datetime, timezone
+
+import pandas as pd
+
+# --- Analysis History: เก็บผลวิเคราะห์ทุกครั้งลง SQLite (มี Index) แทน history_log 10 รายการใน Session ---
+
+HISTORY_DB_PATH = os.environ.get("HISTORY_DB_PATH", os.path.join(os.path.dirname(os.path.abspath(__file__)), ".analysis_history.sqlite"))
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS analyses (
+    id INTEGER PRIMARY KEY,
+    ts TEXT NOT NULL,               -- เวลาที่วิเคราะห์ (UTC ISO-8601 เรียงตามตัวอักษร = เรียงตามเวลา)
+    symbol TEXT NOT NULL,
+    timeframe TEXT NOT NULL,
+    source TEXT NOT NULL DEFAULT 'app',
+    price REAL, change_pct REAL,
+    score INTEGER, status_color TEXT, strategy TEXT,
+    status_label TEXT, action_label TEXT,
+    sl REAL, tp REAL,
+    in_demand_zone INTEGER, candle_pattern TEXT, mtf_trend TEXT
+);
+CREATE INDEX IF NOT EXISTS idx_analyses_symbol_tf_ts ON analyses(symbol, timeframe, ts);
+CREATE INDEX IF NOT EXISTS idx_analyses_ts ON analyses(ts);
+CREATE INDEX IF NOT EXISTS idx_analyses_tf_ts ON analyses(timeframe, ts);
+CREATE INDEX IF NOT EXISTS idx_analyses_status_ts ON analyses(status_color, ts);
+"""
+
+COLUMNS = ["ts", "symbol", "timeframe", "source", "price", "change_pct", "score", "status_color", "strategy",
+           "status_label", "action_label", "sl", "tp", "in_demand_zone", "candle_pattern", "mtf_trend"]
+
+EXPORT_CHUNK = 50_000
+
+# ช่วงเวลาที่หน้า History ให้เลือก (วัน, None = ทั้งหมด)
+HISTORY_WINDOWS = {"7 วัน": 7, "30 วัน": 30, "90 วัน": 90, "1 ปี": 365, "ทั้งหมด": None}
+
+
+def utc_now():
+    return datetime.now(timezone.utc).isoformat(timespec="seconds")
+
+
+def _ts(value):
+    if value is None: return utc_now()
+    ts = value if isinstance(value, datetime) else pd.Timestamp(value).to_pydatetime()
+    ts = ts.replace(tzinfo=timezone.utc) if ts.tzinfo is None else ts.astimezone(timezone.utc)
+    return ts.isoformat(timespec="seconds")
+
+
+class HistoryStore:
+    """
+    คลังประวัติการวิเคราะห์ (SQLite โหมด WAL: อ่านได้พร้อมกันหลาย Session ขณะมีคนเขียน)
+    ทุก Query กรองด้วย symbol / timeframe / status / ช่วงเวลา ผ่าน Index ไม่ต้องอ่านทั้งตาราง
+    """
+
+    def __init__(self, path=HISTORY_DB_PATH):
+        self.path = path
+        self._local = threading.local()
+        with self._conn() as conn: conn.executescript(SCHEMA)
+
+    def _conn(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            if self.path != ":memory:": os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+            conn = sqlite3.connect(self.path, timeout=10)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    # --- เขียน ---
+    def record(self, entry):
+        self.record_many([entry])
+
+    def record_many(self, entries):
+        """entries: dict ที่มีคีย์ตาม COLUMNS (ขาดได้ ยกเว้น symbol/timeframe) -> เขียนใน Transaction เดียว"""
+        rows = []
+        for e in entries:
+            row = {c: e.get(c) for c in COLUMNS}
+            row["ts"] = _ts(e.get("ts")); row["source"] = e.get("source") or "app"
+            if row["in_demand_zone"] is not None: row["in_demand_zone"] = int(bool(row["in_demand_zone"]))
+            rows.append(tuple(row[c] for c in COLUMNS))
+        if not rows: return
+        sql = f"INSERT INTO analyses ({', '.join(COLUMNS)}) VALUES ({', '.join('?' * len(COLUMNS))})"
+        with self._conn() as conn: conn.executemany(sql, rows)
+
+    # --- อ่าน ---
+    @staticmethod
+    def _where(symbol=None, timeframe=None, status=None, source=None, since=None, until=None):
+        clauses, params = [], []
+        for col, val in (("symbol", symbol), ("timeframe", timeframe), ("status_color", status), ("source", source)):
+            if val: clauses.append(f"{col} = ?"); params.append(val.upper() if col == "symbol" else val)
+        if since is not None: clauses.append("ts >= ?"); params.append(_ts(since))
+        if until is not None: clauses.append("ts < ?"); params.append(_ts(until))
+        return (" WHERE " + " AND ".join(clauses)) if clauses else "", params
+
+    def count(self, **filters):
+        where, params = self._where(**filters)
+        return self._conn().execute(f"SELECT COUNT(*) FROM analyses{where}", params).fetchone()[0]
+
+    def page(self, page=0, page_size=20, **filters):
+        """ผลวิเคราะห์ล่าสุดก่อน ทีละหน้า (ใช้ Index ts / symbol+timeframe+ts)"""
+        where, params = self._where(**filters)
+        sql = f"SELECT id, {', '.join(COLUMNS)} FROM analyses{where} ORDER BY ts DESC, id DESC LIMIT ? OFFSET ?"
+        return pd.read_sql_query(sql, self._conn(), params=params + [int(page_size), int(page) * int(page_size)])
+
+    def symbols(self):
+        return [r[0] for r in self._conn().execute("SELECT DISTINCT symbol FROM analyses ORDER BY symbol")]
+
+    def signal_counts(self, **filters):
+        """จำนวนสัญญาณต่อหุ้น แยกตามสี (green/yellow/orange/red) + ครั้งล่าสุดที่วิเคราะห์"""
+        where, params = self._where(**filters)
+        sql = f"""
+            SELECT symbol, timeframe, COUNT(*) AS total,
+                   SUM(status_color = 'green') AS green, SUM(status_color = 'yellow') AS yellow,
+                   SUM(status_color = 'orange') AS orange, SUM(status_color = 'red') AS red,
+                   AVG(score) AS avg_score, MAX(ts) AS last_ts
+            FROM analyses{where} GROUP BY symbol, timeframe ORDER BY total DESC"""
+        return pd.read_sql_query(sql, self._conn(), params=params)
+
+    def status_changes(self, **filters):
+        """เฉพาะครั้งที่สถานะ (status_color) เปลี่ยนจากครั้งก่อนของหุ้น+TF เดียวกัน เรียงตามเวลา"""
+        where, params = self._where(**filters)
+        sql = f"""
+            SELECT ts, symbol, timeframe, prev_status, status_color, strategy, score, price FROM (
+                SELECT ts, id, symbol, timeframe, status_color, strategy, score, price,
+                       LAG(status_color) OVER (PARTITION BY symbol, timeframe ORDER BY ts, id) AS prev_status
+                FROM analyses{where})
+            WHERE prev_status IS NULL OR prev_status != status_color
+            ORDER BY ts, id"""
+        return pd.read_sql_query(sql, self._conn(), params=params)
+
+    def daily_counts(self, **filters):
+        """จำนวนการวิเคราะห์ต่อวันแยกสี (ดูแนวโน้มสัญญาณตามเวลา)"""
+        where, params = self._where(**filters)
+        sql = f"""
+            SELECT substr(ts, 1, 10) AS day, status_color, COUNT(*) AS n
+            FROM analyses{where} GROUP BY day, status_color ORDER BY day"""
+        return pd.read_sql_query(sql, self._conn(), params=params)
+
+    def export(self, path, encoding="utf-8", **filters):
+        """ส่งออกทั้งหมด (หรือเฉพาะที่กรอง) เป็น .csv / .parquet ทีละก้อน ไม่โหลดทั้งตารางเข้าหน่วยความจำทีเดียว"""
+        where, params = self._where(**filters)
+        sql = f"SELECT id, {', '.join(COLUMNS)} FROM analyses{where} ORDER BY ts, id"
+        chunks = pd.read_sql_query(sql, self._conn(), params=params, chunksize=EXPORT_CHUNK)
+        total = 0
+        if path.endswith(".parquet"):
+            import pyarrow as pa
+            import pyarrow.parquet as pq
+            writer = None
+            try:
+                for chunk in chunks:
+                    table = pa.Table.from_pandas(chunk, preserve_index=False)
+                    if writer is None: writer = pq.ParquetWriter(path, table.schema)
+                    writer.write_table(table.cast(writer.schema)); total += len(chunk)
+            finally:
+                if writer is not None: writer.close()
+        else:
+            for i, chunk in enumerate(chunks):
+                chunk.to_csv(path, mode="w" if i == 0 else "a", header=(i == 0), index=False, encoding=encoding); total += len(chunk)
+            if total == 0: pd.DataFrame(columns=["id"] + COLUMNS).to_csv(path, index=False, encoding=encoding)
+        return total
+
+
+def entry_from_report(ctx, symbol, timeframe, change_pct=None, status_label=None, action_label=None, source="app"):
+    """แปลงผลของ analyze_frame เป็นแถวประวัติ"""
+    r = ctx['ai_report']
+    return {
+        "symbol": symbol.upper(), "timeframe": timeframe, "source": source,
+        "price": float(ctx['price']), "change_pct": change_pct,
+        "score": int(r['score']), "status_color": r['status_color'], "strategy": r['strategy'],
+        "status_label": status_label, "action_label": action_label,
+        "sl": float(r['sl']), "tp": float(r['tp']), "in_demand_zone": bool(r['in_demand_zone']),
+        "candle_pattern": r['candle_pattern'], "mtf_trend": ctx.get('mtf_trend'),
+    }
+
+
+def entry_from_scan(row, timeframe):
+    """แปลงแถวผลสแกน (scanner.scan_symbol) เป็นแถวประวัติ"""
+    return {
+        "symbol": row["Symbol"], "timeframe": timeframe, "source": "scan",
+        "price": row.get("Price"), "score": row.get("Score"), "status_color": row.get("Status"),
+        "strategy": row.get("Strategy"), "action_label": row.get("Strategy"),
+        "sl": row.get("SL"), "tp": row.get("TP"), "in_demand_zone": row.get("In Demand Zone"),
+        "candle_pattern": row.get("Pattern"), "mtf_trend": row.get("MTF Trend"),
+    }
+
+
+_default_store = None
+_store_lock = threading.Lock()
+
+def get_history_store():
+    global _default_store
+    with _store_lock:
+        if _default_store is None: _default_store = HistoryStore()
+        return _default_store
@@ -0,0 +1,423 @@
+from collections import deque
+
+import numpy as np
+import pandas as pd
+from numpy.lib.stride_tricks import sliding_window_view
+
+# --- Indicator Engine: คำนวณ Indicator ทั้งชุดรอบเดียวบน Array ต่อเนื่อง (สูตรเดียวกับ pandas_ta) ---
+
+# Numba เป็นตัวเลือก: ถ้ามีจะคอมไพล์ลูป Recursive (EMA/Wilder) ให้วิ่งรอบเดียว ถ้าไม่มีใช้ ewm ของ pandas แทน
+try:
+    from numba import njit
+except ImportError:
+    njit = None
+
+EMA_LENGTHS = (20, 50, 200)
+RSI_LEN = 14; ATR_LEN = 14; ADX_LEN = 14
+MACD_FAST = 12; MACD_SLOW = 26; MACD_SIGNAL = 9
+BB_LEN = 20; BB_STD = 2.0
+SMA_LEN = 20; SLOPE_LEN = 5; ROLL_LEN = 20
+
+MACD_COL = f"MACD_{MACD_FAST}_{MACD_SLOW}_{MACD_SIGNAL}"
+MACDH_COL = f"MACDh_{MACD_FAST}_{MACD_SLOW}_{MACD_SIGNAL}"
+MACDS_COL = f"MACDs_{MACD_FAST}_{MACD_SLOW}_{MACD_SIGNAL}"
+BBL_COL = f"BBL_{BB_LEN}_{BB_STD}"; BBM_COL = f"BBM_{BB_LEN}_{BB_STD}"; BBU_COL = f"BBU_{BB_LEN}_{BB_STD}"
+BBB_COL = f"BBB_{BB_LEN}_{BB_STD}"; BBP_COL = f"BBP_{BB_LEN}_{BB_STD}"
+ADX_COL = f"ADX_{ADX_LEN}"; DMP_COL = f"DMP_{ADX_LEN}"; DMN_COL = f"DMN_{ADX_LEN}"
+
+# คอลัมน์ที่ได้จากลูป Recursive (ลำดับตรงกับ Array ผลลัพธ์ของ Kernel)
+RECURSIVE_COLUMNS = ["EMA20", "EMA50", "EMA200", "RSI", "ATR", MACD_COL, MACDH_COL, MACDS_COL, ADX_COL, DMP_COL, DMN_COL, "OBV"]
+
+# ลำดับคอลัมน์เหมือนตอนเรียก pandas_ta ทีละตัว
+INDICATOR_COLUMNS = ["EMA20", "EMA50", "EMA200", "RSI", "ATR", MACD_COL, MACDH_COL, MACDS_COL,
+                     BBL_COL, BBM_COL, BBU_COL, BBB_COL, BBP_COL, ADX_COL, DMP_COL, DMN_COL,
+                     "Vol_SMA20", "OBV", "OBV_SMA20", "OBV_Slope", "Rolling_Min", "Rolling_Max", "BB_Width", "BB_Width_Min20"]
+
+
+# --- Helpers แบบ pandas_ta (ใช้ทั้งเป็น Fallback และกับ Series อื่นๆ เช่น EMA ของ TF Week) ---
+
+def ema(close, length):
+    """EMA แบบ pandas_ta (ตั้งต้นด้วย SMA ของ length แท่งแรก, adjust=False) คืน None ถ้าข้อมูลไม่พอ"""
+    close = pd.Series(close, dtype="float64")
+    if len(close) < length: return None
+    seed = close.iloc[:length].sum() / length
+    close = close.copy()
+    close.iloc[:length - 1] = np.nan
+    close.iloc[length - 1] = seed
+    return close.ewm(span=length, adjust=False).mean()
+
+
+def rma(x, length):
+    """Wilder's Moving Average แบบ pandas_ta (ewm alpha=1/length, adjust=True)"""
+    return pd.Series(x, dtype="float64").ewm(alpha=1.0 / length, min_periods=length).mean()
+
+
+def sma(x, length):
+    """Rolling Mean (NaN จนกว่าจะครบ length แท่ง)"""
+    x = np.asarray(x, dtype="float64")
+    out = np.full(len(x), np.nan)
+    if len(x) >= length: out[length - 1:] = sliding_window_view(x, length).mean(axis=1)
+    return out
+
+
+def rolling_std(x, length):
+    x = np.asarray(x, dtype="float64")
+    out = np.full(len(x), np.nan)
+    if len(x) >= length: out[length - 1:] = sliding_window_view(x, length).std(axis=1)
+    return out
+
+
+def rolling_min(x, length):
+    x = np.asarray(x, dtype="float64")
+    out = np.full(len(x), np.nan)
+    if len(x) >= length: out[length - 1:] = sliding_window_view(x, length).min(axis=1)
+    return out
+
+
+def rolling_max(x, length):
+    x = np.asarray(x, dtype="float64")
+    out = np.full(len(x), np.nan)
+    if len(x) >= length: out[length - 1:] = sliding_window_view(x, length).max(axis=1)
+    return out
+
+
+def _recursive_numpy(high, low, close, volume, out):
+    """Fallback: เส้น Recursive ทีละตัวด้วย ewm ของ pandas (คอมไพล์แล้ว) ตามสูตร pandas_ta"""
+    n = len(close)
+    c = pd.Series(close)
+    for j, length in enumerate(EMA_LENGTHS):
+        e = ema(close, length)
+        out[:, j] = e.to_numpy() if e is not None else np.nan
+
+    diff = c.diff()
+    pos_avg = rma(diff.clip(lower=0), RSI_LEN); neg_avg = rma(diff.clip(upper=0), RSI_LEN)
+    out[:, 3] = (100 * pos_avg / (pos_avg + neg_avg.abs())).to_numpy()
+
+    prev_close = c.shift(1).to_numpy()
+    tr = np.fmax(np.fmax(np.abs(high - low), np.abs(high - prev_close)), np.abs(prev_close - low))
+    tr[:1] = np.nan
+    atr = rma(tr, ATR_LEN).to_numpy()
+    out[:, 4] = atr
+
+    fast = ema(close, MACD_FAST); slow = ema(close, MACD_SLOW)
+    if fast is not None and slow is not None:
+        macd = (fast - slow)
+        first = macd.first_valid_index()
+        signal = ema(macd.loc[first:].to_numpy(), MACD_SIGNAL) if first is not None else None
+        sig = np.full(n, np.nan)
+        if signal is not None: sig[first:] = signal.to_numpy()
+        out[:, 5] = macd.to_numpy(); out[:, 6] = macd.to_numpy() - sig; out[:, 7] = sig
+    else:
+        out[:, 5:8] = np.nan
+
+    up = np.r_[np.nan, np.diff(high)]; dn = np.r_[np.nan, -np.diff(low)]
+    pos = np.where((up > dn) & (up > 0), up, 0.0); neg = np.where((dn > up) & (dn > 0), dn, 0.0)
+    pos[:1] = np.nan; neg[:1] = np.nan
+    k = 100.0 / atr
+    dmp = k * rma(pos, ADX_LEN).to_numpy(); dmn = k * rma(neg, ADX_LEN).to_numpy()
+    dx = 100.0 * np.abs(dmp - dmn) / (dmp + dmn)
+    out[:, 8] = rma(dx, ADX_LEN).to_numpy(); out[:, 9] = dmp; out[:, 10] = dmn
+
+    sign = np.sign(np.r_[np.nan, np.diff(close)]); sign[:1] = 1.0
+    out[:, 11] = np.cumsum(sign * volume)
+
+
+def _jit(fn):
+    return njit(cache=True, nogil=True, error_model="numpy")(fn) if njit is not None else fn
+
+
+# --- State Vector ของเส้น Recursive (ใช้ร่วมกันทั้งลูปเต็มประวัติ และ IndicatorState แบบทีละแท่ง) ---
+# EMA 6 ช่อง: 20, 50, 200, MACD Fast 12, MACD Slow 26, Signal 9 (ของ MACD)
+# Wilder RMA 6 ช่อง (adjust=True, min_periods=14): RSI+, RSI-, TR, DM+, DM-, DX
+_E_VAL = 0; _E_SUM = 6; _E_SEEN = 12; _E_WT = 18
+_W_VAL = 24; _W_WT = 30; _W_OBS = 36
+_OBV = 42; _PREV_H = 43; _PREV_L = 44; _PREV_C = 45; _BARS = 46
+STATE_SIZE = 47
+_EMA_LEN = np.array([20.0, 50.0, 200.0, 12.0, 26.0, 9.0])
+
+
+@_jit
+def _init_state():
+    st = np.zeros(STATE_SIZE)
+    st[_E_VAL:_E_VAL + 6] = np.nan; st[_E_WT:_E_WT + 6] = 1.0
+    st[_W_VAL:_W_VAL + 6] = np.nan; st[_W_WT:_W_WT + 6] = 1.0
+    st[_PREV_H] = np.nan; st[_PREV_L] = np.nan; st[_PREV_C] = np.nan
+    return st
+
+
+@_jit
+def _ema_update(st, j, x):
+    """EMA แบบ pandas_ta: ตั้งต้นด้วย SMA ของ L แท่งแรก แล้ว ewm(adjust=False) แบบเดียวกับ pandas"""
+    L = _EMA_LEN[j]
+    if st[_E_SEEN + j] < L:
+        if x == x: st[_E_SUM + j] += x
+        st[_E_SEEN + j] += 1
+        if st[_E_SEEN + j] == L: st[_E_VAL + j] = st[_E_SUM + j] / L
+    else:
+        a = 2.0 / (L + 1.0)
+        st[_E_WT + j] *= (1.0 - a)
+        if x == x:
+            if st[_E_VAL + j] != x: st[_E_VAL + j] = (st[_E_WT + j] * st[_E_VAL + j] + a * x) / (st[_E_WT + j] + a)
+            st[_E_WT + j] = 1.0
+
+
+@_jit
+def _rma_update(st, j, x):
+    """Wilder RMA แบบ pandas ewm(alpha=1/14, adjust=True)"""
+    is_obs = x == x
+    if is_obs: st[_W_OBS + j] += 1
+    if st[_W_VAL + j] == st[_W_VAL + j]:
+        st[_W_WT + j] *= (1.0 - 1.0 / 14.0)
+        if is_obs:
+            if st[_W_VAL + j] != x: st[_W_VAL + j] = (st[_W_WT + j] * st[_W_VAL + j] + x) / (st[_W_WT + j] + 1.0)
+            st[_W_WT + j] += 1.0
+    elif is_obs:
+        st[_W_VAL + j] = x
+
+
+@_jit
+def _rma_value(st, j):
+    return st[_W_VAL + j] if st[_W_OBS + j] >= 14 else np.nan
+
+
+@_jit
+def _step(st, h, l, c, v, out):
+    """เดิน State ไป 1 แท่ง แล้วเขียนค่า RECURSIVE_COLUMNS ของแท่งนั้นลง out"""
+    pc = st[_PREV_C]
+    if st[_BARS] > 0:
+        d = c - pc
+        up = h - st[_PREV_H]; dn = st[_PREV_L] - l
+        _rma_update(st, 0, max(d, 0.0)); _rma_update(st, 1, min(d, 0.0))
+        _rma_update(st, 2, max(max(abs(h - l), abs(h - pc)), abs(pc - l)))
+        _rma_update(st, 3, up if (up > dn and up > 0) else 0.0)
+        _rma_update(st, 4, dn if (dn > up and dn > 0) else 0.0)
+        st[_OBV] += (1.0 if d > 0 else (-1.0 if d < 0 else 0.0)) * v
+    else:
+        st[_OBV] += v
+
+    for j in range(5): _ema_update(st, j, c)
+    macd = st[_E_VAL + 3] - st[_E_VAL + 4] if (st[_E_SEEN + 3] >= 12 and st[_E_SEEN + 4] >= 26) else np.nan
+    # Signal เริ่มนับจาก MACD ค่าแรกที่มี (เหมือน ema(macd.loc[first_valid_index:]))
+    if macd == macd or st[_E_SEEN + 5] > 0: _ema_update(st, 5, macd)
+    sig = st[_E_VAL + 5] if st[_E_SEEN + 5] >= 9 else np.nan
+
+    atr = _rma_value(st, 2)
+    dmp = 100.0 / atr * _rma_value(st, 3); dmn = 100.0 / atr * _rma_value(st, 4)
+    _rma_update(st, 5, 100.0 * abs(dmp - dmn) / (dmp + dmn))
+    pos_avg = _rma_value(st, 0); neg_avg = _rma_value(st, 1)
+
+    for j in range(3): out[j] = st[_E_VAL + j] if st[_E_SEEN + j] >= _EMA_LEN[j] else np.nan
+    out[3] = 100.0 * pos_avg / (pos_avg + abs(neg_avg))
+    out[4] = atr
+    out[5] = macd; out[6] = macd - sig; out[7] = sig
+    out[8] = _rma_value(st, 5); out[9] = dmp; out[10] = dmn
+    out[11] = st[_OBV]
+    st[_PREV_H] = h; st[_PREV_L] = l; st[_PREV_C] = c; st[_BARS] += 1
+
+
+@_jit
+def _recursive_fused(high, low, close, volume, out):
+    """ลูปเดียวครบทุกเส้น Recursive (EMA 20/50/200, RSI, ATR, MACD, ADX, OBV)"""
+    st = _init_state()
+    row = np.empty(out.shape[1])
+    for i in range(close.shape[0]):
+        _step(st, high[i], low[i], close[i], volume[i], row)
+        out[i, :] = row
+    return st
+
+
+def compute_indicator_frame(df):
+    """
+    คำนวณ Indicator ทั้งชุด (คอลัมน์ตาม INDICATOR_COLUMNS) ลง Array 2 มิติที่จองไว้ก้อนเดียว
+    แล้วต่อท้าย df ครั้งเดียว (แทนการ pd.concat ทีละ Indicator)
+    """
+    n = len(df)
+    high = np.ascontiguousarray(df['High'].to_numpy(dtype="float64"))
+    low = np.ascontiguousarray(df['Low'].to_numpy(dtype="float64"))
+    close = np.ascontiguousarray(df['Close'].to_numpy(dtype="float64"))
+    volume = np.ascontiguousarray(df['Volume'].to_numpy(dtype="float64"))
+
+    # order="F": แต่ละคอลัมน์ต่อเนื่องในหน่วยความจำ (เขียนทีละคอลัมน์เร็ว และ pandas รับไปเป็น Block เดียวโดยไม่ต้อง Copy)
+    rec = np.empty((n, len(RECURSIVE_COLUMNS)), order="F")
+    if n > 0:
+        if njit is not None: _recursive_fused(high, low, close, volume, rec)
+        else: _recursive_numpy(high, low, close, volume, rec)
+    if n < MACD_SLOW: rec[:, 5:8] = np.nan
+    if n < ADX_LEN: rec[:, 8:11] = np.nan
+
+    values = np.empty((n, len(INDICATOR_COLUMNS)), order="F")
+    col = {name: j for j, name in enumerate(INDICATOR_COLUMNS)}
+    for j, name in enumerate(RECURSIVE_COLUMNS): values[:, col[name]] = rec[:, j]
+
+    mid = sma(close, BB_LEN); std = rolling_std(close, BB_LEN)
+    lower = mid - BB_STD * std; upper = mid + BB_STD * std
+    values[:, col[BBL_COL]] = lower; values[:, col[BBM_COL]] = mid; values[:, col[BBU_COL]] = upper
+    with np.errstate(divide="ignore", invalid="ignore"):
+        values[:, col[BBB_COL]] = 100 * (upper - lower) / mid
+        values[:, col[BBP_COL]] = (close - lower) / (upper - lower)
+
+    obv = rec[:, RECURSIVE_COLUMNS.index("OBV")]
+    values[:, col["Vol_SMA20"]] = sma(volume, SMA_LEN)
+    values[:, col["OBV_SMA20"]] = sma(obv, SMA_LEN)
+    slope = np.full(n, np.nan)
+    if n > SLOPE_LEN: slope[SLOPE_LEN:] = (obv[SLOPE_LEN:] - obv[:-SLOPE_LEN]) / SLOPE_LEN
+    values[:, col["OBV_Slope"]] = slope
+
+    values[:, col["Rolling_Min"]] = rolling_min(low, ROLL_LEN)
+    values[:, col["Rolling_Max"]] = rolling_max(high, ROLL_LEN)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        bb_width = (upper - lower) / values[:, col["EMA20"]] * 100
+    values[:, col["BB_Width"]] = bb_width
+    values[:, col["BB_Width_Min20"]] = rolling_min(bb_width, ROLL_LEN)
+
+    ind = pd.DataFrame(values, index=df.index, columns=INDICATOR_COLUMNS)
+    base = df.drop(columns=[c for c in INDICATOR_COLUMNS if c in df.columns])
+    return pd.concat([base, ind], axis=1)
+
+
+def compare_with_pandas_ta(df, rtol=1e-6, atol=1e-8):
+    """
+    เทียบผลกับ pandas_ta (ต้องติดตั้ง pandas_ta) คืนค่า {คอลัมน์: ค่าคลาดเคลื่อนสูงสุด} เฉพาะคอลัมน์ที่เกินเกณฑ์
+    """
+    import pandas_ta as ta
+    ours = compute_indicator_frame(df)
+    ref = pd.DataFrame(index=df.index)
+    ref['EMA20'] = ta.ema(df['Close'], length=20); ref['EMA50'] = ta.ema(df['Close'], length=50)
+    ref['EMA200'] = ta.ema(df['Close'], length=200)
+    ref['RSI'] = ta.rsi(df['Close'], length=14); ref['ATR'] = ta.atr(df['High'], df['Low'], df['Close'], length=14)
+    ref = pd.concat([ref, ta.macd(df['Close']), ta.bbands(df['Close'], length=20, std=2).iloc[:, :5].set_axis([BBL_COL, BBM_COL, BBU_COL, BBB_COL, BBP_COL], axis=1),
+                     ta.adx(df['High'], df['Low'], df['Close'], length=14)], axis=1)
+    ref['Vol_SMA20'] = ta.sma(df['Volume'], length=20)
+    ref['OBV'] = ta.obv(df['Close'], df['Volume'])
+    ref['OBV_SMA20'] = ta.sma(ref['OBV'], length=20); ref['OBV_Slope'] = ta.slope(ref['OBV'], length=5)
+    mismatches = {}
+    for name in ref.columns:
+        if name not in ours.columns: continue
+        a = ours[name].to_numpy(dtype="float64"); b = ref[name].to_numpy(dtype="float64")
+        both = ~(np.isnan(a) | np.isnan(b))
+        bad = (np.isnan(a) != np.isnan(b)).any() or not np.allclose(a[both], b[both], rtol=rtol, atol=atol)
+        if bad: mismatches[name] = float(np.nanmax(np.abs(a - b))) if both.any() else float("nan")
+    return mismatches
+
+
+# --- Incremental State: อัปเดต Indicator ทีละแท่งแบบ O(1) ---
+
+class IndicatorState:
+    """
+    State ของ Indicator ต่อ (Symbol, Interval) สำหรับ Live Refresh / Scanner
+    - append(bar): เพิ่มแท่งใหม่
+    - replace_last(bar): แท่งล่าสุดยังไม่ปิด (Intrabar) คำนวณแท่งสุดท้ายใหม่จาก State ก่อนหน้า
+    - update(bar, ts): เลือกให้เองตาม Timestamp
+    ค่าที่ได้ (values) ตรงกับแถวสุดท้ายของ compute_indicator_frame บนข้อมูลทั้งก้อน
+    """
+
+    WINDOW = max(BB_LEN, SMA_LEN, ROLL_LEN)
+
+    def __init__(self, symbol="", interval=""):
+        self.symbol = symbol; self.interval = interval
+        self.state = _init_state()
+        self.windows = {k: deque(maxlen=self.WINDOW) for k in ("close", "volume", "obv", "low", "high", "bb_width")}
+        self.obv_hist = deque(maxlen=SLOPE_LEN + 1)
+        self.last_ts = None
+        self.values = {}
+        self._undo = None  # State ก่อนแท่งล่าสุด (ใช้กับ replace_last)
+
+    @classmethod
+    def from_frame(cls, df, symbol="", interval=""):
+        """สร้าง State จากประวัติทั้งหมด: ลูปคอมไพล์ถึงก่อนหน้าต่าง Rolling แล้วเล่นแท่งท้ายๆ ต่อทีละแท่ง"""
+        obj = cls(symbol, interval)
+        n = len(df)
+        # BB_Width_Min20 ต้องใช้ BB_Width 20 ค่า ซึ่งแต่ละค่าต้องใช้ราคาย้อนหลังอีก 20 แท่ง
+        head = max(0, n - (2 * obj.WINDOW + SLOPE_LEN))
+        if head > 0:
+            cols = [np.ascontiguousarray(df[c].to_numpy(dtype="float64")[:head]) for c in ("High", "Low", "Close", "Volume")]
+            obj.state = _recursive_fused(*cols, np.empty((head, len(RECURSIVE_COLUMNS))))
+        for ts, bar in df.iloc[head:].iterrows(): obj.append(bar, ts)
+        return obj
+
+    def update(self, bar, ts=None):
+        ts = ts if ts is not None else getattr(bar, "name", None)
+        if ts is not None and ts == self.last_ts: return self.replace_last(bar)
+        return self.append(bar, ts)
+
+    def append(self, bar, ts=None):
+        self._undo = self._snapshot()
+        self._apply(bar)
+        self.last_ts = ts if ts is not None else getattr(bar, "name", None)
+        return self.values
+
+    def replace_last(self, bar):
+        if self._undo is None: raise ValueError("ยังไม่มีแท่งให้แทนที่ (ต้อง append ก่อน)")
+        last_ts = self.last_ts
+        self._restore(self._undo)
+        self._apply(bar)
+        self.last_ts = last_ts
+        return self.values
+
+    def _apply(self, bar):
+        h = float(bar['High']); l = float(bar['Low']); c = float(bar['Close']); v = float(bar['Volume'])
+        rec = np.empty(len(RECURSIVE_COLUMNS))
+        _step(self.state, h, l, c, v, rec)
+        vals = dict(zip(RECURSIVE_COLUMNS, rec.tolist()))
+
+        w = self.windows
+        w['close'].append(c); w['volume'].append(v); w['obv'].append(vals['OBV']); w['low'].append(l); w['high'].append(h)
+        self.obv_hist.append(vals['OBV'])
+
+        closes = np.array(w['close'])
+        if len(closes) >= BB_LEN:
+            mid = closes[-BB_LEN:].mean(); std = closes[-BB_LEN:].std()
+            lower = mid - BB_STD * std; upper = mid + BB_STD * std
+        else:
+            mid = std = lower = upper = np.nan
+        with np.errstate(divide="ignore", invalid="ignore"):
+            vals[BBL_COL] = lower; vals[BBM_COL] = mid; vals[BBU_COL] = upper
+            vals[BBB_COL] = float(np.float64(100) * (upper - lower) / mid)
+            vals[BBP_COL] = float((np.float64(c) - lower) / (upper - lower))
+            bb_width = float((np.float64(upper) - lower) / vals['EMA20'] * 100)
+        w['bb_width'].append(bb_width)
+
+        def tail_stat(key, length, fn):
+            arr = np.array(w[key])
+            return float(fn(arr[-length:])) if len(arr) >= length else np.nan
+
+        vals['Vol_SMA20'] = tail_stat('volume', SMA_LEN, np.mean)
+        vals['OBV_SMA20'] = tail_stat('obv', SMA_LEN, np.mean)
+        vals['OBV_Slope'] = (self.obv_hist[-1] - self.obv_hist[0]) / SLOPE_LEN if len(self.obv_hist) > SLOPE_LEN else np.nan
+        vals['Rolling_Min'] = tail_stat('low', ROLL_LEN, np.min)
+        vals['Rolling_Max'] = tail_stat('high', ROLL_LEN, np.max)
+        vals['BB_Width'] = bb_width
+        vals['BB_Width_Min20'] = tail_stat('bb_width', ROLL_LEN, np.min)
+        self.values = {k: vals[k] for k in INDICATOR_COLUMNS}
+
+    def _snapshot(self):
+        return {"state": self.state.copy(), "windows": {k: list(v) for k, v in self.windows.items()},
+                "obv_hist": list(self.obv_hist), "last_ts": self.last_ts, "values": dict(self.values)}
+
+    def _restore(self, snap):
+        self.state = np.array(snap["state"], dtype="float64")
+        self.windows = {k: deque(v, maxlen=self.WINDOW) for k, v in snap["windows"].items()}
+        self.obv_hist = deque(snap["obv_hist"], maxlen=SLOPE_LEN + 1)
+        self.last_ts = snap["last_ts"]; self.values = dict(snap["values"])
+
+    # --- Serialization (JSON ได้: list/float/str ล้วน) ---
+
+    def to_dict(self):
+        def pack(snap):
+            snap = dict(snap); snap["state"] = snap["state"].tolist()
+            snap["last_ts"] = str(snap["last_ts"]) if snap["last_ts"] is not None else None
+            return snap
+        return {"symbol": self.symbol, "interval": self.interval, "current": pack(self._snapshot()),
+                "undo": pack(self._undo) if self._undo is not None else None}
+
+    @classmethod
+    def from_dict(cls, data):
+        def unpack(snap):
+            snap = dict(snap)
+            snap["last_ts"] = pd.Timestamp(snap["last_ts"]) if snap["last_ts"] is not None else None
+            return snap
+        obj = cls(data.get("symbol", ""), data.get("interval", ""))
+        obj._restore(unpack(data["current"]))
+        obj._undo = unpack(data["undo"]) if data.get("undo") else None
+        if obj._undo is not None: obj._undo["state"] = np.array(obj._undo["state"], dtype="float64")
+        return obj
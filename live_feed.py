@@ -0,0 +1,110 @@
+import threading
+
+import numpy as np
+import pandas as pd
+
+from market_data import market_session, next_bar_time
+from providers import get_provider, make_quote
+from shared_cache import get_shared_cache
+
+# --- Live Feed: Quote ล่าสุดแบบเบา (ไม่ดึงแท่งทั้งชุด) สำหรับโหมด Live Watch + ตรวจว่ามีแท่งใหม่หรือยัง ---
+# แหล่ง Quote สลับได้ (Provider ของ Process / ReplayQuoteSource) ผ่าน set_quote_source() -> ทดสอบแบบ Offline ได้
+
+QUOTE_TTL = 5                  # วินาที: หลาย Session ดูหุ้นตัวเดียวกัน ใช้ Quote ก้อนเดียวกัน (ประหยัดโควตา Yahoo)
+LIVE_REFRESH_CHOICES = [5, 10, 30, 60]
+
+
+class ReplayQuoteSource:
+    """
+    Quote จากแท่ง OHLCV ในเครื่อง: เรียก quote() แต่ละครั้งเดินหน้า 1 Step (ทดสอบ/เดโม Live Watch แบบ Offline)
+    frames = {symbol: DataFrame OHLCV}, start = ตำแหน่งแท่งเริ่ม (ติดลบนับจากท้าย)
+    steps_per_bar = จำนวน Quote ต่อแท่ง (ราคาวิ่งจาก Open ไป Close ภายในแท่ง แล้วจึงขึ้นแท่งใหม่)
+    """
+
+    def __init__(self, frames, start=-1, steps_per_bar=1):
+        self.frames = {s.upper(): df for s, df in frames.items()}
+        self.start = start
+        self.steps_per_bar = max(1, int(steps_per_bar))
+        self._step = {}
+        self._lock = threading.Lock()
+
+    def quote(self, symbol):
+        symbol = symbol.upper()
+        df = self.frames[symbol]
+        n = len(df)
+        with self._lock:
+            step = self._step.get(symbol, 0); self._step[symbol] = step + 1
+        i = self.start % n + step // self.steps_per_bar
+        frac = (step % self.steps_per_bar + 1) / self.steps_per_bar
+        if i >= n: i, frac = n - 1, 1.0   # เล่นจบแล้ว -> ค้างที่ราคาปิดแท่งสุดท้าย
+        bar = df.iloc[i]
+        price = bar['Open'] + (bar['Close'] - bar['Open']) * frac
+        prev = df['Close'].iloc[i - 1] if i > 0 else np.nan
+        return make_quote(symbol, price, prev, bar['Open'], max(bar['Open'], price) if frac < 1 else bar['High'],
+                          min(bar['Open'], price) if frac < 1 else bar['Low'], ts=df.index[i], bar_ts=df.index[i])
+
+    def rewind(self, symbol=None):
+        with self._lock:
+            if symbol is None: self._step.clear()
+            else: self._step.pop(symbol.upper(), None)
+
+
+def is_new_bar(quote, last_bar_ts, interval):
+    """
+    Quote นี้อยู่ในแท่งที่ใหม่กว่าแท่งสุดท้ายของ df แล้วหรือยัง (ถึงเวลาคำนวณ Analysis หนักใหม่)
+    ลำดับที่เชื่อ: bar_ts (แหล่งรู้แท่ง) > market_ts (เวลาซื้อขายล่าสุด) > เวลาที่ดึง Quote
+    กรณีสุดท้ายนอกเวลาตลาดปกติถือว่าไม่มีแท่งใหม่ (ปฏิทินของ next_bar_time ไม่รู้ว่าตลาดปิด)
+    """
+    if quote is None or last_bar_ts is None: return False
+    last_bar_ts = pd.Timestamp(last_bar_ts)
+    if quote.get("bar_ts") is not None: return _align(quote["bar_ts"], last_bar_ts) > last_bar_ts
+    if quote.get("market_ts") is not None: return _align(quote["market_ts"], last_bar_ts) >= next_bar_time(last_bar_ts, interval)
+    if market_session(quote["ts"]) != "REGULAR": return False
+    return _align(quote["ts"], last_bar_ts) >= next_bar_time(last_bar_ts, interval)
+
+
+def _align(ts, ref):
+    """ทำให้ Timezone ของ ts ตรงกับ ref ก่อนเปรียบเทียบ"""
+    ts = pd.Timestamp(ts)
+    if ref.tz is None: return ts.tz_convert(None) if ts.tz is not None else ts
+    return ts.tz_convert(ref.tz) if ts.tz is not None else ts.tz_localize(ref.tz)
+
+
+def overlay_quote(info, quote):
+    """ทับ Quote สดลงบน info ของ load_market (ราคา/เปลี่ยนแปลง/กรอบวัน) คืน dict ใหม่"""
+    if quote is None: return info
+    live = dict(info)
+    live.update({"regularMarketPrice": quote["price"], "regularMarketChange": quote["change"],
+                 "regularMarketChangePercent": quote["change_pct"]})
+    for key, q in (("regularMarketOpen", "open"), ("dayHigh", "day_high"), ("dayLow", "day_low")):
+        if quote.get(q) is not None: live[key] = quote[q]
+    return live
+
+
+_default_source = None
+_source_lock = threading.Lock()
+
+def get_quote_source():
+    """แหล่ง Quote ของ Process (ค่าเริ่มต้น = Provider ของ Process เช่น yfinance / replay)"""
+    with _source_lock:
+        if _default_source is not None: return _default_source
+    return get_provider()
+
+
+def set_quote_source(source):
+    """สลับแหล่ง Quote (เช่น ReplayQuoteSource ตอนทดสอบ)"""
+    global _default_source
+    with _source_lock: _default_source = source
+
+
+def cached_quote(symbol, ttl=QUOTE_TTL, source=None, cache=None):
+    """
+    Quote ผ่านแคชกลาง อายุ ttl วินาที (ทุก Session/Replica ที่เปิดหุ้นเดียวกันยิง Upstream รอบละครั้ง
+    และทุก Panel ในรอบ Refresh เดียวกันเห็นราคาเดียวกัน)
+    """
+    source = source or get_quote_source()
+    cache = cache or get_shared_cache()
+    # แหล่งที่มีชื่อ (Provider) แยก Key กัน -> Quote จาก Replay ไม่ปนกับของจริงในแคชกลาง
+    name = getattr(source, "name", None)
+    key = f"quote:{name}:{symbol.upper()}" if name else f"quote:{symbol.upper()}"
+    return cache.get_or_compute(key, lambda: source.quote(symbol), ttl=ttl)
@@ -0,0 +1,475 @@
+import os
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from concurrent.futures import TimeoutError as FutureTimeout
+from datetime import datetime, timedelta
+
+import numpy as np
+import pandas as pd
+
+# --- Market Data: คลังข้อมูล OHLCV บนดิสก์ (Parquet ต่อ Symbol + Interval) ---
+
+STORE_DIR = os.environ.get("OHLCV_STORE_DIR", os.path.join(os.path.dirname(os.path.abspath(__file__)), ".ohlcv_store"))
+
+# ช่วงข้อมูลตั้งต้น (Cold Load) ของแต่ละ Interval
+PERIOD_BY_INTERVAL = {"1h": "730d", "1d": "5y", "1wk": "10y", "1mo": "10y"}
+
+# Yahoo ให้ข้อมูลรายชั่วโมงย้อนหลังได้ไม่เกิน 730 วัน (เผื่อขอบไว้ 1 วัน)
+INTRADAY_LIMIT = {"1h": timedelta(days=729)}
+
+PRICE_COLS = ["Open", "High", "Low", "Close"]
+
+# --- Fetch Planner: ดึงดิบให้น้อยที่สุด แล้วสร้าง TF อื่นจากข้อมูลรายวัน ---
+
+# Interval ที่ดึงจาก Yahoo ตรงๆ (1wk/1mo สร้างจาก 1d ด้วยการ Resample)
+RAW_PERIOD = {"1h": "730d", "1d": "10y"}
+
+# ช่วงข้อมูลที่ส่งให้ส่วนวิเคราะห์ (None = ใช้ทั้งหมดในคลัง)
+VIEW_PERIOD = {"1h": None, "1d": "5y", "1wk": "10y", "1mo": "10y"}
+
+# เพดานประวัติที่เก็บในคลังต่อ Interval (นับจากแท่งล่าสุด) กันไฟล์โตไม่สิ้นสุด ต้องไม่สั้นกว่า RAW_PERIOD/VIEW_PERIOD
+RETENTION_PERIOD = {"1h": "1095d", "1d": "12y", "1wk": "20y", "1mo": "20y"}
+
+RESAMPLE_RULE = {"1wk": "W-MON", "1mo": "MS"}
+
+# TF หลัก -> TF ใหญ่ที่ใช้ดูเทรนด์ (MTF)
+MTF_BY_TF = {"1h": "1d", "1d": "1wk", "1wk": "1mo"}
+
+# --- Concurrent Fetch: ยิงทุก Request ของการค้นหา 1 ครั้งพร้อมกัน (รอแค่ตัวที่ช้าที่สุด) ---
+FETCH_WORKERS = 8
+INFO_WORKERS = 4         # ticker.info แยก Pool: ตัวที่ค้างกินได้แค่ Pool ของ info ไม่แย่ง Worker ของแท่งเทียน
+HISTORY_TIMEOUT = 20.0   # วินาที ต่อชุดแท่งเทียน (นับตั้งแต่ Worker เริ่มทำ ไม่นับเวลารอคิว)
+INFO_TIMEOUT = 6.0       # ticker.info ช้าบ่อย และไม่จำเป็นต่อการวิเคราะห์ -> หมดเวลาก็ใช้ค่าว่าง
+
+OHLCV_AGG = {"Open": "first", "High": "max", "Low": "min", "Close": "last", "Volume": "sum", "Dividends": "sum", "Stock Splits": "sum"}
+
+# --- Compact Mode: เฟรมที่ถือไว้ต่อ Session/แคช เก็บแค่ OHLCV เป็น float32 ก้อนเดียว (ปิดด้วย COMPACT_MEMORY=0) ---
+# คำนวณ Indicator ยังเป็น float64 (analysis.compute_indicators แปลงกลับก่อนคำนวณ)
+COMPACT_MEMORY = os.environ.get("COMPACT_MEMORY", "1") != "0"
+OHLCV_COLS = PRICE_COLS + ["Volume"]
+COMPACT_DTYPE = "float32"
+
+
+class OHLCVStore:
+    """
+    คลังแท่งเทียนบนดิสก์: โหลดของเก่าจากไฟล์ แล้วดึงเฉพาะแท่งใหม่หลัง Timestamp ล่าสุดมาต่อท้าย
+    - แท่งสุดท้ายที่เก็บไว้จะถูกดึงซ้ำเสมอ (อาจเป็นแท่งที่ยังไม่ปิด)
+    - ถ้าราคาแท่งที่ซ้อนกันไม่ตรง (ปันผล/แตกพาร์ ทำให้ Yahoo ปรับราคาย้อนหลัง) จะโหลดใหม่ทั้งก้อนครั้งเดียว
+      แล้วจด Timestamp ของปันผล/แตกพาร์ที่ปรับแล้วไว้ใน attrs['adjusted_at'] (แท่งเดิมที่ยังดึงซ้ำจะไม่ทำให้โหลดใหม่อีก)
+    - ข้อมูลเก่ากว่าแท่งใหม่ได้ยังอยู่ในคลัง (เช่นรายชั่วโมงเกิน 730 วัน) แต่ตัดทิ้งที่ RETENTION_PERIOD
+    """
+
+    def __init__(self, root=STORE_DIR):
+        self.root = root
+
+    def path(self, symbol, interval):
+        safe_symbol = "".join(ch if ch.isalnum() or ch in "-_." else "_" for ch in symbol.upper())
+        return os.path.join(self.root, interval, f"{safe_symbol}.parquet")
+
+    def load(self, symbol, interval):
+        path = self.path(symbol, interval)
+        if not os.path.exists(path): return pd.DataFrame()
+        try: return pd.read_parquet(path)
+        except Exception: return pd.DataFrame()
+
+    def save(self, symbol, interval, df):
+        path = self.path(symbol, interval)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        # เขียนลงไฟล์ชั่วคราวก่อนแล้ว rename (กันไฟล์พังเวลาหลาย Session เขียนพร้อมกัน)
+        fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), suffix=".tmp")
+        os.close(fd)
+        try:
+            df.to_parquet(tmp_path)
+            os.replace(tmp_path, path)
+        except Exception:
+            if os.path.exists(tmp_path): os.remove(tmp_path)
+
+    def history(self, provider, symbol, interval, period=None):
+        period = period or PERIOD_BY_INTERVAL.get(interval, "5y")
+        stored = self.load(symbol, interval)
+        if stored.empty:
+            df = provider.history(symbol, interval, period=period)
+            if not df.empty:
+                df.attrs['period'] = period
+                self.save(symbol, interval, df)
+            return df
+
+        last_ts = stored.index[-1]
+        limit = INTRADAY_LIMIT.get(interval)
+        if limit is not None and _now_like(last_ts) - last_ts > limit:
+            # ช่องว่างเกินหน้าต่างของ Yahoo: ดึงใหม่เต็มช่วงแล้วต่อกับของเก่า
+            fresh = provider.history(symbol, interval, period=period)
+            merged = merge_bars(stored, fresh)
+        elif not covers_period(stored.attrs.get('period'), period):
+            # คลังเดิมโหลดมาสั้นกว่าที่ขอ (เช่น 5y -> 10y): โหลดเต็มช่วงครั้งเดียว
+            fresh = provider.history(symbol, interval, period=period)
+            merged = merge_bars(stored, fresh)
+        else:
+            delta = provider.history(symbol, interval, start=last_ts)
+            if delta.empty: return stored
+            adjusted_at = stored.attrs.get('adjusted_at')
+            if is_readjusted(stored, delta, adjusted_at):
+                fresh = provider.history(symbol, interval, period=period)
+                if fresh.empty: return stored
+                has_split = "Stock Splits" in fresh.columns and (fresh["Stock Splits"].fillna(0) != 0).any()
+                merged = merge_bars(rescale_bars(stored, adjustment_factor(stored, fresh), scale_volume=has_split), fresh)
+                adjusted_at = last_corporate_action(fresh) or adjusted_at
+            else:
+                merged = merge_bars(stored, delta)
+            if adjusted_at: merged.attrs['adjusted_at'] = adjusted_at
+
+        merged = slice_period(merged, RETENTION_PERIOD.get(interval))
+        merged.attrs['period'] = longest_period(stored.attrs.get('period'), period)
+        if not merged.equals(stored) or merged.attrs != stored.attrs: self.save(symbol, interval, merged)
+        return merged
+
+
+def merge_bars(old, new):
+    """ต่อแท่งใหม่เข้ากับของเก่า (Timestamp ซ้ำ ให้แท่งใหม่ชนะ)"""
+    if old.empty: return new
+    if new.empty: return old
+    new = new.reindex(columns=old.columns.union(new.columns, sort=False))
+    merged = pd.concat([old, new])
+    merged = merged[~merged.index.duplicated(keep="last")]
+    return merged.sort_index()
+
+
+def last_corporate_action(df, after=None):
+    """Timestamp (ข้อความ ISO เก็บใน attrs ได้) ของแท่งล่าสุดที่มีปันผล/แตกพาร์ หลัง after; ไม่มีคืน None"""
+    corp = [c for c in ("Dividends", "Stock Splits") if c in df.columns]
+    if not corp: return None
+    hits = df.index[(df[corp].fillna(0) != 0).any(axis=1).to_numpy()]
+    if after is not None: hits = hits[hits > pd.Timestamp(after)]
+    return hits[-1].isoformat() if len(hits) else None
+
+
+def is_readjusted(stored, delta, adjusted_at=None):
+    """
+    ตรวจว่า Yahoo ปรับราคาย้อนหลังหรือไม่ (มีปันผล/แตกพาร์ในแท่งใหม่ หรือราคาปิดของแท่งที่ปิดแล้วไม่ตรงกัน)
+    adjusted_at: ปันผล/แตกพาร์ที่ปรับคลังไปแล้ว (attrs['adjusted_at']) -> ไม่นับซ้ำ
+    """
+    if last_corporate_action(delta, after=adjusted_at): return True
+    # แท่งล่าสุดที่เก็บไว้อาจยังไม่ปิด จึงไม่เอามาเทียบ
+    overlap = stored.index[:-1].intersection(delta.index)
+    if len(overlap) == 0: return False
+    return adjustment_factor(stored.loc[overlap], delta.loc[overlap]) != 1.0
+
+
+def adjustment_factor(stored, fresh):
+    """อัตราส่วนราคาปิดระหว่างข้อมูลใหม่กับของเก่า ณ แท่งแรกที่ซ้อนกัน"""
+    overlap = stored.index.intersection(fresh.index)
+    if len(overlap) == 0: return 1.0
+    ts = overlap[0]
+    old_c = stored.loc[ts, "Close"]; new_c = fresh.loc[ts, "Close"]
+    if not old_c or np.isnan(old_c) or np.isnan(new_c): return 1.0
+    factor = float(new_c / old_c)
+    return factor if abs(factor - 1.0) > 1e-4 else 1.0
+
+
+def rescale_bars(df, factor, scale_volume=False):
+    """ปรับราคาแท่งเก่า (ที่ Yahoo ไม่ส่งมาแล้ว) ให้อยู่บนฐานเดียวกับข้อมูลที่ปรับแล้ว (Volume ปรับเฉพาะกรณีแตกพาร์)"""
+    out = df.copy()
+    cols = [c for c in PRICE_COLS if c in out.columns]
+    out[cols] = out[cols] * factor
+    if scale_volume and "Volume" in out.columns: out["Volume"] = out["Volume"] / factor
+    return out
+
+
+def raw_interval(interval):
+    return interval if interval in RAW_PERIOD else "1d"
+
+
+def plan_fetch(interval, mtf_interval):
+    """คืนชุด Interval ดิบที่ต้องดาวน์โหลดจริง (เช่น 1d+1wk -> ['1d'], 1h+1d -> ['1h', '1d'])"""
+    plan = []
+    # ข้อมูลรายวันต้องมีเสมอ (ใช้ทำ Quote 5 วัน + Safety Net รายวัน/รายสัปดาห์)
+    for itv in (interval, mtf_interval, "1d"):
+        raw = raw_interval(itv)
+        if raw not in plan: plan.append(raw)
+    return plan
+
+
+def resample_bars(df, interval):
+    """แปลงแท่งรายวันเป็นรายสัปดาห์/รายเดือน (Label = วันแรกของรอบ เหมือนของ Yahoo)"""
+    rule = RESAMPLE_RULE.get(interval)
+    if rule is None or df.empty: return df
+    agg = {c: f for c, f in OHLCV_AGG.items() if c in df.columns}
+    out = df.resample(rule, label="left", closed="left").agg(agg)
+    return out.dropna(subset=["Close"])
+
+
+def period_offset(period):
+    """แปลง period แบบ Yahoo (เช่น '5d', '2y', '730d', '6mo') เป็น DateOffset"""
+    if period.endswith("mo"): return pd.DateOffset(months=int(period[:-2]))
+    if period.endswith("y"): return pd.DateOffset(years=int(period[:-1]))
+    return pd.DateOffset(days=int(period[:-1]))
+
+
+def period_days(period):
+    return (pd.Timestamp("2000-01-01") + period_offset(period) - pd.Timestamp("2000-01-01")).days if period else 0
+
+
+def covers_period(stored_period, period):
+    return period_days(stored_period) >= period_days(period)
+
+
+def longest_period(a, b):
+    return a if period_days(a) >= period_days(b) else b
+
+
+def slice_period(df, period):
+    """ตัดข้อมูลให้เหลือช่วงล่าสุดตาม period ของ Yahoo (ตัดด้วย iloc -> เป็น View ใช้หน่วยความจำร่วมกับ df)"""
+    if df.empty or not period: return df
+    return df.iloc[df.index.searchsorted(df.index[-1] - period_offset(period), side="right"):]
+
+
+def derive_frame(raw_frames, interval, period=None):
+    df = raw_frames.get(raw_interval(interval), pd.DataFrame())
+    if interval not in RAW_PERIOD: df = resample_bars(df, interval)
+    return slice_period(df, period)
+
+
+def compact_frame(df, columns=OHLCV_COLS):
+    """
+    เหลือเฉพาะ columns (ทิ้ง Dividends/Stock Splits และคอลัมน์อื่นที่ไม่มีใครอ่าน) เป็น float32 Block เดียว
+    ตัดช่วงต่อด้วย slice_period จะได้ View ที่ใช้ Array และ Timestamp Index ร่วมกัน ไม่ Copy
+    """
+    if df is None: return df
+    cols = [c for c in columns if c in df.columns]
+    values = np.asarray(df[cols].to_numpy(dtype=COMPACT_DTYPE), order="C")
+    out = pd.DataFrame(values, index=df.index, columns=cols, copy=False)
+    out.attrs.update(df.attrs)
+    return out
+
+
+def frames_nbytes(*frames):
+    """
+    ขนาดจริง (ไบต์) ของหลาย DataFrame รวมกัน: Array ที่แชร์กันเป็น View (เช่น df กับ df_stats_day) นับครั้งเดียว
+    ต่างจาก memory_usage() ที่นับ View ซ้ำทุกเฟรม
+    """
+    seen = {}; extra = 0
+    def add(arr):
+        root = arr
+        while isinstance(root.base, np.ndarray): root = root.base
+        seen[id(root)] = root.nbytes
+    for df in frames:
+        if df is None: continue
+        idx = df.index
+        add(np.asarray(idx.asi8) if isinstance(idx, pd.DatetimeIndex) else np.asarray(idx))
+        for c in df.columns:
+            arr = df[c].to_numpy(copy=False) if df[c].dtype != object else None
+            if isinstance(arr, np.ndarray) and arr.dtype != object: add(arr)
+            else: extra += int(df[c].memory_usage(index=False, deep=True))
+    return sum(seen.values()) + extra
+
+
+class _TimedJob:
+    """งานใน Pool ที่จดเวลาตอน Worker หยิบไปทำ (Timeout นับจากตรงนี้ ไม่รวมเวลาต่อคิวหลัง Session อื่น)"""
+
+    def __init__(self, fn, *args):
+        self.fn = fn; self.args = args
+        self.started_at = None; self.started = threading.Event()
+
+    def __call__(self):
+        self.started_at = time.monotonic(); self.started.set()
+        return self.fn(*self.args)
+
+
+def _wait_job(fut, job, limit, submitted):
+    """
+    รอผลของงาน: ยังไม่ได้เริ่มภายใน limit หลังส่ง (Pool เต็มจากหลาย Session) -> ยกเลิกออกจากคิว
+    เริ่มแล้ว -> รอได้อีกเต็ม limit นับจากตอนเริ่ม (เวลาต่อคิวไม่กินเวลาของงาน)
+    หมดเวลาแล้ว fut.cancel() เสมอ (งานที่วิ่งอยู่ยกเลิกไม่ได้ แต่ที่ยังค้างในคิวจะไม่กิน Worker อีก)
+    """
+    if not job.started.wait(timeout=max(0.0, submitted + limit - time.monotonic())) and fut.cancel():
+        raise FutureTimeout()
+    job.started.wait()
+    try:
+        return fut.result(timeout=max(0.0, job.started_at + limit - time.monotonic()))
+    except FutureTimeout:
+        fut.cancel()
+        raise
+
+
+def fetch_raw(symbol, interval, mtf_interval, store=None, history_timeout=HISTORY_TIMEOUT, info_timeout=INFO_TIMEOUT,
+              provider=None):
+    """
+    ดาวน์โหลดดิบ 1-2 ชุด + info คืนค่า (raw_frames, raw_info, errors)
+    ทุก Request วิ่งพร้อมกันใน Thread Pool แต่ละตัวมี Timeout ของตัวเอง (นับจากตอน Worker เริ่มทำ; รอคิวได้อีกเท่ากัน)
+    ตัวไหนพัง/หมดเวลาจะได้ค่าว่าง
+    และถูกบันทึกไว้ใน errors (เช่น {'info': 'timeout'}) แทนที่จะทำให้ทั้งการค้นหาล้ม
+    provider: แหล่งข้อมูล (ค่าเริ่มต้น providers.get_provider()) ตัวที่ persist=False (Replay) ไม่ผ่านคลังบนดิสก์
+    """
+    from providers import get_provider  # providers import market_data -> import ตอนเรียกกัน Import วน
+    provider = provider or get_provider()
+    store = store or get_store()
+    pool = get_fetch_pool()
+    if provider.persist:
+        jobs = {raw: _TimedJob(store.history, provider, symbol, raw, RAW_PERIOD[raw]) for raw in plan_fetch(interval, mtf_interval)}
+    else:
+        jobs = {raw: _TimedJob(provider.history, symbol, raw, RAW_PERIOD[raw]) for raw in plan_fetch(interval, mtf_interval)}
+    jobs["info"] = _TimedJob(provider.fundamentals, symbol)
+    submitted = time.monotonic()
+    futures = {name: (get_info_pool() if name == "info" else pool).submit(job) for name, job in jobs.items()}
+
+    results, errors = {}, {}
+    for name, fut in futures.items():
+        limit = info_timeout if name == "info" else history_timeout
+        try:
+            results[name] = _wait_job(fut, jobs[name], limit, submitted)
+        except FutureTimeout:
+            errors[name] = "timeout"
+        except Exception as e:
+            errors[name] = str(e) or type(e).__name__
+
+    raw_frames = {raw: results.get(raw, pd.DataFrame()) for raw in jobs if raw != "info"}
+    return raw_frames, results.get("info") or {}, errors
+
+
+def bundle_from_raw(raw_frames, interval, mtf_interval, raw_info=None, errors=None, compact=COMPACT_MEMORY):
+    """
+    แยกชุดดิบเป็น df (TF หลัก), df_mtf, df_daily (Quote 5 วัน), df_stats_day (2y) และ df_stats_week (5y)
+    compact: ชุดดิบเหลือ OHLCV float32 แล้วทุกเฟรมเป็น View ของชุดดิบ/ชุดที่ Resample แล้ว (ไม่ Copy ซ้ำ)
+    """
+    if compact: raw_frames = {k: compact_frame(v) for k, v in raw_frames.items()}
+    resampled = {}
+    def view(tf, period=None):
+        # TF เดียวกัน Resample ครั้งเดียว (df_mtf 1wk กับ df_stats_week ใช้ชุดเดียวกัน)
+        if tf not in resampled:
+            frame = derive_frame(raw_frames, tf)
+            resampled[tf] = compact_frame(frame) if compact and tf not in RAW_PERIOD else frame
+        return slice_period(resampled[tf], period)
+    return {
+        "df": view(interval, VIEW_PERIOD.get(interval)),
+        "df_mtf": view(mtf_interval, "10y"),
+        "df_daily": view("1d").tail(5),
+        "df_stats_day": view("1d", "2y"),
+        "df_stats_week": view("1wk", "5y"),
+        "raw_info": raw_info or {},
+        "errors": errors or {},
+    }
+
+
+def fetch_bundle(symbol, interval, mtf_interval, store=None, history_timeout=HISTORY_TIMEOUT, info_timeout=INFO_TIMEOUT,
+                 compact=COMPACT_MEMORY, provider=None):
+    """ดึงข้อมูลทั้งหมดของการวิเคราะห์ 1 ครั้ง (fetch_raw + bundle_from_raw)"""
+    raw_frames, raw_info, errors = fetch_raw(symbol, interval, mtf_interval, store, history_timeout, info_timeout, provider)
+    return bundle_from_raw(raw_frames, interval, mtf_interval, raw_info, errors, compact)
+
+
+# --- Session-aware TTL: แคชอยู่ได้นานแค่ไหนตาม TF + สถานะตลาด + เวลาที่แท่งถัดไปจะเกิด ---
+
+EXCHANGE_TZ = "America/New_York"
+PRE_MARKET_OPEN = pd.Timedelta(hours=4)            # 04:00 เวลาตลาด (Yahoo เริ่มส่ง Pre-market)
+REGULAR_OPEN = pd.Timedelta(hours=9, minutes=30)
+REGULAR_CLOSE = pd.Timedelta(hours=16)
+POST_MARKET_CLOSE = pd.Timedelta(hours=20)
+
+# ตลาดเปิด: แท่งล่าสุดกำลังวิ่ง -> Quote ต้องสด (TF ใหญ่ขยับช้ากว่าในเชิงสัดส่วน ยืดได้)
+REGULAR_TTL = {"1h": 60, "1d": 60, "1wk": 300, "1mo": 900}
+# Pre/Post: แท่งปกติไม่ขยับ มีแค่ราคา Pre/Post จาก info
+EXTENDED_TTL = 300
+MIN_TTL = 30
+
+
+def next_session_open(now, tz=EXCHANGE_TZ, at=PRE_MARKET_OPEN):
+    """เวลาเปิดรอบถัดไป (วันทำการถัดไป เวลา at ของตลาด) ไม่รวมวันหยุดนักขัตฤกษ์ (วันหยุดจะได้ TTL สั้นลงแค่ 1 รอบ)"""
+    now = pd.Timestamp(now)
+    local = now.tz_convert(tz) if now.tzinfo else now.tz_localize(tz)
+    candidate = local.normalize() + at
+    if candidate <= local: candidate += pd.Timedelta(days=1)
+    while candidate.weekday() >= 5: candidate += pd.Timedelta(days=1)
+    return candidate
+
+
+def market_session(now=None, tz=EXCHANGE_TZ):
+    """สถานะตลาดจากนาฬิกา (REGULAR / PRE / POST / CLOSED) ใช้เมื่อแหล่งข้อมูลไม่บอก marketState (ไม่รู้วันหยุดนักขัตฤกษ์)"""
+    now = pd.Timestamp.now(tz=tz) if now is None else pd.Timestamp(now)
+    local = now.tz_convert(tz) if now.tzinfo else now.tz_localize(tz)
+    if local.weekday() >= 5: return "CLOSED"
+    t = local - local.normalize()
+    if REGULAR_OPEN <= t < REGULAR_CLOSE: return "REGULAR"
+    if PRE_MARKET_OPEN <= t < REGULAR_OPEN: return "PRE"
+    if REGULAR_CLOSE <= t < POST_MARKET_CLOSE: return "POST"
+    return "CLOSED"
+
+
+def next_bar_time(last_ts, interval):
+    """Timestamp ที่แท่งถัดจาก last_ts จะเริ่ม (ตามปฏิทิน ไม่รู้วันหยุด)"""
+    last_ts = pd.Timestamp(last_ts)
+    if interval == "1h": return last_ts + pd.Timedelta(hours=1)
+    if interval == "1d": return last_ts + pd.offsets.BDay(1)
+    if interval == "1wk": return last_ts + pd.Timedelta(weeks=1)
+    if interval == "1mo": return last_ts + pd.offsets.MonthBegin(1)
+    return last_ts + pd.Timedelta(days=1)
+
+
+# ระยะของแท่ง 1 แท่ง (Label = เวลาเริ่ม) -> เวลาปิด = Label + ระยะ
+BAR_SPAN = {"1h": pd.Timedelta(hours=1), "1d": pd.Timedelta(days=1), "1wk": pd.Timedelta(weeks=1), "1mo": pd.offsets.MonthBegin(1)}
+
+
+def bar_end_times(index, interval):
+    """เวลาปิดของทุกแท่งใน index (แท่งที่ปิดแล้ว ณ เวลา t คือแท่งที่เวลาปิด <= t)"""
+    return index + BAR_SPAN.get(interval, pd.Timedelta(days=1))
+
+
+def cache_ttl(interval, market_state, last_bar_ts=None, now=None, tz=None):
+    """
+    อายุแคช (วินาที) ของข้อมูล 1 ชุด:
+    - REGULAR: สั้นตาม TF แต่ไม่เกินเวลาที่แท่งใหม่จะเกิด (1h ใกล้ปิดแท่ง -> หมดอายุตรงแท่งใหม่พอดี)
+    - PRE/POST: แท่งไม่ขยับ เหลือแค่ Quote นอกเวลา
+    - CLOSED (กลางคืน/เสาร์-อาทิตย์): ไม่มีอะไรเปลี่ยนจนถึงรอบ Pre-market ถัดไป
+    """
+    tz = tz or EXCHANGE_TZ
+    now = pd.Timestamp.now(tz=tz) if now is None else pd.Timestamp(now)
+    if now.tzinfo is None: now = now.tz_localize(tz)
+    state = (market_state or "REGULAR").upper()
+
+    if state == "REGULAR":
+        ttl = REGULAR_TTL.get(interval, 60)
+        if last_bar_ts is not None:
+            nxt = pd.Timestamp(next_bar_time(last_bar_ts, interval))
+            if nxt.tzinfo is None: nxt = nxt.tz_localize(tz)
+            until_bar = (nxt - now).total_seconds()
+            if until_bar > 0: ttl = min(ttl, until_bar)
+    elif state in ("PRE", "PREPRE", "POST", "POSTPOST"):
+        ttl = EXTENDED_TTL
+        # Pre-market: หมดอายุตรงเวลาเปิดตลาดพอดี (แท่งปกติเริ่มวิ่ง)
+        open_at = now.tz_convert(tz).normalize() + REGULAR_OPEN
+        if state.startswith("PRE") and open_at > now: ttl = min(ttl, (open_at - now).total_seconds())
+    else:
+        ttl = (next_session_open(now, tz) - now).total_seconds()
+    return max(MIN_TTL, int(ttl))
+
+
+def _now_like(ts):
+    return pd.Timestamp.now(tz=ts.tz) if ts.tz is not None else pd.Timestamp(datetime.now())
+
+
+_default_store = None
+
+def get_store():
+    global _default_store
+    if _default_store is None: _default_store = OHLCVStore()
+    return _default_store
+
+
+_fetch_pool = None
+_info_pool = None
+_fetch_pool_lock = threading.Lock()
+
+def get_fetch_pool():
+    """Thread Pool ของ Process สำหรับ Network I/O (จำกัดจำนวน ไม่ให้หลาย Session ยิงพร้อมกันจนล้น)"""
+    global _fetch_pool
+    with _fetch_pool_lock:
+        if _fetch_pool is None: _fetch_pool = ThreadPoolExecutor(max_workers=FETCH_WORKERS, thread_name_prefix="fetch")
+        return _fetch_pool
+
+def get_info_pool():
+    """Pool แยกของ ticker.info / fundamentals (ค้างบ่อย) -> แท่งเทียนของการค้นหาอื่นไม่ต้องรอ"""
+    global _info_pool
+    with _fetch_pool_lock:
+        if _info_pool is None: _info_pool = ThreadPoolExecutor(max_workers=INFO_WORKERS, thread_name_prefix="fetch-info")
+        return _info_pool
@@ -0,0 +1,273 @@
+import itertools
+import multiprocessing
+import random
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import shared_memory
+
+import numpy as np
+import pandas as pd
+
+from analysis import SCORING_COLUMNS, SCORING_DEFAULTS, classify_candles, compute_indicators, demand_swings, score_bars, zone_hits
+from backtest import MAX_HOLD, OUTCOME_OPEN, WARMUP_BARS, resolve_trades
+from market_data import RAW_PERIOD, derive_frame, raw_interval
+from scanner import BATCH_SIZE, bulk_download
+
+# --- Parameter Sweep: จูนค่าคงที่ของกฎให้คะแนน (SCORING_DEFAULTS) ต่อตลาด ด้วย Walk-forward ---
+# Indicator / แท่งเทียน / Swing Low คำนวณครั้งเดียวใน Process หลัก แล้ววางใน Shared Memory 2 ก้อน
+# Worker ทุกตัว Attach แบบอ่านอย่างเดียว (ไม่ Pickle/Copy ข้อมูลต่อ Task) แล้วประเมินทีละชุดด้วย analysis.score_bars
+# python -m cli optimize AAPL MSFT NVDA --tf 1d --search random --samples 500 --folds 4
+
+# ค่าที่ลองของแต่ละพารามิเตอร์ (Grid เต็ม = 3^8 = 6,561 ชุด)
+DEFAULT_GRID = {
+    "ema200_weight": [2, 3, 4],
+    "rsi_overbought": [60, 65, 70],
+    "rsi_trap": [65, 70, 75],
+    "rsi_super": [70, 75, 80],
+    "atr_multiplier": [0.15, 0.25, 0.5],
+    "zone_buffer": [0.0, 0.015, 0.03],
+    "sl_atr": [1.5, 2.0, 3.0],
+    "tp_atr": [2.0, 3.0, 4.0],
+}
+
+# สัญญาณเข้าซื้อ = สถานะเขียว (คะแนน >= 4) เหมือนหน้าวิเคราะห์
+ENTRY_MIN_SCORE = 4
+# เทรดน้อยกว่านี้ (รวมทุก Fold นอกตัวอย่าง) ไม่จัดอันดับ (Expectancy จากไม่กี่เทรดเชื่อไม่ได้)
+MIN_TRADES = 30
+# จำนวนชุดต่อ Task ที่ส่งให้ Worker (ลด Overhead ของ IPC)
+TASK_CHUNK = 16
+# Timeline ของโซนที่จำไว้ต่อ Worker (ต่อหุ้น x atr_multiplier x zone_buffer)
+ZONE_MEMO_SIZE = 256
+
+BAR_COLUMNS = SCORING_COLUMNS + ['Open', 'Candle_Code', 'Segment']
+SWING_COLUMNS = ['pos', 'bottom', 'atr', 'end']
+
+
+def param_grid(grid=DEFAULT_GRID):
+    """ทุกชุดพารามิเตอร์ของ Grid (list ของ dict)"""
+    keys = list(grid)
+    return [dict(zip(keys, values)) for values in itertools.product(*(grid[k] for k in keys))]
+
+
+def random_configs(n, grid=DEFAULT_GRID, seed=None):
+    """สุ่ม n ชุดจาก Grid แบบไม่ซ้ำ (ใส่ชุดค่าเริ่มต้นไว้ด้วยเสมอ เพื่อเทียบ)"""
+    rng = random.Random(seed)
+    keys = list(grid)
+    total = int(np.prod([len(grid[k]) for k in keys]))
+    default = tuple(SCORING_DEFAULTS[k] for k in keys)
+    seen = {default} if all(SCORING_DEFAULTS[k] in grid[k] for k in keys) else set()
+    while len(seen) < min(n, total):
+        seen.add(tuple(rng.choice(grid[k]) for k in keys))
+    return [dict(zip(keys, values)) for values in seen]
+
+
+# --- Shared Data: เมทริกซ์ Indicator ของทั้ง Universe (คำนวณครั้งเดียว) ---
+
+def time_segments(frames, n_folds, warmup=WARMUP_BARS):
+    """แบ่งช่วงเวลาของทั้ง Universe (หลัง Warmup) เป็น n_folds + 1 ช่วงยาวเท่ากัน คืนค่าขอบเวลา (n_folds + 2 จุด)"""
+    starts = [df.index[min(warmup, len(df) - 1)] for df in frames.values()]
+    ends = [df.index[-1] for df in frames.values()]
+    lo, hi = min(starts), max(ends)
+    return [(lo + (hi - lo) * k / (n_folds + 1)).normalize() for k in range(n_folds + 2)]
+
+
+class SweepData:
+    """
+    Indicator ของทุกหุ้นเรียงต่อกันใน Shared Memory:
+    - bars: float64 [len(BAR_COLUMNS), แท่งรวม] (Segment = ช่วง Walk-forward ของแท่ง, -1 = Warmup)
+    - swings: float64 [4, Swing รวม] (ตำแหน่ง/ราคา/ATR/แท่งที่ปิดหลุด ของ Swing Low -> สร้างโซนได้ทุกความหนา)
+    layout = [(symbol, bar_start, bar_end, swing_start, swing_end)] ส่งให้ Worker (เล็ก Pickle ได้)
+    """
+
+    def __init__(self, frames, n_folds=4, warmup=WARMUP_BARS):
+        self.edges = time_segments(frames, n_folds, warmup)
+        self.n_segments = n_folds + 1
+        parts, swings, self.layout = [], [], []
+        bar_at = swing_at = 0
+        for symbol, df in frames.items():
+            ind, _, _, _ = compute_indicators(df.copy())
+            arrays = [ind[c].to_numpy(dtype="float64") if c in ind.columns else np.full(len(ind), np.nan) for c in SCORING_COLUMNS]
+            seg = pd.DatetimeIndex(self.edges[1:-1]).searchsorted(ind.index, side="right").astype("float64")
+            seg[:min(warmup, len(ind))] = -1
+            arrays += [ind['Open'].to_numpy(dtype="float64"), classify_candles(ind)['Candle_Code'].to_numpy(dtype="float64"), seg]
+            parts.append(np.vstack(arrays))
+            swings.append(np.vstack([np.asarray(x, dtype="float64") for x in demand_swings(ind)]))
+            self.layout.append((symbol, bar_at, bar_at + len(ind), swing_at, swing_at + swings[-1].shape[1]))
+            bar_at += len(ind); swing_at += swings[-1].shape[1]
+        self._bars = self._share(np.hstack(parts) if parts else np.zeros((len(BAR_COLUMNS), 0)))
+        self._swings = self._share(np.hstack(swings) if swings else np.zeros((len(SWING_COLUMNS), 0)))
+
+    @staticmethod
+    def _share(arr):
+        shm = shared_memory.SharedMemory(create=True, size=max(arr.nbytes, 1))
+        np.ndarray(arr.shape, dtype=arr.dtype, buffer=shm.buf)[:] = arr
+        return shm, arr.shape
+
+    @property
+    def spec(self):
+        """ข้อมูลที่ Worker ต้องใช้ Attach (ชื่อ Shared Memory + รูปร่าง + layout)"""
+        return {"bars": (self._bars[0].name, self._bars[1]), "swings": (self._swings[0].name, self._swings[1]),
+                "layout": self.layout, "n_segments": self.n_segments}
+
+    @property
+    def nbytes(self):
+        return self._bars[0].size + self._swings[0].size
+
+    def close(self):
+        for shm, _ in (self._bars, self._swings):
+            shm.close(); shm.unlink()
+
+    def __enter__(self): return self
+    def __exit__(self, *exc): self.close()
+
+
+# --- Worker: Attach ครั้งเดียวตอนเริ่ม Process แล้วประเมินชุดพารามิเตอร์ทีละก้อน ---
+
+_worker = {}
+
+def _attach(name, shape):
+    # Worker แบบ spawn ใช้ resource_tracker ตัวเดียวกับ Process หลัก -> Segment ถูก unlink ครั้งเดียวตอน SweepData.close()
+    shm = shared_memory.SharedMemory(name=name)
+    arr = np.ndarray(shape, dtype="float64", buffer=shm.buf)
+    arr.flags.writeable = False
+    return shm, arr
+
+
+def _init_worker(spec, max_hold, min_score):
+    bars_shm, bars = _attach(*spec["bars"])
+    swings_shm, swings = _attach(*spec["swings"])
+    col = {c: i for i, c in enumerate(BAR_COLUMNS)}
+    symbols = []
+    for symbol, b0, b1, s0, s1 in spec["layout"]:
+        view = bars[:, b0:b1]   # View ของ Shared Memory (ไม่ Copy)
+        symbols.append({
+            "symbol": symbol, "arrays": {c: view[col[c]] for c in SCORING_COLUMNS},
+            "open": view[col['Open']], "code": view[col['Candle_Code']].astype(np.int8),
+            "segment": view[col['Segment']].astype(np.int64),
+            "swings": (swings[0, s0:s1].astype(np.int64), swings[1, s0:s1], swings[2, s0:s1], swings[3, s0:s1].astype(np.int64)),
+        })
+    _worker.update(shm=(bars_shm, swings_shm), symbols=symbols, n_segments=spec["n_segments"],
+                   max_hold=max_hold, min_score=min_score, zones={})
+
+
+def _zones(i, sym, atr_multiplier, zone_buffer):
+    """Timeline ของโซน ต่อ (หุ้น, ความหนา, Buffer) จำไว้ใน Worker (Grid มีค่าซ้ำกันมาก)"""
+    memo = _worker["zones"]; key = (i, atr_multiplier, zone_buffer)
+    if key not in memo:
+        if len(memo) >= ZONE_MEMO_SIZE: memo.pop(next(iter(memo)))
+        pos, bottoms, atr, ends = sym["swings"]
+        a = sym["arrays"]
+        memo[key] = zone_hits(a['Low'], a['High'], a['Close'], pos, bottoms, bottoms + atr * atr_multiplier, ends, zone_buffer)
+    return memo[key]
+
+
+def evaluate(params):
+    """
+    ประเมิน 1 ชุดพารามิเตอร์บนทุกหุ้น คืนค่า float64 [n_segments, 3] = (จำนวนเทรด, ผลรวม %Return, จำนวนเทรดที่กำไร) ต่อช่วง
+    เทรดที่ออกคนละช่วงกับที่เข้า และเทรดที่ข้อมูลหมดก่อนรู้ผล (Open) ไม่นับ (Purge: ไม่ให้ผลของช่วงหนึ่งรั่วไปอีกช่วง)
+    """
+    p = {**SCORING_DEFAULTS, **params}
+    n_seg = _worker["n_segments"]
+    stats = np.zeros((n_seg, 3))
+    for i, sym in enumerate(_worker["symbols"]):
+        a = sym["arrays"]; close = a['Close']; n = len(close)
+        if n < 2: continue
+        in_zone, zone_bottom = _zones(i, sym, p['atr_multiplier'], p['zone_buffer'])
+        r = score_bars(a, sym["code"], in_zone, zone_bottom, p)
+        sl, tp = r['sl'], r['tp']
+        seg = sym["segment"]
+        with np.errstate(invalid="ignore"):
+            mask = (r['score'] >= _worker["min_score"]) & (seg >= 0) & (sl < close) & (tp > close)
+        mask[-1] = False
+        entry = np.flatnonzero(mask)
+        if len(entry) == 0: continue
+        exit_idx, exit_price, outcome = resolve_trades(sym["open"], a['High'], a['Low'], close, entry, sl[entry], tp[entry],
+                                                       max_hold=_worker["max_hold"])
+        keep = (seg[exit_idx] == seg[entry]) & (outcome != OUTCOME_OPEN)
+        ret = (exit_price[keep] / close[entry][keep] - 1) * 100
+        s = seg[entry][keep]
+        stats[:, 0] += np.bincount(s, minlength=n_seg)
+        stats[:, 1] += np.bincount(s, weights=ret, minlength=n_seg)
+        stats[:, 2] += np.bincount(s, weights=(ret > 0).astype("float64"), minlength=n_seg)
+    return stats
+
+
+def _evaluate_chunk(chunk):
+    return [evaluate(params) for params in chunk]
+
+
+# --- Sweep + Walk-forward Ranking ---
+
+def sweep(data, configs, max_workers=None, max_hold=MAX_HOLD, min_score=ENTRY_MIN_SCORE):
+    """ประเมินทุกชุดใน Process Pool (Worker Attach Shared Memory ของ data) คืนค่า float64 [ชุด, ช่วง, 3]"""
+    chunks = [configs[i:i + TASK_CHUNK] for i in range(0, len(configs), TASK_CHUNK)]
+    ctx = multiprocessing.get_context("spawn")
+    with ProcessPoolExecutor(max_workers=max_workers, mp_context=ctx, initializer=_init_worker,
+                             initargs=(data.spec, max_hold, min_score)) as pool:
+        results = [stats for part in pool.map(_evaluate_chunk, chunks) for stats in part]
+    return np.array(results).reshape(len(configs), data.n_segments, 3)
+
+
+def _expectancy(trades, total):
+    return np.divide(total, trades, out=np.full(np.shape(total), np.nan), where=np.asarray(trades) > 0)
+
+
+def rank_configs(configs, stats, min_trades=MIN_TRADES):
+    """
+    Walk-forward แบบ Anchored: Fold f = เรียนรู้ช่วง 0..f-1, ทดสอบช่วง f (f = 1..n_folds)
+    จัดอันดับด้วย Expectancy นอกตัวอย่าง (รวมทุกช่วงทดสอบ) คืนค่า DataFrame (อันดับ 1 = ดีที่สุด)
+    """
+    trades, total, wins = stats[..., 0], stats[..., 1], stats[..., 2]
+    oos_t = trades[:, 1:].sum(axis=1); oos_r = total[:, 1:].sum(axis=1)
+    fold_exp = _expectancy(trades[:, 1:], total[:, 1:])
+    table = pd.DataFrame(configs)
+    table["OOS Trades"] = oos_t.astype(int)
+    table["OOS Expectancy %"] = _expectancy(oos_t, oos_r)
+    table["OOS Win %"] = _expectancy(oos_t, wins[:, 1:].sum(axis=1)) * 100
+    table["IS Expectancy %"] = _expectancy(trades[:, 0], total[:, 0])   # ช่วงแรก (ไม่เคยเป็นช่วงทดสอบ)
+    table["Positive Folds"] = (fold_exp > 0).sum(axis=1)
+    table["Worst Fold %"] = np.nanmin(np.where(np.isnan(fold_exp), np.inf, fold_exp), axis=1)
+    table.loc[np.isinf(table["Worst Fold %"]), "Worst Fold %"] = np.nan
+    table["Is Default"] = [all(c.get(k) == v for k, v in SCORING_DEFAULTS.items() if k in c) for c in configs]
+    ranked = table[table["OOS Trades"] >= min_trades].sort_values(
+        ["OOS Expectancy %", "Positive Folds"], ascending=False)
+    return pd.concat([ranked, table.drop(ranked.index)]).reset_index(drop=True)
+
+
+def walk_forward(configs, stats, edges, min_trades=MIN_TRADES):
+    """
+    เลือกชุดที่ดีที่สุดจากช่วงเรียนรู้ของแต่ละ Fold แล้ววัดผลในช่วงทดสอบถัดไป (จำลองการจูนใหม่เป็นรอบๆ)
+    คืนค่า DataFrame 1 แถวต่อ Fold
+    """
+    trades, total = stats[..., 0], stats[..., 1]
+    rows = []
+    for f in range(1, stats.shape[1]):
+        is_t = trades[:, :f].sum(axis=1); is_exp = _expectancy(is_t, total[:, :f].sum(axis=1))
+        is_exp = np.where(is_t >= min_trades, is_exp, np.nan)
+        if np.isnan(is_exp).all(): continue
+        best = int(np.nanargmax(is_exp))
+        rows.append({"Fold": f, "Test Start": edges[f].date().isoformat(), "Test End": edges[f + 1].date().isoformat(), **configs[best],
+                     "IS Expectancy %": is_exp[best], "OOS Trades": int(trades[best, f]),
+                     "OOS Expectancy %": float(_expectancy(trades[best, f], total[best, f]))})
+    return pd.DataFrame(rows)
+
+
+def optimize_frames(frames, configs=None, n_folds=4, max_workers=None, max_hold=MAX_HOLD, min_trades=MIN_TRADES):
+    """Sweep บน {symbol: DataFrame OHLCV} คืนค่า (ranking, walk_forward)"""
+    configs = configs if configs is not None else param_grid()
+    frames = {s: df for s, df in frames.items() if df is not None and len(df) > WARMUP_BARS + 20}
+    if not frames or not configs: return rank_configs(configs or [], np.zeros((len(configs or []), n_folds + 1, 3))), pd.DataFrame()
+    with SweepData(frames, n_folds) as data:
+        stats = sweep(data, configs, max_workers, max_hold)
+        return rank_configs(configs, stats, min_trades), walk_forward(configs, stats, data.edges, min_trades)
+
+
+def optimize_universe(symbols, interval="1d", search="grid", samples=500, seed=None, n_folds=4,
+                      max_workers=None, batch_size=BATCH_SIZE, max_hold=MAX_HOLD, min_trades=MIN_TRADES):
+    """ดาวน์โหลดทั้งรายชื่อแบบ Batch (ผ่าน Provider) แล้ว Sweep แบบ grid หรือ random (samples ชุด)"""
+    raw = raw_interval(interval)
+    frames = {}
+    for i in range(0, len(symbols), batch_size):
+        got = bulk_download(symbols[i:i + batch_size], raw, RAW_PERIOD[raw])
+        frames.update({sym: derive_frame({raw: df}, interval) for sym, df in got.items()})
+    configs = random_configs(samples, seed=seed) if search == "random" else param_grid()
+    return optimize_frames(frames, configs, n_folds, max_workers, max_hold, min_trades)
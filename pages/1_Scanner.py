@@ -0,0 +1,72 @@
+import streamlit as st
+
+from scanner import parse_watchlist, scan_watchlist, results_frame
+from sheets_writer import get_writer, scan_row
+from history_store import entry_from_scan, get_history_store
+
+# --- 1. ตั้งค่าหน้าเว็บ (Scanner Mode) ---
+st.set_page_config(page_title="AI Stock Scanner (God Mode)", page_icon="🔭", layout="wide")
+
+if 'scan_results' not in st.session_state:
+    st.session_state['scan_results'] = []
+
+st.markdown("<h1 style='text-align: center;'>🔭 Watchlist Scanner<br><span style='font-size: 1.5rem; opacity: 0.7;'>God Mode ทั้งพอร์ตในคลิกเดียว</span></h1>", unsafe_allow_html=True)
+
+# --- Form Watchlist ---
+with st.form(key='scan_form'):
+    watchlist_raw = st.text_area("รายชื่อหุ้น (คั่นด้วย , หรือขึ้นบรรทัดใหม่)", value="", height=150)
+    c1, c2 = st.columns([3, 1])
+    with c1:
+        timeframe = st.selectbox("Timeframe:", ["1h (รายชั่วโมง)", "1d (รายวัน)", "1wk (รายสัปดาห์)"], index=1)
+        if "1wk" in timeframe: tf_code = "1wk"
+        elif "1h" in timeframe: tf_code = "1h"
+        else: tf_code = "1d"
+    with c2:
+        max_workers = st.number_input("Workers", min_value=1, max_value=64, value=8)
+    scan_btn = st.form_submit_button("🚀 สแกนทั้งหมด")
+
+column_config = {
+    "Score": st.column_config.NumberColumn("Score", help="คะแนน God Mode"),
+    "SL": st.column_config.NumberColumn("Stop Loss", format="%.2f"),
+    "TP": st.column_config.NumberColumn("Take Profit", format="%.2f"),
+    "Price": st.column_config.NumberColumn("Price", format="%.2f"),
+    "In Demand Zone": st.column_config.CheckboxColumn("In Zone"),
+    "Squeeze": st.column_config.CheckboxColumn("Squeeze"),
+}
+
+table_slot = st.empty()
+
+if scan_btn:
+    symbols = parse_watchlist(watchlist_raw)
+    if not symbols:
+        st.error("กรุณาใส่รายชื่อหุ้นอย่างน้อย 1 ตัว")
+    else:
+        rows = []
+        progress = st.progress(0.0, text=f"กำลังสแกน 0/{len(symbols)}")
+        for row in scan_watchlist(symbols, tf_code, max_workers=int(max_workers)):
+            rows.append(row)
+            progress.progress(len(rows) / len(symbols), text=f"กำลังสแกน {len(rows)}/{len(symbols)} ({row['Symbol']})")
+            # วาดตารางใหม่ทุก 10 ตัว (กันหน้าเว็บกระพริบ)
+            if len(rows) % 10 == 0: table_slot.dataframe(results_frame(rows), use_container_width=True, hide_index=True, column_config=column_config)
+        progress.empty()
+        st.session_state['scan_results'] = rows
+        st.session_state['scan_tf'] = tf_code
+        # เก็บผลสแกนลงคลังประวัติในครั้งเดียว (1 Transaction)
+        try: get_history_store().record_many([entry_from_scan(r, tf_code) for r in rows if not r.get("Error")])
+        except Exception: pass
+
+if st.session_state['scan_results']:
+    table_slot.dataframe(results_frame(st.session_state['scan_results']), use_container_width=True, hide_index=True, column_config=column_config)
+
+    # บันทึกผลทั้งตารางเข้า Sheet ทีเดียว (เข้าคิว ส่งเป็นก้อนด้วย append_rows ไม่ยิงทีละแถว)
+    if st.button("💾 บันทึกผลสแกนทั้งหมดลง Sheet", type="primary"):
+        ok_rows = [r for r in st.session_state['scan_results'] if not r.get("Error")]
+        # ไม่มี secrets.toml -> st.secrets โยน StreamlitSecretNotFoundError (ครอบ try เหมือน save_to_gsheet ใน app.py)
+        try: creds = st.secrets["gcp_service_account"] if "gcp_service_account" in st.secrets else None
+        except Exception: creds = None
+        if creds is None:
+            st.error("บันทึกไม่สำเร็จ โปรดตรวจสอบการตั้งค่า gcp_service_account ใน Secrets")
+        elif ok_rows:
+            tf = st.session_state.get('scan_tf', tf_code)
+            get_writer(creds).submit_many([scan_row(r, tf) for r in ok_rows])
+            st.toast(f"✅ เข้าคิวบันทึก {len(ok_rows)} ตัวเรียบร้อย!", icon="☁️")
@@ -0,0 +1,222 @@
+import json
+import os
+import random
+import threading
+import time
+
+import numpy as np
+import pandas as pd
+
+from market_data import EXCHANGE_TZ, RAW_PERIOD, RESAMPLE_RULE, resample_bars, slice_period
+from startup import lazy_import
+
+# yfinance โหลดจริงตอนดึงข้อมูลครั้งแรก (ลดเวลา Start ของแอป/CLI ที่ยังไม่ต้องใช้เน็ต)
+yf = lazy_import("yfinance")
+
+# --- Market Data Providers: แหล่งข้อมูลสลับได้ (history / batch_history / quote / fundamentals) ---
+# ทุกที่ที่ดึงข้อมูล (market_data.fetch_raw, scanner, live_feed) เรียกผ่าน get_provider()
+# เลือกด้วย MARKET_DATA_PROVIDER=yfinance|replay (replay อ่านไฟล์จาก REPLAY_DIR, ตัดเวลาด้วย REPLAY_AS_OF,
+# หน่วงเวลาด้วย REPLAY_LATENCY/REPLAY_JITTER วินาที) หรือ set_provider() ตอนทดสอบ
+
+REPLAY_DIR = os.environ.get("REPLAY_DIR", os.path.join(os.path.dirname(os.path.abspath(__file__)), ".ohlcv_store"))
+
+
+def make_quote(symbol, price, prev_close=None, open_=None, day_high=None, day_low=None, ts=None, bar_ts=None, market_ts=None):
+    """
+    Quote 1 ก้อน (dict): ราคาล่าสุด + เปลี่ยนแปลงจากวันก่อน + กรอบวัน
+    bar_ts = เวลาเริ่มของแท่งที่ Quote นี้อยู่ (ถ้าแหล่งรู้ เช่น Replay) ใช้ตัดสินแท่งใหม่แทน ts
+    market_ts = เวลาซื้อขายล่าสุดของราคานี้ (ถ้าแหล่งรู้) นอกเวลาตลาดค้างที่เวลาปิด -> ไม่เกิดแท่งใหม่ปลอม
+    """
+    price = float(price)
+    prev = float(prev_close) if prev_close is not None and not pd.isna(prev_close) else np.nan
+    chg = price - prev if not np.isnan(prev) else 0.0
+    num = lambda v: float(v) if v is not None and not pd.isna(v) else None
+    return {
+        "symbol": symbol, "price": price, "change": chg, "change_pct": chg / prev if prev else 0.0,
+        "open": num(open_), "day_high": num(day_high), "day_low": num(day_low),
+        "ts": pd.Timestamp(ts) if ts is not None else pd.Timestamp.now(tz="UTC"),
+        "bar_ts": pd.Timestamp(bar_ts) if bar_ts is not None else None,
+        "market_ts": pd.Timestamp(market_ts) if market_ts is not None else None,
+    }
+
+
+def market_time(ticker, tz="UTC"):
+    """เวลาซื้อขายล่าสุด (regularMarketTime) จาก History Metadata ของ yfinance (Epoch หรือ Timestamp ตามเวอร์ชัน) ไม่มี = None"""
+    try: value = (ticker.get_history_metadata() or {}).get("regularMarketTime")
+    except Exception: return None
+    if value is None: return None
+    ts = pd.Timestamp(int(value), unit="s", tz="UTC") if isinstance(value, (int, float, np.integer)) else pd.Timestamp(value)
+    return (ts if ts.tzinfo else ts.tz_localize("UTC")).tz_convert(tz)
+
+
+class YFinanceProvider:
+    """ข้อมูลจาก Yahoo Finance ผ่าน yfinance (persist: แท่งเทียนเก็บลงคลัง OHLCVStore + Delta Fetch ได้)"""
+
+    name = "yfinance"
+    persist = True
+
+    def history(self, symbol, interval, period=None, start=None):
+        ticker = yf.Ticker(symbol)
+        if start is not None: return ticker.history(start=start, interval=interval)
+        return ticker.history(period=period, interval=interval)
+
+    def batch_history(self, symbols, interval, period):
+        """yf.download ทีเดียวทั้ง Batch คืนค่า {symbol: DataFrame} (ตัวที่ไม่มีข้อมูลไม่อยู่ใน dict)"""
+        frames = {}
+        try:
+            data = yf.download(symbols, period=period, interval=interval, group_by="ticker",
+                               auto_adjust=True, threads=True, progress=False)
+        except Exception:
+            return frames
+        if data is None or data.empty: return frames
+        for sym in symbols:
+            if isinstance(data.columns, pd.MultiIndex):
+                if sym not in data.columns.get_level_values(0): continue
+                sub = data[sym]
+            else:
+                sub = data
+            sub = sub.dropna(subset=["Close"])
+            if not sub.empty: frames[sym] = sub
+        return frames
+
+    def quote(self, symbol):
+        """Quote จาก fast_info (เบากว่า .info และ .history หลายเท่า) + เวลาซื้อขายล่าสุดจาก Metadata ที่ fast_info ดึงมาแล้ว"""
+        ticker = yf.Ticker(symbol)
+        fi = ticker.fast_info
+        tz = fi.get("timezone") or "UTC"
+        price = fi["lastPrice"]
+        return make_quote(symbol, price, fi.get("previousClose"), fi.get("open"), fi.get("dayHigh"), fi.get("dayLow"),
+                          ts=pd.Timestamp.now(tz=tz), market_ts=market_time(ticker, tz))
+
+    def fundamentals(self, symbol):
+        return yf.Ticker(symbol).info or {}
+
+
+class ReplayProvider:
+    """
+    ข้อมูลจากไฟล์ในเครื่อง (Parquet/CSV) แทน Yahoo -> รันซ้ำได้ผลเดิม ใช้ทำ Load Test / Benchmark แบบ Offline
+    - ไฟล์: {root}/{interval}/{SYMBOL}.parquet|.csv (โครงเดียวกับ OHLCVStore ชี้ไปที่ .ohlcv_store ได้เลย)
+      หรือ {root}/{SYMBOL}_{interval}.parquet|.csv / 1wk, 1mo ไม่มีไฟล์จะ Resample จาก 1d
+    - as_of: ทิ้งแท่งหลังเวลานี้ (เหมือนย้อนเวลากลับไปวันนั้น) Quote = ราคาปิดแท่งสุดท้ายก่อน as_of
+    - latency + jitter: หน่วงเวลาต่อ Request (วินาที) จำลองเครือข่าย
+    - fundamentals: {root}/fundamentals.json ({symbol: info}) ถ้ามี
+    """
+
+    persist = False
+
+    def __init__(self, root=REPLAY_DIR, as_of=None, latency=0.0, jitter=0.0, seed=None):
+        self.root = root
+        self.as_of = pd.Timestamp(as_of) if as_of is not None else None
+        self.latency = float(latency)
+        self.jitter = float(jitter)
+        self._rng = random.Random(seed)
+        self._frames = {}
+        self._fundamentals = None
+        self._lock = threading.Lock()
+
+    @property
+    def name(self):
+        return f"replay:{self.as_of.isoformat()}" if self.as_of is not None else "replay"
+
+    def _sleep(self):
+        if self.latency or self.jitter:
+            with self._lock: extra = self._rng.uniform(0, self.jitter) if self.jitter else 0.0
+            time.sleep(self.latency + extra)
+
+    def _path(self, symbol, interval):
+        safe = "".join(ch if ch.isalnum() or ch in "-_." else "_" for ch in symbol.upper())
+        for path in (os.path.join(self.root, interval, safe), os.path.join(self.root, f"{safe}_{interval}")):
+            for ext in (".parquet", ".csv"):
+                if os.path.exists(path + ext): return path + ext
+        return None
+
+    def _read(self, path):
+        if path.endswith(".parquet"): df = pd.read_parquet(path)
+        else:
+            df = pd.read_csv(path, index_col=0)
+            # CSV จาก to_csv เก็บ Offset ต่อแถว (EST/EDT สลับกัน) -> อ่านเป็น UTC แล้วแปลงกลับเป็นเวลาตลาด
+            has_tz = df.index.astype(str).str.contains(r"(?:[+-]\d\d:\d\d|Z)$").any()
+            df.index = pd.to_datetime(df.index, utc=True).tz_convert(EXCHANGE_TZ) if has_tz else pd.to_datetime(df.index)
+        return df.sort_index()
+
+    def _load(self, symbol, interval):
+        key = (symbol.upper(), interval)
+        with self._lock:
+            if key in self._frames: return self._frames[key]
+        path = self._path(symbol, interval)
+        if path is not None: df = self._read(path)
+        elif interval in RESAMPLE_RULE and self._path(symbol, "1d") is not None: df = resample_bars(self._load(symbol, "1d"), interval)
+        else: df = pd.DataFrame()
+        df = self._cut(df)
+        with self._lock: self._frames[key] = df
+        return df
+
+    def _cut(self, df):
+        if self.as_of is None or df.empty: return df
+        as_of = self.as_of
+        if df.index.tz is not None: as_of = as_of.tz_convert(df.index.tz) if as_of.tz is not None else as_of.tz_localize(df.index.tz)
+        elif as_of.tz is not None: as_of = as_of.tz_convert(None)
+        return df.iloc[:df.index.searchsorted(as_of, side="right")]
+
+    # --- Provider API ---
+    def history(self, symbol, interval, period=None, start=None):
+        self._sleep()
+        df = self._load(symbol, interval)
+        if df.empty: return df
+        if start is not None:
+            start = pd.Timestamp(start)
+            if df.index.tz is not None and start.tz is None: start = start.tz_localize(df.index.tz)
+            return df.iloc[df.index.searchsorted(start, side="left"):]
+        return slice_period(df, period or RAW_PERIOD.get(interval))
+
+    def batch_history(self, symbols, interval, period):
+        self._sleep()  # ทั้ง Batch = 1 Request
+        frames = {}
+        for sym in symbols:
+            df = slice_period(self._load(sym, interval), period)
+            if not df.empty: frames[sym] = df
+        return frames
+
+    def quote(self, symbol):
+        self._sleep()
+        df = self._load(symbol, "1d")
+        if df.empty: raise KeyError(f"replay: ไม่มีข้อมูล {symbol}")
+        last = df.iloc[-1]
+        prev = df['Close'].iloc[-2] if len(df) >= 2 else None
+        return make_quote(symbol, last['Close'], prev, last['Open'], last['High'], last['Low'],
+                          ts=self.as_of if self.as_of is not None else df.index[-1], bar_ts=df.index[-1])
+
+    def fundamentals(self, symbol):
+        self._sleep()
+        if self._fundamentals is None:
+            path = os.path.join(self.root, "fundamentals.json")
+            try:
+                with open(path, encoding="utf-8") as f: self._fundamentals = {k.upper(): v for k, v in json.load(f).items()}
+            except (OSError, ValueError):
+                self._fundamentals = {}
+        return dict(self._fundamentals.get(symbol.upper(), {"longName": symbol.upper(), "marketState": "CLOSED"}))
+
+
+def provider_from_env():
+    kind = os.environ.get("MARKET_DATA_PROVIDER", "yfinance")
+    if kind == "replay":
+        return ReplayProvider(os.environ.get("REPLAY_DIR", REPLAY_DIR), as_of=os.environ.get("REPLAY_AS_OF") or None,
+                              latency=float(os.environ.get("REPLAY_LATENCY", "0")), jitter=float(os.environ.get("REPLAY_JITTER", "0")))
+    return YFinanceProvider()
+
+
+_default_provider = None
+_provider_lock = threading.Lock()
+
+def get_provider():
+    """Provider ของ Process (ค่าเริ่มต้นตาม MARKET_DATA_PROVIDER)"""
+    global _default_provider
+    with _provider_lock:
+        if _default_provider is None: _default_provider = provider_from_env()
+        return _default_provider
+
+
+def set_provider(provider):
+    """สลับ Provider (เช่น ReplayProvider ตอนทดสอบ/Load Test)"""
+    global _default_provider
+    with _provider_lock: _default_provider = provider
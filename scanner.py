@@ -0,0 +1,79 @@
+import multiprocessing
+import re
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import numpy as np
+import pandas as pd
+
+from analysis import analyze_frame
+from market_data import MTF_BY_TF, RAW_PERIOD, VIEW_PERIOD, derive_frame, plan_fetch
+from providers import get_provider
+
+# --- Watchlist Scanner: ดาวน์โหลดแบบ Batch + วิเคราะห์ขนานใน Process Pool ---
+
+BATCH_SIZE = 100
+
+
+def parse_watchlist(text):
+    """แยกรายชื่อหุ้นจากข้อความ (คั่นด้วย , เว้นวรรค หรือขึ้นบรรทัดใหม่) ตัดตัวซ้ำ คงลำดับเดิม"""
+    symbols = [s.strip().upper() for s in re.split(r"[,\s;]+", text or "") if s.strip()]
+    return list(dict.fromkeys(symbols))
+
+
+def bulk_download(symbols, interval, period, provider=None):
+    """ดาวน์โหลดทีเดียวทั้ง Batch ผ่าน Provider คืนค่า {symbol: DataFrame}"""
+    return (provider or get_provider()).batch_history(symbols, interval, period)
+
+
+def scan_symbol(symbol, raw_frames, interval, mtf_interval):
+    """งานของ Worker: Indicator -> Zones -> God Mode Brain ของหุ้น 1 ตัว คืนค่าแถวสรุปผล"""
+    try:
+        df = derive_frame(raw_frames, interval, VIEW_PERIOD.get(interval))
+        df_mtf = derive_frame(raw_frames, mtf_interval, "10y")
+        ctx = analyze_frame(df.copy(), df_mtf.copy())
+    except Exception as e:
+        return {"Symbol": symbol, "Error": str(e)}
+    if ctx is None: return {"Symbol": symbol, "Error": "ข้อมูลไม่พอ (ต้องมีมากกว่า 20 แท่ง)"}
+    report = ctx['ai_report']
+    return {
+        "Symbol": symbol, "Price": float(ctx['price']), "Score": int(report['score']),
+        "Status": report['status_color'], "Strategy": report['strategy'],
+        "SL": float(report['sl']), "TP": float(report['tp']),
+        "In Demand Zone": bool(report['in_demand_zone']), "Squeeze": bool(report['is_squeeze']),
+        "Pattern": report['candle_pattern'], "MTF Trend": ctx['mtf_trend'], "Error": "",
+    }
+
+
+def scan_watchlist(symbols, interval="1d", max_workers=None, batch_size=BATCH_SIZE):
+    """
+    สแกนทั้ง Watchlist แล้ว yield ผลทีละตัวทันทีที่คำนวณเสร็จ
+    ระหว่างที่ Worker คำนวณ Batch ก่อนหน้า ตัวหลักจะดาวน์โหลด Batch ถัดไปไปพร้อมกัน
+    """
+    mtf_interval = MTF_BY_TF.get(interval, "1wk")
+    raws = plan_fetch(interval, mtf_interval)
+    # ใช้ spawn: Server ของ Streamlit มีหลาย Thread การ fork อาจติด Lock ค้าง
+    ctx = multiprocessing.get_context("spawn")
+    with ProcessPoolExecutor(max_workers=max_workers, mp_context=ctx) as pool:
+        pending = set()
+        for i in range(0, len(symbols), batch_size):
+            batch = symbols[i:i + batch_size]
+            frames_by_raw = {raw: bulk_download(batch, raw, RAW_PERIOD[raw]) for raw in raws}
+            for sym in batch:
+                raw_frames = {raw: frames_by_raw[raw].get(sym) for raw in raws}
+                if any(f is None for f in raw_frames.values()):
+                    yield {"Symbol": sym, "Error": "ดาวน์โหลดข้อมูลไม่สำเร็จ"}
+                    continue
+                pending.add(pool.submit(scan_symbol, sym, raw_frames, interval, mtf_interval))
+            for fut in [f for f in pending if f.done()]:
+                pending.discard(fut)
+                yield fut.result()
+        for fut in as_completed(pending):
+            yield fut.result()
+
+
+def results_frame(rows):
+    """รวมผลเป็นตาราง เรียงคะแนนจากมากไปน้อย (ตัวที่ Error อยู่ท้ายสุด)"""
+    if not rows: return pd.DataFrame()
+    df = pd.DataFrame(rows)
+    if "Score" not in df.columns: df["Score"] = np.nan
+    return df.sort_values("Score", ascending=False, na_position="last").reset_index(drop=True)
@@ -0,0 +1,326 @@
+import atexit
+import io
+import json
+import math
+import os
+import sqlite3
+import struct
+import threading
+import time
+from collections import OrderedDict
+
+import numpy as np
+import pandas as pd
+
+# --- Shared Cache: แคชที่ทุก Process ในเครื่องใช้ร่วมกัน (ข้อมูลดิบ + รายงานที่คำนวณแล้ว) ---
+# st.cache_data แยกกันคนละ Process -> หลาย Replica ดึง/คำนวณหุ้นตัวเดิมซ้ำ ตัวนี้เก็บบน SQLite ไฟล์เดียว
+# Backend สลับได้ (SQLiteCache / MemoryCache) ผ่าน get_shared_cache() หรือ SHARED_CACHE_BACKEND
+
+SHARED_CACHE_PATH = os.environ.get("SHARED_CACHE_PATH", os.path.join(os.path.dirname(os.path.abspath(__file__)), ".shared_cache.sqlite"))
+SHARED_CACHE_MAX_MB = float(os.environ.get("SHARED_CACHE_MAX_MB", "512"))
+# เวลาอ่านล่าสุด (LRU) + ตัวนับ hits/misses สะสมในหน่วยความจำ แล้วเขียนรวมทีเดียวทุกเท่านี้วินาที (หรือพร้อมกับ set)
+TOUCH_FLUSH_INTERVAL = 30.0
+
+
+# --- Codec: dict/list/ตัวเลข/Timestamp/DataFrame -> bytes (DataFrame เป็น Parquet ไม่ใช้ Pickle) ---
+
+def _encode(obj, frames):
+    if isinstance(obj, pd.DataFrame):
+        frames.append(obj); return {"__df__": len(frames) - 1}
+    if isinstance(obj, dict): return {"__dict__": [[_encode(k, frames), _encode(v, frames)] for k, v in obj.items()]}
+    if isinstance(obj, tuple): return {"__tuple__": [_encode(v, frames) for v in obj]}
+    if isinstance(obj, list): return [_encode(v, frames) for v in obj]
+    if isinstance(obj, pd.Timestamp): return {"__ts__": obj.isoformat()}
+    if isinstance(obj, np.generic): obj = obj.item()
+    if isinstance(obj, float) and not math.isfinite(obj): return {"__float__": repr(obj)}
+    if obj is None or isinstance(obj, (str, int, float, bool)): return obj
+    raise TypeError(f"shared_cache: ไม่รองรับชนิดข้อมูล {type(obj).__name__}")
+
+
+def _decode(obj, frames):
+    if isinstance(obj, list): return [_decode(v, frames) for v in obj]
+    if not isinstance(obj, dict): return obj
+    if "__df__" in obj: return frames[obj["__df__"]]
+    if "__dict__" in obj: return {_decode(k, frames): _decode(v, frames) for k, v in obj["__dict__"]}
+    if "__tuple__" in obj: return tuple(_decode(v, frames) for v in obj["__tuple__"])
+    if "__ts__" in obj: return pd.Timestamp(obj["__ts__"])
+    if "__float__" in obj: return float(obj["__float__"])
+    return obj
+
+
+def pack(obj):
+    """[ยาว JSON 4 ไบต์][JSON][ยาว Parquet 8 ไบต์][Parquet]... (DataFrame แต่ละตัวเป็น Parquet แยกกัน)"""
+    frames = []
+    header = json.dumps(_encode(obj, frames), ensure_ascii=False).encode("utf-8")
+    out = io.BytesIO()
+    out.write(struct.pack("<I", len(header))); out.write(header)
+    for df in frames:
+        buf = io.BytesIO(); df.to_parquet(buf); data = buf.getvalue()
+        out.write(struct.pack("<Q", len(data))); out.write(data)
+    return out.getvalue()
+
+
+def unpack(data):
+    view = memoryview(data)
+    (n,) = struct.unpack_from("<I", view, 0)
+    header = json.loads(bytes(view[4:4 + n]).decode("utf-8"))
+    pos = 4 + n; frames = []
+    while pos < len(view):
+        (size,) = struct.unpack_from("<Q", view, pos); pos += 8
+        frames.append(pd.read_parquet(io.BytesIO(view[pos:pos + size]))); pos += size
+    return _decode(header, frames)
+
+
+def bar_key(df):
+    """ตัวระบุแท่งล่าสุด: Timestamp + Close + Volume (แท่งที่ยังไม่ปิดราคาขยับ -> Key เปลี่ยนตาม)"""
+    if df is None or df.empty: return "empty"
+    last = df.iloc[-1]
+    return f"{df.index[-1].isoformat()}|{float(last['Close']):.6g}|{float(last.get('Volume', 0) or 0):.0f}|{len(df)}"
+
+
+# --- Backends ---
+
+class MemoryCache:
+    """LRU ในหน่วยความจำ จำกัดขนาดรวมเป็นไบต์ (ใช้ตอนทดสอบ หรือรันแบบ Process เดียว)"""
+
+    def __init__(self, max_bytes=SHARED_CACHE_MAX_MB * 2**20):
+        self.max_bytes = max_bytes
+        self._items = OrderedDict()   # key -> (value, expires_at)
+        self._size = 0
+        self._lock = threading.Lock()
+        self.hits = self.misses = 0
+
+    def get(self, key):
+        with self._lock:
+            item = self._items.get(key)
+            if item is None or (item[1] is not None and item[1] <= time.time()):
+                if item is not None: self._drop(key)
+                self.misses += 1
+                return None
+            self._items.move_to_end(key)
+            self.hits += 1
+            return item[0]
+
+    def set(self, key, value, ttl=None):
+        with self._lock:
+            if key in self._items: self._drop(key)
+            self._items[key] = (value, time.time() + ttl if ttl else None)
+            self._size += len(value)
+            while self._size > self.max_bytes and len(self._items) > 1:
+                self._drop(next(iter(self._items)))
+
+    def delete(self, key):
+        with self._lock:
+            if key in self._items: self._drop(key)
+
+    def _drop(self, key):
+        value, _ = self._items.pop(key)
+        self._size -= len(value)
+
+    def clear(self):
+        with self._lock: self._items.clear(); self._size = 0
+
+    def stats(self):
+        with self._lock:
+            total = self.hits + self.misses
+            return {"entries": len(self._items), "bytes": self._size, "hits": self.hits, "misses": self.misses,
+                    "hit_rate": self.hits / total if total else 0.0}
+
+
+class SQLiteCache:
+    """
+    LRU บนไฟล์ SQLite ที่ทุก Process ในเครื่องเปิดร่วมกัน (WAL: อ่านพร้อมกันได้ ขณะมีคนเขียน)
+    ขนาดรวมเกิน max_bytes จะลบรายการที่ไม่ได้ถูกอ่านนานที่สุดก่อน ตัวนับ hits/misses เก็บในไฟล์ (เห็นร่วมกันทั้ง Fleet)
+    - get เป็น SELECT ล้วน (ไม่แย่ง Write Lock กับ Process อื่น): last_access + ตัวนับ เขียนรวมเป็นก้อนทีหลัง
+    - ขนาดรวมเก็บเป็นตัวนับ 'bytes' อัปเดตใน Transaction เดียวกับ set/delete (ไม่ต้อง SUM ทั้งตาราง)
+    """
+
+    def __init__(self, path=SHARED_CACHE_PATH, max_bytes=SHARED_CACHE_MAX_MB * 2**20, flush_interval=TOUCH_FLUSH_INTERVAL):
+        self.path = path
+        self.max_bytes = max_bytes
+        self.flush_interval = flush_interval
+        self._local = threading.local()
+        self._touch_lock = threading.Lock()
+        self._touched = {}           # key -> เวลาอ่านล่าสุด (ยังไม่ได้เขียนลงไฟล์)
+        self._counts = {"hits": 0, "misses": 0}
+        self._last_flush = time.monotonic()
+        with self._conn() as conn:
+            conn.executescript("""
+                CREATE TABLE IF NOT EXISTS cache (
+                    key TEXT PRIMARY KEY, value BLOB NOT NULL, size INTEGER NOT NULL,
+                    expires_at REAL, last_access REAL NOT NULL);
+                CREATE INDEX IF NOT EXISTS idx_cache_last_access ON cache(last_access);
+                CREATE TABLE IF NOT EXISTS counters (name TEXT PRIMARY KEY, value INTEGER NOT NULL);
+                INSERT OR IGNORE INTO counters VALUES ('hits', 0), ('misses', 0);
+                INSERT OR IGNORE INTO counters SELECT 'bytes', COALESCE(SUM(size), 0) FROM cache;
+            """)
+        atexit.register(self.flush, False)   # ปิด Process -> เขียน last_access/ตัวนับที่ค้างอยู่
+
+    def _conn(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+            conn = sqlite3.connect(self.path, timeout=10)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    # --- เขียนแบบรวมก้อน: last_access + hits/misses ---
+    def _note(self, key, hit, now):
+        with self._touch_lock:
+            self._counts["hits" if hit else "misses"] += 1
+            if hit: self._touched[key] = now
+            due = time.monotonic() - self._last_flush >= self.flush_interval
+        if due: self.flush(wait=False)
+
+    def _take_touches(self):
+        with self._touch_lock:
+            touched, counts = self._touched, self._counts
+            self._touched, self._counts = {}, {"hits": 0, "misses": 0}
+            self._last_flush = time.monotonic()
+        return touched, counts
+
+    def _put_back(self, touched, counts):
+        with self._touch_lock:
+            for k, t in touched.items(): self._touched[k] = max(t, self._touched.get(k, t))
+            for k, v in counts.items(): self._counts[k] += v
+
+    @staticmethod
+    def _write_touches(conn, touched, counts):
+        if touched: conn.executemany("UPDATE cache SET last_access = MAX(last_access, ?) WHERE key = ?", [(t, k) for k, t in touched.items()])
+        for name, n in counts.items():
+            if n: conn.execute("UPDATE counters SET value = value + ? WHERE name = ?", (n, name))
+
+    def flush(self, wait=True):
+        """เขียน last_access/ตัวนับที่ค้างลงไฟล์ wait=False: ไฟล์ติด Lock อยู่ก็ข้ามไปก่อน (เก็บไว้เขียนรอบหน้า)"""
+        touched, counts = self._take_touches()
+        if not touched and not any(counts.values()): return
+        conn = self._conn()
+        try:
+            if not wait: conn.execute("PRAGMA busy_timeout = 0")
+            with conn: self._write_touches(conn, touched, counts)
+        except sqlite3.OperationalError:
+            self._put_back(touched, counts)
+        finally:
+            if not wait: conn.execute("PRAGMA busy_timeout = 10000")
+
+    # --- API ---
+    def get(self, key):
+        now = time.time()
+        row = self._conn().execute("SELECT value, expires_at FROM cache WHERE key = ?", (key,)).fetchone()
+        hit = row is not None and (row[1] is None or row[1] > now)   # หมดอายุ = Miss (ลบตอน set รอบถัดไป)
+        self._note(key, hit, now)
+        return row[0] if hit else None
+
+    def set(self, key, value, ttl=None):
+        now = time.time()
+        touched, counts = self._take_touches()
+        conn = self._conn()
+        try:
+            with conn:
+                conn.execute("BEGIN IMMEDIATE")
+                self._write_touches(conn, touched, counts)
+                old = conn.execute("SELECT size FROM cache WHERE key = ?", (key,)).fetchone()
+                conn.execute("INSERT OR REPLACE INTO cache VALUES (?, ?, ?, ?, ?)",
+                             (key, sqlite3.Binary(value), len(value), now + ttl if ttl else None, now))
+                total = self._add_bytes(conn, len(value) - (old[0] if old else 0))
+                if total > self.max_bytes:
+                    # ลบของหมดอายุก่อน แล้วค่อยลบตามลำดับการใช้งานเก่าสุด
+                    freed = conn.execute("SELECT COALESCE(SUM(size), 0) FROM cache WHERE expires_at IS NOT NULL AND expires_at <= ?", (now,)).fetchone()[0]
+                    conn.execute("DELETE FROM cache WHERE expires_at IS NOT NULL AND expires_at <= ?", (now,))
+                    total -= freed
+                    while total > self.max_bytes:
+                        victims = conn.execute("SELECT key, size FROM cache WHERE key != ? ORDER BY last_access LIMIT 64", (key,)).fetchall()
+                        if not victims: break
+                        for old_key, size in victims:
+                            if total <= self.max_bytes: break
+                            conn.execute("DELETE FROM cache WHERE key = ?", (old_key,)); total -= size
+                    conn.execute("UPDATE counters SET value = ? WHERE name = 'bytes'", (total,))
+        except sqlite3.OperationalError:
+            self._put_back(touched, counts)
+            raise
+
+    @staticmethod
+    def _add_bytes(conn, delta):
+        conn.execute("UPDATE counters SET value = value + ? WHERE name = 'bytes'", (delta,))
+        return conn.execute("SELECT value FROM counters WHERE name = 'bytes'").fetchone()[0]
+
+    def delete(self, key):
+        with self._conn() as conn:
+            conn.execute("BEGIN IMMEDIATE")
+            old = conn.execute("SELECT size FROM cache WHERE key = ?", (key,)).fetchone()
+            if old is None: return
+            conn.execute("DELETE FROM cache WHERE key = ?", (key,))
+            self._add_bytes(conn, -old[0])
+
+    def clear(self):
+        self._take_touches()
+        with self._conn() as conn:
+            conn.execute("DELETE FROM cache"); conn.execute("UPDATE counters SET value = 0")
+
+    def stats(self):
+        self.flush(wait=False)
+        conn = self._conn()
+        entries = conn.execute("SELECT COUNT(*) FROM cache").fetchone()[0]
+        counters = dict(conn.execute("SELECT name, value FROM counters").fetchall())
+        total = counters["hits"] + counters["misses"]
+        return {"entries": entries, "bytes": counters["bytes"], "hits": counters["hits"], "misses": counters["misses"],
+                "hit_rate": counters["hits"] / total if total else 0.0}
+
+
+class SharedCache:
+    """ชั้นบนของ Backend: แปลง Object <-> bytes และมี get_or_compute ให้ใช้แทน Decorator ของ Streamlit"""
+
+    def __init__(self, backend):
+        self.backend = backend
+        self.errors = 0
+
+    # แคชเป็นแค่ตัวช่วย: Backend พัง/ติด Lock (sqlite3.OperationalError ฯลฯ) = Miss / ไม่ได้เก็บ ไม่ให้หลุดไปถึงหน้าเว็บ
+    def get(self, key):
+        try: data = self.backend.get(key)
+        except Exception:
+            self.errors += 1
+            return None
+        if data is None: return None
+        try: return unpack(data)
+        except Exception:
+            self.delete(key)  # ข้อมูลเสีย/ฟอร์แมตเก่า -> ทิ้งแล้วคำนวณใหม่
+            return None
+
+    def set(self, key, value, ttl=None):
+        data = pack(value)
+        try: self.backend.set(key, data, ttl)
+        except Exception: self.errors += 1
+
+    def delete(self, key):
+        try: self.backend.delete(key)
+        except Exception: self.errors += 1
+
+    def get_or_compute(self, key, compute, ttl=None):
+        value = self.get(key)
+        if value is None:
+            value = compute()
+            if value is not None: self.set(key, value, ttl)
+        return value
+
+    def stats(self):
+        return {**self.backend.stats(), "errors": self.errors}
+
+
+_default_cache = None
+_cache_lock = threading.Lock()
+
+def get_shared_cache():
+    global _default_cache
+    with _cache_lock:
+        if _default_cache is None:
+            kind = os.environ.get("SHARED_CACHE_BACKEND", "sqlite")
+            _default_cache = SharedCache(MemoryCache() if kind == "memory" else SQLiteCache())
+        return _default_cache
+
+
+def set_shared_cache(cache):
+    """สลับ Backend (เช่นใช้ SharedCache(MemoryCache()) ตอนทดสอบ)"""
+    global _default_cache
+    with _cache_lock: _default_cache = cache
@@ -0,0 +1,282 @@
+import glob
+import json
+import os
+import random
+import socket
+import tempfile
+import threading
+import time
+from datetime import datetime
+
+from startup import lazy_import
+
+try:
+    import fcntl
+except ImportError:  # Windows: ไม่มี flock -> ไม่รับ Spool ของ Process อื่น (อ่านได้เฉพาะไฟล์ของตัวเอง)
+    fcntl = None
+
+gspread = lazy_import("gspread")
+service_account = lazy_import("oauth2client.service_account")
+
+# --- Google Sheets Writer: คิว + ส่งเป็นก้อน (append_rows) จาก Background Thread ---
+# กดบันทึกแล้วกลับทันที แถวที่ยังส่งไม่สำเร็จถูกเก็บลงไฟล์ (Spool) ไว้ส่งต่อหลัง Restart
+
+SHEET_NAME = "Stock_Analysis_Log"
+SCOPE = ['https://spreadsheets.google.com/feeds', 'https://www.googleapis.com/auth/drive']
+
+# Spool แยกไฟล์ต่อ Process: {SPOOL_PATH ตัด .jsonl}.{host}-{pid}.jsonl (หลาย Replica ในเครื่องเดียวไม่เขียนทับกัน)
+SPOOL_PATH = os.environ.get("SHEETS_SPOOL_PATH", os.path.join(os.path.dirname(os.path.abspath(__file__)), ".sheets_spool.jsonl"))
+
+BATCH_SIZE = 100          # แถวต่อ 1 ครั้งของ append_rows
+FLUSH_INTERVAL = 2.0      # รอรวมแถวได้นานสุดกี่วินาทีก่อนส่ง
+BACKOFF_BASE = 1.0        # Retry: 1, 2, 4, 8, ... วินาที (+ Jitter)
+BACKOFF_MAX = 60.0
+
+
+def log_row(data_dict, date=None):
+    """แปลง log_entry ของหน้าวิเคราะห์เป็นแถวใน Sheet (ลำดับคอลัมน์เดิม)"""
+    return [
+        date or datetime.now().strftime("%Y-%m-%d"),
+        data_dict.get("เวลา", ""),
+        data_dict.get("หุ้น", ""),
+        data_dict.get("TF", ""),
+        data_dict.get("ราคา", ""),
+        data_dict.get("Change%", ""),
+        data_dict.get("สถานะ", ""),
+        data_dict.get("Action", ""),
+        data_dict.get("SL", ""),
+        data_dict.get("TP", "")
+    ]
+
+
+def scan_row(row, tf, now=None):
+    """แปลงแถวผลสแกน (scanner.scan_symbol) เป็นแถวใน Sheet รูปแบบเดียวกับ log_row"""
+    now = now or datetime.now()
+    fmt = lambda v: f"{v:.2f}" if isinstance(v, (int, float)) and v == v else ""
+    return [now.strftime("%Y-%m-%d"), now.strftime("%H:%M:%S"), row.get("Symbol", ""), tf,
+            fmt(row.get("Price")), "", row.get("Status", ""), row.get("Strategy", ""), fmt(row.get("SL")), fmt(row.get("TP"))]
+
+
+class GSheetBackend:
+    """ส่งข้อมูลเข้า Google Sheet จริง: Authorize + เปิด Sheet ครั้งเดียวแล้วใช้ซ้ำ (ส่งพลาดจะต่อใหม่รอบหน้า)"""
+
+    def __init__(self, creds_dict, sheet_name=SHEET_NAME):
+        self.creds_dict = dict(creds_dict)
+        self.sheet_name = sheet_name
+        self._sheet = None
+
+    def _worksheet(self):
+        if self._sheet is None:
+            creds = service_account.ServiceAccountCredentials.from_json_keyfile_dict(self.creds_dict, SCOPE)
+            self._sheet = gspread.authorize(creds).open(self.sheet_name).sheet1
+        return self._sheet
+
+    def append_rows(self, rows):
+        try:
+            # RAW เหมือน append_row เดิม: Sheet ไม่แปลง "+1.23%"/เวลา/ตัวเลข และไม่รันข้อความที่ขึ้นต้นด้วย "=" เป็นสูตร
+            self._worksheet().append_rows(rows, value_input_option="RAW")
+        except Exception:
+            self._sheet = None
+            raise
+
+
+class FakeSheetBackend:
+    """Backend จำลองสำหรับทดสอบแบบ Offline: เก็บแถวในหน่วยความจำ สั่งให้พังได้ fail_times ครั้งแรก"""
+
+    def __init__(self, fail_times=0, latency=0.0):
+        self.rows = []
+        self.batches = []   # จำนวนแถวต่อ append_rows ที่สำเร็จ
+        self.calls = 0
+        self.fail_times = fail_times
+        self.latency = latency
+        self._lock = threading.Lock()
+
+    def append_rows(self, rows):
+        with self._lock:
+            self.calls += 1
+            if self.latency: time.sleep(self.latency)
+            if self.fail_times > 0:
+                self.fail_times -= 1
+                raise ConnectionError("fake sheet unavailable")
+            self.rows.extend(list(r) for r in rows)
+            self.batches.append(len(rows))
+
+
+class SheetWriter:
+    """
+    คิวแถวที่จะส่งเข้า Sheet (1 ตัวต่อ Process)
+    - submit()/submit_many() แค่ต่อคิว + เขียน Spool แล้วกลับทันที
+    - Background Thread รวมแถวเป็นก้อนละ batch_size ส่งด้วย append_rows ครั้งเดียว
+    - ส่งไม่ผ่าน: Retry แบบ Exponential Backoff ไปเรื่อยๆ แถวยังอยู่ใน Spool จนกว่าจะส่งสำเร็จ
+    (ถ้า Process ตายระหว่างส่งสำเร็จกับลบจาก Spool แถวนั้นอาจถูกส่งซ้ำ 1 ครั้ง)
+    - Spool เป็นของ Process นี้คนเดียว (ถือ flock ไว้ตลอดอายุ) ตอนเริ่มจะรับ Spool ที่เจ้าของตายแล้ว
+      (ล็อกได้ = ไม่มีใครถือ) มาต่อคิวของตัวเอง Spool ของ Replica ที่ยังทำงานอยู่จะไม่ถูกแตะ
+    """
+
+    def __init__(self, backend, spool_path=SPOOL_PATH, batch_size=BATCH_SIZE, flush_interval=FLUSH_INTERVAL,
+                 backoff_base=BACKOFF_BASE, backoff_max=BACKOFF_MAX):
+        self.backend = backend
+        self.spool_base = spool_path
+        self.spool_path = self._own_spool(spool_path) if spool_path else None
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.sent = 0
+        self.failures = 0
+        self.last_error = None
+        self._retry_at = 0.0      # time.monotonic() ที่ส่งซ้ำได้ (Backoff ไม่ถูกปลุกก่อนเวลาด้วย submit/flush)
+        self._lock_fd = None
+        self._pending = self._load_spool()
+        self._cond = threading.Condition()
+        self._stopping = False
+        self._force = False
+        self._thread = threading.Thread(target=self._run, name="sheet-writer", daemon=True)
+        self._thread.start()
+
+    # --- Spool บนดิสก์ (JSON Lines: 1 แถวต่อบรรทัด) ---
+    @staticmethod
+    def _own_spool(base):
+        root, ext = os.path.splitext(base)
+        return f"{root}.{socket.gethostname()}-{os.getpid()}{ext or '.jsonl'}"
+
+    @staticmethod
+    def _read_rows(path):
+        rows = []
+        with open(path, encoding="utf-8") as f:
+            for line in f:
+                try: rows.append(json.loads(line))
+                except ValueError: continue  # บรรทัดสุดท้ายอาจเขียนไม่ครบตอน Process ตาย
+        return rows
+
+    @staticmethod
+    def _try_lock(path, blocking=False):
+        """flock บน {path}.lock คืนค่า fd ถ้าได้ล็อก / None ถ้ามี Process อื่นถืออยู่"""
+        fd = os.open(path + ".lock", os.O_RDWR | os.O_CREAT, 0o644)
+        try: fcntl.flock(fd, fcntl.LOCK_EX if blocking else fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except OSError:
+            os.close(fd); return None
+        return fd
+
+    def _load_spool(self):
+        """ถือล็อก Spool ของตัวเอง แล้วรับแถวจาก Spool ของ Process ที่ตายแล้ว (รวม Spool ไฟล์เดียวแบบเก่า)"""
+        if not self.spool_path: return []
+        if fcntl is None:
+            return self._read_rows(self.spool_path) if os.path.exists(self.spool_path) else []
+        os.makedirs(os.path.dirname(os.path.abspath(self.spool_path)), exist_ok=True)
+        self._lock_fd = self._try_lock(self.spool_path, blocking=True)
+        root, ext = os.path.splitext(self.spool_base)
+        candidates = [self.spool_path, self.spool_base] + sorted(glob.glob(f"{glob.escape(root)}.*{ext or '.jsonl'}"))
+        rows, adopted = [], False
+        for path in dict.fromkeys(candidates):
+            if not os.path.exists(path): continue
+            if path == self.spool_path:
+                rows.extend(self._read_rows(path)); continue
+            fd = self._try_lock(path)
+            if fd is None: continue  # เจ้าของยังทำงานอยู่
+            try:
+                if os.path.exists(path):
+                    rows.extend(self._read_rows(path)); adopted = True
+                    os.remove(path)
+                try: os.remove(path + ".lock")
+                except OSError: pass
+            finally:
+                os.close(fd)
+        if adopted:
+            self._pending = rows; self._rewrite_spool()
+        return rows
+
+    def _append_spool(self, rows):
+        if not self.spool_path: return
+        with open(self.spool_path, "a", encoding="utf-8") as f:
+            for r in rows: f.write(json.dumps(r, ensure_ascii=False) + "\n")
+
+    def _rewrite_spool(self):
+        if not self.spool_path: return
+        folder = os.path.dirname(os.path.abspath(self.spool_path))
+        fd, tmp_path = tempfile.mkstemp(dir=folder, suffix=".tmp")
+        with os.fdopen(fd, "w", encoding="utf-8") as f:
+            for r in self._pending: f.write(json.dumps(r, ensure_ascii=False) + "\n")
+        os.replace(tmp_path, self.spool_path)
+
+    # --- API ---
+    def submit(self, row):
+        self.submit_many([row])
+
+    def submit_many(self, rows):
+        rows = [list(r) for r in rows]
+        if not rows: return
+        with self._cond:
+            self._pending.extend(rows)
+            self._append_spool(rows)
+            self._cond.notify()
+
+    @property
+    def pending(self):
+        with self._cond: return len(self._pending)
+
+    def flush(self, timeout=None):
+        """รอจนคิวว่าง (ส่งครบ) คืนค่า True ถ้าว่างทันเวลา"""
+        deadline = None if timeout is None else time.monotonic() + timeout
+        with self._cond:
+            if self._pending: self._force = True
+            self._cond.notify_all()
+            while self._pending:
+                remaining = None if deadline is None else deadline - time.monotonic()
+                if remaining is not None and remaining <= 0: return False
+                self._cond.wait(remaining if remaining is not None else 0.5)
+        return True
+
+    def stop(self, timeout=5.0):
+        self.flush(timeout)
+        with self._cond:
+            self._stopping = True
+            self._cond.notify_all()
+        self._thread.join(timeout)
+        if self._lock_fd is not None:
+            # คิวว่าง -> ลบ Spool ของตัวเอง / ยังค้าง -> ปล่อยล็อกให้ Process ถัดไปรับช่วง
+            if self.spool_path and not self._pending and os.path.exists(self.spool_path):
+                os.remove(self.spool_path)
+            os.close(self._lock_fd); self._lock_fd = None
+
+    # --- Background Thread ---
+    def _run(self):
+        while True:
+            with self._cond:
+                while not self._pending and not self._stopping: self._cond.wait()
+                if self._stopping: return
+                # อยู่ในช่วง Backoff: รอจนถึงเวลา ไม่ว่าจะมี submit/flush มาปลุกกี่ครั้ง
+                while time.monotonic() < self._retry_at and not self._stopping:
+                    self._cond.wait(self._retry_at - time.monotonic())
+                if self._stopping: return
+                # รอให้แถวสะสมเป็นก้อน (หรือครบเวลา / มีคนสั่ง flush) ก่อนส่ง
+                deadline = time.monotonic() + self.flush_interval
+                while len(self._pending) < self.batch_size and not self._force and not self._stopping:
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0: break
+                    self._cond.wait(remaining)
+                batch = self._pending[:self.batch_size]
+            try:
+                self.backend.append_rows(batch)
+            except Exception as e:
+                self.failures += 1; self.last_error = repr(e)
+                delay = min(self.backoff_max, self.backoff_base * 2 ** min(self.failures - 1, 16)) * random.uniform(0.8, 1.2)
+                with self._cond: self._retry_at = time.monotonic() + delay
+                continue
+            with self._cond:
+                del self._pending[:len(batch)]
+                self._rewrite_spool()
+                self.sent += len(batch); self.failures = 0
+                if not self._pending: self._force = False
+                self._cond.notify_all()
+
+
+_default_writer = None
+_writer_lock = threading.Lock()
+
+def get_writer(creds_dict):
+    """SheetWriter ตัวเดียวของ Process (ทุก Session/หน้าใช้คิวและ Client ร่วมกัน)"""
+    global _default_writer
+    with _writer_lock:
+        if _default_writer is None: _default_writer = SheetWriter(GSheetBackend(creds_dict))
+        return _default_writer
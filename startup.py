@@ -0,0 +1,116 @@
+import builtins
+import importlib
+import os
+import sys
+import time
+
+# --- Startup Profile: เวลา + หน่วยความจำของการ Import แต่ละโมดูล และ Lazy Import ของไลบรารีหนัก ---
+# python -X importtime ใช้ได้เฉพาะตอนสั่งรันเอง -> ตัวนี้ติดไปกับแอปได้เลย (พิมพ์ออก Console หรือโชว์ใน Debug Panel)
+
+_records = []        # {'module', 'seconds', 'rss_mb', 'depth', 'lazy'}
+_depth = 0
+_original_import = None
+_started_at = None
+
+
+def rss_mb():
+    """RSS ปัจจุบันของ Process (MB) อ่านจาก /proc (Linux) ไม่มีก็ใช้ค่าสูงสุดจาก resource"""
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE") / 2**20
+    except (OSError, ValueError, AttributeError):
+        pass
+    try:
+        import resource
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return peak / 2**20 if sys.platform == "darwin" else peak / 2**10
+    except Exception:
+        return 0.0
+
+
+def _profiled_import(name, globals=None, locals=None, fromlist=(), level=0):
+    global _depth
+    top = name.partition(".")[0]
+    if level != 0 or top in sys.modules:
+        return _original_import(name, globals, locals, fromlist, level)
+    t0 = time.perf_counter(); m0 = rss_mb()
+    _depth += 1
+    try:
+        return _original_import(name, globals, locals, fromlist, level)
+    finally:
+        _depth -= 1
+        _records.append({"module": top, "seconds": time.perf_counter() - t0, "rss_mb": rss_mb() - m0,
+                         "depth": _depth, "lazy": False})
+
+
+def begin():
+    """เริ่มจับเวลา Import ทุกโมดูลที่ยังไม่เคยโหลด (เรียกครั้งเดียวที่บนสุดของสคริปต์ เรียกซ้ำไม่มีผล)"""
+    global _original_import, _started_at
+    if _original_import is not None or _started_at is not None: return
+    _started_at = (time.perf_counter(), rss_mb())
+    _original_import = builtins.__import__
+    builtins.__import__ = _profiled_import
+
+
+def end():
+    """หยุดจับเวลา (Import หลังจากนี้จะไม่ถูกบันทึก ยกเว้น Lazy Import)"""
+    global _original_import
+    if _original_import is None: return
+    builtins.__import__ = _original_import
+    _original_import = None
+    _records.append({"module": "(startup total)", "seconds": time.perf_counter() - _started_at[0],
+                     "rss_mb": rss_mb() - _started_at[1], "depth": -1, "lazy": False})
+
+
+class LazyModule:
+    """ตัวแทนโมดูลที่ Import จริงตอนถูกใช้งานครั้งแรก (เวลาที่ใช้ถูกบันทึกใน Startup Profile เป็น lazy)"""
+
+    def __init__(self, name):
+        self.__dict__["_name"] = name
+        self.__dict__["_module"] = None
+
+    def _load(self):
+        module = self.__dict__["_module"]
+        if module is None:
+            name = self.__dict__["_name"]
+            already = name in sys.modules
+            t0 = time.perf_counter(); m0 = rss_mb()
+            module = importlib.import_module(name)
+            if not already:
+                _records.append({"module": name, "seconds": time.perf_counter() - t0, "rss_mb": rss_mb() - m0,
+                                 "depth": 0, "lazy": True})
+            self.__dict__["_module"] = module
+        return module
+
+    def __getattr__(self, attr):
+        return getattr(self._load(), attr)
+
+    def __setattr__(self, attr, value):
+        setattr(self._load(), attr, value)
+
+    def __repr__(self):
+        state = "loaded" if self.__dict__["_module"] is not None else "not loaded"
+        return f"<lazy module '{self.__dict__['_name']}' ({state})>"
+
+
+def lazy_import(name):
+    return LazyModule(name)
+
+
+def startup_report(top_level_only=True):
+    """รายการโมดูลเรียงจากช้าไปเร็ว (top_level_only = เฉพาะที่ Import ตรงจากโค้ดแอป ไม่รวมโมดูลย่อยข้างใน)"""
+    rows = [r for r in _records if not top_level_only or r["depth"] <= 0]
+    return sorted(rows, key=lambda r: r["seconds"], reverse=True)
+
+
+def format_report(top_level_only=True, limit=25):
+    lines = [f"{'module':<32}{'time (ms)':>12}{'RSS (MB)':>12}  kind"]
+    for r in startup_report(top_level_only)[:limit]:
+        kind = "lazy" if r["lazy"] else ("total" if r["depth"] < 0 else "startup")
+        lines.append(f"{r['module']:<32}{r['seconds'] * 1000:>12.1f}{r['rss_mb']:>12.1f}  {kind}")
+    lines.append(f"{'(current RSS)':<32}{'':>12}{rss_mb():>12.1f}")
+    return "\n".join(lines)
+
+
+def print_report(top_level_only=True, limit=25):
+    print(format_report(top_level_only, limit), file=sys.stderr)
@@ -0,0 +1,68 @@
+import os
+import sys
+
+# โมดูลของแอปอยู่ที่ Root ของ Repo (ไม่ใช่ Package) -> ให้ import ได้เมื่อรัน pytest จากที่ไหนก็ได้
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import pytest
+
+from benchmarks.fixtures import load_recorded, synthetic_ohlcv
+from providers import ReplayProvider
+
+REPLAY_SYMBOL = "LIVE"
+
+
+class CountingReplay(ReplayProvider):
+    """นับจำนวนครั้งที่ดึงแท่ง + ชื่อคงที่ (เลื่อน as_of แล้ว Key แคชไม่เปลี่ยน -> ต้องล้างเองเมื่อเห็นแท่งใหม่)"""
+
+    name = "replay-test"
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.history_calls = 0
+
+    def history(self, *args, **kwargs):
+        self.history_calls += 1
+        return super().history(*args, **kwargs)
+
+
+@pytest.fixture
+def offline(tmp_path, monkeypatch):
+    """แคชกลาง/คลังประวัติ/Provider/แหล่ง Quote เป็นของทดสอบ แล้วคืนค่าเดิมหลังจบ"""
+    import history_store, live_feed, providers, shared_cache
+    monkeypatch.setattr(shared_cache, "_default_cache", shared_cache.SharedCache(shared_cache.MemoryCache()))
+    monkeypatch.setattr(providers, "_default_provider", None)
+    monkeypatch.setattr(live_feed, "_default_source", None)
+    monkeypatch.setattr(history_store, "_default_store", history_store.HistoryStore(str(tmp_path / "history.sqlite")))
+
+
+@pytest.fixture
+def replay_bars(tmp_path):
+    """แท่งวันสังเคราะห์ 800 แท่ง (เวลาตลาด US) เขียนเป็น {tmp_path}/1d/LIVE.parquet ให้ ReplayProvider อ่าน"""
+    from market_data import EXCHANGE_TZ
+    df = synthetic_ohlcv("1d", 800, seed=7)
+    df.index = df.index.tz_localize(EXCHANGE_TZ)
+    (tmp_path / "1d").mkdir()
+    df.to_parquet(tmp_path / "1d" / f"{REPLAY_SYMBOL}.parquet")
+    return df
+
+
+# ชุดข้อมูลของเทสต์ Parity (โค้ด Vectorize เทียบกับโค้ด Scalar เดิมใน scalar_reference.py)
+PARITY_DATASETS = {
+    "1h": lambda: synthetic_ohlcv("1h", 700, seed=21),
+    "1d": lambda: synthetic_ohlcv("1d", 700, seed=22),
+    "1wk": lambda: synthetic_ohlcv("1wk", 700, seed=23),
+    "1d-sample": lambda: load_recorded("1d", "SAMPLE").iloc[-700:],
+}
+
+
+@pytest.fixture(params=list(PARITY_DATASETS), scope="module")
+def parity_raw(request):
+    """OHLCV หลายหน้าตา: สังเคราะห์ 3 TF + Fixture ที่ Commit ไว้ (มี Timezone/ปันผล/แตกพาร์ แบบไฟล์ Yahoo)"""
+    return PARITY_DATASETS[request.param]()
+
+
+@pytest.fixture(scope="module")
+def parity_ind(parity_raw):
+    from analysis import compute_indicators
+    return compute_indicators(parity_raw.copy())[0]
@@ -0,0 +1,126 @@
+import numpy as np
+
+# --- โค้ดแบบ Scalar ดั้งเดิม (คัดลอกตรงจาก app.py ของ Commit baseline) ใช้เป็นค่าอ้างอิงของตัวที่ Vectorize แล้ว ---
+# ห้ามแก้ให้ตรงกับโค้ดใหม่: ถ้าเทสต์พัง แปลว่าโค้ดใหม่เปลี่ยนผลจากของเดิม
+
+
+def analyze_candlestick(df_window):
+    """
+    ฟังก์ชันอ่านแท่งเทียน Pro Max (4-Bar Logic)
+    รับค่า: DataFrame ย้อนหลัง 4 แท่ง (Index 0=ไกลสุด, 3=ล่าสุด)
+    """
+    if len(df_window) < 4: 
+        return "Normal Candle", "gray", "ข้อมูลไม่เพียงพอ", False
+
+    c1 = df_window.iloc[0] # 3 วันก่อน
+    c2 = df_window.iloc[1] # 2 วันก่อน
+    c3 = df_window.iloc[2] # เมื่อวาน (Prev)
+    c4 = df_window.iloc[3] # วันนี้ (Current)
+
+    open_p = c4['Open']; close_p = c4['Close']
+    high_p = c4['High']; low_p = c4['Low']
+    body = abs(close_p - open_p)
+    range_len = high_p - low_p
+    is_bull = close_p >= open_p
+    color = "🟢 เขียว (Buying)" if is_bull else "🔴 แดง (Selling)"
+
+    prev_open = c3['Open']; prev_close = c3['Close']
+    is_prev_bull = prev_close >= prev_open
+
+    pattern_name = "Normal Candle (ปกติ)"
+    detail = "แรงซื้อขายสมดุล"
+    is_big = False
+
+    # --- 🧠 LEVEL 1: รูปแบบกลุ่ม 3-4 แท่ง ---
+    if (c2['Close'] < c2['Open']) and (c3['Close'] < c3['Open']) and (c4['Close'] < c4['Open']):
+        if (c4['Close'] < c3['Close']) and (c3['Close'] < c2['Close']):
+            return "🦅 Three Black Crows (อีกา 3 ตัว)", "🔴 แดง (Selling)", "แรงขายทุบต่อเนื่อง 3 วัน (ระวังลงลึก)", True
+
+    if (c2['Close'] > c2['Open']) and (c3['Close'] > c3['Open']) and (c4['Close'] > c4['Open']):
+        if (c4['Close'] > c3['Close']) and (c3['Close'] > c2['Close']):
+            return "💂 Three White Soldiers (3 ทหารเสือ)", "🟢 เขียว (Buying)", "แรงซื้อดันต่อเนื่อง 3 วัน (แข็งแกร่ง)", True
+
+    c2_body = abs(c2['Close'] - c2['Open']); c2_range = c2['High'] - c2['Low']
+    if (c2['Close'] < c2['Open']) and (c2_body > c2_range * 0.5): 
+        if abs(c3['Close'] - c3['Open']) < c2_body * 0.4: 
+            midpoint = (c2['Open'] + c2['Close']) / 2
+            if (c4['Close'] > c4['Open']) and (c4['Close'] > midpoint): 
+                return "🌅 Morning Star (รุ่งอรุณ)", "🟢 เขียว (Buying)", "กลับตัวขึ้นสวยงาม (Confirm Reversal)", True
+
+    if (c2['Close'] > c2['Open']) and (c2_body > c2_range * 0.5): 
+        if abs(c3['Close'] - c3['Open']) < c2_body * 0.4: 
+            midpoint = (c2['Open'] + c2['Close']) / 2
+            if (c4['Close'] < c4['Open']) and (c4['Close'] < midpoint): 
+                return "🌆 Evening Star (พลบค่ำ)", "🔴 แดง (Selling)", "กลับตัวลงชัดเจน (Confirm Reversal)", True
+
+    # --- 🧠 LEVEL 2: รูปแบบ 2 แท่ง ---
+    if is_prev_bull and not is_bull: 
+        if (open_p >= prev_close) and (close_p <= prev_open):
+            return "🐻 Bearish Engulfing (กลืนกินขาลง)", "🔴 แดง (Selling)", "แท่งแดงกลบแท่งเขียวเมื่อวาน", True
+
+    if not is_prev_bull and is_bull: 
+        if (open_p <= prev_close) and (close_p >= prev_open):
+            return "🐂 Bullish Engulfing (กลืนกินขาขึ้น)", "🟢 เขียว (Buying)", "แท่งเขียวกลบแท่งแดงเมื่อวาน", True
+
+    # --- 🧠 LEVEL 3: รูปแบบแท่งเดียว ---
+    wick_up = high_p - max(close_p, open_p)
+    wick_low = min(close_p, open_p) - low_p
+    
+    if wick_low > (body * 2) and wick_up < body:
+        pattern_name = "🔨 Hammer/Pinbar (ค้อน)"
+        detail = "ปฏิเสธราคาต่ำ (แรงซื้อสวน)"
+    elif wick_up > (body * 2) and wick_low < body:
+        pattern_name = "☄️ Shooting Star (ดาวตก)"
+        detail = "ปฏิเสธราคาสูง (แรงขายตบ)"
+    elif body > (range_len * 0.6): 
+        is_big = True
+        pattern_name = "Big Bullish (แท่งเขียวตัน)" if is_bull else "Big Bearish (แท่งแดงตัน)"
+        detail = "แรงซื้อ/ขาย คุมตลาดเบ็ดเสร็จ"
+    elif body < (range_len * 0.1):
+        pattern_name = "Doji (โดจิ)"
+        detail = "ตลาดลังเล (Indecision)"
+        
+    return pattern_name, color, detail, is_big
+
+
+def find_demand_zones(df, atr_multiplier=0.25):
+    zones = []
+    if len(df) < 20: return zones
+    lows = df['Low']
+    is_swing_low = (lows < lows.shift(1)) & (lows < lows.shift(2)) & (lows < lows.shift(-1)) & (lows < lows.shift(-2))
+    swing_indices = is_swing_low[is_swing_low].index
+    current_price = df['Close'].iloc[-1]
+    for date in swing_indices:
+        if date == df.index[-1] or date == df.index[-2]: continue
+        swing_low_val = df.loc[date, 'Low']
+        atr_val = df.loc[date, 'ATR'] if 'ATR' in df.columns else (swing_low_val * 0.02)
+        if np.isnan(atr_val): atr_val = swing_low_val * 0.02
+        zone_bottom = swing_low_val
+        zone_top = swing_low_val + (atr_val * atr_multiplier)
+        if (current_price - zone_top) / current_price > 0.20: continue
+        future_data = df.loc[date:][1:]
+        if future_data.empty: continue
+        if not (future_data['Close'] < zone_bottom).any():
+            zones.append({'bottom': zone_bottom, 'top': zone_top})
+    return zones
+
+def find_supply_zones(df, atr_multiplier=0.25):
+    zones = []
+    if len(df) < 20: return zones
+    highs = df['High']
+    is_swing_high = (highs > highs.shift(1)) & (highs > highs.shift(2)) & (highs > highs.shift(-1)) & (highs > highs.shift(-2))
+    swing_indices = is_swing_high[is_swing_high].index
+    current_price = df['Close'].iloc[-1]
+    for date in swing_indices:
+        if date == df.index[-1] or date == df.index[-2]: continue
+        swing_high_val = df.loc[date, 'High']
+        atr_val = df.loc[date, 'ATR'] if 'ATR' in df.columns else (swing_high_val * 0.02)
+        if np.isnan(atr_val): atr_val = swing_high_val * 0.02
+        zone_top = swing_high_val
+        zone_bottom = swing_high_val - (atr_val * atr_multiplier)
+        if (zone_bottom - current_price) / current_price > 0.20: continue
+        future_data = df.loc[date:][1:]
+        if future_data.empty: continue
+        if not (future_data['Close'] > zone_top).any():
+            zones.append({'bottom': zone_bottom, 'top': zone_top})
+    return zones
@@ -0,0 +1,127 @@
+import pandas as pd
+import pytest
+
+from alert_daemon import AlertDaemon, MemorySink, _epoch
+from market_data import EXCHANGE_TZ
+from providers import make_quote, market_time, set_provider
+from shared_cache import get_shared_cache
+
+from conftest import REPLAY_SYMBOL as SYMBOL, CountingReplay
+
+pytestmark = pytest.mark.usefixtures("offline")
+
+
+class ClockQuotes:
+    """Quote แบบ yfinance (ไม่มี bar_ts) ที่เวลาตามนาฬิกาจำลองของ Daemon"""
+
+    def __init__(self, clock, market_ts=None):
+        self.clock = clock
+        self.market_ts = market_ts
+        self.calls = 0
+
+    def quote(self, symbol):
+        self.calls += 1
+        return make_quote(symbol, 100.0, 99.0, ts=pd.Timestamp(self.clock(), unit="s", tz="UTC"), market_ts=self.market_ts)
+
+
+def ny(ts):
+    return pd.Timestamp(ts, tz=EXCHANGE_TZ)
+
+
+def run_once(daemon, now):
+    daemon.step(now)
+    assert daemon.wait_idle(60)
+
+
+def test_no_refetch_outside_market_hours(replay_bars, tmp_path):
+    last_bar = replay_bars.index[-1]                       # ศุกร์ 2025-01-03
+    provider = CountingReplay(str(tmp_path))
+    set_provider(provider)
+    now = [_epoch(ny("2025-01-04 11:00"))]                  # เสาร์
+    quotes = ClockQuotes(lambda: now[0])
+    daemon = AlertDaemon([SYMBOL], interval="1d", sinks=[MemorySink()], quote_source=quotes, clock=lambda: now[0])
+    try:
+        run_once(daemon, now[0])                            # รอบแรก: คำนวณเพื่อเก็บ Snapshot
+        assert daemon.evaluations == 1 and daemon.snapshot(SYMBOL)['bar_ts'] == last_bar
+        calls = provider.history_calls
+
+        # ปฏิทินบอกแท่งถัดไปคือจันทร์ 00:00 -> ถึงเวลาแล้วแต่ตลาดยังปิด: ดู Quote 1 ครั้งแล้วหลับถึงเวลาเปิด ไม่ดึงแท่งใหม่
+        now[0] = _epoch(ny("2025-01-06 00:05"))
+        run_once(daemon, now[0])
+        assert quotes.calls == 1 and daemon.evaluations == 1
+        assert provider.history_calls == calls
+        assert daemon.next_due() == _epoch(ny("2025-01-06 09:30"))
+        assert daemon.step(_epoch(ny("2025-01-06 09:29"))) == 0
+    finally:
+        daemon.stop()
+
+
+def test_market_time_keeps_holiday_quiet(replay_bars, tmp_path):
+    provider = CountingReplay(str(tmp_path))
+    set_provider(provider)
+    now = [_epoch(ny("2025-01-03 12:00"))]
+    quotes = ClockQuotes(lambda: now[0], market_ts=ny("2025-01-03 16:00"))
+    daemon = AlertDaemon([SYMBOL], interval="1d", sinks=[MemorySink()], quote_source=quotes, clock=lambda: now[0])
+    try:
+        run_once(daemon, now[0])
+        # วันหยุดวันทำการ (ตลาดปิดทั้งวัน): เวลาซื้อขายล่าสุดยังเป็นของวันก่อน -> ไม่ใช่แท่งใหม่ แม้นาฬิกาอยู่ในเวลาตลาด
+        now[0] = _epoch(ny("2025-01-06 11:00"))
+        run_once(daemon, now[0])
+        assert quotes.calls == 1 and daemon.evaluations == 1
+        # ซื้อขายแล้ว -> แท่งใหม่ (Replay ยังไม่มีแท่งใหม่ -> คำนวณ 1 ครั้ง แล้วถอยเวลา)
+        quotes.market_ts = ny("2025-01-06 11:00")
+        get_shared_cache().delete(f"quote:{SYMBOL}")
+        run_once(daemon, now[0] + daemon.poll_every)
+        assert daemon.evaluations == 2
+    finally:
+        daemon.stop()
+
+
+def test_readded_symbol_is_polled_once(replay_bars, tmp_path):
+    set_provider(CountingReplay(str(tmp_path)))
+    now = [_epoch(ny("2025-01-03 12:00"))]
+    daemon = AlertDaemon([], interval="1d", sinks=[MemorySink()], quote_source=ClockQuotes(lambda: now[0]), clock=lambda: now[0])
+    try:
+        daemon.add(SYMBOL, due=now[0])
+        daemon.remove(SYMBOL)
+        daemon.add(SYMBOL, due=now[0] + 60)
+        assert daemon.step(now[0]) == 0                    # รายการของรอบที่ถูก remove ต้องถูกทิ้ง ไม่ถูกส่งเช็ค
+        run_once(daemon, now[0] + 60)
+        assert daemon.evaluations == 1 and daemon.last_error is None
+        assert daemon.stats()["queued"] == 1               # เหลือรายการเดียว ไม่ถูก Poll ซ้ำสองสาย
+    finally:
+        daemon.stop()
+
+
+class NoQuotes:
+    def quote(self, symbol):
+        return None
+
+
+def test_missing_quote_polls_again(replay_bars, tmp_path):
+    set_provider(CountingReplay(str(tmp_path)))
+    now = [_epoch(ny("2025-01-06 11:00"))]
+    daemon = AlertDaemon([SYMBOL], interval="1d", sinks=[MemorySink()], quote_source=NoQuotes(), clock=lambda: now[0])
+    try:
+        run_once(daemon, now[0])                            # รอบแรก: Snapshot
+        now[0] = daemon.next_due()
+        run_once(daemon, now[0])                            # Quote = None -> ไม่ใช่ Error ลองใหม่รอบหน้า
+        assert daemon.evaluations == 1 and daemon.quote_checks == 1
+        assert daemon.last_error is None
+        assert daemon.next_due() == now[0] + daemon.poll_every
+    finally:
+        daemon.stop()
+
+
+class FakeTicker:
+    def __init__(self, md):
+        self.md = md
+
+    def get_history_metadata(self):
+        return self.md
+
+
+@pytest.mark.parametrize("value", [1736542800, pd.Timestamp(1736542800, unit="s", tz="UTC").tz_convert(EXCHANGE_TZ)])
+def test_market_time_from_yfinance_metadata(value):
+    assert market_time(FakeTicker({"regularMarketTime": value}), EXCHANGE_TZ) == ny("2025-01-10 16:00")
+    assert market_time(FakeTicker({}), EXCHANGE_TZ) is None
@@ -0,0 +1,75 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from backtest import (OUTCOME_EXIT, OUTCOME_OPEN, OUTCOME_SL, OUTCOME_TIMEOUT, OUTCOME_TP, max_drawdown,
+                      resolve_trades, signal_trades, summarize_trades)
+
+
+def _bars(close, open_=None, high=None, low=None):
+    close = np.asarray(close, dtype="float64")
+    open_ = close.copy() if open_ is None else np.asarray(open_, dtype="float64")
+    high = np.maximum(open_, close) if high is None else np.asarray(high, dtype="float64")
+    low = np.minimum(open_, close) if low is None else np.asarray(low, dtype="float64")
+    return open_, high, low, close
+
+
+def test_same_bar_hits_both_counts_as_sl():
+    o, h, l, c = _bars([100, 100, 100, 100], high=[100, 106, 100, 100], low=[100, 94, 100, 100])
+    exit_idx, price, outcome = resolve_trades(o, h, l, c, [0], [95], [105], max_hold=3)
+    assert (exit_idx[0], price[0], outcome[0]) == (1, 95.0, OUTCOME_SL)
+
+
+@pytest.mark.parametrize("gap_open, expect", [(90.0, (90.0, OUTCOME_SL)), (110.0, (110.0, OUTCOME_TP))])
+def test_gap_through_fills_at_open(gap_open, expect):
+    o, h, l, c = _bars([100, gap_open, gap_open, gap_open], open_=[100, gap_open, gap_open, gap_open])
+    _, price, outcome = resolve_trades(o, h, l, c, [0], [95], [105], max_hold=3)
+    assert (price[0], outcome[0]) == expect
+
+
+def test_open_when_data_ends_before_max_hold():
+    o, h, l, c = _bars([100, 101, 102, 101, 100])
+    exit_idx, price, outcome = resolve_trades(o, h, l, c, [0, 2], [90, 90], [110, 110], max_hold=3)
+    assert list(outcome) == [OUTCOME_TIMEOUT, OUTCOME_OPEN]
+    assert list(exit_idx) == [3, 4] and price[1] == 100.0
+
+
+def test_signal_trades_exit_rows_and_long_filter():
+    close = [100, 100, 95, 90, 92, 92]
+    idx = pd.bdate_range("2024-01-01", periods=len(close))
+    df = pd.DataFrame(dict(zip(["Open", "High", "Low", "Close"], _bars(close))), index=idx)
+    signals = pd.DataFrame({
+        'strategy': ["Exit Immediately", "Buy on Dip", "Accumulate", "Reduce Port", "Aggressive Buy", "Wait & Watch"],
+        'sl': [np.nan, np.nan, 91.0, np.nan, 80.0, np.nan], 'tp': [np.nan, np.nan, 99.0, np.nan, 120.0, np.nan],
+        'score': [-5, 2, 1, -3, 4, 0]}, index=idx)
+    trades = signal_trades(df, signals, max_hold=2, warmup=0)
+    # Buy on Dip ไม่มี SL/TP -> ไม่นับ / แท่งสุดท้ายไม่เป็นจุดเข้า
+    assert list(trades['strategy']) == ["Exit Immediately", "Accumulate", "Reduce Port", "Aggressive Buy"]
+    exit_row = trades.iloc[0]
+    assert exit_row['side'] == "exit" and exit_row['outcome'] == OUTCOME_EXIT
+    assert exit_row['return_pct'] == pytest.approx(5.0) and np.isnan(exit_row['sl']) and np.isnan(exit_row['tp'])
+    assert trades.iloc[2]['outcome'] == OUTCOME_EXIT and trades.iloc[2]['return_pct'] == pytest.approx((1 - 92 / 90) * 100)
+    long_row = trades.iloc[1]                                                             # แท่งถัดไปเปิด 90 ใต้ SL 91
+    assert (long_row['side'], long_row['outcome'], long_row['exit']) == ("long", OUTCOME_SL, 90.0)
+    assert trades.iloc[3]['outcome'] == OUTCOME_OPEN                                      # เข้าแท่ง 4 ถือได้แค่ 1 แท่ง
+
+
+def test_summary_expectancy_and_drawdown_skip_open_trades():
+    t0 = pd.Timestamp("2024-01-01")
+    trades = pd.DataFrame({
+        'entry_time': [t0 + pd.Timedelta(days=i) for i in range(7)],
+        'strategy': ["Accumulate"] * 5 + ["Reduce Port"] * 2,
+        'side': ["long"] * 5 + ["exit"] * 2,
+        'outcome': [OUTCOME_TP, OUTCOME_SL, OUTCOME_TIMEOUT, OUTCOME_SL, OUTCOME_OPEN, OUTCOME_EXIT, OUTCOME_EXIT],
+        'return_pct': [10.0, -5.0, 3.0, -8.0, 50.0, 4.0, -2.0],
+        'bars_held': [2, 1, 3, 2, 1, 5, 5],
+    })
+    summary = summarize_trades(trades).set_index("Strategy")
+    acc = summary.loc["Accumulate"]
+    assert (acc["Trades"], acc["Open"]) == (4, 1)
+    assert acc["Expectancy %"] == pytest.approx(0.0) and acc["Win %"] == 50.0 and acc["TP Hit %"] == 25.0
+    assert acc["Max Drawdown %"] == pytest.approx(-10.0)   # Equity 0 -> 10 -> 5 -> 8 -> 0
+    assert acc["Avg Win %"] == 6.5 and acc["Avg Loss %"] == -6.5 and acc["Avg Bars Held"] == 2.0
+    exit_ = summary.loc["Reduce Port"]
+    assert exit_["Side"] == "exit" and np.isnan(exit_["Timeout %"]) and exit_["Expectancy %"] == 1.0
+    assert max_drawdown([]) == 0.0
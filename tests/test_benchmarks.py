@@ -0,0 +1,17 @@
+from benchmarks.fixtures import SHAPES, extend_recorded, load_recorded, recorded_fixtures
+from benchmarks.run import compare, merge_reports, meta_mismatch
+
+
+def test_committed_fixture_per_shape_extends_to_benchmark_size():
+    for shape in SHAPES:
+        assert "SAMPLE" in recorded_fixtures(shape)
+        df = extend_recorded(load_recorded(shape, "SAMPLE"), 3_000, seed=1)
+        assert len(df) == 3_000 and df["Close"].notna().all() and df.index.is_monotonic_increasing
+
+
+def test_baseline_keeps_slowest_run_and_check_keeps_fastest():
+    runs = [{"meta": {"cpu_count": 1}, "results": {"k": {"time_s": t, "peak_mb": 1.0}}} for t in (0.10, 0.13, 0.11)]
+    baseline = merge_reports(runs, pick=max); current = merge_reports(runs, pick=min)
+    assert baseline["results"]["k"]["time_s"] == 0.13 and current["results"]["k"]["time_s"] == 0.10
+    assert baseline["meta"]["runs"] == 3 and compare(current, baseline) == []
+    assert meta_mismatch({"meta": {"cpu_count": 4}}, baseline)[0] == ("cpu_count", 1, 4)
@@ -0,0 +1,15 @@
+import scalar_reference as ref
+from analysis import CANDLE_INSUFFICIENT, analyze_candlestick, candle_info, classify_candles
+
+
+def test_candle_labels_match_scalar(parity_raw):
+    raw = parity_raw
+    rows = classify_candles(raw)
+    codes = rows['Candle_Code'].to_numpy()
+    assert (codes[:3] == CANDLE_INSUFFICIENT).all()
+    for i in range(3, len(raw)):
+        window = raw.iloc[i - 3:i + 1]
+        got = candle_info(*rows.iloc[i][['Candle_Code', 'Candle_Color', 'Candle_Big']])
+        assert got == ref.analyze_candlestick(window) == analyze_candlestick(window), raw.index[i]
+    assert analyze_candlestick(raw.iloc[:3]) == ref.analyze_candlestick(raw.iloc[:3])
+    assert len(set(codes[3:])) >= 8   # ผ่านรูปแบบส่วนใหญ่จริง ไม่ใช่แค่ Normal
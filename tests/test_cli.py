@@ -0,0 +1,37 @@
+import json
+import os
+import subprocess
+import sys
+
+import pytest
+
+from benchmarks.fixtures import FIXTURE_DIR, load_recorded
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def run_cli(tmp_path, *argv):
+    """python -m cli แบบ Offline: Replay จาก benchmarks/fixtures ส่วนแคช/คลัง/ประวัติอยู่ใน tmp_path"""
+    env = {**os.environ, "MARKET_DATA_PROVIDER": "replay", "REPLAY_DIR": FIXTURE_DIR,
+           "SHARED_CACHE_PATH": str(tmp_path / "cache.sqlite"), "HISTORY_DB_PATH": str(tmp_path / "history.sqlite"),
+           "OHLCV_STORE_DIR": str(tmp_path / "store")}
+    return subprocess.run([sys.executable, "-m", "cli", *argv], cwd=ROOT, env=env, capture_output=True, text=True, timeout=120)
+
+
+def test_analyze_json_from_fixtures(tmp_path):
+    proc = run_cli(tmp_path, "analyze", "SAMPLE", "--json")
+    assert proc.returncode == 0, proc.stderr
+    out = json.loads(proc.stdout)
+    daily = load_recorded("1d", "SAMPLE")
+    assert out["symbol"] == "SAMPLE" and out["interval"] == "1d" and out["mtf_interval"] == "1wk"
+    assert out["price"] == pytest.approx(float(daily["Close"].iloc[-1]), rel=1e-6)   # เฟรม Compact เป็น float32
+    assert out["mtf_trend"] in ("Bullish", "Bearish", "Sideway")
+    report = out["ai_report"]
+    assert isinstance(report["score"], int) and report["strategy"] and report["sl"] < out["price"] < report["tp"]
+    assert all(z["bottom"] <= z["top"] for z in out["demand_zones"] + out["supply_zones"])
+
+
+def test_analyze_unknown_symbol_exits_1(tmp_path):
+    proc = run_cli(tmp_path, "analyze", "NOPE", "--json")
+    assert proc.returncode == 1
+    assert "error" in json.loads(proc.stdout)
@@ -0,0 +1,66 @@
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import pandas as pd
+import pytest
+
+import market_data
+from market_data import fetch_raw
+
+
+class SlowProvider:
+    """history ใช้เวลา history_s วินาที / fundamentals ค้างจนกว่า release ถูก set"""
+
+    name = "slow-test"; persist = False
+
+    def __init__(self, history_s=0.0, hang_info=False):
+        self.history_s = history_s; self.release = threading.Event()
+        self.hang_info = hang_info; self.info_calls = 0
+
+    def history(self, symbol, interval, period=None, start=None):
+        time.sleep(self.history_s)
+        return pd.DataFrame({"Close": [1.0]})
+
+    def fundamentals(self, symbol):
+        self.info_calls += 1
+        if self.hang_info: self.release.wait(10)
+        return {"symbol": symbol}
+
+
+@pytest.fixture
+def pools(monkeypatch):
+    """Pool ขนาดเล็กของเทสต์ (แท่งเทียน 1 Worker, info 1 Worker) แทน Pool กลางของ Process"""
+    fetch, info = ThreadPoolExecutor(1), ThreadPoolExecutor(1)
+    monkeypatch.setattr(market_data, "_fetch_pool", fetch); monkeypatch.setattr(market_data, "_info_pool", info)
+    yield fetch, info
+    fetch.shutdown(wait=False, cancel_futures=True); info.shutdown(wait=False, cancel_futures=True)
+
+
+def test_queue_wait_does_not_count_against_timeout(pools):
+    fetch, _ = pools
+    fetch.submit(time.sleep, 0.2)                       # Session อื่นยึด Worker อยู่ (รอคิว 0.2 + ทำงาน 0.1 > 0.25)
+    provider = SlowProvider(history_s=0.1)
+    frames, info, errors = fetch_raw("AAA", "1d", "1wk", provider=provider, history_timeout=0.25)
+    assert errors == {} and not frames["1d"].empty and info == {"symbol": "AAA"}
+
+
+def test_job_never_started_is_cancelled_from_queue(pools):
+    fetch, _ = pools
+    fetch.submit(time.sleep, 0.5)
+    provider = SlowProvider()
+    frames, _, errors = fetch_raw("AAA", "1d", "1wk", provider=provider, history_timeout=0.1)
+    assert errors == {"1d": "timeout"} and frames["1d"].empty
+
+
+def test_hung_info_does_not_starve_history_or_pile_up(pools):
+    provider = SlowProvider(hang_info=True)
+    try:
+        for _ in range(3):
+            frames, info, errors = fetch_raw("AAA", "1d", "1wk", provider=provider, history_timeout=1.0, info_timeout=0.05)
+            assert errors == {"info": "timeout"} and info == {} and not frames["1d"].empty
+    finally:
+        provider.release.set()
+    _, info_pool = pools
+    info_pool.submit(lambda: None).result(timeout=5)    # รอคิวของ info ว่าง
+    assert provider.info_calls == 1                     # info ที่หมดเวลาในคิวถูกยกเลิก ไม่ได้วิ่งตามมาทีหลัง
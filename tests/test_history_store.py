@@ -0,0 +1,70 @@
+import pandas as pd
+import pytest
+
+import history_store
+from history_store import COLUMNS, HistoryStore
+
+T0 = pd.Timestamp("2026-01-05 14:00", tz="UTC")
+
+
+def _entry(minutes, symbol="AAA", status="green", timeframe="1d", score=5, **extra):
+    return {"ts": T0 + pd.Timedelta(minutes=minutes), "symbol": symbol, "timeframe": timeframe,
+            "status_color": status, "score": score, "strategy": f"S-{status}", "price": 100.0 + minutes, **extra}
+
+
+@pytest.fixture
+def store(tmp_path):
+    return HistoryStore(str(tmp_path / "history.sqlite"))
+
+
+def test_record_many_and_paginate_newest_first(store):
+    store.record_many([_entry(i) for i in range(25)] + [_entry(100, symbol="BBB", in_demand_zone=True)])
+    assert store.count() == 26 and store.count(symbol="aaa") == 25 and store.symbols() == ["AAA", "BBB"]
+    first = store.page(0, page_size=10)
+    assert list(first["symbol"][:1]) == ["BBB"] and first["in_demand_zone"].iloc[0] == 1
+    pages = [store.page(p, page_size=10, symbol="AAA") for p in range(3)]
+    assert [len(p) for p in pages] == [10, 10, 5]
+    prices = pd.concat(pages)["price"].tolist()
+    assert prices == sorted(prices, reverse=True) and len(set(prices)) == 25   # ไม่ซ้ำ ไม่ข้าม
+    assert store.page(0, source="app")["source"].eq("app").all() and store.page(5).empty
+
+
+def test_since_window_limits_aggregates(store):
+    store.record_many([_entry(-60 * 24 * 40, status="red"), _entry(-60 * 24 * 3, status="green"), _entry(0, status="green")])
+    since = T0 - pd.Timedelta(days=30)
+    counts = store.signal_counts(since=since).iloc[0]
+    assert (counts["total"], counts["green"], counts["red"]) == (2, 2, 0)
+    assert store.signal_counts()["total"].iloc[0] == 3
+    assert store.daily_counts(since=since)["n"].sum() == 2
+    assert store.count(until=since) == 1
+
+
+def test_status_changes_uses_previous_row_per_symbol_and_tf(store):
+    store.record_many([
+        _entry(0, status="green"), _entry(1, status="green"), _entry(2, status="red"), _entry(3, status="red"),
+        _entry(4, status="green"),
+        _entry(1, symbol="BBB", status="red"), _entry(5, symbol="BBB", status="red"),
+        _entry(2, timeframe="1h", status="red"),   # TF อื่นของหุ้นเดียวกัน นับแยก
+    ])
+    changes = store.status_changes()
+    aaa = changes[(changes.symbol == "AAA") & (changes.timeframe == "1d")]
+    assert list(zip(aaa.prev_status.fillna("-"), aaa.status_color)) == [("-", "green"), ("green", "red"), ("red", "green")]
+    assert len(changes[changes.symbol == "BBB"]) == 1 and len(changes[changes.timeframe == "1h"]) == 1
+    assert changes["ts"].is_monotonic_increasing
+
+
+@pytest.mark.parametrize("suffix", [".csv", ".parquet"])
+def test_export_in_chunks(store, tmp_path, monkeypatch, suffix):
+    monkeypatch.setattr(history_store, "EXPORT_CHUNK", 3)
+    store.record_many([_entry(i, symbol="AAA" if i % 2 else "BBB") for i in range(10)])
+    path = str(tmp_path / f"out{suffix}")
+    assert store.export(path, symbol="AAA") == 5
+    out = pd.read_parquet(path) if suffix == ".parquet" else pd.read_csv(path)
+    assert list(out.columns) == ["id"] + COLUMNS and len(out) == 5 and out["symbol"].eq("AAA").all()
+    assert out["ts"].is_monotonic_increasing and out["id"].is_unique
+
+
+def test_export_empty_writes_header_only(store, tmp_path):
+    path = str(tmp_path / "empty.csv")
+    assert store.export(path, encoding="utf-8-sig", symbol="NONE") == 0
+    assert list(pd.read_csv(path, encoding="utf-8-sig").columns) == ["id"] + COLUMNS
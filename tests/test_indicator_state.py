@@ -0,0 +1,59 @@
+import json
+
+import numpy as np
+import pytest
+
+from benchmarks.fixtures import synthetic_ohlcv
+from indicators import INDICATOR_COLUMNS, IndicatorState, compute_indicator_frame
+
+
+def assert_matches_full(values, df):
+    full = compute_indicator_frame(df).iloc[-1]
+    for name in INDICATOR_COLUMNS:
+        a, b = values[name], full[name]
+        assert np.isnan(a) == np.isnan(b), name
+        if not np.isnan(b): assert a == pytest.approx(b, rel=1e-9, abs=1e-9), name
+
+
+@pytest.mark.parametrize("n", [5, 30, 150, 400])
+def test_append_matches_full_recompute(n):
+    df = synthetic_ohlcv("1d", n + 3, seed=11)
+    state = IndicatorState.from_frame(df.iloc[:n])
+    assert_matches_full(state.values, df.iloc[:n])
+    for i in range(n, n + 3):
+        state.append(df.iloc[i], df.index[i])
+        assert_matches_full(state.values, df.iloc[:i + 1])
+
+
+def test_append_from_empty_matches_each_prefix():
+    df = synthetic_ohlcv("1d", 60, seed=5)
+    state = IndicatorState()
+    for i in range(len(df)):
+        state.append(df.iloc[i], df.index[i])
+        assert_matches_full(state.values, df.iloc[:i + 1])
+
+
+@pytest.mark.parametrize("n", [25, 300])
+def test_replace_last_matches_recompute_with_new_bar(n):
+    df = synthetic_ohlcv("1d", n, seed=2)
+    state = IndicatorState.from_frame(df)
+    live = df.copy()
+    for close in (live['Close'].iloc[-1] * 1.03, live['Close'].iloc[-1] * 0.95):
+        bar = live.iloc[-1].copy(); bar['Close'] = close; bar['High'] = max(bar['High'], close); bar['Low'] = min(bar['Low'], close)
+        live.iloc[-1] = bar
+        state.update(bar, df.index[-1])   # Timestamp เดิม -> replace_last
+        assert_matches_full(state.values, live)
+
+
+@pytest.mark.parametrize("n", [12, 250])
+def test_dict_round_trip_continues_like_original(n):
+    df = synthetic_ohlcv("1d", n + 2, seed=9)
+    state = IndicatorState.from_frame(df.iloc[:n], symbol="AAA", interval="1d")
+    restored = IndicatorState.from_dict(json.loads(json.dumps(state.to_dict())))
+    assert (restored.symbol, restored.interval, restored.last_ts) == ("AAA", "1d", df.index[n - 1])
+    restored.append(df.iloc[n], df.index[n])
+    assert_matches_full(restored.values, df.iloc[:n + 1])
+    # undo ต้องรอดการ Serialize ด้วย: แทนแท่งล่าสุดหลังโหลดกลับ
+    again = IndicatorState.from_dict(json.loads(json.dumps(restored.to_dict())))
+    again.replace_last(df.iloc[n + 1])
+    assert_matches_full(again.values, df.iloc[list(range(n)) + [n + 1]])
@@ -0,0 +1,97 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+import indicators
+from benchmarks.fixtures import synthetic_ohlcv
+from indicators import (ADX_COL, BBB_COL, BBL_COL, BBM_COL, BBP_COL, BBU_COL, DMN_COL, DMP_COL, MACD_COL, MACDH_COL,
+                        MACDS_COL, compute_indicator_frame)
+
+RTOL = 1e-6; ATOL = 1e-8   # เกณฑ์เดียวกับ compare_with_pandas_ta
+
+
+# --- สูตรอ้างอิงตาม pandas_ta 0.3.14b (เขียนแยกด้วย pandas ล้วน ไม่เรียก Helper ของ indicators) ---
+
+def _rma(x, n): return x.ewm(alpha=1.0 / n, min_periods=n).mean()
+
+
+def _ema(x, n):
+    x = x.copy()
+    if len(x) < n: return pd.Series(np.nan, index=x.index)
+    seed = x.iloc[:n].mean()
+    x.iloc[:n - 1] = np.nan; x.iloc[n - 1] = seed
+    return x.ewm(span=n, adjust=False).mean()
+
+
+def _atr(h, l, c, n=14):
+    prev = c.shift(1)
+    tr = pd.concat([h - l, (h - prev).abs(), (l - prev).abs()], axis=1).max(axis=1); tr.iloc[:1] = np.nan
+    return _rma(tr, n)
+
+
+def pandas_ta_reference(df):
+    h, l, c, v = (df[k].astype("float64") for k in ("High", "Low", "Close", "Volume"))
+    ref = pd.DataFrame(index=df.index)
+    for n in (20, 50, 200): ref[f"EMA{n}"] = _ema(c, n)
+    d = c.diff(); pos = d.clip(lower=0); neg = d.clip(upper=0)
+    ref["RSI"] = 100 * _rma(pos, 14) / (_rma(pos, 14) + _rma(neg, 14).abs())
+    ref["ATR"] = atr = _atr(h, l, c)
+    macd = _ema(c, 12) - _ema(c, 26)
+    first = macd.first_valid_index()
+    sig = _ema(macd.loc[first:], 9).reindex(df.index) if first is not None else macd * np.nan
+    ref[MACD_COL] = macd; ref[MACDH_COL] = macd - sig; ref[MACDS_COL] = sig
+    mid = c.rolling(20).mean(); std = c.rolling(20).std(ddof=0)
+    ref[BBL_COL] = mid - 2 * std; ref[BBM_COL] = mid; ref[BBU_COL] = mid + 2 * std
+    ref[BBB_COL] = 100 * (ref[BBU_COL] - ref[BBL_COL]) / mid
+    ref[BBP_COL] = (c - ref[BBL_COL]) / (ref[BBU_COL] - ref[BBL_COL])
+    up = h - h.shift(1); dn = l.shift(1) - l
+    dmp = ((up > dn) & (up > 0)) * up; dmn = ((dn > up) & (dn > 0)) * dn
+    dmp.iloc[:1] = np.nan; dmn.iloc[:1] = np.nan
+    ref[DMP_COL] = 100 / atr * _rma(dmp, 14); ref[DMN_COL] = 100 / atr * _rma(dmn, 14)
+    ref[ADX_COL] = _rma(100 * (ref[DMP_COL] - ref[DMN_COL]).abs() / (ref[DMP_COL] + ref[DMN_COL]), 14)
+    sign = np.sign(c.diff()); sign.iloc[0] = 1
+    ref["OBV"] = obv = (sign * v).cumsum()
+    ref["Vol_SMA20"] = v.rolling(20).mean(); ref["OBV_SMA20"] = obv.rolling(20).mean(); ref["OBV_Slope"] = obv.diff(5) / 5
+    return ref
+
+
+def assert_frames_close(ours, ref, columns):
+    for name in columns:
+        a = ours[name].to_numpy(dtype="float64"); b = ref[name].to_numpy(dtype="float64")
+        assert (np.isnan(a) == np.isnan(b)).all(), f"{name}: ตำแหน่ง NaN ไม่ตรง"
+        np.testing.assert_allclose(a[~np.isnan(a)], b[~np.isnan(b)], rtol=RTOL, atol=ATOL, err_msg=name)
+
+
+@pytest.fixture(params=[600, 150, 30, 10], ids=lambda n: f"{n}bars")
+def bars(request):
+    return synthetic_ohlcv("1d", request.param, seed=3)
+
+
+def test_matches_pandas_ta_formulas(bars):
+    ref = pandas_ta_reference(bars)
+    assert_frames_close(compute_indicator_frame(bars), ref, ref.columns)
+
+
+def test_matches_pandas_ta_when_installed(bars):
+    pytest.importorskip("pandas_ta")
+    assert indicators.compare_with_pandas_ta(bars) == {}
+
+
+def test_frozen_values():
+    last = compute_indicator_frame(synthetic_ohlcv("1d", 600, seed=3)).iloc[-1]
+    expected = FROZEN_LAST_ROW
+    np.testing.assert_allclose([last[k] for k in expected], list(expected.values()), rtol=1e-6)
+
+
+def test_numba_path_equals_numpy_fallback(bars, monkeypatch):
+    if indicators.njit is None: pytest.skip("ไม่มี numba")
+    fused = compute_indicator_frame(bars)
+    monkeypatch.setattr(indicators, "njit", None)
+    fallback = compute_indicator_frame(bars)
+    assert_frames_close(fused, fallback, indicators.INDICATOR_COLUMNS)
+
+
+# แถวสุดท้ายของ synthetic_ohlcv("1d", 600, seed=3) (ค่าที่ผ่านสูตรอ้างอิงข้างบนแล้ว) กันสูตรเปลี่ยนทั้งสองฝั่งพร้อมกัน
+FROZEN_LAST_ROW = {"EMA20": 179.5241318, "EMA200": 167.6106312, "RSI": 55.91459785, "ATR": 6.29716549,
+                   MACD_COL: 2.170351774, MACDS_COL: 2.52021875, ADX_COL: 21.80619893,
+                   BBL_COL: 171.6680083, BBU_COL: 187.8863964, "OBV": 1083579659.0}
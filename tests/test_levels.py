@@ -0,0 +1,21 @@
+from analysis import cluster_levels, level_strength, select_levels
+
+
+def _c(val, label, weight=1.0):
+    return {'val': val, 'label': label, 'weight': weight}
+
+
+def test_cluster_weight_is_sum_of_sources():
+    (top,) = cluster_levels([_c(99.0, "A", 1.0), _c(98.8, "B", 2.5), _c(98.7, "C", 0.5)], is_support=True)
+    assert top['count'] == 3 and top['weight'] == 4.0
+    assert level_strength(top) == "💪 4 · 3 แหล่ง"
+
+
+def test_select_prefers_heavier_cluster_when_close_and_when_limited():
+    price = 100.0
+    merged = cluster_levels([_c(99.0, "near"), _c(95.0, "light"), _c(93.5, "heavy", 1.5),
+                             _c(90.0, "x1"), _c(85.0, "x2"), _c(80.0, "strong A", 1.5), _c(79.9, "strong B", 1.5)], is_support=True)
+    shown = select_levels(merged, price, min_dist=2.0, is_support=True)
+    assert [s['val'] for s in shown] == [99.0, 93.5, 90.0, 85.0, 80.0]   # 93.5 หนักกว่า 95.0 ที่ชิดกัน
+    top3 = select_levels(merged, price, min_dist=2.0, is_support=True, limit=3)
+    assert [s['val'] for s in top3] == [99.0, 93.5, 80.0]                 # ใกล้สุด + หนักสุด เรียงใกล้ไปไกล
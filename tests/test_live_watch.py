@@ -0,0 +1,97 @@
+import pandas as pd
+import pytest
+
+import shared_cache
+from live_feed import ReplayQuoteSource, is_new_bar, set_quote_source
+from market_data import EXCHANGE_TZ
+from providers import make_quote, set_provider
+
+from conftest import REPLAY_SYMBOL as SYMBOL, CountingReplay
+
+pytestmark = pytest.mark.usefixtures("offline")
+
+LAST = -5   # หน้าเว็บเห็นถึงแท่งนี้ (Replay ตัดด้วย as_of) แล้ว Quote ค่อยๆ เดินไปแท่งถัดไป
+
+
+def open_live_page(as_of_provider):
+    from streamlit.testing.v1 import AppTest
+    set_provider(as_of_provider)
+    at = AppTest.from_file("../app.py", default_timeout=120)
+    at.run()
+    at.toggle(key="live_mode").set_value(True)
+    at.text_input[0].input(SYMBOL)
+    at.button[0].click()
+    at.run()
+    assert not at.exception, at.exception
+    return at
+
+
+def live_caption(at):
+    return [c.value for c in at.caption if "Live" in c.value]
+
+
+
+
+def test_replay_quotes_drive_live_watch(replay_bars, tmp_path):
+    bars = replay_bars
+    as_of = bars.index[LAST]
+    quotes = ReplayQuoteSource({SYMBOL: bars}, start=LAST, steps_per_bar=2)
+    set_quote_source(quotes)
+    provider = CountingReplay(str(tmp_path), as_of=as_of)
+    at = open_live_page(provider)
+
+    # ราคาสดกลางแท่ง (Open -> Close ครึ่งทาง) ทับบน Header โดยไม่ดึงแท่งใหม่
+    bar = bars.iloc[LAST]
+    mid = bar['Open'] + (bar['Close'] - bar['Open']) / 2
+    assert live_caption(at)
+    assert any(f"{mid:,.2f}" in m.value for m in at.markdown)
+    calls = provider.history_calls
+
+    # Quote ยังอยู่แท่งเดิม -> Rerun แค่ราคา ไม่โหลดข้อมูลใหม่
+    shared_cache.get_shared_cache().delete(f"quote:{SYMBOL}")
+    at.run()
+    assert not at.exception
+    assert provider.history_calls == calls
+    assert "live_bar_trigger" not in at.session_state
+
+    # Quote ขึ้นแท่งใหม่ -> ล้างแคชข้อมูล + Rerun ทั้งหน้า 1 ครั้ง (โหลดแท่งใหม่จาก Replay ที่เดินเวลาไปแล้ว)
+    provider.as_of = bars.index[LAST + 1]; provider._frames.clear()
+    shared_cache.get_shared_cache().delete(f"quote:{SYMBOL}")
+    at.run()
+    assert not at.exception
+    assert at.session_state["live_bar_trigger"] == str(as_of)
+    assert provider.history_calls > calls
+    reloaded = provider.history_calls
+
+    # แท่งใหม่โหลดแล้ว -> รอบถัดไปไม่ Reload ซ้ำ
+    shared_cache.get_shared_cache().delete(f"quote:{SYMBOL}")
+    at.run()
+    assert not at.exception
+    assert provider.history_calls == reloaded
+
+
+# --- is_new_bar: Quote ที่ไม่รู้แท่ง (yfinance) ต้องไม่ทำให้เกิดแท่งใหม่ปลอมนอกเวลาตลาด ---
+
+def ny(ts):
+    return pd.Timestamp(ts, tz=EXCHANGE_TZ)
+
+
+@pytest.mark.parametrize("now, last_bar, interval, expected", [
+    ("2024-06-08 11:00", "2024-06-07", "1d", False),           # เสาร์: ปฏิทินบอกแท่งใหม่วันจันทร์ แต่ยังไม่ถึง
+    ("2024-06-10 08:00", "2024-06-07", "1d", False),           # จันทร์ Pre-market
+    ("2024-06-10 09:45", "2024-06-07", "1d", True),            # จันทร์ตลาดเปิด
+    ("2024-06-07 17:30", "2024-06-07 15:30", "1h", False),     # หลังปิดตลาด (Post)
+    ("2024-06-07 23:00", "2024-06-07 15:30", "1h", False),     # กลางคืน
+    ("2024-06-10 10:31", "2024-06-10 09:30", "1h", True),
+])
+def test_is_new_bar_gated_by_session(now, last_bar, interval, expected):
+    quote = make_quote(SYMBOL, 100.0, 99.0, ts=ny(now))
+    assert is_new_bar(quote, ny(last_bar), interval) is expected
+
+
+def test_is_new_bar_uses_market_time():
+    # วันหยุดกลางสัปดาห์ (4 ก.ค.): นาฬิกาอยู่ในเวลาตลาด แต่ราคาล่าสุดยังเป็นของวันก่อน
+    quote = make_quote(SYMBOL, 100.0, 99.0, ts=ny("2024-07-04 11:00"), market_ts=ny("2024-07-03 13:00"))
+    assert not is_new_bar(quote, ny("2024-07-03"), "1d")
+    quote = make_quote(SYMBOL, 100.0, 99.0, ts=ny("2024-07-05 09:35"), market_ts=ny("2024-07-05 09:34"))
+    assert is_new_bar(quote, ny("2024-07-03"), "1d")
@@ -0,0 +1,49 @@
+import numpy as np
+import pandas as pd
+
+from market_data import OHLCVStore, period_days, RETENTION_PERIOD, slice_period
+
+
+class AdjustingProvider:
+    """แหล่งข้อมูลปลอม: ส่ง frame ที่ตั้งไว้ นับจำนวนครั้งที่โหลดเต็มช่วง (period=)"""
+
+    def __init__(self, df):
+        self.df = df; self.full_loads = 0
+
+    def history(self, symbol, interval, period=None, start=None):
+        if start is not None: return self.df.loc[self.df.index >= pd.Timestamp(start)]
+        self.full_loads += 1
+        return slice_period(self.df, period)
+
+
+def _bars(n, end="2024-06-28"):
+    idx = pd.bdate_range(end=end, periods=n, tz="America/New_York")
+    close = np.linspace(50.0, 100.0, n)
+    return pd.DataFrame({"Open": close, "High": close + 1, "Low": close - 1, "Close": close, "Volume": 1e6,
+                         "Dividends": 0.0, "Stock Splits": 0.0}, index=idx)
+
+
+def test_dividend_in_delta_reloads_once_until_next_bar(tmp_path):
+    store = OHLCVStore(root=str(tmp_path)); base = _bars(300)
+    provider = AdjustingProvider(base)
+    store.history(provider, "AAA", "1d", period="1y")
+    assert provider.full_loads == 1
+    adjusted = base.copy(); adjusted[["Open", "High", "Low", "Close"]] *= 0.98   # ปันผลที่แท่งล่าสุด: Yahoo ปรับย้อนหลัง
+    adjusted.iloc[-1, adjusted.columns.get_loc("Dividends")] = 1.5
+    provider.df = adjusted
+    df = store.history(provider, "AAA", "1d", period="1y")
+    assert provider.full_loads == 2 and np.isclose(df["Close"].iloc[0], adjusted["Close"].iloc[-len(df)])
+    for _ in range(3): store.history(provider, "AAA", "1d", period="1y")
+    assert provider.full_loads == 2                                               # ไม่โหลด 10y ซ้ำทุกครั้ง
+    provider.df = pd.concat([adjusted, _bars(1, end="2024-07-01").assign(Close=100.0)])
+    assert store.history(provider, "AAA", "1d", period="1y").index[-1] == provider.df.index[-1]
+    assert provider.full_loads == 2
+
+
+def test_stored_history_is_capped_at_retention(tmp_path):
+    store = OHLCVStore(root=str(tmp_path)); old = _bars(260 * 15)
+    old.attrs['period'] = "10y"; store.save("AAA", "1d", old)
+    provider = AdjustingProvider(_bars(10, end="2024-07-12"))
+    df = store.history(provider, "AAA", "1d", period="10y")
+    assert (df.index[-1] - df.index[0]).days <= period_days(RETENTION_PERIOD["1d"])
+    assert len(store.load("AAA", "1d")) == len(df) < len(old)
@@ -0,0 +1,32 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from analysis import mtf_alignment
+
+
+def bars(index, high):
+    high = np.asarray(high, dtype="float64")
+    return pd.DataFrame({"Open": high - 1, "High": high, "Low": high - 2, "Close": high - 0.5, "Volume": 1000.0}, index=index)
+
+
+@pytest.mark.parametrize("tz", [None, "America/New_York"])
+def test_each_bar_sees_only_closed_week(tz):
+    """แท่งวันรอบรอยต่อสัปดาห์: ศุกร์ยังเห็นสัปดาห์ก่อนหน้า จันทร์ถัดไปถึงเห็นสัปดาห์ที่เพิ่งปิด (ไม่เห็นสัปดาห์ปัจจุบัน)"""
+    week = bars(pd.DatetimeIndex(["2024-12-30", "2025-01-06", "2025-01-13"], tz=tz), [10, 20, 30])   # Index = จันทร์ต้นสัปดาห์ แบบ Yahoo
+    day = bars(pd.DatetimeIndex(["2025-01-09", "2025-01-10", "2025-01-13", "2025-01-14"], tz=tz), [1, 2, 3, 4])
+    out = mtf_alignment(day, df_mtf=week, mtf_interval="1wk", df_week=week)
+    assert out.index.equals(day.index)
+    assert out["week_high"].tolist() == [10, 10, 20, 20]
+    assert out["week_low"].tolist() == [8, 8, 18, 18]
+    assert out["mtf_close"].tolist() == [9.5, 9.5, 19.5, 19.5]
+    assert (out["mtf_trend"] == "Sideway").all()             # ไม่ถึง 200 แท่ง -> ไม่มีเทรนด์
+    assert out["week_ema200"].isna().all()
+
+
+def test_bars_before_first_closed_week_are_empty():
+    week = bars(pd.DatetimeIndex(["2025-01-06"]), [20])
+    day = bars(pd.DatetimeIndex(["2025-01-10", "2025-01-13"]), [1, 2])
+    out = mtf_alignment(day, df_mtf=week, df_week=week)
+    assert np.isnan(out["week_high"].iloc[0]) and out["week_high"].iloc[1] == 20
+    assert out["mtf_trend"].tolist() == ["Sideway", "Sideway"]
@@ -0,0 +1,104 @@
+from multiprocessing import shared_memory
+
+import numpy as np
+import pandas as pd
+import pytest
+
+import optimizer
+from analysis import SCORING_DEFAULTS, ai_hybrid_analysis_batch, compute_indicators
+from backtest import OUTCOME_OPEN, WARMUP_BARS, signal_trades
+from benchmarks.fixtures import load_recorded, synthetic_ohlcv
+from optimizer import SweepData, evaluate, optimize_frames, rank_configs, walk_forward
+
+MAX_HOLD = 40
+GREEN = ("Aggressive Buy", "Buy on Dip", "Accumulate")   # คะแนน >= ENTRY_MIN_SCORE
+
+
+@pytest.fixture(scope="module")
+def frames():
+    sample = load_recorded("1d", "SAMPLE")
+    sample.index = sample.index.tz_localize(None)
+    return {"SAMPLE": sample.iloc[-900:], "SYN": synthetic_ohlcv("1d", 700, seed=4)}
+
+
+@pytest.fixture
+def worker(frames):
+    """SweepData + State ของ Worker ใน Process นี้ (evaluate เรียกตรงได้ ไม่ต้อง spawn)"""
+    with SweepData(frames, n_folds=3) as data:
+        optimizer._init_worker(data.spec, MAX_HOLD, optimizer.ENTRY_MIN_SCORE)
+        try: yield data
+        finally:
+            for shm in optimizer._worker.pop("shm"): shm.close()
+            optimizer._worker.clear()
+
+
+def _segment(ts, edges):
+    return pd.DatetimeIndex(edges[1:-1]).searchsorted(ts, side="right")
+
+
+def test_segments_follow_edges_and_skip_warmup(worker, frames):
+    col = optimizer.BAR_COLUMNS.index("Segment")
+    bars = np.ndarray(worker.spec["bars"][1], buffer=worker._bars[0].buf)
+    for symbol, b0, b1, _, _ in worker.layout:
+        seg = bars[col, b0:b1]
+        assert (seg[:WARMUP_BARS] == -1).all()
+        assert (seg[WARMUP_BARS:] == _segment(frames[symbol].index[WARMUP_BARS:], worker.edges)).all()
+    assert len(worker.edges) == worker.n_segments + 1 == 5
+
+
+def test_evaluate_purges_cross_segment_and_open_trades(worker, frames):
+    """ผลของ evaluate = เทรดจาก backtest.signal_trades ที่เข้า/ออกช่วงเดียวกัน และรู้ผลแล้ว (เทียบทางอ้อมคนละเส้นทางโค้ด)"""
+    expected = np.zeros((worker.n_segments, 3)); dropped = {"cross": 0, "open": 0}
+    for df in frames.values():
+        ind = compute_indicators(df.copy())[0]
+        trades = signal_trades(ind, ai_hybrid_analysis_batch(ind), max_hold=MAX_HOLD)
+        trades = trades[trades.strategy.isin(GREEN)]
+        seg_in = _segment(trades.entry_time, worker.edges); seg_out = _segment(trades.exit_time, worker.edges)
+        is_open = (trades.outcome == OUTCOME_OPEN).to_numpy()
+        dropped["cross"] += int(((seg_in != seg_out) & ~is_open).sum()); dropped["open"] += int(is_open.sum())
+        keep = (seg_in == seg_out) & ~is_open
+        for s, r in zip(seg_in[keep], trades.return_pct.to_numpy()[keep]):
+            expected[s] += (1, r, r > 0)
+    assert dropped["cross"] > 0 and dropped["open"] > 0   # ข้อมูลชุดนี้มีเทรดที่ต้องตัดทิ้งจริง
+    np.testing.assert_allclose(evaluate({}), expected, rtol=1e-9, atol=1e-9)
+
+
+def test_rank_marks_default_and_requires_min_trades():
+    configs = [{**SCORING_DEFAULTS, "tp_atr": 4.0}, dict(SCORING_DEFAULTS), {**SCORING_DEFAULTS, "sl_atr": 1.5}]
+    stats = np.zeros((3, 3, 3))
+    stats[0, 1:] = (20, 40.0, 12); stats[1, 1:] = (20, 20.0, 11); stats[2, 1:] = (5, 50.0, 5)   # ชุดสุดท้ายเทรดน้อย
+    table = rank_configs(configs, stats, min_trades=30)
+    assert table["Is Default"].tolist() == [False, True, False]
+    assert table["tp_atr"].iloc[0] == 4.0 and table["OOS Expectancy %"].iloc[0] == 2.0
+    assert table["sl_atr"].iloc[-1] == 1.5   # OOS Trades 10 < 30 -> ท้ายตาราง
+
+
+def test_walk_forward_picks_from_earlier_folds_only():
+    """Fold f เลือกชุดจากช่วง < f เท่านั้น: ชุด B ชนะในช่วงทดสอบแต่แพ้ในช่วงเรียนรู้ จึงห้ามถูกเลือก"""
+    configs = [{"name": "A"}, {"name": "B"}]
+    stats = np.zeros((2, 3, 3))
+    stats[0] = [(10, 10.0, 6), (10, 10.0, 6), (10, -5.0, 3)]
+    stats[1] = [(10, -10.0, 3), (10, 50.0, 9), (10, 90.0, 9)]
+    edges = pd.date_range("2020-01-01", periods=4, freq="365D")
+    folds = walk_forward(configs, stats, edges, min_trades=5)
+    assert folds["Fold"].tolist() == [1, 2]
+    assert folds["name"].tolist() == ["A", "B"]   # Fold 1 เห็นแค่ช่วง 0, Fold 2 เห็นช่วง 0-1 (B รวม 40 > A รวม 20)
+    assert folds["OOS Expectancy %"].tolist() == [1.0, 9.0]
+    assert folds["Test Start"].iloc[0] == edges[1].date().isoformat()
+
+
+def test_optimize_frames_single_worker_unlinks_shared_memory(frames, monkeypatch):
+    names = []
+
+    class Recording(SweepData):
+        def __init__(self, *args, **kwargs):
+            super().__init__(*args, **kwargs)
+            names.extend([self.spec["bars"][0], self.spec["swings"][0]])
+
+    monkeypatch.setattr(optimizer, "SweepData", Recording)
+    configs = [dict(SCORING_DEFAULTS), {**SCORING_DEFAULTS, "tp_atr": 2.0}]
+    ranking, folds = optimize_frames(frames, configs, n_folds=3, max_workers=1, max_hold=MAX_HOLD, min_trades=1)
+    assert len(ranking) == 2 and ranking["Is Default"].sum() == 1 and not folds.empty
+    assert len(names) == 2
+    for name in names:
+        with pytest.raises(FileNotFoundError): shared_memory.SharedMemory(name=name)
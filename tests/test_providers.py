@@ -0,0 +1,50 @@
+import pandas as pd
+import pytest
+
+from providers import ReplayProvider
+
+from conftest import REPLAY_SYMBOL as SYMBOL
+
+
+def test_as_of_cuts_history_and_quote(replay_bars, tmp_path):
+    cut = replay_bars.index[-30]
+    provider = ReplayProvider(str(tmp_path), as_of=cut + pd.Timedelta(hours=12))   # ระหว่างแท่ง -> ได้แท่งก่อนหน้า
+    df = provider.history(SYMBOL, "1d")
+    assert df.index[-1] == cut and df.equals(replay_bars.loc[df.index[0]:cut])
+    quote = provider.quote(SYMBOL)
+    assert quote["bar_ts"] == cut and quote["price"] == replay_bars["Close"].iloc[-30]
+    assert quote["change"] == pytest.approx(replay_bars["Close"].iloc[-30] - replay_bars["Close"].iloc[-31])
+    assert provider.name != ReplayProvider(str(tmp_path)).name   # as_of ต่างกัน -> Key แคชไม่ปนกัน
+
+
+def test_as_of_in_other_timezone(replay_bars, tmp_path):
+    cut = replay_bars.index[-10]
+    provider = ReplayProvider(str(tmp_path), as_of=cut.tz_convert("UTC"))
+    assert provider.history(SYMBOL, "1d", start=replay_bars.index[-20]).index[-1] == cut
+
+
+def _by(daily, start):
+    """รวมแท่งวันเป็นรอบเอง (เทียบกับ resample_bars) start = วันแรกของรอบของแต่ละแท่ง"""
+    g = daily.groupby(start)
+    return pd.DataFrame({"Open": g["Open"].first(), "High": g["High"].max(), "Low": g["Low"].min(),
+                         "Close": g["Close"].last(), "Volume": g["Volume"].sum()})
+
+
+@pytest.mark.parametrize("interval", ["1wk", "1mo"])
+def test_resamples_from_daily(replay_bars, tmp_path, interval):
+    provider = ReplayProvider(str(tmp_path))
+    out = provider.history(SYMBOL, interval)
+    days = replay_bars.index.normalize().tz_localize(None)
+    start = days - pd.to_timedelta(days.weekday, unit="D") if interval == "1wk" else days.to_period("M").to_timestamp()
+    expected = _by(replay_bars, start.tz_localize(replay_bars.index.tz).values)
+    assert (out.index.weekday == 0).all() if interval == "1wk" else (out.index.day == 1).all()
+    pd.testing.assert_frame_equal(out[expected.columns], expected, check_names=False, check_freq=False, check_index_type=False)
+
+
+def test_resampled_week_is_cut_at_as_of(replay_bars, tmp_path):
+    mid = replay_bars.index[replay_bars.index.weekday == 2][-5]               # พุธ: สัปดาห์ยังไม่จบ
+    week = ReplayProvider(str(tmp_path), as_of=mid).history(SYMBOL, "1wk")
+    monday = mid.normalize() - pd.Timedelta(days=2)
+    assert week.index[-1] == monday
+    days = replay_bars.loc[monday:mid]
+    assert week["High"].iloc[-1] == days["High"].max() and week["Close"].iloc[-1] == days["Close"].iloc[-1]
@@ -0,0 +1,25 @@
+import numpy as np
+import pytest
+
+from analysis import ai_hybrid_analysis_batch, analyze_frame, find_demand_zones
+
+
+def _same_report(row, report):
+    assert row['score'] == report['score'] and row['strategy'] == report['strategy']
+    assert row['status_color'] == report['status_color'] and row['in_demand_zone'] == report['in_demand_zone']
+    assert row['sl'] == pytest.approx(report['sl'], rel=1e-12) and row['tp'] == pytest.approx(report['tp'], rel=1e-12)
+
+
+def test_batch_rows_match_scalar_on_truncations(parity_raw, parity_ind):
+    """แถว T ของการให้คะแนนทั้งเฟรม = ai_hybrid_analysis ของข้อมูลถึงแท่ง T (ไม่แอบเห็นโซน/ราคาอนาคต)"""
+    batch = ai_hybrid_analysis_batch(parity_ind)
+    for end in np.linspace(60, len(parity_raw), 25).astype(int):
+        _same_report(batch.iloc[end - 1], analyze_frame(parity_raw.iloc[:end].copy())['ai_report'])
+
+
+def test_batch_last_row_matches_scalar_with_price_override(parity_raw, parity_ind):
+    close = float(parity_raw['Close'].iloc[-1])
+    for price in (close * 0.97, close * 1.04):
+        report = analyze_frame(parity_raw.copy(), price=price)['ai_report']
+        _same_report(ai_hybrid_analysis_batch(parity_ind, demand_zones=find_demand_zones(parity_ind), price=price).iloc[-1], report)
+        _same_report(ai_hybrid_analysis_batch(parity_ind, price=price).iloc[-1], report)
@@ -0,0 +1,64 @@
+import sqlite3
+
+import pytest
+
+from shared_cache import SharedCache, SQLiteCache
+
+
+@pytest.fixture
+def backend(tmp_path):
+    return SQLiteCache(str(tmp_path / "cache.sqlite"), max_bytes=20_000, flush_interval=3600)
+
+
+def stored_bytes(backend):
+    return backend._conn().execute("SELECT COALESCE(SUM(size), 0) FROM cache").fetchone()[0]
+
+
+def test_running_total_matches_table(backend):
+    for i in range(40): backend.set(f"k{i}", b"x" * 1000)      # เกิน max_bytes -> Evict
+    backend.set("k39", b"y" * 10)                               # แทนที่ Key เดิม
+    backend.delete("k38"); backend.delete("missing")
+    assert backend.stats()["bytes"] == stored_bytes(backend) <= backend.max_bytes
+
+
+def test_reads_do_not_write_until_flush(backend):
+    backend.set("a", b"1"); backend.set("b", b"2")
+    before = backend._conn().execute("SELECT last_access FROM cache WHERE key = 'a'").fetchone()[0]
+    assert backend.get("a") == b"1" and backend.get("zz") is None
+    assert backend._conn().execute("SELECT last_access FROM cache WHERE key = 'a'").fetchone()[0] == before
+    stats = backend.stats()                                     # stats() เขียนของที่ค้างก่อนอ่าน
+    assert (stats["hits"], stats["misses"]) == (1, 1)
+    assert backend._conn().execute("SELECT last_access FROM cache WHERE key = 'a'").fetchone()[0] > before
+
+
+def test_lru_uses_batched_access_times(tmp_path):
+    backend = SQLiteCache(str(tmp_path / "lru.sqlite"), max_bytes=5_000, flush_interval=3600)
+    for i in range(5): backend.set(f"k{i}", b"x" * 1000)
+    backend.get("k0")                                           # ยังไม่ได้ Flush แต่ set ถัดไปเขียนรวมไปด้วย
+    backend.set("new", b"x" * 1000)
+    assert backend.get("k0") is not None and backend.get("k1") is None
+
+
+def test_locked_backend_is_a_miss_not_an_error(backend):
+    cache = SharedCache(backend)
+    cache.set("k", {"v": 1})
+    backend._conn().execute("PRAGMA busy_timeout = 50")
+    other = sqlite3.connect(backend.path, timeout=0)
+    other.execute("BEGIN EXCLUSIVE")
+    try:
+        assert cache.get("k") == {"v": 1}                       # WAL: อ่านได้ระหว่างมีคนเขียน
+        assert cache.get_or_compute("other", lambda: {"v": 2}) == {"v": 2}   # เขียนไม่ได้ -> ยังได้ค่าที่คำนวณ
+    finally:
+        other.rollback(); other.close()
+    assert cache.errors == 1
+
+
+def test_broken_backend_is_a_miss():
+    class Broken:
+        def get(self, key): raise sqlite3.OperationalError("database is locked")
+        def set(self, key, value, ttl=None): raise sqlite3.OperationalError("database is locked")
+        def delete(self, key): raise sqlite3.OperationalError("database is locked")
+    cache = SharedCache(Broken())
+    assert cache.get("k") is None
+    assert cache.get_or_compute("k", lambda: 42) == 42
+    assert cache.errors == 3
@@ -0,0 +1,163 @@
+import glob
+import json
+import os
+import subprocess
+import sys
+import time
+
+import pytest
+
+from sheets_writer import FakeSheetBackend, SheetWriter
+
+
+def rows(n, start=0):
+    return [["2024-01-01", f"{i:05d}", "AAPL", "1d"] for i in range(start, start + n)]
+
+
+@pytest.fixture
+def spool(tmp_path):
+    return str(tmp_path / "spool.jsonl")
+
+
+def wait_until(cond, timeout=5.0):
+    deadline = time.monotonic() + timeout
+    while not cond():
+        if time.monotonic() > deadline: return False
+        time.sleep(0.01)
+    return True
+
+
+def test_batches_split_by_batch_size(spool):
+    backend = FakeSheetBackend()
+    w = SheetWriter(backend, spool_path=spool, batch_size=10, flush_interval=10.0)
+    w.submit_many(rows(35))
+    assert w.flush(5.0)
+    w.stop()
+    assert backend.batches == [10, 10, 10, 5]
+    assert backend.rows == rows(35)
+
+
+def test_retry_until_backend_recovers(spool):
+    backend = FakeSheetBackend(fail_times=2)
+    w = SheetWriter(backend, spool_path=spool, flush_interval=0.0, backoff_base=0.02)
+    w.submit_many(rows(3))
+    assert w.flush(5.0)
+    w.stop()
+    assert backend.calls == 3 and backend.rows == rows(3)
+    assert w.sent == 3 and w.failures == 0
+
+
+def test_backoff_not_cut_short_by_submit_or_flush(spool):
+    backend = FakeSheetBackend(fail_times=1)
+    w = SheetWriter(backend, spool_path=spool, flush_interval=0.0, backoff_base=0.5, backoff_max=0.5)
+    w.submit(rows(1)[0])
+    assert wait_until(lambda: backend.calls == 1)
+    for r in rows(5, start=1):
+        w.submit(r)           # submit ปลุก Thread ทุกครั้ง แต่ยังไม่ถึงเวลา Retry
+    assert not w.flush(0.2)   # flush ก็ไม่ทำให้ส่งก่อนครบ Backoff
+    assert backend.calls == 1
+    assert w.flush(5.0)
+    w.stop()
+    assert backend.calls == 2 and backend.rows == rows(6)
+
+
+def test_spool_replayed_after_restart(spool):
+    down = FakeSheetBackend(fail_times=10**6)
+    w = SheetWriter(down, spool_path=spool, flush_interval=0.0, backoff_base=10.0)
+    w.submit_many(rows(4))
+    assert wait_until(lambda: down.calls >= 1)
+    w.stop(timeout=0.1)       # ยังส่งไม่ได้ -> แถวค้างใน Spool
+    assert w.pending == 4 and os.path.exists(w.spool_path)
+
+    backend = FakeSheetBackend()
+    w2 = SheetWriter(backend, spool_path=spool, flush_interval=0.0)
+    assert w2.flush(5.0)
+    w2.stop()
+    assert backend.rows == rows(4)
+    assert not os.path.exists(w2.spool_path)
+
+
+def test_adopts_orphaned_spool_but_not_live_ones(spool, tmp_path):
+    orphan = str(tmp_path / "spool.deadhost-1.jsonl")
+    live = str(tmp_path / "spool.livehost-2.jsonl")
+    legacy = spool  # Spool ไฟล์เดียวแบบเก่า
+    for path, data in ((orphan, rows(2)), (live, rows(2, start=10)), (legacy, rows(1, start=20))):
+        with open(path, "w", encoding="utf-8") as f:
+            for r in data: f.write(json.dumps(r) + "\n")
+    live_lock = SheetWriter._try_lock(live)   # จำลอง Replica ที่ยังทำงาน (ถือล็อกอยู่)
+    assert live_lock is not None
+    try:
+        backend = FakeSheetBackend()
+        w = SheetWriter(backend, spool_path=spool, flush_interval=0.0)
+        assert w.flush(5.0)
+        w.stop()
+    finally:
+        os.close(live_lock)
+    assert sorted(backend.rows) == sorted(rows(2) + rows(1, start=20))
+    assert not os.path.exists(orphan) and not os.path.exists(legacy)
+    with open(live, encoding="utf-8") as f:
+        assert [json.loads(line) for line in f] == rows(2, start=10)
+
+
+REPLICA = """
+import sys
+from sheets_writer import FakeSheetBackend, SheetWriter
+w = SheetWriter(FakeSheetBackend(fail_times=10**6), spool_path=sys.argv[1], flush_interval=0.0, backoff_base=60.0)
+w.submit_many([["2024-01-01", f"{i:05d}", "MSFT", "1d"] for i in range(3)])
+print("ready", flush=True)
+sys.stdin.readline()
+"""
+
+
+def test_two_replicas_on_one_spool(spool):
+    root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    child = subprocess.Popen([sys.executable, "-c", REPLICA, spool], cwd=root, stdin=subprocess.PIPE,
+                             stdout=subprocess.PIPE, text=True, env={**os.environ, "PYTHONPATH": root})
+    try:
+        assert child.stdout.readline().strip() == "ready"
+        backend = FakeSheetBackend()
+        w = SheetWriter(backend, spool_path=spool, flush_interval=0.0)
+        w.submit_many(rows(2))
+        assert w.flush(5.0)
+        w.stop()
+        assert backend.rows == rows(2)       # ไม่เอาแถวของ Replica ที่ยังทำงานไปส่งซ้ำ
+        other = [p for p in glob.glob(spool.replace(".jsonl", ".*.jsonl")) if p != w.spool_path]
+        assert len(other) == 1
+        with open(other[0], encoding="utf-8") as f:
+            assert len(f.readlines()) == 3     # และไม่ลบแถวที่อีกตัวยังส่งไม่ได้
+    finally:
+        child.kill(); child.wait()
+
+    # Replica ตาย -> ตัวถัดไปรับ Spool ที่ค้างไปส่งต่อ
+    backend = FakeSheetBackend()
+    w = SheetWriter(backend, spool_path=spool, flush_interval=0.0)
+    assert w.flush(5.0)
+    w.stop()
+    assert [r[2] for r in backend.rows] == ["MSFT"] * 3
+
+
+def test_gsheet_backend_appends_raw_values():
+    from sheets_writer import GSheetBackend
+
+    class Worksheet:
+        def append_rows(self, rows, **kwargs): self.rows = rows; self.kwargs = kwargs
+
+    backend = GSheetBackend({}); backend._sheet = ws = Worksheet()
+    backend.append_rows([["=HYPERLINK(1)", "+1.23%", "14:05:03"]])
+    assert ws.kwargs == {"value_input_option": "RAW"}
+
+
+def test_scanner_save_without_secrets_shows_error(monkeypatch):
+    from streamlit.errors import StreamlitSecretNotFoundError
+    from streamlit.runtime.secrets import Secrets
+    from streamlit.testing.v1 import AppTest
+
+    def missing(self, key): raise StreamlitSecretNotFoundError("No secrets found")
+    monkeypatch.setattr(Secrets, "__contains__", missing)   # เหมือนไม่มี secrets.toml
+    at = AppTest.from_file("../pages/1_Scanner.py", default_timeout=60)
+    at.session_state["scan_results"] = [{"Symbol": "AAA", "Score": 3, "Price": 10.0}]
+    at.run()
+    next(b for b in at.button if "Sheet" in b.label).click()
+    at.run()
+    assert not at.exception, at.exception
+    assert any("gcp_service_account" in e.value for e in at.error)
@@ -0,0 +1,22 @@
+import pytest
+
+import scalar_reference as ref
+from analysis import find_demand_zones, find_supply_zones
+
+
+def _bounds(zones): return [(z['bottom'], z['top']) for z in zones]
+
+
+@pytest.mark.parametrize("with_atr", [True, False], ids=["atr", "no-atr"])
+def test_zones_match_scalar(parity_ind, with_atr):
+    df = parity_ind if with_atr else parity_ind.drop(columns="ATR")
+    for end in (len(df), len(df) - 37, 260, 60, 19):   # หลายจุดตัด (ราคาปัจจุบันต่างกัน -> ตัดโซนไกล 20% ต่างกัน)
+        part = df.iloc[:end]
+        assert _bounds(find_demand_zones(part)) == _bounds(ref.find_demand_zones(part))
+        assert _bounds(find_supply_zones(part)) == _bounds(ref.find_supply_zones(part))
+    assert find_demand_zones(df) or find_supply_zones(df)   # ข้อมูลต้องมีโซนให้เทียบจริง
+
+
+def test_zone_position_and_timestamp(parity_ind):
+    for z in find_demand_zones(parity_ind):
+        assert parity_ind.index[z['index']] == z['timestamp'] and parity_ind['Low'].iloc[z['index']] == z['bottom']